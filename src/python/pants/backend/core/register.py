@@ -14,6 +14,7 @@ from pants.backend.core.targets.doc import Page, Wiki, WikiArtifact
 from pants.backend.core.targets.prep_command import PrepCommand
 from pants.backend.core.targets.resources import Resources
 from pants.backend.core.tasks.builddictionary import BuildBuildDictionary
+from pants.backend.core.tasks.cache_stats import CacheStats
 from pants.backend.core.tasks.changed_target_goals import CompileChanged, TestChanged
 from pants.backend.core.tasks.clean import Cleaner, Invalidator
 from pants.backend.core.tasks.confluence_publish import ConfluencePublish
@@ -128,6 +129,9 @@ def register_goals():
   task(name='killserver', action=KillServer, serialize=False).install().with_description(
       'Kill the reporting server.')
 
+  task(name='cache-stats', action=CacheStats).install().with_description(
+      'Report the size, hit rate and evictions of local artifact caches.')
+
   # Bootstrapping.
   task(name='prepare', action=PrepareResources).install('resources')
 
@@ -0,0 +1,56 @@
+# coding=utf-8
+# Copyright 2015 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (absolute_import, division, generators, nested_scopes, print_function,
+                        unicode_literals, with_statement)
+
+import os
+
+from pants.backend.core.tasks.console_task import ConsoleTask
+from pants.cache.local_artifact_cache import (ContentAddressedLocalArtifactCache,
+                                              LocalArtifactCache)
+
+
+class CacheStats(ConsoleTask):
+  """Report the size, hit rate and evictions of each task's local artifact cache."""
+
+  def console_output(self, targets):
+    for cache_root in self._local_cache_roots():
+      yield '{}:'.format(cache_root)
+      if not os.path.isdir(cache_root):
+        continue
+      for task_name in sorted(os.listdir(cache_root)):
+        path = os.path.join(cache_root, task_name)
+        if os.path.isdir(path):
+          yield '  {}: {}'.format(task_name, self._format(self._stats(path)))
+
+  def _local_cache_roots(self):
+    roots = []
+    def collect(spec):
+      if isinstance(spec, (list, tuple)):
+        for s in spec:
+          collect(s)
+      elif spec.startswith('/') or spec.startswith('~'):
+        root = os.path.realpath(os.path.expanduser(spec))
+        if root not in roots:
+          roots.append(root)
+    collect(self.get_options().read_artifact_caches or [])
+    collect(self.get_options().write_artifact_caches or [])
+    return roots
+
+  def _stats(self, path):
+    pants_workdir = self.context.options.for_global_scope().pants_workdir
+    if os.path.isdir(os.path.join(path, ContentAddressedLocalArtifactCache.BLOB_DIR)):
+      cache_type = ContentAddressedLocalArtifactCache
+    else:
+      cache_type = LocalArtifactCache
+    return cache_type(pants_workdir, path, self.get_options().cache_compression).stats()
+
+  @staticmethod
+  def _format(stats):
+    lookups = stats['hits'] + stats['misses']
+    hit_rate = '{:.1f}%'.format(100.0 * stats['hits'] / lookups) if lookups else 'n/a'
+    return ('{entries} artifacts, {bytes} bytes, hit rate {hit_rate} ({hits}/{lookups}), '
+            'evicted {evicted_entries} artifacts ({evicted_bytes} bytes)'
+            .format(hit_rate=hit_rate, lookups=lookups, **stats))
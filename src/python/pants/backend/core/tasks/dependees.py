@@ -70,27 +70,34 @@ class ReverseDepmap(ConsoleTask):
       buildfiles = address_mapper.scan_buildfiles(get_buildroot(), spec_excludes=self._spec_excludes)
 
     build_graph = self.context.build_graph
-    build_file_parser = self.context.build_file_parser
-
-    dependees_by_target = defaultdict(set)
-    for build_file in buildfiles:
-      address_map = build_file_parser.parse_build_file(build_file)
-      for address in address_map.keys():
-        build_graph.inject_address_closure(address)
-      for address in address_map.keys():
-        target = build_graph.get_target(address)
-        # TODO(John Sirois): tighten up the notion of targets written down in a BUILD by a
-        # user vs. targets created by pants at runtime.
-        target = self.get_concrete_target(target)
-        for dependency in target.dependencies:
-          dependency = self.get_concrete_target(dependency)
-          dependees_by_target[dependency].add(target)
-
     roots = set(self.context.target_roots)
     if self._closed:
       for root in roots:
         yield root.address.spec
 
+    dependee_index = build_graph.dependee_index
+    if dependee_index is not None:
+      spec_paths = dependee_index.update(build_graph, buildfiles)
+      root_specs = set(root.address.spec for root in roots)
+      dependees = dependee_index.dependees(root_specs, spec_paths, transitive=self._transitive)
+      for spec in dependees - root_specs:
+        yield spec
+      return
+
+    addresses = address_mapper.addresses_in_build_files(buildfiles)
+    for address in addresses:
+      build_graph.inject_address_closure(address)
+
+    dependees_by_target = defaultdict(set)
+    for address in addresses:
+      target = build_graph.get_target(address)
+      # TODO(John Sirois): tighten up the notion of targets written down in a BUILD by a
+      # user vs. targets created by pants at runtime.
+      target = self.get_concrete_target(target)
+      for dependency in target.dependencies:
+        dependency = self.get_concrete_target(dependency)
+        dependees_by_target[dependency].add(target)
+
     for dependant in self.get_dependants(dependees_by_target, roots):
       yield dependant.address.spec
 
@@ -231,18 +231,15 @@ class MarkdownToHtml(Task):
     if css:
       self.context.log.info('Emitted {}'.format(css))
 
-    def is_page(target):
-      return isinstance(target, Page)
-
     roots = set()
     interior_nodes = set()
     if self.open:
-      dependencies_by_page = self.context.dependents(on_predicate=is_page, from_predicate=is_page)
+      dependencies_by_page = self.context.dependents(on_predicate=Page, from_predicate=Page)
       roots.update(dependencies_by_page.keys())
       for dependencies in dependencies_by_page.values():
         interior_nodes.update(dependencies)
         roots.difference_update(dependencies)
-      for page in self.context.targets(is_page):
+      for page in self.context.targets(Page):
         # There are no in or out edges so we need to show show this isolated page.
         if not page.dependencies and page not in interior_nodes:
           roots.add(page)
@@ -250,7 +247,7 @@ class MarkdownToHtml(Task):
     plaingenmap = self.context.products.get('markdown_html')
     wikigenmap = self.context.products.get('wiki_html')
     show = []
-    for page in self.context.targets(is_page):
+    for page in self.context.targets(Page):
       def process_page(key, outdir, url_builder, config, genmap, fragment=False):
         if page.format == 'rst':
           html_path = self.process_rst(
@@ -0,0 +1,124 @@
+# coding=utf-8
+# Copyright 2015 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (absolute_import, division, generators, nested_scopes, print_function,
+                        unicode_literals, with_statement)
+
+import os
+from contextlib import contextmanager
+from hashlib import sha1
+
+from pants.base.fingerprint_strategy import FingerprintStrategy
+from pants.option.options import Options
+from pants.util.dirutil import safe_open
+
+
+class PassedTestsFingerprintStrategy(FingerprintStrategy):
+  """Fingerprints targets along with the inputs of the test run they are part of.
+
+  The sources of a test target and of its transitive dependencies are covered by invalidating
+  dependents.  Everything else the results of its tests depend on - the test runner and its
+  options, the jvm options or interpreters, the environment - is passed in as a single fingerprint
+  of the run, mixed into that of every target.
+  """
+
+  def __init__(self, run_fingerprint):
+    self._run_fingerprint = run_fingerprint
+
+  def compute_fingerprint(self, target):
+    fingerprint = target.payload.fingerprint()
+    if fingerprint is None:
+      return None
+    hasher = sha1()
+    hasher.update(fingerprint)
+    hasher.update(self._run_fingerprint)
+    return hasher.hexdigest()
+
+  def __hash__(self):
+    return hash((type(self), self._run_fingerprint))
+
+  def __eq__(self, other):
+    return type(self) == type(other) and self._run_fingerprint == other._run_fingerprint
+
+
+class PassedTestsCacheMixin(object):
+  """A mixin for test tasks that skips the tests of targets that passed before with the same inputs.
+
+  With --cache-results, a test target whose tests passed is recorded as such under its cache key,
+  locally and, if the task is configured with write artifact caches, in the artifact cache, so
+  that other runs, e.g. other CI shards, skip it too.
+
+  Requires that the mixing task class is a Task.
+  """
+
+  @classmethod
+  def register_options(cls, register):
+    super(PassedTestsCacheMixin, cls).register_options(register)
+    register('--cache-results', action='store_true', default=False,
+             help='Skip the tests of targets that passed before with the same sources, '
+                  'dependencies and test options.')
+    register('--cache-results-env-vars', advanced=True, type=Options.list, default=[],
+             help='Re-run the tests of targets that passed before if any of these environment '
+                  'variables changed since.')
+
+  def __init__(self, *args, **kwargs):
+    super(PassedTestsCacheMixin, self).__init__(*args, **kwargs)
+    self.setup_artifact_cache()
+    self._untested_vts = {}
+
+  @contextmanager
+  def invalidated_tests(self, targets, run_inputs, cacheable=True):
+    """Yields those of the test targets whose tests need to run.
+
+    The yielded targets are recorded as passed if the block completes.  Blocks that fail because
+    of some of the targets should record those that passed with `record_passed_tests` first.
+
+    :param list targets: The test targets.
+    :param list run_inputs: Strings describing how the tests are run, e.g. the test runner options.
+    :param bool cacheable: False if the results can't be cached, e.g. because the run must run all
+      the tests to collect coverage.
+    """
+    if not (cacheable and self.get_options().cache_results):
+      yield targets
+      return
+
+    strategy = PassedTestsFingerprintStrategy(self._run_fingerprint(run_inputs))
+    with self.invalidated(targets,
+                          invalidate_dependents=True,
+                          fingerprint_strategy=strategy,
+                          silent=True) as invalidation_check:
+      passed = set(vt.target for vt in invalidation_check.all_vts if vt.valid)
+      if passed:
+        self._report_targets('Skipping the tests of ', sorted(passed),
+                             ', which passed before with the same inputs.')
+      self._untested_vts = {vt.target: vt for vt in invalidation_check.invalid_vts}
+      yield [target for target in targets if target not in passed]
+      self.record_passed_tests(list(self._untested_vts))
+
+  def record_passed_tests(self, targets):
+    """Records that the tests of the given targets passed, if they can be cached.
+
+    :param list targets: Targets yielded by `invalidated_tests`.
+    """
+    vts = [self._untested_vts.pop(target) for target in targets if target in self._untested_vts]
+    for vt in vts:
+      vt.update()
+    if vts and self.artifact_cache_writes_enabled():
+      vts_artifactfiles_pairs = []
+      for vt in vts:
+        marker = os.path.join(self.workdir, 'passed', vt.target.id)
+        with safe_open(marker, 'w') as fp:
+          fp.write(vt.cache_key.hash)
+        vts_artifactfiles_pairs.append((vt, [marker]))
+      self.update_artifact_cache(vts_artifactfiles_pairs)
+
+  def _run_fingerprint(self, run_inputs):
+    hasher = sha1()
+    for run_input in run_inputs:
+      hasher.update(run_input.encode('utf-8'))
+      hasher.update(b'\0')
+    for name in sorted(self.get_options().cache_results_env_vars):
+      hasher.update('{}={}'.format(name, os.environ.get(name, '')).encode('utf-8'))
+      hasher.update(b'\0')
+    return hasher.hexdigest()
@@ -14,11 +14,12 @@ from contextlib import contextmanager
 
 from twitter.common.collections.orderedset import OrderedSet
 
-from pants.base.build_invalidator import BuildInvalidator, CacheKeyGenerator
+from pants.base.build_invalidator import CacheKeyGenerator, create_build_invalidator
 from pants.base.cache_manager import InvalidationCacheManager, InvalidationCheck
 from pants.base.exceptions import TaskError
 from pants.base.worker_pool import Work
-from pants.cache.artifact_cache import UnreadableArtifact, call_insert, call_use_cached_files
+from pants.cache.artifact_cache import (NonfatalArtifactCacheError, UnreadableArtifact, call_insert,
+                                        call_use_cached_files)
 from pants.cache.cache_setup import create_artifact_cache
 from pants.cache.read_write_artifact_cache import ReadWriteArtifactCache
 from pants.reporting.reporting_utils import items_to_report_element
@@ -190,6 +191,8 @@ class TaskBase(AbstractClass):
       self.context.options.for_global_scope().pants_workdir,
       'build_invalidator',
       self.stable_name())
+    self._build_invalidator_backend = self.context.options.for_global_scope().build_invalidator
+    self._fingerprint_workers = self.context.options.for_global_scope().fingerprint_workers
 
   def get_options(self):
     """Returns the option values for this task's scope."""
@@ -240,7 +243,13 @@ class TaskBase(AbstractClass):
         spec=spec,
         task_name=self.stable_name(),
         compression=compression,
-        action=action)
+        action=action,
+        bulk_lookup=self.get_options().cache_bulk_lookup,
+        max_entries=self.get_options().cache_max_entries,
+        max_bytes=self.get_options().cache_max_bytes,
+        dedup=self.get_options().cache_dedup,
+        codec=self.get_options().cache_codec,
+        compression_threads=self.get_options().cache_compression_threads)
     else:
       return None
 
@@ -270,7 +279,8 @@ class TaskBase(AbstractClass):
 
   def invalidate(self):
     """Invalidates all targets for this task."""
-    BuildInvalidator(self._build_invalidator_dir).force_invalidate_all()
+    create_build_invalidator(self._build_invalidator_dir,
+                             self._build_invalidator_backend).force_invalidate_all()
 
   def create_cache_manager(self, invalidate_dependents, fingerprint_strategy=None):
     """Creates a cache manager that can be used to invalidate targets on behalf of this task.
@@ -286,7 +296,9 @@ class TaskBase(AbstractClass):
     return InvalidationCacheManager(self._cache_key_generator,
                                     self._build_invalidator_dir,
                                     invalidate_dependents,
-                                    fingerprint_strategy=fingerprint_strategy)
+                                    fingerprint_strategy=fingerprint_strategy,
+                                    build_invalidator_backend=self._build_invalidator_backend,
+                                    fingerprint_workers=self._fingerprint_workers)
 
   @contextmanager
   def invalidated(self,
@@ -296,7 +308,8 @@ class TaskBase(AbstractClass):
                   silent=False,
                   locally_changed_targets=None,
                   fingerprint_strategy=None,
-                  topological_order=False):
+                  topological_order=False,
+                  artifact_cache_check=True):
     """Checks targets for invalidation, first checking the artifact cache.
 
     Subclasses call this to figure out what to work on.
@@ -314,6 +327,9 @@ class TaskBase(AbstractClass):
                                   and over, and partitioning them separately is a performance win.
     :param fingerprint_strategy:   A FingerprintStrategy instance, which can do per task, finer grained
                                   fingerprinting of a given Target.
+    :param artifact_cache_check:   False to leave checking the artifact cache for the invalid
+                                  targets to the caller, e.g. to overlap it with work on other
+                                  targets.
 
     If no exceptions are thrown by work in the block, the build cache is updated for the targets.
     Note: the artifact cache is not updated. That must be done manually.
@@ -344,7 +360,8 @@ class TaskBase(AbstractClass):
           colors[t] = 'not_locally_changed'
     invalidation_check = cache_manager.check(targets, partition_size_hint, colors, topological_order=topological_order)
 
-    if invalidation_check.invalid_vts and self.artifact_cache_reads_enabled():
+    if (invalidation_check.invalid_vts and artifact_cache_check
+        and self.artifact_cache_reads_enabled()):
       with self.context.new_workunit('cache'):
         cached_vts, uncached_vts = \
           self.check_artifact_cache(self.check_artifact_cache_for(invalidation_check))
@@ -378,10 +395,14 @@ class TaskBase(AbstractClass):
         msg_elements.append('.')
         self.context.log.info(*msg_elements)
 
-    # Yield the result, and then mark the targets as up to date.
-    yield invalidation_check
-    for vt in invalidation_check.invalid_vts:
-      vt.update()  # In case the caller doesn't update.
+    # Yield the result, and then mark the targets as up to date.  Updates are flushed even if the
+    # caller fails, so that any partial progress it marked valid is preserved.
+    try:
+      yield invalidation_check
+      for vt in invalidation_check.invalid_vts:
+        vt.update()  # In case the caller doesn't update.
+    finally:
+      cache_manager.flush()
 
   def check_artifact_cache_for(self, invalidation_check):
     """Decides which VTS to check the artifact cache for.
@@ -402,6 +423,40 @@ class TaskBase(AbstractClass):
   def do_check_artifact_cache(self, vts, post_process_cached_vts=None):
     """Checks the artifact cache for the specified list of VersionedTargetSets.
 
+    Returns a pair (cached, uncached) of VersionedTargets that were
+    satisfied/unsatisfied from the cache.
+    """
+    cached_vts, uncached_vts = self.fetch_from_artifact_cache(vts, post_process_cached_vts)
+    for vt in cached_vts:
+      vt.update()
+    return cached_vts, uncached_vts
+
+  def find_in_artifact_cache(self, vts):
+    """Finds out which of the specified list of VersionedTargetSets have artifacts in the cache.
+
+    The artifacts are looked up in one batch, so that only hits need a round trip each to fetch.
+    If the lookup fails, the artifacts are assumed present, so that fetching them is still tried.
+
+    Returns a list of booleans, indicating whether the artifacts of the corresponding
+    VersionedTargetSet are present.
+    """
+    if not vts:
+      return []
+    try:
+      return self.get_artifact_cache().has_many([vt.cache_key for vt in vts])
+    except NonfatalArtifactCacheError as e:
+      self.context.log.warn('Error while checking the artifact cache: {0}'.format(e))
+      return [True] * len(vts)
+
+  def fetch_from_artifact_cache(self, vts, post_process_cached_vts=None, known_present=False):
+    """Fetches the artifacts of the specified list of VersionedTargetSets from the artifact cache.
+
+    Unlike `do_check_artifact_cache`, leaves marking the cached VersionedTargets valid to the
+    caller, so that it may be called from background threads.
+
+    :param bool known_present: True if `find_in_artifact_cache` already found the artifacts of all
+      of vts present, so that they needn't be looked up again before fetching them.
+
     Returns a pair (cached, uncached) of VersionedTargets that were
     satisfied/unsatisfied from the cache.
     """
@@ -412,11 +467,17 @@ class TaskBase(AbstractClass):
     uncached_vts = OrderedSet(vts)
 
     cache = self.get_artifact_cache()
-    items = [(cache, vt.cache_key) for vt in vts]
 
-    res = self.context.subproc_map(call_use_cached_files, items)
+    if known_present:
+      present_vts = vts
+    else:
+      present = self.find_in_artifact_cache(vts)
+      present_vts = [vt for vt, is_present in zip(vts, present) if is_present]
+
+    items = [(cache, vt.cache_key) for vt in present_vts]
+    res = self.context.subproc_map(call_use_cached_files, items) if items else []
 
-    for vt, was_in_cache in zip(vts, res):
+    for vt, was_in_cache in zip(present_vts, res):
       if was_in_cache:
         cached_vts.append(vt)
         uncached_vts.discard(vt)
@@ -430,8 +491,6 @@ class TaskBase(AbstractClass):
     all_cached_vts, all_uncached_vts = flatten(cached_vts), flatten(uncached_vts)
     if post_process_cached_vts:
       post_process_cached_vts(all_cached_vts)
-    for vt in all_cached_vts:
-      vt.update()
     return all_cached_vts, all_uncached_vts
 
   def update_artifact_cache(self, vts_artifactfiles_pairs):
@@ -471,7 +530,12 @@ class TaskBase(AbstractClass):
         overwrite = always_overwrite or vts.cache_key in self._cache_key_errors
         args_tuples.append((cache, vts.cache_key, artifactfiles, overwrite))
 
-      return Work(lambda x: self.context.subproc_map(call_insert, x), [(args_tuples,)], 'insert')
+      def insert_and_prune(args_tuples):
+        self.context.subproc_map(call_insert, args_tuples)
+        # Evict from any bounded local cache here, in the background, rather than on reads.
+        cache.prune()
+
+      return Work(insert_and_prune, [(args_tuples,)], 'insert')
     else:
       return None
 
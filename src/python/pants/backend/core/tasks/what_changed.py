@@ -8,7 +8,7 @@ from __future__ import (absolute_import, division, generators, nested_scopes, pr
 import re
 
 from pants.backend.core.tasks.console_task import ConsoleTask
-from pants.base.build_environment import get_scm
+from pants.base.build_environment import get_buildroot, get_scm
 from pants.base.exceptions import TaskError
 from pants.base.lazy_source_mapper import LazySourceMapper
 from pants.goal.workspace import ScmWorkspace
@@ -46,7 +46,8 @@ class ChangeCalculator(object):
   @property
   def _mapper(self):
     if self._mapper_cache is None:
-      self._mapper_cache = LazySourceMapper(self._address_mapper, self._build_graph, self._fast)
+      self._mapper_cache = LazySourceMapper(self._address_mapper, self._build_graph, self._fast,
+                                            source_owner_index=self._build_graph.source_owner_index)
     return self._mapper_cache
 
   def changed_files(self):
@@ -73,6 +74,15 @@ class ChangeCalculator(object):
     if self._include_dependees == 'none':
       return changed
 
+    dependee_index = self._build_graph.dependee_index
+    if dependee_index is not None and self._include_dependees in ('direct', 'transitive'):
+      build_files = self._address_mapper.scan_buildfiles(get_buildroot(),
+                                                         spec_excludes=self._spec_excludes)
+      spec_paths = dependee_index.update(self._build_graph, build_files)
+      dependees = dependee_index.dependees([addr.spec for addr in changed], spec_paths,
+                                           transitive=self._include_dependees == 'transitive')
+      return changed.union(self._address_mapper.specs_to_addresses(dependees))
+
     # Load the whole build graph since we need it for dependee finding in either remaining case.
     for address in self._address_mapper.scan_addresses(spec_excludes=self._spec_excludes):
       self._build_graph.inject_address_closure(address)
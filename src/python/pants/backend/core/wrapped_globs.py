@@ -31,6 +31,12 @@ class FilesetWithSpec(object):
   def __getitem__(self, index):
     return self._result[index]
 
+  def __getstate__(self):
+    # The result may be a lazily evaluated Fileset, which can't be pickled; pickle the files.
+    state = self.__dict__.copy()
+    state['_result'] = list(self._result)
+    return state
+
   @deprecated(removal_version='0.0.35',
               hint_message='Instead of globs(a) + globs(b), use globs(a, b)')
   def __add__(self, other):
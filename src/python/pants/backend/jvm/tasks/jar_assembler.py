@@ -0,0 +1,193 @@
+# coding=utf-8
+# Copyright 2015 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (absolute_import, division, generators, nested_scopes, print_function,
+                        unicode_literals, with_statement)
+
+import collections
+import copy
+import os
+import struct
+import zipfile
+from collections import OrderedDict
+from multiprocessing.pool import ThreadPool
+
+from pants.backend.jvm.targets.jvm_binary import Duplicate, JarRules, Skip
+from pants.java.jar.manifest import Manifest
+from pants.util.contextutil import open_zip
+
+
+# Zip entries whose sizes and crc follow their data rather than being in their local header.
+_DATA_DESCRIPTOR_FLAG = 0x08
+
+
+def _list_entries(path):
+  with open_zip(path) as jar:
+    return jar.infolist()
+
+
+def _read_compressed(path, infos):
+  """Returns the data of the given entries of the jar at path, as compressed in the jar."""
+  data = []
+  with open(path, 'rb') as fp:
+    for info in infos:
+      fp.seek(info.header_offset)
+      header = struct.unpack(zipfile.structFileHeader, fp.read(zipfile.sizeFileHeader))
+      if header[zipfile._FH_SIGNATURE] != zipfile.stringFileHeader:
+        raise zipfile.BadZipfile('Bad local header for {} in {}'.format(info.filename, path))
+      fp.seek(header[zipfile._FH_FILENAME_LENGTH] + header[zipfile._FH_EXTRA_FIELD_LENGTH],
+              os.SEEK_CUR)
+      data.append(fp.read(info.compress_size))
+  return data
+
+
+def _read_uncompressed(path, info):
+  with open_zip(path) as jar:
+    return jar.read(info)
+
+
+class JarAssembler(object):
+  """Assembles a jar from the entries of other jars, applying jar rules as the jar tool does.
+
+  Entries are copied as they are compressed in their jars rather than decompressed and compressed
+  again, save for duplicates whose contents are concatenated.  The jars are read ahead of the
+  output concurrently, a bounded number at a time, while the output is written in order.
+  """
+
+  _META_INF = 'META-INF/'
+
+  def __init__(self, jar_rules=None, threads=1):
+    """
+    :param jar_rules: The rules for skipping and handling duplicate entries; `JarRules.default()`
+      if not given.
+    :param int threads: The number of threads to read jars with.
+    """
+    jar_rules = jar_rules or JarRules.default()
+    self._skip_patterns = [rule.apply_pattern for rule in jar_rules.rules
+                           if isinstance(rule, Skip)]
+    self._duplicate_rules = [rule for rule in jar_rules.rules if isinstance(rule, Duplicate)]
+    self._default_dup_action = jar_rules.default_dup_action
+    self._threads = max(threads, 1)
+
+  def assemble(self, path, jars, base_jar=None):
+    """Writes a new jar at path holding the entries of the given jars.
+
+    :param string path: The path of the jar to write, overwriting an existing file, if any.
+    :param list jars: The paths of the jars whose entries to add, in order.  As with
+      `Jar.writejar`, their manifests are left out.
+    :param string base_jar: The path of an optional jar whose entries go first, and whose manifest
+      is that of the new jar.  If not given, the new jar gets a default manifest.
+    :raises: `Duplicate.Error` if a duplicate entry is encountered that the rules say to fail on.
+    """
+    inputs = ([base_jar] if base_jar else []) + list(jars)
+    pool = ThreadPool(self._threads)
+    try:
+      # Use a timeout so that ctrl-c still works while waiting.
+      listings = pool.map_async(_list_entries, inputs, chunksize=1).get(timeout=1000000000)
+      entries = self._resolve(listings, has_base=base_jar is not None)
+      if base_jar is None:
+        entries.pop(self._META_INF, None)
+
+      # The entries to write in the place of the first of their name in each jar, and of those the
+      # ones that are copied from that very jar, so can be read ahead with the rest of it.
+      first_in = [[] for _ in inputs]
+      for name, (action, occurrences) in entries.items():
+        first_in[occurrences[0][0]].append((name, action, occurrences))
+      local = [[occurrences[0][1] for _, action, occurrences in names if action is None]
+               for names in first_in]
+
+      with open_zip(path, 'w') as out:
+        if base_jar is None:
+          self._write_default_manifest(out)
+
+        pending = collections.deque()
+        submitted = [0]
+
+        def read_ahead():
+          # Bound the data held in memory, while keeping every thread busy.
+          while submitted[0] < len(inputs) and len(pending) < 2 * self._threads:
+            index = submitted[0]
+            pending.append(pool.apply_async(_read_compressed, (inputs[index], local[index])))
+            submitted[0] += 1
+
+        for index in range(len(inputs)):
+          read_ahead()
+          data = iter(pending.popleft().get(timeout=1000000000))
+          for name, action, occurrences in first_in[index]:
+            if action is None:
+              self._write_compressed(out, occurrences[0][1], next(data))
+            elif action == Duplicate.REPLACE:
+              jar_index, info = occurrences[-1]
+              self._write_compressed(out, info, _read_compressed(inputs[jar_index], [info])[0])
+            else:
+              contents = b''.join(_read_uncompressed(inputs[jar_index], info)
+                                  for jar_index, info in occurrences)
+              self._write_uncompressed(out, occurrences[0][1], contents)
+    finally:
+      pool.terminate()
+
+  def _resolve(self, listings, has_base):
+    """Decides which entries of the jars go into the assembled jar.
+
+    :returns: An OrderedDict of entry name to (action, occurrences), in the order the names are
+      first encountered, where occurrences is a list of (jar index, ZipInfo) and action is None if
+      the first occurrence is to be copied, or else `Duplicate.REPLACE` or `Duplicate.CONCAT`.
+    """
+    entries = OrderedDict()
+    for jar_index, infos in enumerate(listings):
+      for info in infos:
+        name = info.filename
+        if name == Manifest.PATH and (jar_index > 0 or not has_base):
+          continue
+        if any(pattern.search(name) for pattern in self._skip_patterns):
+          continue
+        entries.setdefault(name, []).append((jar_index, info))
+
+    resolved = OrderedDict()
+    for name, occurrences in entries.items():
+      action = None
+      # Duplicate directory entries are harmless, and the first is as good as any.
+      if len(occurrences) > 1 and not name.endswith('/'):
+        action = self._duplicate_action(name)
+        if action == Duplicate.FAIL:
+          raise Duplicate.Error(name)
+        if action == Duplicate.SKIP:
+          action = None
+      resolved[name] = (action, occurrences)
+    return resolved
+
+  def _duplicate_action(self, name):
+    for rule in self._duplicate_rules:
+      if rule.apply_pattern.search(name):
+        return rule.action
+    return self._default_dup_action
+
+  @staticmethod
+  def _write_compressed(out, info, data):
+    info = copy.copy(info)
+    info.header_offset = out.fp.tell()
+    # The sizes and crc are known up front, so they go in the local header.
+    info.flag_bits &= ~_DATA_DESCRIPTOR_FLAG
+    out.fp.write(info.FileHeader())
+    out.fp.write(data)
+    out.filelist.append(info)
+    out.NameToInfo[info.filename] = info
+    out._didModify = True
+
+  @staticmethod
+  def _write_uncompressed(out, info, contents):
+    concatenated = zipfile.ZipInfo(info.filename, date_time=info.date_time)
+    concatenated.external_attr = info.external_attr
+    concatenated.compress_type = zipfile.ZIP_DEFLATED
+    out.writestr(concatenated, contents)
+
+  @classmethod
+  def _write_default_manifest(cls, out):
+    meta_inf = zipfile.ZipInfo(cls._META_INF)
+    meta_inf.external_attr = (0o40755 << 16) | 0x10  # A directory, to unix and to dos.
+    out.writestr(meta_inf, b'')
+    manifest = Manifest()
+    manifest.addentry(Manifest.MANIFEST_VERSION, '1.0')
+    manifest.addentry(Manifest.CREATED_BY, 'pants')
+    out.writestr(Manifest.PATH, manifest.contents(), compress_type=zipfile.ZIP_DEFLATED)
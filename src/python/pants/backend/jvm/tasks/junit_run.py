@@ -7,20 +7,25 @@ from __future__ import (absolute_import, division, generators, nested_scopes, pr
 
 import copy
 import fnmatch
+import heapq
 import os
 import sys
+import threading
+import time
 from abc import abstractmethod
-from collections import defaultdict, namedtuple
+from collections import OrderedDict, defaultdict, namedtuple
 
 from six.moves import range
 from twitter.common.collections import OrderedSet
 
 from pants import binary_util
+from pants.backend.core.tasks.passed_tests_cache_mixin import PassedTestsCacheMixin
 from pants.backend.jvm.targets.java_tests import JavaTests as junit_tests
 from pants.backend.jvm.tasks.jvm_task import JvmTask
 from pants.backend.jvm.tasks.jvm_tool_task_mixin import JvmToolTaskMixin
 from pants.base.build_environment import get_buildroot
 from pants.base.exceptions import TargetDefinitionException, TaskError, TestFailedTaskError
+from pants.base.worker_pool import Work, WorkerPool
 from pants.base.workunit import WorkUnit
 from pants.java.jar.shader import Shader
 from pants.java.util import execute_java
@@ -64,6 +69,57 @@ def _classfile_to_classname(cls):
   return clsname
 
 
+def _report_durations(reportdir, classnames):
+  """Returns the durations of test classes, as recorded in the JUnit XML reports of earlier runs.
+
+  :param string reportdir: The directory the TEST-*.xml reports are written to.
+  :param classnames: The test classes to look up.
+  :returns: A dict from classname to its duration in seconds, for the classes with a report.
+  """
+  durations = {}
+  for classname in classnames:
+    filename = os.path.join(reportdir, 'TEST-{0}.xml'.format(classname))
+    if os.path.exists(filename):
+      try:
+        durations[classname] = float(XmlParser.from_file(filename).get_attribute('testsuite',
+                                                                                  'time'))
+      except (XmlParser.XmlError, ValueError):
+        # A report we can't parse is just a missing one.
+        pass
+  return durations
+
+
+def _pack_by_duration(tests, durations, count, default_duration=1.0):
+  """Spreads tests across count bins, so that the bins take about as long to run as each other.
+
+  Tests of the same class always land in the same bin, as the reports of a class are written to
+  the same files.  Classes are placed longest first, each in the bin with the least work so far.
+  Classes without a recorded duration are assumed to take the mean of those with one.
+
+  :param tests: Test specs, of the form classname or classname#methodname.
+  :param dict durations: A dict from classname to its duration in seconds.
+  :param int count: The number of bins.
+  :param float default_duration: The duration of classes when none have a recorded duration.
+  :returns: A list of at most count non-empty lists of test specs.
+  """
+  tests_by_class = OrderedDict()
+  for test in tests:
+    tests_by_class.setdefault(test.partition('#')[0], []).append(test)
+
+  known = [durations[classname] for classname in tests_by_class if classname in durations]
+  mean_duration = sum(known) / len(known) if known else default_duration
+
+  def duration(classname):
+    return durations.get(classname, mean_duration)
+
+  bins = [(0.0, i, []) for i in range(count)]
+  for classname in sorted(tests_by_class, key=lambda c: (-duration(c), c)):
+    load, i, bin_tests = heapq.heappop(bins)
+    bin_tests.extend(tests_by_class[classname])
+    heapq.heappush(bins, (load + duration(classname), i, bin_tests))
+  return [bin_tests for _, _, bin_tests in sorted(bins, key=lambda b: b[1]) if bin_tests]
+
+
 class _JUnitRunner(object):
   """Helper class to run JUnit tests with or without coverage.
 
@@ -76,6 +132,10 @@ class _JUnitRunner(object):
              help='Fail fast on the first test failure in a suite.')
     register('--batch-size', type=int, default=sys.maxint,
              help='Run at most this many tests in a single test process.')
+    register('--concurrent-jvms', type=int, default=1, advanced=True,
+             help='Run batches of tests in up to this many test processes at once. Test classes '
+                  'are spread across the processes by how long they took in earlier runs. '
+                  'Ignored with --coverage, as the processes would share a coverage data file.')
     register('--test', action='append',
              help='Force running of just these tests.  Tests can be specified using any of: '
                   '[classname], [classname]#[methodname], [filename] or [filename]#[methodname]')
@@ -109,6 +169,7 @@ class _JUnitRunner(object):
     options = task_exports.task_options
     self._tests_to_run = options.test
     self._batch_size = options.batch_size
+    self._concurrent_jvms = max(options.concurrent_jvms, 1)
     self._fail_fast = options.fail_fast
     self._working_dir = self._pick_working_dir(options.cwd, context)
     self._args = copy.copy(task_exports.args)
@@ -130,7 +191,13 @@ class _JUnitRunner(object):
       self._args.append('-test-shard')
       self._args.append(options.test_shard)
 
-  def execute(self, targets):
+  def execute(self, targets, test_targets=None):
+    """Runs the tests of the java_tests/junit_tests targets among targets.
+
+    :param targets: the targets to run tests for.
+    :param test_targets: if not None, only the tests of these targets, and requested tests of no
+      known target, are run.
+    """
     # We only run tests within java_tests/junit_tests targets.
     #
     # But if coverage options are specified, we want to instrument
@@ -139,6 +206,10 @@ class _JUnitRunner(object):
     # Thus, we filter out the non-java-tests targets first but
     # keep the original targets set intact for coverages.
     tests_and_targets = self._collect_test_targets(targets)
+    if test_targets is not None:
+      test_targets = set(test_targets)
+      tests_and_targets = {test: target for test, target in tests_and_targets.items()
+                           if target is None or target in test_targets}
 
     if not tests_and_targets:
       return
@@ -260,13 +331,39 @@ class _JUnitRunner(object):
 
     return failed_targets
 
+  def passed_targets(self, targets, since):
+    """Return a list of those of the targets all of whose tests ran since the given time and passed.
+
+    Analyzes JUnit XML files, like `_get_failed_targets`.
+
+    :param targets: the test targets to check.
+    :param float since: the time the tests started running, in seconds since the epoch.
+    """
+    tests_by_target = defaultdict(list)
+    for test, target in self._collect_test_targets(targets).items():
+      if target is not None:
+        tests_by_target[target].append(test.partition('#')[0])
+
+    def passed(classname):
+      filename = os.path.join(self._task_exports.workdir, 'TEST-{0}.xml'.format(classname))
+      try:
+        if os.path.getmtime(filename) < since:
+          return False
+        xml = XmlParser.from_file(filename)
+        return (int(xml.get_attribute('testsuite', 'failures')) == 0 and
+                int(xml.get_optional_attribute('testsuite', 'errors') or 0) == 0)
+      except (OSError, XmlParser.XmlError, ValueError):
+        return False
+
+    return [target for target, classnames in tests_by_target.items()
+            if all(passed(classname) for classname in classnames)]
+
   def _run_tests(self, tests_and_targets, classpath, main, extra_jvm_options=None):
     extra_jvm_options = extra_jvm_options or []
 
-    result = 0
-    for batch in self._partition(tests_and_targets.keys()):
+    def run_batch(batch):
       with binary_util.safe_args(batch, self._task_exports.task_options) as batch_tests:
-        result += abs(execute_java(
+        return abs(execute_java(
           classpath=classpath,
           main=main,
           jvm_options=self._task_exports.jvm_options + extra_jvm_options,
@@ -277,6 +374,13 @@ class _JUnitRunner(object):
           cwd=self._working_dir
         ))
 
+    tests = tests_and_targets.keys()
+    if self._concurrent_jvms > 1 and len(tests) > 1:
+      result = self._run_concurrently(tests, run_batch)
+    else:
+      result = 0
+      for batch in self._partition(tests):
+        result += run_batch(batch)
         if result != 0 and self._fail_fast:
           break
 
@@ -287,6 +391,39 @@ class _JUnitRunner(object):
         failed_targets=failed_targets
       )
 
+  def _run_concurrently(self, tests, run_batch):
+    """Runs the batches of tests in up to --concurrent-jvms test processes at once.
+
+    Each process runs its tests in batches of --batch-size, one after the other, in a workunit of
+    its own.  The processes all write their reports to the workdir, so _get_failed_targets sees
+    the reports of every batch.
+
+    :returns: The sum of the exit codes of the batches run.
+    """
+    durations = _report_durations(self._task_exports.workdir,
+                                  set(test.partition('#')[0] for test in tests))
+    jvms = _pack_by_duration(tests, durations, self._concurrent_jvms)
+    failed = threading.Event()
+
+    def run_jvm(jvm_tests):
+      result = 0
+      for batch in self._partition(jvm_tests):
+        if self._fail_fast and failed.is_set():
+          break
+        result += run_batch(batch)
+        if result != 0:
+          failed.set()
+      return result
+
+    with self._context.new_workunit('run-concurrently') as workunit:
+      pool = WorkerPool(workunit, self._context.run_tracker, len(jvms))
+      try:
+        work = Work(run_jvm, [(jvm_tests,) for jvm_tests in jvms], 'jvm')
+        results = pool.submit_work_and_wait(work, workunit_parent=workunit)
+      finally:
+        pool.shutdown()
+    return sum(results)
+
   def _partition(self, tests):
     stride = min(self._batch_size, len(tests))
     for i in range(0, len(tests), stride):
@@ -374,6 +511,8 @@ class _Coverage(_JUnitRunner):
     options = task_exports.task_options
     self._coverage = options.coverage
     self._coverage_filters = options.coverage_patterns or []
+    # Every test process writes its coverage data to the same file, so they run one at a time.
+    self._concurrent_jvms = 1
 
     self._coverage_jvm_options = []
     for jvm_option in options.coverage_jvm_options:
@@ -710,7 +849,7 @@ class Cobertura(_Coverage):
                         " 'failed to report'".format(main, result))
 
 
-class JUnitRun(JvmTask, JvmToolTaskMixin):
+class JUnitRun(PassedTestsCacheMixin, JvmTask, JvmToolTaskMixin):
   _MAIN = 'org.pantsbuild.tools.junit.ConsoleRunner'
 
   @classmethod
@@ -744,7 +883,8 @@ class JUnitRun(JvmTask, JvmToolTaskMixin):
                                 workdir=self.workdir)
 
     options = self.get_options()
-    if options.coverage or options.coverage_html_open:
+    self._coverage = options.coverage or options.coverage_html_open
+    if self._coverage:
       coverage_processor = options.coverage_processor
       if coverage_processor == 'emma':
         self._runner = Emma(task_exports, self.context)
@@ -765,4 +905,21 @@ class JUnitRun(JvmTask, JvmToolTaskMixin):
           msg = 'JavaTests target {} must include a non-empty set of sources.'.format(target.address.spec)
           raise TargetDefinitionException(target, msg)
 
-      self._runner.execute(targets)
+      test_targets = [target for target in targets if isinstance(target, junit_tests)]
+      # Coverage needs all the tests to run.
+      with self.invalidated_tests(test_targets, self._run_inputs(),
+                                  cacheable=not self._coverage) as untested_targets:
+        since = int(time.time())
+        try:
+          self._runner.execute(targets, test_targets=untested_targets)
+        except TestFailedTaskError:
+          self.record_passed_tests(self._runner.passed_targets(untested_targets, since))
+          raise
+
+  def _run_inputs(self):
+    options = self.get_options()
+    option_values = ['{0}={1!r}'.format(name, options[name])
+                     for name in ('test', 'test_shard', 'default_parallel', 'parallel_threads',
+                                  'cwd')]
+    return ([self._MAIN] + self.tool_classpath('junit') + sorted(self.confs) + self.jvm_options +
+            self.args + option_values)
@@ -11,12 +11,24 @@ from contextlib import contextmanager
 
 from twitter.common.collections.orderedset import OrderedSet
 
-from pants.backend.jvm.targets.jvm_binary import JvmBinary
+from pants.backend.jvm.targets.jvm_binary import Duplicate, JvmBinary
+from pants.backend.jvm.tasks.jar_assembler import JarAssembler
 from pants.backend.jvm.tasks.jar_task import JarTask
+from pants.base.exceptions import TaskError
+from pants.util.contextutil import temporary_dir
 
 
 class JvmBinaryTask(JarTask):
 
+  @classmethod
+  def register_options(cls, register):
+    super(JvmBinaryTask, cls).register_options(register)
+    register('--stream-dependency-jars', action='store_true', advanced=True, default=False,
+             help='Copy the entries of dependency jars into monolithic jars as they are '
+                  'compressed, rather than have the jar tool decompress and compress them again.')
+    register('--dependency-jar-readers', type=int, advanced=True, default=4,
+             help='With --stream-dependency-jars, read up to this many dependency jars at once.')
+
   @staticmethod
   def is_binary(target):
     return isinstance(target, JvmBinary)
@@ -63,23 +75,51 @@ class JvmBinaryTask(JarTask):
     # It could be any target. And that might actually be useful.
 
     with self.context.new_workunit(name='create-monolithic-jar'):
-      with self.open_jar(path,
-                         jar_rules=binary.deploy_jar_rules,
-                         overwrite=True,
-                         compressed=True) as jar:
+      if with_external_deps and self.get_options().stream_dependency_jars:
+        with temporary_dir() as stage_dir:
+          internal_jar = os.path.join(stage_dir, os.path.basename(path))
+          with self._open_monolithic_jar(binary, internal_jar) as jar:
+            yield jar
+          with self.context.new_workunit(name='add-dependency-jars'):
+            self._assemble_dependency_jars(binary, path, internal_jar)
+      else:
+        with self._open_monolithic_jar(binary, path) as jar:
+          if with_external_deps:
+            with self.context.new_workunit(name='add-dependency-jars'):
+              for basedir, external_jar in self.list_external_jar_dependencies(binary):
+                external_jar_path = os.path.join(basedir, external_jar)
+                self.context.log.debug('  dumping {}'.format(external_jar_path))
+                jar.writejar(external_jar_path)
+
+          yield jar
+
+  @contextmanager
+  def _open_monolithic_jar(self, binary, path):
+    with self.open_jar(path,
+                       jar_rules=binary.deploy_jar_rules,
+                       overwrite=True,
+                       compressed=True) as jar:
 
-        with self.context.new_workunit(name='add-internal-classes'):
-          with self.create_jar_builder(jar) as jar_builder:
-            jar_builder.add_target(binary, recursive=True)
+      with self.context.new_workunit(name='add-internal-classes'):
+        with self.create_jar_builder(jar) as jar_builder:
+          jar_builder.add_target(binary, recursive=True)
 
-        if with_external_deps:
-          with self.context.new_workunit(name='add-dependency-jars'):
-            for basedir, external_jar in self.list_external_jar_dependencies(binary):
-              external_jar_path = os.path.join(basedir, external_jar)
-              self.context.log.debug('  dumping {}'.format(external_jar_path))
-              jar.writejar(external_jar_path)
+      yield jar
 
-        yield jar
+  def _assemble_dependency_jars(self, binary, path, internal_jar):
+    """Writes the jar at path from the internal jar and the binary's external jar dependencies.
+
+    The jar tool doesn't write empty jars, so the internal jar may not exist.
+    """
+    external_jars = [os.path.join(basedir, external_jar)
+                     for basedir, external_jar in self.list_external_jar_dependencies(binary)]
+    assembler = JarAssembler(jar_rules=binary.deploy_jar_rules,
+                             threads=self.get_options().dependency_jar_readers)
+    try:
+      assembler.assemble(path, external_jars,
+                         base_jar=internal_jar if os.path.exists(internal_jar) else None)
+    except Duplicate.Error as e:
+      raise TaskError('Failed to write to jar at {}: {}'.format(path, e))
 
   def _mapped_dependencies(self, jardepmap, binary, confs):
     # TODO(John Sirois): rework product mapping towards well known types
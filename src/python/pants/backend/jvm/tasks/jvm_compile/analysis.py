@@ -26,6 +26,10 @@ class Analysis(object):
     """
     raise NotImplementedError()
 
+  def is_empty(self):
+    """Returns True if the analysis contains no information for any source file."""
+    raise NotImplementedError()
+
   def write_to_path(self, outfile_path):
     with open(outfile_path, 'w') as outfile:
       self.write(outfile)
@@ -0,0 +1,208 @@
+# coding=utf-8
+# Copyright 2015 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (absolute_import, division, generators, nested_scopes, print_function,
+                        unicode_literals, with_statement)
+
+import errno
+import mmap
+import os
+import struct
+import time
+
+from pants.util.fileutil import RACY_WINDOW_SECS, atomic_replace
+
+
+class AnalysisIndex(object):
+  """A binary index of the products of an analysis file, kept in a sidecar file next to it.
+
+  The sidecar is a header, a table of sections, and the sections themselves:
+
+  - `sources`: a record per source, sorted by source path, locating the path and its products.
+  - `products`: a record per product, locating its path.
+  - `strings`: the paths themselves.
+
+  It is read through mmap, so the products of a given source are found by binary search without
+  reading the rest of the index.  The analysis file itself stays the canonical text format that
+  the compilers and the artifact cache use; the sidecar is derived from it, and rebuilt whenever
+  the analysis file's size or modification time no longer match those recorded in its header.
+  Sidecars of analysis files modified in the last couple of seconds are not written, to avoid
+  coarse-mtime races.
+  """
+
+  _MAGIC = b'PANTSAIX'
+
+  # Bump this whenever the format of the sidecar changes.
+  _VERSION = 1
+
+  # magic, version, analysis size, analysis mtime, length of the classes dir that follows.
+  _HEADER = struct.Struct(b'<8sIQdI')
+  # The number of sections that follow.
+  _SECTION_COUNT = struct.Struct(b'<I')
+  # name, offset, length.
+  _SECTION = struct.Struct(b'<8sQQ')
+  # path offset, path length, index of the first product, number of products.
+  _SOURCE = struct.Struct(b'<IIII')
+  # path offset, path length.
+  _PRODUCT = struct.Struct(b'<II')
+
+  @staticmethod
+  def sidecar_path(analysis_path):
+    return analysis_path + '.index'
+
+  @classmethod
+  def load(cls, analysis_path, classes_dir, parse_products):
+    """Returns the index of the products of the given analysis file.
+
+    :param string analysis_path: The analysis file.
+    :param string classes_dir: The classes dir products were parsed relative to.
+    :param parse_products: A no-arg function returning the products of the analysis file, as a
+      dict of source -> list of classfiles, to (re)build the index from if the sidecar is stale.
+    :returns: An AnalysisIndex.
+    :raises OSError: if the analysis file does not exist.
+    """
+    stat = os.stat(analysis_path)
+    sidecar_path = cls.sidecar_path(analysis_path)
+    index = cls._read(sidecar_path, stat, classes_dir)
+    if index is None:
+      data = cls._encode(parse_products(), stat, classes_dir)
+      if stat.st_mtime < time.time() - RACY_WINDOW_SECS:
+        with atomic_replace(sidecar_path) as tmp_path:
+          with open(tmp_path, 'wb') as fp:
+            fp.write(data)
+      index = cls(data)
+    return index
+
+  @classmethod
+  def _read(cls, sidecar_path, stat, classes_dir):
+    try:
+      with open(sidecar_path, 'rb') as fp:
+        data = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+    except (EnvironmentError, ValueError) as e:
+      # An empty file cannot be mapped, and is just as stale as a missing one.
+      if getattr(e, 'errno', None) not in (None, errno.ENOENT, errno.EINVAL):
+        raise
+      return None
+    try:
+      if cls._header(data) != (stat.st_size, stat.st_mtime, classes_dir):
+        return None
+      return cls(data)
+    except (KeyError, struct.error, ValueError):
+      # A corrupt sidecar is just a stale one.
+      return None
+
+  @classmethod
+  def _header(cls, data):
+    magic, version, size, mtime, classes_dir_length = cls._HEADER.unpack_from(data, 0)
+    if magic != cls._MAGIC or version != cls._VERSION:
+      raise ValueError('Not an analysis index.')
+    offset = cls._HEADER.size
+    classes_dir = data[offset:offset + classes_dir_length].decode('utf-8')
+    return size, mtime, classes_dir
+
+  @classmethod
+  def _encode(cls, products, stat, classes_dir):
+    strings = []
+    strings_length = [0]
+
+    def add_string(path):
+      path = cls._encode_path(path)
+      strings.append(path)
+      offset = strings_length[0]
+      strings_length[0] += len(path)
+      return offset, len(path)
+
+    source_records = []
+    product_records = []
+    for source in sorted(products, key=cls._encode_path):
+      classfiles = products[source]
+      source_offset, source_length = add_string(source)
+      source_records.append(cls._SOURCE.pack(source_offset, source_length,
+                                             len(product_records), len(classfiles)))
+      for classfile in classfiles:
+        product_records.append(cls._PRODUCT.pack(*add_string(classfile)))
+
+    sections = [(b'sources', b''.join(source_records)),
+                (b'products', b''.join(product_records)),
+                (b'strings', b''.join(strings))]
+    encoded_classes_dir = classes_dir.encode('utf-8')
+    preamble = [cls._HEADER.pack(cls._MAGIC, cls._VERSION, stat.st_size, stat.st_mtime,
+                                 len(encoded_classes_dir)),
+                encoded_classes_dir,
+                cls._SECTION_COUNT.pack(len(sections))]
+    offset = sum(len(part) for part in preamble) + cls._SECTION.size * len(sections)
+    for name, section in sections:
+      preamble.append(cls._SECTION.pack(name, offset, len(section)))
+      offset += len(section)
+    return b''.join(preamble + [section for _, section in sections])
+
+  @staticmethod
+  def _encode_path(path):
+    return path.encode('utf-8') if isinstance(path, unicode) else path
+
+  def __init__(self, data):
+    """
+    :param data: The contents of a sidecar, as a string or mmap.
+    """
+    self._data = data
+    _, _, _, _, classes_dir_length = self._HEADER.unpack_from(data, 0)
+    offset = self._HEADER.size + classes_dir_length
+    section_count, = self._SECTION_COUNT.unpack_from(data, offset)
+    offset += self._SECTION_COUNT.size
+    sections = {}
+    for _ in range(section_count):
+      name, section_offset, section_length = self._SECTION.unpack_from(data, offset)
+      sections[name.rstrip(b'\0')] = (section_offset, section_length)
+      offset += self._SECTION.size
+    self._sources_offset, sources_length = sections[b'sources']
+    self._products_offset, _ = sections[b'products']
+    self._strings_offset, _ = sections[b'strings']
+    self._num_sources = sources_length // self._SOURCE.size
+
+  def _string(self, offset, length):
+    start = self._strings_offset + offset
+    return self._data[start:start + length]
+
+  def _source_record(self, i):
+    return self._SOURCE.unpack_from(self._data, self._sources_offset + i * self._SOURCE.size)
+
+  def _products_of(self, first_product, num_products):
+    classfiles = []
+    for i in range(first_product, first_product + num_products):
+      offset, length = self._PRODUCT.unpack_from(self._data,
+                                                 self._products_offset + i * self._PRODUCT.size)
+      classfiles.append(self._string(offset, length))
+    return classfiles
+
+  def __len__(self):
+    return self._num_sources
+
+  def sources(self):
+    """Returns the sources the analysis has products for, in sorted order."""
+    return [self._string(offset, length)
+            for offset, length, _, _ in (self._source_record(i) for i in range(self._num_sources))]
+
+  def products_for(self, source):
+    """Returns the list of classfiles produced by the given source, empty if there are none."""
+    source = self._encode_path(source)
+    lo, hi = 0, self._num_sources
+    while lo < hi:
+      mid = (lo + hi) // 2
+      offset, length, first_product, num_products = self._source_record(mid)
+      candidate = self._string(offset, length)
+      if candidate < source:
+        lo = mid + 1
+      elif candidate > source:
+        hi = mid
+      else:
+        return self._products_of(first_product, num_products)
+    return []
+
+  def products(self):
+    """Returns a dict of source -> list of classfiles for all the sources."""
+    products = {}
+    for i in range(self._num_sources):
+      offset, length, first_product, num_products = self._source_record(i)
+      products[self._string(offset, length)] = self._products_of(first_product, num_products)
+    return products
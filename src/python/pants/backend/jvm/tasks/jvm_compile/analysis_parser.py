@@ -9,6 +9,7 @@ import os
 import re
 from contextlib import contextmanager
 
+from pants.backend.jvm.tasks.jvm_compile.analysis_index import AnalysisIndex
 from pants.base.exceptions import TaskError
 
 
@@ -91,6 +92,15 @@ class AnalysisParser(object):
     with open(infile_path, 'rb') as infile:
       return self.parse_products(infile, classes_dir)
 
+  def products_index_from_path(self, infile_path, classes_dir):
+    """Returns an AnalysisIndex of the src->class mappings of the analysis at infile_path.
+
+    The index is kept in a sidecar file next to the analysis, so that the products of a given
+    source can be looked up without parsing the analysis, as long as it does not change.
+    """
+    return AnalysisIndex.load(infile_path, classes_dir,
+                              lambda: self.parse_products_from_path(infile_path, classes_dir))
+
   def parse_products(self, infile, classes_dir):
     """An efficient parser of just the src->class mappings.
 
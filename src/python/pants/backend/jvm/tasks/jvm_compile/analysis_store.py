@@ -0,0 +1,90 @@
+# coding=utf-8
+# Copyright 2015 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (absolute_import, division, generators, nested_scopes, print_function,
+                        unicode_literals, with_statement)
+
+from pants.util.fileutil import atomic_replace
+
+
+class AnalysisStore(object):
+  """An analysis file that is parsed at most once, and then split and merged in memory.
+
+  Large analyses take a long time to parse and write, so rather than round-tripping the file for
+  every split and merge, the store keeps the parsed analysis and only writes it back to the file
+  when flushed.
+  """
+
+  def __init__(self, analysis_tools, path):
+    """
+    :param analysis_tools: The AnalysisTools to parse and merge analyses with.
+    :param string path: The analysis file.
+    """
+    self._analysis_tools = analysis_tools
+    self._path = path
+    self._analysis = None
+    self._loaded = False
+    self._dirty = False
+
+  @property
+  def path(self):
+    return self._path
+
+  def _get(self):
+    if not self._loaded:
+      parser = self._analysis_tools.parser
+      if parser.is_nonempty_analysis(self._path):
+        self._analysis = parser.parse_from_path(self._path)
+      self._loaded = True
+    return self._analysis
+
+  def is_empty(self):
+    """Returns True if the analysis contains no information for any source file."""
+    analysis = self._get()
+    return analysis is None or analysis.is_empty()
+
+  def split_to_paths(self, split_path_pairs):
+    """Writes out the analysis of the given sources, leaving the store as it is.
+
+    :param split_path_pairs: A list of pairs (split, output_path) where split is a list of source
+      files whose analysis is to be written to output_path.  The source files may either be
+      absolute paths, or relative to the build root.
+    """
+    splits, output_paths = zip(*split_path_pairs)
+    for analysis, path in zip(self._get().split(splits), output_paths):
+      analysis.write_to_path(path)
+
+  def discard(self, sources):
+    """Removes the analysis of the given sources from the store, and returns it.
+
+    :param list sources: Source files, either absolute or relative to the build root.
+    :returns: An Analysis for the given sources, or None if the store is empty.
+    """
+    analysis = self._get()
+    if analysis is None:
+      return None
+    discarded, self._analysis = analysis.split([sources], catchall=True)
+    self._dirty = True
+    return discarded
+
+  def merge(self, analyses):
+    """Merges the given analyses into the store."""
+    analysis = self._get()
+    if analysis is not None:
+      analyses = [analysis] + list(analyses)
+    self._analysis = self._analysis_tools.merge(analyses)
+    self._dirty = True
+
+  def merge_from_paths(self, analysis_paths):
+    """Merges the given analysis files into the store."""
+    parser = self._analysis_tools.parser
+    self.merge([parser.parse_from_path(path) for path in analysis_paths])
+
+  def flush(self):
+    """Writes the analysis back to the file, if it changed since it was read or last written."""
+    if not self._dirty:
+      return
+    with atomic_replace(self._path) as tmp_path:
+      self._analysis.write_to_path(tmp_path)
+    self._dirty = False
@@ -48,9 +48,13 @@ class AnalysisTools(object):
   def merge_from_paths(self, analysis_paths, merged_analysis_path):
     """Merge multiple analysis files into one."""
     analyses = [self.parser.parse_from_path(path) for path in analysis_paths]
-    merged_analysis = self._analysis_cls.merge(analyses)
+    merged_analysis = self.merge(analyses)
     merged_analysis.write_to_path(merged_analysis_path)
 
+  def merge(self, analyses):
+    """Merge multiple analysis instances into one."""
+    return self._analysis_cls.merge(analyses)
+
   def relativize(self, src_analysis, relativized_analysis):
     with temporary_dir() as tmp_analysis_dir:
       tmp_analysis_file = os.path.join(tmp_analysis_dir, 'analysis.relativized')
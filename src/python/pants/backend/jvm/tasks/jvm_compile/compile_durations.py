@@ -0,0 +1,109 @@
+# coding=utf-8
+# Copyright 2015 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (absolute_import, division, generators, nested_scopes, print_function,
+                        unicode_literals, with_statement)
+
+import threading
+import time
+
+from pants.util.persistent_pickle import PersistentPickle
+
+
+class CompileDurations(object):
+  """A persistent history of how long the compiles of each target took.
+
+  The history is used to estimate the cost of compiles, so they can be scheduled critical path
+  first.  A target compiled before is estimated from its last compile, scaled by how much its
+  source count changed since.  Other targets are estimated from their source count, at the mean
+  time per source of all recorded compiles.  Entries for targets that no run has estimated or
+  compiled for a while are evicted when the history is saved.
+  """
+
+  # The estimated time to compile a source, in seconds, when there is no history to go on.
+  _DEFAULT_SECS_PER_SOURCE = 0.1
+
+  # Entries no run has used for this long are evicted, so that the history doesn't grow without
+  # bound with removed and renamed targets.
+  _MAX_UNUSED_SECS = 14 * 24 * 60 * 60
+
+  # How stale the recorded last use of an entry may get before using it calls for a save.  This
+  # bounds how often runs that only estimate write the history.
+  _USE_RESOLUTION_SECS = 24 * 60 * 60
+
+  # Bump this whenever the format of the entries changes.
+  _VERSION = 2
+
+  def __init__(self, path):
+    """
+    :param string path: The file the history is persisted to.
+    """
+    self._store = PersistentPickle(path, self._VERSION)
+    self._lock = threading.Lock()
+    # {spec: (source count, secs, last used at)}
+    self._entries = None
+    self._used = set()
+    self._secs_per_source = None
+    self._dirty = False
+
+  def estimate(self, spec, source_count):
+    """Returns the estimated time to compile a target, in seconds.
+
+    :param string spec: The address spec of the target.
+    :param int source_count: The number of sources the target has now.
+    """
+    source_count = max(source_count, 1)
+    with self._lock:
+      entry = self._load().get(spec)
+      if entry is not None:
+        recorded_source_count, secs, used_at = entry
+        self._used.add(spec)
+        if used_at < time.time() - self._USE_RESOLUTION_SECS:
+          self._dirty = True
+        return secs * source_count / max(recorded_source_count, 1)
+      return source_count * self._mean_secs_per_source()
+
+  def _mean_secs_per_source(self):
+    if self._secs_per_source is None:
+      entries = self._load().values()
+      total_sources = sum(max(source_count, 1) for source_count, _, _ in entries)
+      if total_sources:
+        self._secs_per_source = sum(secs for _, secs, _ in entries) / total_sources
+      else:
+        self._secs_per_source = self._DEFAULT_SECS_PER_SOURCE
+    return self._secs_per_source
+
+  def record(self, spec, source_count, secs):
+    """Records how long a target took to compile.
+
+    Safe to call from worker threads.
+
+    :param string spec: The address spec of the target.
+    :param int source_count: The number of sources compiled.
+    :param float secs: The duration of the compile, in seconds.
+    """
+    with self._lock:
+      self._load()[spec] = (source_count, secs, time.time())
+      self._used.add(spec)
+      self._dirty = True
+
+  def save(self):
+    """Persists the history if it changed, evicting unused entries."""
+    with self._lock:
+      if not self._dirty:
+        return
+      now = time.time()
+      horizon = now - self._MAX_UNUSED_SECS
+      for spec, (source_count, secs, used_at) in self._entries.items():
+        if spec in self._used:
+          self._entries[spec] = (source_count, secs, now)
+        elif used_at < horizon:
+          del self._entries[spec]
+      self._store.save(self._entries)
+      self._dirty = False
+
+  def _load(self):
+    if self._entries is None:
+      self._entries = self._store.load() or {}
+    return self._entries
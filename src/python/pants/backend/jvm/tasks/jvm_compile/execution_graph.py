@@ -6,6 +6,7 @@ from __future__ import (absolute_import, division, generators, nested_scopes, pr
                         unicode_literals, with_statement)
 
 import Queue as queue
+import heapq
 import traceback
 from collections import defaultdict
 
@@ -19,7 +20,7 @@ class Job(object):
   keys of its dependent jobs.
   """
 
-  def __init__(self, key, fn, dependencies, on_success=None, on_failure=None):
+  def __init__(self, key, fn, dependencies, on_success=None, on_failure=None, size=1):
     """
 
     :param key: Key used to reference and look up jobs
@@ -28,12 +29,14 @@ class Job(object):
     :param on_success: Zero parameter callback to run if job completes successfully. Run on main
                        thread.
     :param on_failure: Zero parameter callback to run if job completes successfully. Run on main
-                       thread."""
+                       thread.
+    :param size: The estimated cost of the work, in any unit shared by all jobs of the graph."""
     self.key = key
     self.fn = fn
     self.dependencies = dependencies
     self.on_success = on_success
     self.on_failure = on_failure
+    self.size = size
 
   def __call__(self):
     self.fn()
@@ -52,6 +55,8 @@ QUEUED = 'Queued'
 SUCCESSFUL = 'Successful'
 FAILED = 'Failed'
 CANCELED = 'Canceled'
+# Not a status: reported for jobs whose work turned out to be unnecessary.
+SATISFIED = 'Satisfied'
 
 
 class StatusTable(object):
@@ -123,6 +128,13 @@ class ExecutionGraph(object):
 
   This is currently only used within jvm compile, but the intent is to unify it with the future
   global execution graph.
+
+  Ready jobs are dispatched in order of priority, which is the size of the job plus the largest
+  priority among its dependees: the estimated cost of the longest chain of work it holds up.  Jobs
+  of equal priority are dispatched in the order they became ready.
+
+  Jobs that have not started yet may be marked successful without running them, by calling
+  `satisfy` from any thread.
   """
 
   def __init__(self, job_list):
@@ -134,6 +146,7 @@ class ExecutionGraph(object):
     self._jobs = {}
     self._job_keys_as_scheduled = []
     self._job_keys_with_no_dependencies = []
+    self._finished_queue = queue.Queue()
 
     for job in job_list:
       self._schedule(job)
@@ -145,6 +158,8 @@ class ExecutionGraph(object):
     if len(self._job_keys_with_no_dependencies) == 0:
       raise NoRootJobError()
 
+    self._priorities = self._compute_priorities()
+
   def format_dependee_graph(self):
     return "\n".join([
       "{} -> {{\n  {}\n}}".format(key, ',\n  '.join(self._dependees[key]))
@@ -165,17 +180,80 @@ class ExecutionGraph(object):
     for dep_name in dependency_keys:
       self._dependees[dep_name].append(key)
 
+  def _compute_priorities(self):
+    # Visit the jobs in topological order, and compute the priorities in reverse.
+    remaining = {key: len(job.dependencies) for key, job in self._jobs.items()}
+    ordered = list(self._job_keys_with_no_dependencies)
+    for key in ordered:
+      for dependee in self._dependees[key]:
+        remaining[dependee] -= 1
+        if remaining[dependee] == 0:
+          ordered.append(dependee)
+
+    priorities = {}
+    for key in reversed(ordered):
+      downstream = [priorities[dependee] for dependee in self._dependees[key]]
+      priorities[key] = self._jobs[key].size + max(downstream or [0])
+    return priorities
+
+  def priority(self, key):
+    """Returns the estimated cost of the longest chain of jobs starting with the given job."""
+    return self._priorities.get(key, self._jobs[key].size)
+
+  def simulate(self, num_workers, fifo=False):
+    """Replays the execution of the graph, taking job sizes as their durations.
+
+    :param int num_workers: The number of jobs that may run at once.
+    :param bool fifo: True to dispatch ready jobs in the order they became ready, as a pool's own
+      queue does, rather than by priority.
+    :returns: The makespan: the time it takes to run all the jobs.
+    """
+    remaining = {key: len(job.dependencies) for key, job in self._jobs.items()}
+    ready = []
+    running = []
+    sequence = [0]
+
+    def make_ready(key):
+      priority = 0 if fifo else -self.priority(key)
+      heapq.heappush(ready, (priority, sequence[0], key))
+      sequence[0] += 1
+
+    for key in self._job_keys_with_no_dependencies:
+      make_ready(key)
+    now = 0
+    while ready or running:
+      while ready and len(running) < num_workers:
+        _, _, key = heapq.heappop(ready)
+        heapq.heappush(running, (now + self._jobs[key].size, sequence[0], key))
+        sequence[0] += 1
+      now, _, finished_key = heapq.heappop(running)
+      for dependee in self._dependees[finished_key]:
+        remaining[dependee] -= 1
+        if remaining[dependee] == 0:
+          make_ready(dependee)
+    return now
+
+  def satisfy(self, key):
+    """Marks the given job successful without running it, unless it is running or done already.
+
+    Its success callback is run and its dependees are scheduled as though it had run.  May be
+    called from any thread, before or during `execute`.
+    """
+    self._finished_queue.put((key, SATISFIED, None))
+
   def execute(self, pool, log):
     """Runs scheduled work, ensuring all dependencies for each element are done before execution.
 
-    :param pool: A WorkerPool to run jobs on
+    :param pool: A WorkerPool to run jobs on.  If it has `num_workers`, no more jobs than that are
+                 submitted to it at once, so that the highest priority ready job always runs next.
     :param log: logger for logging debug information and progress
 
-    submits all the work without any dependencies to the worker pool
+    submits the highest priority work without any dependencies to the worker pool
     when a unit of work finishes,
       if it is successful
         calls success callback
-        checks for dependees whose dependencies are all successful, and submits them
+        checks for dependees whose dependencies are all successful, and queues them
+      submits the highest priority queued work while the pool has idle workers
       if it fails
         calls failure callback
         marks dependees as failed and queues them directly into the finished work queue
@@ -189,19 +267,32 @@ class ExecutionGraph(object):
     log.debug(self.format_dependee_graph())
 
     status_table = StatusTable(self._job_keys_as_scheduled)
-    finished_queue = queue.Queue()
+    finished_queue = self._finished_queue
+    num_workers = getattr(pool, 'num_workers', None)
+    ready = []
+    running = set()
+    satisfied = set()
+    sequence = [0]
+
+    def worker(worker_key, work):
+      try:
+        work()
+        result = (worker_key, SUCCESSFUL, None)
+      except Exception as e:
+        result = (worker_key, FAILED, e)
+      finished_queue.put(result)
 
     def submit_jobs(job_keys):
-      def worker(worker_key, work):
-        try:
-          work()
-          result = (worker_key, SUCCESSFUL, None)
-        except Exception as e:
-          result = (worker_key, FAILED, e)
-        finished_queue.put(result)
-
       for job_key in job_keys:
         status_table.mark_as(QUEUED, job_key)
+        heapq.heappush(ready, (-self.priority(job_key), sequence[0], job_key))
+        sequence[0] += 1
+
+      while ready and (num_workers is None or len(running) < num_workers):
+        _, _, job_key = heapq.heappop(ready)
+        if job_key in satisfied:
+          continue
+        running.add(job_key)
         pool.submit_async_work(Work(worker, [(job_key, (self._jobs[job_key]))]))
 
     try:
@@ -215,9 +306,20 @@ class ExecutionGraph(object):
             "{}: {}".format(key, state) for key, state in status_table.unfinished_items())))
           continue
 
+        if result_status is SATISFIED:
+          if finished_key in running or status_table.get(finished_key) in StatusTable.DONE_STATES:
+            continue
+          log.debug("{} was satisfied without running".format(finished_key))
+          satisfied.add(finished_key)
+          result_status = SUCCESSFUL
+        elif result_status is CANCELED and (
+            status_table.get(finished_key) in StatusTable.DONE_STATES):
+          continue
+
         finished_job = self._jobs[finished_key]
         direct_dependees = self._dependees[finished_key]
         status_table.mark_as(result_status, finished_key)
+        running.discard(finished_key)
 
         if result_status is SUCCESSFUL:
           try:
@@ -227,7 +329,8 @@ class ExecutionGraph(object):
             raise ExecutionFailure("Error in on_success for {}".format(finished_key), e)
 
           ready_dependees = [dependee for dependee in direct_dependees
-                             if status_table.are_all_successful(self._jobs[dependee].dependencies)]
+                             if status_table.get(dependee) is UNSTARTED and
+                             status_table.are_all_successful(self._jobs[dependee].dependencies)]
 
           submit_jobs(ready_dependees)
         else:  # failed or canceled
@@ -241,6 +344,9 @@ class ExecutionGraph(object):
           for dependee in direct_dependees:
             finished_queue.put((dependee, CANCELED, None))
 
+          # Make use of the worker this job freed.
+          submit_jobs([])
+
         log.debug("{} finished with status {}".format(finished_key,
                                                       status_table.get(finished_key)))
     except ExecutionFailure:
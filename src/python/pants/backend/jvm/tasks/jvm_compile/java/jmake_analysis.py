@@ -32,6 +32,9 @@ class JMakeAnalysis(Analysis):
     self.pcd_entries = pcd_entries  # Note that second item in tuple is the source file.
     self.src_to_deps = src_to_deps
 
+  def is_empty(self):
+    return not self.pcd_entries
+
   def split(self, splits, catchall=False):
     buildroot = get_buildroot()
     src_to_split_idx = {}
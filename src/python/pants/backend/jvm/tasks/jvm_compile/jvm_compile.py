@@ -246,12 +246,14 @@ class JvmCompile(NailgunTaskBase, GroupMember):
     # Invalidation check. Everything inside the with block must succeed for the
     # invalid targets to become valid.
     partition_size_hint, locally_changed_targets = self._strategy.invalidation_hints(relevant_targets)
+    prefetch = self._strategy.prefetches_artifacts and self.artifact_cache_reads_enabled()
     with self.invalidated(relevant_targets,
                           invalidate_dependents=True,
                           partition_size_hint=partition_size_hint,
                           locally_changed_targets=locally_changed_targets,
                           fingerprint_strategy=self._jvm_fingerprint_strategy(),
-                          topological_order=True) as invalidation_check:
+                          topological_order=True,
+                          artifact_cache_check=not prefetch) as invalidation_check:
       if invalidation_check.invalid_vts:
         # Find the invalid targets for this chunk.
         invalid_targets = [vt.target for vt in invalidation_check.invalid_vts]
@@ -272,7 +274,9 @@ class JvmCompile(NailgunTaskBase, GroupMember):
                                      self.extra_compile_time_classpath_elements(),
                                      self._compile_vts,
                                      self._register_vts,
-                                     update_artifact_cache_vts_work)
+                                     update_artifact_cache_vts_work,
+                                     self._fetch_artifacts if prefetch else None,
+                                     self.find_in_artifact_cache if prefetch else None)
       else:
         # Nothing to build. Register products for all the targets in one go.
         self._register_vts([self._strategy.compile_context(t) for t in relevant_targets])
@@ -315,6 +319,11 @@ class JvmCompile(NailgunTaskBase, GroupMember):
     post_process_cached_vts = lambda vts: self._strategy.post_process_cached_vts(vts)
     return self.do_check_artifact_cache(vts, post_process_cached_vts=post_process_cached_vts)
 
+  def _fetch_artifacts(self, vts, known_present=False):
+    post_process_cached_vts = self._strategy.post_process_cached_vts
+    return self.fetch_from_artifact_cache(vts, post_process_cached_vts=post_process_cached_vts,
+                                          known_present=known_present)
+
   def _create_empty_products(self):
     make_products = lambda: defaultdict(MultipleRootedProducts)
     if self.context.products.is_required_data('classes_by_source'):
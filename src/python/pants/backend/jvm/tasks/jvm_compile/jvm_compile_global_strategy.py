@@ -7,13 +7,13 @@ from __future__ import (absolute_import, division, generators, nested_scopes, pr
 
 import itertools
 import os
-import shutil
 import uuid
 from collections import defaultdict
 
 from twitter.common.collections import OrderedSet
 
 from pants.backend.jvm.tasks.classpath_util import ClasspathUtil
+from pants.backend.jvm.tasks.jvm_compile.analysis_store import AnalysisStore
 from pants.backend.jvm.tasks.jvm_compile.jvm_compile_strategy import JvmCompileStrategy
 from pants.backend.jvm.tasks.jvm_compile.jvm_dependency_analyzer import JvmDependencyAnalyzer
 from pants.backend.jvm.tasks.jvm_compile.resource_mapping import ResourceMapping
@@ -22,7 +22,7 @@ from pants.base.exceptions import TaskError
 from pants.base.target import Target
 from pants.base.worker_pool import Work
 from pants.option.options import Options
-from pants.util.contextutil import open_zip, temporary_dir
+from pants.util.contextutil import open_zip
 from pants.util.dirutil import safe_mkdir, safe_rmtree, safe_walk
 
 
@@ -75,6 +75,10 @@ class JvmCompileGlobalStrategy(JvmCompileStrategy):
     self._analysis_file = os.path.join(self._analysis_dir, 'global_analysis.valid')
     self._invalid_analysis_file = os.path.join(self._analysis_dir, 'global_analysis.invalid')
 
+    # The global analyses are parsed once per run, and split and merged in memory.
+    self._valid_analysis = AnalysisStore(analysis_tools, self._analysis_file)
+    self._invalid_analysis = AnalysisStore(analysis_tools, self._invalid_analysis_file)
+
     self._target_sources_dir = os.path.join(workdir, 'target_sources')
 
     # A temporary, but well-known, dir in which to munge analysis/dependency files in before
@@ -130,12 +134,6 @@ class JvmCompileGlobalStrategy(JvmCompileStrategy):
                                self._classes_dir,
                                self._sources_for_target(target))
 
-  def move(self, src, dst):
-    if self._delete_scratch:
-      shutil.move(src, dst)
-    else:
-      shutil.copy(src, dst)
-
   def pre_compile(self):
     # Only create these working dirs during execution phase, otherwise, they
     # would be wiped out by clean-all goal/task if it's specified.
@@ -167,25 +165,15 @@ class JvmCompileGlobalStrategy(JvmCompileStrategy):
       self._deleted_sources = self._compute_deleted_sources()
 
       self._ensure_analysis_tmpdir()
-      tmpdir = os.path.join(self._analysis_tmpdir, str(uuid.uuid4()))
-      os.mkdir(tmpdir)
-      valid_analysis_tmp = os.path.join(tmpdir, 'valid_analysis')
-      newly_invalid_analysis_tmp = os.path.join(tmpdir, 'newly_invalid_analysis')
-      invalid_analysis_tmp = os.path.join(tmpdir, 'invalid_analysis')
-      if self._analysis_parser.is_nonempty_analysis(self._analysis_file):
+      if not self._valid_analysis.is_empty():
         with self.context.new_workunit(name='prepare-analysis'):
-          self._analysis_tools.split_to_paths(self._analysis_file,
-              [(invalid_sources + self._deleted_sources, newly_invalid_analysis_tmp)],
-              valid_analysis_tmp)
-          if self._analysis_parser.is_nonempty_analysis(self._invalid_analysis_file):
-            self._analysis_tools.merge_from_paths(
-              [self._invalid_analysis_file, newly_invalid_analysis_tmp], invalid_analysis_tmp)
-          else:
-            invalid_analysis_tmp = newly_invalid_analysis_tmp
+          newly_invalid_analysis = self._valid_analysis.discard(
+            invalid_sources + self._deleted_sources)
+          self._invalid_analysis.merge([newly_invalid_analysis])
 
           # Now it's OK to overwrite the main analysis files with the new state.
-          self.move(valid_analysis_tmp, self._analysis_file)
-          self.move(invalid_analysis_tmp, self._invalid_analysis_file)
+          self._invalid_analysis.flush()
+          self._valid_analysis.flush()
     else:
       self._deleted_sources = []
 
@@ -210,7 +198,9 @@ class JvmCompileGlobalStrategy(JvmCompileStrategy):
                     extra_compile_time_classpath_elements,
                     compile_vts,
                     register_vts,
-                    update_artifact_cache_vts_work):
+                    update_artifact_cache_vts_work,
+                    fetch_artifacts=None,
+                    find_artifacts=None):
     """Executes compilations for the invalid targets contained in a single chunk.
 
     Has the side effects of populating:
@@ -253,16 +243,25 @@ class JvmCompileGlobalStrategy(JvmCompileStrategy):
       partitions.append((vts, de_duped_sources, analysis_file))
 
     # Split per-partition files out of the global invalid analysis.
-    if self._analysis_parser.is_nonempty_analysis(self._invalid_analysis_file) and partitions:
+    if not self._invalid_analysis.is_empty() and partitions:
       with self.context.new_workunit(name='partition-analysis'):
         splits = [(x[1], x[2]) for x in partitions]
         # We have to pass the analysis for any deleted files through zinc, to give it
         # a chance to delete the relevant class files.
         if splits:
           splits[0] = (splits[0][0] + self._deleted_sources, splits[0][1])
-        self._analysis_tools.split_to_paths(self._invalid_analysis_file, splits)
-
-    # Now compile partitions one by one.
+        self._invalid_analysis.split_to_paths(splits)
+
+    # Now compile partitions one by one.  The global invalid analysis is trimmed as we go, but is
+    # only read by later runs, so it is written once we are done.
+    try:
+      self._compile_partitions(partitions, compile_classpath, compile_vts, register_vts,
+                               update_artifact_cache_vts_work)
+    finally:
+      self._invalid_analysis.flush()
+
+  def _compile_partitions(self, partitions, compile_classpath, compile_vts, register_vts,
+                          update_artifact_cache_vts_work):
     for partition_index, partition in enumerate(partitions):
       (vts, sources, analysis_file) = partition
 
@@ -282,19 +281,13 @@ class JvmCompileGlobalStrategy(JvmCompileStrategy):
 
       # No exception was thrown, therefore the compile succeeded and analysis_file is now valid.
       if os.path.exists(analysis_file):  # The compilation created an analysis.
-        # Merge the newly-valid analysis with our global valid analysis.
-        new_valid_analysis = analysis_file + '.valid.new'
-        if self._analysis_parser.is_nonempty_analysis(self._analysis_file):
-          with self.context.new_workunit(name='update-upstream-analysis'):
-            self._analysis_tools.merge_from_paths([self._analysis_file, analysis_file],
-                                                  new_valid_analysis)
-        else:  # We need to keep analysis_file around. Background tasks may need it.
-          shutil.copy(analysis_file, new_valid_analysis)
-
-        # Move the merged valid analysis to its proper location.
+        # Merge the newly-valid analysis with our global valid analysis, and write it out for the
+        # compiles of the next partitions to use upstream.
         # We do this before checking for missing dependencies, so that we can still
         # enjoy an incremental compile after fixing missing deps.
-        self.move(new_valid_analysis, self._analysis_file)
+        with self.context.new_workunit(name='update-upstream-analysis'):
+          self._valid_analysis.merge_from_paths([analysis_file])
+          self._valid_analysis.flush()
 
         # Update the products with the latest classes. Must happen before the
         # missing dependencies check.
@@ -312,14 +305,10 @@ class JvmCompileGlobalStrategy(JvmCompileStrategy):
                                         vts,
                                         update_artifact_cache_vts_work)
 
-      if self._analysis_parser.is_nonempty_analysis(self._invalid_analysis_file):
+      if not self._invalid_analysis.is_empty():
         with self.context.new_workunit(name='trim-downstream-analysis'):
           # Trim out the newly-valid sources from our global invalid analysis.
-          new_invalid_analysis = analysis_file + '.invalid.new'
-          discarded_invalid_analysis = analysis_file + '.invalid.discard'
-          self._analysis_tools.split_to_paths(self._invalid_analysis_file,
-            [(sources, discarded_invalid_analysis)], new_invalid_analysis)
-          self.move(new_invalid_analysis, self._invalid_analysis_file)
+          self._invalid_analysis.discard(sources)
 
       # Record the built target -> sources mapping for future use.
       for target, sources in self._sources_for_targets(vts.targets).items():
@@ -351,17 +340,17 @@ class JvmCompileGlobalStrategy(JvmCompileStrategy):
 
     classes_by_src_by_context = defaultdict(dict)
     if os.path.exists(analysis_file):
-      # Parse the global analysis once.
+      # Index the global analysis once, or reuse its index if it is unchanged since.
       buildroot = get_buildroot()
-      products = self._analysis_parser.parse_products_from_path(analysis_file,
+      products = self._analysis_parser.products_index_from_path(analysis_file,
                                                                 self._classes_dir)
 
-      # Then iterate over contexts (targets), and add the classes for their sources.
+      # Then iterate over contexts (targets), and look up the classes for their sources.
       for compile_context in compile_contexts:
         classes_by_src = classes_by_src_by_context[compile_context]
         for source in compile_context.sources:
           absolute_source = os.path.join(buildroot, source)
-          classes_by_src[source] = products.get(absolute_source, [])
+          classes_by_src[source] = products.products_for(absolute_source)
     return classes_by_src_by_context
 
   def post_process_cached_vts(self, cached_vts):
@@ -398,30 +387,19 @@ class JvmCompileGlobalStrategy(JvmCompileStrategy):
 
     # Merge them into the global analysis.
     if analyses_to_merge:
-      with temporary_dir() as tmpdir:
-        if sources_to_strip:
-          throwaway = os.path.join(tmpdir, 'throwaway')
-          trimmed_analysis = os.path.join(tmpdir, 'trimmed')
-          self._analysis_tools.split_to_paths(self._analysis_file,
-                                          [(sources_to_strip, throwaway)],
-                                          trimmed_analysis)
-        else:
-          trimmed_analysis = self._analysis_file
-        if os.path.exists(trimmed_analysis):
-          analyses_to_merge.append(trimmed_analysis)
-        tmp_analysis = os.path.join(tmpdir, 'analysis')
-        with self.context.new_workunit(name='merge_analysis'):
-          self._analysis_tools.merge_from_paths(analyses_to_merge, tmp_analysis)
-
-        sources_by_cached_target = self._sources_for_targets(cached_targets)
-
-        # Record the cached target -> sources mapping for future use.
-        for target, sources in sources_by_cached_target.items():
-          self._record_previous_sources_by_target(target, sources)
-
-        # Everything's good so move the merged analysis to its final location.
-        if os.path.exists(tmp_analysis):
-          self.move(tmp_analysis, self._analysis_file)
+      if sources_to_strip:
+        self._valid_analysis.discard(sources_to_strip)
+      with self.context.new_workunit(name='merge_analysis'):
+        self._valid_analysis.merge_from_paths(analyses_to_merge)
+
+      sources_by_cached_target = self._sources_for_targets(cached_targets)
+
+      # Record the cached target -> sources mapping for future use.
+      for target, sources in sources_by_cached_target.items():
+        self._record_previous_sources_by_target(target, sources)
+
+      # Everything's good so write the merged analysis to its final location.
+      self._valid_analysis.flush()
 
   def _write_to_artifact_cache(self, analysis_file, vts, get_update_artifact_cache_work):
     vt_by_target = dict([(vt.target, vt) for vt in vts.versioned_targets])
@@ -502,10 +480,10 @@ class JvmCompileGlobalStrategy(JvmCompileStrategy):
     """
     with self.context.new_workunit('find-deleted-sources'):
       if os.path.exists(self._analysis_file):
-        products = self._analysis_parser.parse_products_from_path(self._analysis_file,
+        products = self._analysis_parser.products_index_from_path(self._analysis_file,
                                                                   self._classes_dir)
         buildroot = get_buildroot()
-        old_srcs = products.keys()  # Absolute paths.
+        old_srcs = products.sources()  # Absolute paths.
         return [os.path.relpath(src, buildroot) for src in old_srcs if not os.path.exists(src)]
       else:
         return []
@@ -6,10 +6,13 @@ from __future__ import (absolute_import, division, generators, nested_scopes, pr
                         unicode_literals, with_statement)
 
 import os
+import threading
+import time
 from collections import OrderedDict, defaultdict
 from contextlib import contextmanager
 
 from pants.backend.jvm.tasks.classpath_util import ClasspathUtil
+from pants.backend.jvm.tasks.jvm_compile.compile_durations import CompileDurations
 from pants.backend.jvm.tasks.jvm_compile.execution_graph import (ExecutionFailure, ExecutionGraph,
                                                                  Job)
 from pants.backend.jvm.tasks.jvm_compile.jvm_compile_strategy import JvmCompileStrategy
@@ -20,6 +23,23 @@ from pants.base.worker_pool import Work, WorkerPool
 from pants.util.dirutil import safe_delete, safe_mkdir, safe_walk
 
 
+class _ArtifactLookup(object):
+  """The outcome of looking up the artifacts of a compile in the artifact cache."""
+
+  def __init__(self):
+    self._done = threading.Event()
+    self._hit = False
+
+  def finish(self, hit):
+    self._hit = hit
+    self._done.set()
+
+  def wait(self):
+    """Blocks until the lookup is finished, and returns True if the artifacts were fetched."""
+    self._done.wait()
+    return self._hit
+
+
 class JvmCompileIsolatedStrategy(JvmCompileStrategy):
   """A strategy for JVM compilation that uses per-target classpaths and analysis."""
 
@@ -29,6 +49,10 @@ class JvmCompileIsolatedStrategy(JvmCompileStrategy):
       register('--worker-count', type=int, default=1, advanced=True,
                help='The number of concurrent workers to use compiling {lang} sources with the isolated'
                     ' strategy. This is a beta feature.'.format(lang=language))
+    register('--prefetch-artifacts', default=True, action='store_true', advanced=True,
+             help='With the isolated strategy, look up the artifacts of invalid {lang} targets in '
+                  'the background while compiling others, rather than all before compiling. '
+                  'Targets whose artifacts are found are not compiled.'.format(lang=language))
 
   def __init__(self, context, options, workdir, analysis_tools, language, sources_predicate):
     super(JvmCompileIsolatedStrategy, self).__init__(context, options, workdir, analysis_tools,
@@ -37,6 +61,9 @@ class JvmCompileIsolatedStrategy(JvmCompileStrategy):
     # Various working directories.
     self._analysis_dir = os.path.join(workdir, 'isolated-analysis')
     self._classes_dir = os.path.join(workdir, 'isolated-classes')
+    # How long compiles took in previous runs, to schedule the critical path first.
+    self._compile_durations = CompileDurations(os.path.join(workdir, 'isolated-durations',
+                                                            'durations.pickle'))
 
     try:
       worker_count = options.worker_count
@@ -46,10 +73,17 @@ class JvmCompileIsolatedStrategy(JvmCompileStrategy):
 
     self._worker_count = worker_count
     self._worker_pool = None
+    self._prefetch_artifacts = options.prefetch_artifacts
+    # Estimating makespans simulates the whole schedule, so is only worth it to log at debug.
+    self._estimate_makespans = options.level == 'debug'
 
   def name(self):
     return 'isolated'
 
+  @property
+  def prefetches_artifacts(self):
+    return self._prefetch_artifacts
+
   def compile_context(self, target):
     analysis_file = JvmCompileStrategy._analysis_for_target(self._analysis_dir, target)
     classes_dir = os.path.join(self._classes_dir, target.id)
@@ -104,10 +138,10 @@ class JvmCompileIsolatedStrategy(JvmCompileStrategy):
     for compile_context in compile_contexts:
       if not os.path.exists(compile_context.analysis_file):
         continue
-      products = self._analysis_parser.parse_products_from_path(compile_context.analysis_file,
-                                                                compile_context.classes_dir)
+      index = self._analysis_parser.products_index_from_path(compile_context.analysis_file,
+                                                             compile_context.classes_dir)
       classes_by_src = classes_by_src_by_context[compile_context]
-      for src, classes in products.items():
+      for src, classes in index.products().items():
         relsrc = os.path.relpath(src, buildroot)
         classes_by_src[relsrc] = classes
     return classes_by_src_by_context
@@ -157,9 +191,13 @@ class JvmCompileIsolatedStrategy(JvmCompileStrategy):
   def _create_compile_jobs(self, compile_classpaths,
                            compile_contexts, extra_compile_time_classpath,
                      invalid_targets, invalid_vts_partitioned,  compile_vts, register_vts,
-                     update_artifact_cache_vts_work):
-    def create_work_for_vts(vts, compile_context, target_closure):
+                     update_artifact_cache_vts_work, lookups=None):
+    def create_work_for_vts(vts, compile_context, target_closure, lookup):
       def work():
+        # Don't compile what was fetched from the cache, nor race with fetching it.
+        if lookup and lookup.wait():
+          return
+
         progress_message = vts.targets[0].address.spec
         cp_entries = self._compute_classpath_entries(compile_classpaths,
                                                      target_closure,
@@ -167,6 +205,7 @@ class JvmCompileIsolatedStrategy(JvmCompileStrategy):
                                                      extra_compile_time_classpath)
         upstream_analysis = dict(self._upstream_analysis(compile_contexts, cp_entries))
 
+        start = time.time()
         with self._empty_analysis_cleanup(compile_context):
           compile_vts(vts,
                       compile_context.sources,
@@ -175,6 +214,9 @@ class JvmCompileIsolatedStrategy(JvmCompileStrategy):
                       cp_entries,
                       compile_context.classes_dir,
                       progress_message)
+        self._compile_durations.record(vts.targets[0].address.spec,
+                                       len(compile_context.sources),
+                                       time.time() - start)
 
         # Update the products with the latest classes.
         register_vts([compile_context])
@@ -198,13 +240,17 @@ class JvmCompileIsolatedStrategy(JvmCompileStrategy):
       # dependencies of the current target which are invalid for this chunk
       invalid_dependencies = (compile_target_closure & invalid_target_set) - [compile_target]
 
-      jobs.append(Job(self.exec_graph_key_for_target(compile_target),
-                      create_work_for_vts(vts, compile_context, compile_target_closure),
+      key = self.exec_graph_key_for_target(compile_target)
+      jobs.append(Job(key,
+                      create_work_for_vts(vts, compile_context, compile_target_closure,
+                                          lookups and lookups[key]),
                       [self.exec_graph_key_for_target(target) for target in invalid_dependencies],
                       # If compilation and analysis work succeeds, validate the vts.
                       # Otherwise, fail it.
                       on_success=vts.update,
-                      on_failure=vts.force_invalidate))
+                      on_failure=vts.force_invalidate,
+                      size=self._compile_durations.estimate(compile_target.address.spec,
+                                                            len(compile_context.sources))))
     return jobs
 
   def compile_chunk(self,
@@ -215,8 +261,16 @@ class JvmCompileIsolatedStrategy(JvmCompileStrategy):
                     extra_compile_time_classpath_elements,
                     compile_vts,
                     register_vts,
-                    update_artifact_cache_vts_work):
-    """Executes compilations for the invalid targets contained in a single chunk."""
+                    update_artifact_cache_vts_work,
+                    fetch_artifacts=None,
+                    find_artifacts=None):
+    """Executes compilations for the invalid targets contained in a single chunk.
+
+    If `fetch_artifacts` is given, the artifacts of the invalid targets are looked up in one batch
+    with `find_artifacts`, and those found are then fetched in the background, critical path first.
+    Compiles whose artifacts are fetched are satisfied rather than run, if they have not started
+    yet.
+    """
     assert invalid_targets, "compile_chunk should only be invoked if there are invalid targets."
 
     # Get the classpath generated by upstream JVM tasks and our own prepare_compile().
@@ -227,6 +281,11 @@ class JvmCompileIsolatedStrategy(JvmCompileStrategy):
 
     compile_contexts = self._create_compile_contexts_for_targets(all_targets)
 
+    lookups = None
+    if fetch_artifacts:
+      lookups = OrderedDict((self.exec_graph_key_for_target(vts.targets[0]), _ArtifactLookup())
+                            for vts in invalidation_check.invalid_vts_partitioned)
+
     # Now create compile jobs for each invalid target one by one.
     jobs = self._create_compile_jobs(compile_classpaths,
                                      compile_contexts,
@@ -235,14 +294,76 @@ class JvmCompileIsolatedStrategy(JvmCompileStrategy):
                                      invalidation_check.invalid_vts_partitioned,
                                      compile_vts,
                                      register_vts,
-                                     update_artifact_cache_vts_work)
+                                     update_artifact_cache_vts_work,
+                                     lookups)
 
 
     exec_graph = ExecutionGraph(jobs)
+    if self._estimate_makespans:
+      self.context.log.debug('Estimated makespan with {} workers: {:.1f}s critical path first, '
+                             '{:.1f}s in order of readiness.'
+                             .format(self._worker_count,
+                                     exec_graph.simulate(self._worker_count),
+                                     exec_graph.simulate(self._worker_count, fifo=True)))
+    if lookups:
+      self._prefetch_artifacts_for(exec_graph, lookups, compile_contexts,
+                                   invalidation_check.invalid_vts_partitioned, fetch_artifacts,
+                                   find_artifacts, register_vts)
     try:
       exec_graph.execute(self._worker_pool, self.context.log)
     except ExecutionFailure as e:
       raise TaskError("Compilation failure: {}".format(e))
+    finally:
+      self._compile_durations.save()
+
+  def _prefetch_artifacts_for(self, exec_graph, lookups, compile_contexts, invalid_vts,
+                              fetch_artifacts, find_artifacts, register_vts):
+    """Fetches the artifacts of compile jobs in the background, satisfying the jobs they fill.
+
+    Which artifacts are present is looked up for all the jobs at once, up front, so that the jobs
+    whose artifacts are absent can start compiling right away rather than wait on their lookups.
+    """
+    artifact_cache_stats = self.context.run_tracker.artifact_cache_stats
+
+    def lookup(key, vts, compile_context):
+      hit = False
+      try:
+        cached_vts, _ = fetch_artifacts([vts], known_present=True)
+        if cached_vts:
+          register_vts([compile_context])
+          hit = True
+      except Exception as e:
+        self.context.log.warn('Error fetching artifacts for {}: {}'.format(key, e))
+      finally:
+        # Unblocks the job, which may be waiting to compile on a miss.
+        lookups[key].finish(hit)
+      if hit:
+        artifact_cache_stats.add_hit('default', compile_context.target)
+        exec_graph.satisfy(key)
+      else:
+        artifact_cache_stats.add_miss('default', compile_context.target)
+
+    try:
+      present = find_artifacts(invalid_vts)
+    except Exception as e:
+      self.context.log.warn('Error looking up artifacts: {}'.format(e))
+      present = [False] * len(invalid_vts)
+
+    args_tuples = []
+    for vts, is_present in zip(invalid_vts, present):
+      key = self.exec_graph_key_for_target(vts.targets[0])
+      compile_context = compile_contexts[vts.targets[0]]
+      if is_present:
+        args_tuples.append((key, vts, compile_context))
+      else:
+        lookups[key].finish(False)
+        artifact_cache_stats.add_miss('default', compile_context.target)
+    if not args_tuples:
+      return
+    # Fetch what will be dispatched first, first.
+    args_tuples.sort(key=lambda args_tuple: -exec_graph.priority(args_tuple[0]))
+    self.context.submit_background_work_chain([Work(lookup, args_tuples)],
+                                              parent_workunit_name='cache')
 
   def compute_resource_mapping(self, compile_contexts):
     return ResourceMapping(self._classes_dir)
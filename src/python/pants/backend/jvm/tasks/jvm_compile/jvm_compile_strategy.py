@@ -111,10 +111,29 @@ class JvmCompileStrategy(object):
                     extra_compile_time_classpath_elements,
                     compile_vts,
                     register_vts,
-                    update_artifact_cache_vts_work):
-    """Executes compilations for that invalid targets contained in a single language chunk."""
+                    update_artifact_cache_vts_work,
+                    fetch_artifacts=None,
+                    find_artifacts=None):
+    """Executes compilations for that invalid targets contained in a single language chunk.
+
+    :param fetch_artifacts: If the strategy `prefetches_artifacts` and reading from the artifact
+      cache is enabled, a function that fetches the artifacts of a list of VersionedTargetSets
+      from the cache, and returns the pair (cached, uncached) of VersionedTargets.  It takes a
+      `known_present` flag to skip looking the artifacts up first.  Otherwise, None.
+    :param find_artifacts: Given along with `fetch_artifacts`, a function that looks up which of a
+      list of VersionedTargetSets have artifacts in the cache, in one batch, and returns a list of
+      booleans.  Otherwise, None.
+    """
     pass
 
+  @property
+  def prefetches_artifacts(self):
+    """True if the strategy looks up the artifacts of invalid targets in compile_chunk itself.
+
+    Otherwise, they are looked up for it before compile_chunk is called.
+    """
+    return False
+
   @abstractmethod
   def post_process_cached_vts(self, cached_vts):
     """Post processes VTS that have been fetched from the cache."""
@@ -48,6 +48,9 @@ class ZincAnalysis(Analysis):
   def sources(self):
     return self._underlying_analysis.sources()
 
+  def is_empty(self):
+    return next(iter(self.sources()), None) is None
+
   def split(self, splits, catchall=False):
     buildroot = get_buildroot()
     abs_splits = [set([s if os.path.isabs(s) else os.path.join(buildroot, s) for s in x])
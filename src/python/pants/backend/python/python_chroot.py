@@ -5,12 +5,17 @@
 from __future__ import (absolute_import, division, generators, nested_scopes, print_function,
                         unicode_literals, with_statement)
 
+import copy
+import errno
 import logging
 import os
 import shutil
 import sys
 import tempfile
+import threading
+import time
 from collections import defaultdict
+from hashlib import sha1
 
 from pex.interpreter import PythonInterpreter
 from pex.pex_builder import PEXBuilder
@@ -31,7 +36,10 @@ from pants.backend.python.targets.python_tests import PythonTests
 from pants.backend.python.thrift_builder import PythonThriftBuilder
 from pants.base.build_environment import get_buildroot
 from pants.base.build_invalidator import BuildInvalidator, CacheKeyGenerator
+from pants.base.hash_utils import hash_file
+from pants.util.contextutil import open_zip
 from pants.util.dirutil import safe_mkdir, safe_rmtree
+from pants.util.persistent_pickle import PersistentPickle
 
 
 logger = logging.getLogger(__name__)
@@ -49,6 +57,16 @@ class PythonChroot(object):
 
   MEMOIZED_THRIFTS = {}
 
+  # Resolves memoized by where and what they resolved, so that the chroots of targets with the
+  # same requirements, e.g. those of tests run in chroots of their own, resolve them once.
+  MEMOIZED_RESOLVES = {}
+
+  # Chroots may be dumped concurrently.  This guards the memoized requirements and resolves.
+  _MEMO_LOCK = threading.RLock()
+
+  # Bump this whenever the format of the manifests of persistent chroots changes.
+  _MANIFEST_VERSION = 1
+
   class InvalidDependencyException(Exception):
     def __init__(self, target):
       Exception.__init__(self, "Not a valid Python dependency! Found: {}".format(target))
@@ -62,7 +80,13 @@ class PythonChroot(object):
                extra_requirements=None,
                builder=None,
                platforms=None,
-               interpreter=None):
+               interpreter=None,
+               manifest_path=None):
+    """
+    :param string manifest_path: If given, the chroot is persistent: it is dumped over whatever its
+      previous dump, as recorded in this manifest, left in the builder's directory, and it is not
+      deleted when garbage collected.
+    """
     self.context = context
     self._python_setup = python_setup
     self._python_repos = python_repos
@@ -73,6 +97,8 @@ class PythonChroot(object):
     self._interpreter = interpreter or PythonInterpreter.get()
     self._builder = builder or PEXBuilder(os.path.realpath(tempfile.mkdtemp()),
                                           interpreter=self._interpreter)
+    self._manifest = (PersistentPickle(manifest_path, self._MANIFEST_VERSION)
+                      if manifest_path is not None else None)
 
     # Note: unrelated to the general pants artifact cache.
     self._egg_cache_root = os.path.join(
@@ -86,6 +112,8 @@ class PythonChroot(object):
     safe_rmtree(self.path())
 
   def __del__(self):
+    if self._manifest is not None:
+      return
     if os.getenv('PANTS_LEAVE_CHROOT') is None:
       self.delete()
     else:
@@ -103,14 +131,24 @@ class PythonChroot(object):
     return os.path.realpath(self._builder.path())
 
   def _dump_library(self, library):
-    def copy_to_chroot(base, path, add_function):
+    """Dumps the sources and resources of a library.
+
+    :returns: The files added to the chroot, as a dict of fileset label -> list of paths.
+    """
+    files = {'source': [], 'resource': []}
+
+    def copy_to_chroot(base, path, add_function, label):
       src = os.path.join(get_buildroot(), base, path)
       add_function(src, path)
+      files[label].append(path)
+      # As PEXBuilder.add_source does, python sources are added along with their bytecode.
+      if label == 'source' and path.endswith('.py'):
+        files[label].append(os.path.splitext(path)[0] + '.pyc')
 
     self.debug('  Dumping library: {}'.format(library))
     for relpath in library.sources_relative_to_source_root():
       try:
-        copy_to_chroot(library.target_base, relpath, self._builder.add_source)
+        copy_to_chroot(library.target_base, relpath, self._builder.add_source, 'source')
       except OSError as e:
         logger.error("Failed to copy {path} for library {library}"
                      .format(path=os.path.join(library.target_base, relpath),
@@ -121,21 +159,50 @@ class PythonChroot(object):
       for resource_file_from_source_root in resources_tgt.sources_relative_to_source_root():
         try:
           copy_to_chroot(resources_tgt.target_base, resource_file_from_source_root,
-                         self._builder.add_resource)
+                         self._builder.add_resource, 'resource')
         except OSError as e:
           logger.error("Failed to copy {path} for resource {resource}"
                        .format(path=os.path.join(resources_tgt.target_base,
                                                  resource_file_from_source_root),
                                resource=resources_tgt.address.spec))
           raise
+    return files
 
   def _dump_requirement(self, req):
     self.debug('  Dumping requirement: {}'.format(req))
     self._builder.add_requirement(req)
 
   def _dump_distribution(self, dist):
-    self.debug('  Dumping distribution: .../{}'.format(os.path.basename(dist.location)))
-    self._builder.add_distribution(dist)
+    dist_name = os.path.basename(dist.location)
+    self.debug('  Dumping distribution: .../{}'.format(dist_name))
+    if not os.path.isdir(dist.location):
+      # Rather than extracting a zipped distribution into each chroot, link its files from a copy
+      # unpacked once.
+      dist = copy.copy(dist)
+      dist.location = self._unpacked_distribution(dist.location)
+    self._builder.add_distribution(dist, dist_name=dist_name)
+
+  def _unpacked_distribution(self, path):
+    """Returns a directory holding the contents of the zipped distribution at path.
+
+    Unpacked distributions are kept in a cache keyed by the contents of the zip, shared by all
+    chroots, and unpacked atomically, so that concurrent chroots may ask for the same one.
+    """
+    unpacked_root = os.path.join(self._python_setup.scratch_dir, 'unpacked')
+    unpacked = os.path.join(unpacked_root, hash_file(path))
+    if not os.path.isdir(unpacked):
+      safe_mkdir(unpacked_root)
+      tmp = tempfile.mkdtemp(dir=unpacked_root)
+      with open_zip(path) as zf:
+        zf.extractall(tmp)
+      try:
+        os.rename(tmp, unpacked)
+      except OSError as e:
+        # Another chroot unpacked it first.
+        safe_rmtree(tmp)
+        if e.errno not in (errno.EEXIST, errno.ENOTEMPTY):
+          raise
+    return unpacked
 
   def _generate_requirement(self, library, builder_cls):
     library_key = self._key_generator.key_for_target(library)
@@ -175,20 +242,31 @@ class PythonChroot(object):
     self.debug('Building chroot for {}:'.format(self._targets))
     targets = self.resolve(self._targets)
 
-    for lib in targets['libraries'] | targets['binaries']:
-      self._dump_library(lib)
+    if self._manifest is None:
+      for lib in targets['libraries'] | targets['binaries']:
+        self._dump_library(lib)
+      self._dump_requirements(targets)
+    else:
+      self._dump_incrementally(targets)
 
+    if len(targets['binaries']) > 1:
+      print('WARNING: Target has multiple python_binary targets!', file=sys.stderr)
+
+    return self._builder
+
+  def _dump_requirements(self, targets):
     generated_reqs = OrderedSet()
-    if targets['thrifts']:
-      for thr in set(targets['thrifts']):
-        if thr not in self.MEMOIZED_THRIFTS:
-          self.MEMOIZED_THRIFTS[thr] = self._generate_thrift_requirement(thr)
-        generated_reqs.add(self.MEMOIZED_THRIFTS[thr])
+    with self._MEMO_LOCK:
+      if targets['thrifts']:
+        for thr in set(targets['thrifts']):
+          if thr not in self.MEMOIZED_THRIFTS:
+            self.MEMOIZED_THRIFTS[thr] = self._generate_thrift_requirement(thr)
+          generated_reqs.add(self.MEMOIZED_THRIFTS[thr])
 
-      generated_reqs.add(PythonRequirement('thrift', use_2to3=True))
+        generated_reqs.add(PythonRequirement('thrift', use_2to3=True))
 
-    for antlr in targets['antlrs']:
-      generated_reqs.add(self._generate_antlr_requirement(antlr))
+      for antlr in targets['antlrs']:
+        generated_reqs.add(self._generate_antlr_requirement(antlr))
 
     reqs_from_libraries = OrderedSet()
     for req_lib in targets['reqs']:
@@ -207,14 +285,7 @@ class PythonChroot(object):
       if req.repository:
         find_links.append(req.repository)
 
-    distributions = resolve_multi(
-         self._python_setup,
-         self._python_repos,
-         reqs_to_build,
-         interpreter=self._interpreter,
-         platforms=self._platforms,
-         ttl=self.context.options.for_global_scope().python_chroot_requirements_ttl,
-         find_links=find_links)
+    distributions = self._resolve_multi(reqs_to_build, find_links)
 
     locations = set()
     for platform, dist_set in distributions.items():
@@ -223,7 +294,140 @@ class PythonChroot(object):
           self._dump_distribution(dist)
         locations.add(dist.location)
 
-    if len(targets['binaries']) > 1:
-      print('WARNING: Target has multiple python_binary targets!', file=sys.stderr)
+  def _dump_incrementally(self, targets):
+    """Dumps the chroot over what its previous dump left in the builder's directory.
+
+    The chroot is reused as is if none of its targets or their dependencies changed since, and its
+    requirements were resolved within the requirements ttl.  Otherwise only the libraries that
+    changed are dumped again, and the requirements are resolved again.
+    """
+    manifest = self._manifest.load() or {}
+    chroot_key = self._chroot_key()
+    ttl = self.context.options.for_global_scope().python_chroot_requirements_ttl
+    if (chroot_key is not None and chroot_key == manifest.get('key') and
+        time.time() - manifest['resolved_at'] < ttl and self._restore(manifest)):
+      self.debug('  Reusing chroot at {}'.format(self.path()))
+      self._prune()
+      return
+
+    # Until this dump completes, what is in the builder's directory is unaccounted for.
+    if manifest:
+      os.unlink(self._manifest.path)
+    else:
+      safe_rmtree(self.path())
+      safe_mkdir(self.path())
 
-    return self._builder
+    libraries = {}
+    changed = []
+    previous_libraries = manifest.get('libraries', {})
+    for lib in targets['libraries'] | targets['binaries']:
+      library_key = self._library_key(lib)
+      previous_key, files = previous_libraries.get(lib.address.spec, (None, {}))
+      if library_key is None or library_key != previous_key or not self._retag(files):
+        changed.append((lib, library_key))
+      else:
+        libraries[lib.address.spec] = (library_key, files)
+
+    # Linking into the chroot skips destinations that already exist, so only the files of unchanged
+    # libraries may stay: any other leftover, e.g. a namespace __init__.py written when the chroot
+    # was frozen, would shadow the file dumped in its place.  Distributions are linked rather than
+    # copied, so relinking them is cheap, and it keeps a distribution that changed under the same
+    # name from being stale.
+    self._prune()
+    for lib, library_key in changed:
+      libraries[lib.address.spec] = (library_key, self._dump_library(lib))
+    self._dump_requirements(targets)
+
+    self._manifest.save({
+      'key': chroot_key,
+      'resolved_at': time.time(),
+      'libraries': libraries,
+      'requirements': sorted(self._builder.info.requirements),
+      'distributions': dict(self._builder.info.distributions),
+      # PEXBuilder adds the files of distributions unlabeled.
+      'distribution_files': {None: sorted(self._builder.chroot().get(None))},
+    })
+
+  def _chroot_key(self):
+    keys = [self._key_generator.key_for_target(target, transitive=True) for target in self._targets]
+    if not keys or None in keys:
+      return None
+    hasher = sha1()
+    hasher.update(CacheKeyGenerator.combine_cache_keys(keys).hash)
+    hasher.update(str(self._interpreter.identity))
+    hasher.update(repr(tuple(self._platforms or self._python_setup.platforms)))
+    hasher.update(repr(sorted(req.cache_key() for req in self._extra_requirements)))
+    hasher.update(self._builder.info.internal_cache)
+    return hasher.hexdigest()
+
+  def _library_key(self, library):
+    keys = [self._key_generator.key_for_target(target)
+            for target in [library] + list(library.resources)]
+    if None in keys:
+      return None
+    return CacheKeyGenerator.combine_cache_keys(keys).hash
+
+  def _retag(self, files):
+    """Adds files already in the builder's directory to the chroot, if they all are."""
+    chroot = self._builder.chroot()
+    for paths in files.values():
+      for path in paths:
+        if not os.path.isfile(os.path.join(chroot.path(), path)):
+          return False
+    for label, paths in files.items():
+      chroot.filesets[label].update(paths)
+    return True
+
+  def _restore(self, manifest):
+    """Restores the previous dump recorded in the manifest, if all its files are still there."""
+    files = defaultdict(list)
+    for _, library_files in manifest['libraries'].values():
+      for label, paths in library_files.items():
+        files[label].extend(paths)
+    for label, paths in manifest['distribution_files'].items():
+      files[label].extend(paths)
+    if not self._retag(files):
+      return False
+    for req in manifest['requirements']:
+      self._builder.add_requirement(req)
+    for dist_name, dist_hash in manifest['distributions'].items():
+      self._builder.info.add_distribution(dist_name, dist_hash)
+    return True
+
+  def _prune(self):
+    """Removes the files in the builder's directory that this dump has not added so far.
+
+    Files written when freezing the builder are among them, but are rewritten when it is frozen.
+    """
+    chroot = self._builder.chroot()
+    files = chroot.files()
+    for root, dirs, filenames in os.walk(chroot.path(), topdown=False):
+      for filename in filenames:
+        path = os.path.join(root, filename)
+        if os.path.relpath(path, chroot.path()) not in files:
+          os.unlink(path)
+      if root != chroot.path() and not os.listdir(root):
+        os.rmdir(root)
+
+  def _resolve_multi(self, reqs_to_build, find_links):
+    ttl = self.context.options.for_global_scope().python_chroot_requirements_ttl
+    key = (self._python_setup.scratch_dir,
+           tuple(self._python_repos.repos or ()),
+           tuple(self._python_repos.indexes or ()),
+           str(self._interpreter.identity),
+           tuple(self._platforms or self._python_setup.platforms),
+           tuple(sorted((str(req.requirement), req.repository, req.use_2to3)
+                        for req in reqs_to_build)),
+           tuple(find_links),
+           ttl)
+    # Resolving concurrently into the shared egg cache isn't safe, so resolves are serialized.
+    with self._MEMO_LOCK:
+      if key not in self.MEMOIZED_RESOLVES:
+        self.MEMOIZED_RESOLVES[key] = resolve_multi(self._python_setup,
+                                                    self._python_repos,
+                                                    reqs_to_build,
+                                                    interpreter=self._interpreter,
+                                                    platforms=self._platforms,
+                                                    ttl=ttl,
+                                                    find_links=find_links)
+      return self.MEMOIZED_RESOLVES[key]
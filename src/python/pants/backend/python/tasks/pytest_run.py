@@ -7,20 +7,22 @@ from __future__ import (absolute_import, division, generators, nested_scopes, pr
 
 import itertools
 import logging
+import multiprocessing
 import os
 import re
 import shutil
+import threading
 import time
 import traceback
 from contextlib import contextmanager
 from textwrap import dedent
 
 from pex.pex import PEX
-from pex.pex_builder import PEXBuilder
+from pex.pex_info import PexInfo
 from six import StringIO
 from six.moves import configparser
 
-from pants.backend.python.python_chroot import PythonChroot
+from pants.backend.core.tasks.passed_tests_cache_mixin import PassedTestsCacheMixin
 from pants.backend.python.python_requirement import PythonRequirement
 from pants.backend.python.python_setup import PythonRepos, PythonSetup
 from pants.backend.python.targets.python_tests import PythonTests
@@ -28,6 +30,7 @@ from pants.backend.python.tasks.python_task import PythonTask
 from pants.base.deprecated import deprecated
 from pants.base.exceptions import TaskError, TestFailedTaskError
 from pants.base.target import Target
+from pants.base.worker_pool import Work, WorkerPool
 from pants.base.workunit import WorkUnit
 from pants.util.contextutil import (environment_as, temporary_dir, temporary_file,
                                     temporary_file_path)
@@ -105,7 +108,7 @@ def deprecated_env_accessors(removal_version, **replacement_mapping):
                           PANTS_PROFILE='--profile',
                           PANTS_PYTHON_TEST_FAILSOFT='--fail-slow',
                           PANTS_PY_COVERAGE='--coverage')
-class PytestRun(PythonTask):
+class PytestRun(PassedTestsCacheMixin, PythonTask):
   _TESTING_TARGETS = [
     # Note: the requirement restrictions on pytest and pytest-cov match those in requirements.txt,
     # to avoid confusion when debugging pants tests.
@@ -146,27 +149,41 @@ class PytestRun(PythonTask):
     register('--shard',
              help='Subset of tests to run, in the form M/N, 0 <= M < N. For example, 1/3 means '
                   'run tests number 2, 5, 8, 11, ...')
+    register('--jobs', type=int, default=1,
+             help='With --no-fast, build the chroots of and run the tests of up to this many '
+                  'targets at once. 0 for as many as there are cores. Coverage runs are not '
+                  'parallelized.')
 
   @classmethod
   def supports_passthru_args(cls):
     return True
 
   def execute(self):
-    def is_python_test(target):
-      return isinstance(target, PythonTests)
-
-    test_targets = list(filter(is_python_test, self.context.targets()))
+    test_targets = self.context.targets(PythonTests)
     if test_targets:
       self.context.release_lock()
-      with self.context.new_workunit(name='run',
-                                     labels=[WorkUnit.TOOL, WorkUnit.TEST]) as workunit:
-        # pytest uses py.io.terminalwriter for output. That class detects the terminal
-        # width and attempts to use all of it. However we capture and indent the console
-        # output, leading to weird-looking line wraps. So we trick the detection code
-        # into thinking the terminal window is narrower than it is.
-        cols = os.environ.get('COLUMNS', 80)
-        with environment_as(COLUMNS=str(int(cols) - 30)):
-          self.run_tests(test_targets, workunit)
+      # Coverage needs all the tests to run.
+      with self.invalidated_tests(test_targets, self._run_inputs(),
+                                  cacheable=not self.get_DEPRECATED_PANTS_PY_COVERAGE()) \
+          as untested_targets:
+        if not untested_targets:
+          return
+        with self.context.new_workunit(name='run',
+                                       labels=[WorkUnit.TOOL, WorkUnit.TEST]) as workunit:
+          # pytest uses py.io.terminalwriter for output. That class detects the terminal
+          # width and attempts to use all of it. However we capture and indent the console
+          # output, leading to weird-looking line wraps. So we trick the detection code
+          # into thinking the terminal window is narrower than it is.
+          cols = os.environ.get('COLUMNS', 80)
+          with environment_as(COLUMNS=str(int(cols) - 30)):
+            self.run_tests(untested_targets, workunit)
+
+  def _run_inputs(self):
+    options = self.get_options()
+    return ([str(interpreter.identity) for interpreter in self.interpreter_cache.interpreters] +
+            [requirement.cache_key() for requirement in self._TESTING_TARGETS] +
+            ['fast={0!r}'.format(options.fast), 'shard={0!r}'.format(options.shard)] +
+            options.options + self.get_passthru_args())
 
   def run_tests(self, targets, workunit):
     if self.get_options().fast:
@@ -178,8 +195,14 @@ class PytestRun(PythonTask):
       # Coverage often throws errors despite tests succeeding, so force failsoft in that case.
       fail_hard = (not self.get_DEPRECATED_PANTS_PYTHON_TEST_FAILSOFT() and
                    not self.get_DEPRECATED_PANTS_PY_COVERAGE())
-      for target in targets:
-        if isinstance(target, PythonTests):
+      test_targets = [target for target in targets if isinstance(target, PythonTests)]
+      jobs = min(self.get_options().jobs or multiprocessing.cpu_count(), len(test_targets))
+      # Coverage is collected via the environment and the .coverage file in the cwd, which
+      # concurrent runs would share.
+      if jobs > 1 and not self.get_DEPRECATED_PANTS_PY_COVERAGE():
+        results = self._run_tests_concurrently(test_targets, workunit, jobs, fail_hard)
+      else:
+        for target in test_targets:
           rv = self._do_run_tests([target], workunit)
           results[target] = rv
           if not rv.success and fail_hard:
@@ -188,10 +211,43 @@ class PytestRun(PythonTask):
       for target in sorted(results):
         self.context.log.info('{0:80}.....{1:>10}'.format(target.id, str(results[target])))
 
+      # Only here do we know which targets passed: a failed run of all the targets in one chroot
+      # may not have got to the tests of some of them.
+      self.record_passed_tests([target for target, rv in results.items() if rv.success])
       failed_targets = [target for target, rv in results.items() if not rv.success]
       if failed_targets:
         raise TestFailedTaskError(failed_targets=failed_targets)
 
+  def _run_tests_concurrently(self, targets, workunit, jobs, fail_hard):
+    """Runs the tests of each target in a chroot of its own, up to jobs at once.
+
+    :returns: A dict from target to its PythonTestResult, for the targets whose tests ran.
+    """
+    # Set up the interpreters once, up front, rather than racing to in the workers.
+    self.interpreter_cache
+    results = {}
+    failed = threading.Event()
+
+    def run_target_tests(target):
+      if fail_hard and failed.is_set():
+        return
+      with self.context.new_workunit(name=target.address.reference(),
+                                     labels=[WorkUnit.TEST]) as target_workunit:
+        rv = self._do_run_tests([target], target_workunit)
+        if not rv.success:
+          target_workunit.set_outcome(WorkUnit.FAILURE)
+      results[target] = rv
+      if not rv.success:
+        failed.set()
+
+    pool = WorkerPool(workunit, self.context.run_tracker, jobs)
+    try:
+      pool.submit_work_and_wait(Work(run_target_tests, [(target,) for target in targets]),
+                                workunit_parent=workunit)
+    finally:
+      pool.shutdown()
+    return results
+
   class InvalidShardSpecification(TaskError):
     """Indicates an invalid `--shard` option."""
 
@@ -442,30 +498,21 @@ class PytestRun(PythonTask):
   @contextmanager
   def _test_runner(self, targets, workunit):
     interpreter = self.select_interpreter_for_targets(targets)
-    builder = PEXBuilder(interpreter=interpreter)
-    builder.info.entry_point = 'pytest'
-    chroot = PythonChroot(
-      context=self.context,
-      python_setup=PythonSetup.global_instance(),
-      python_repos=PythonRepos.global_instance(),
-      targets=targets,
-      extra_requirements=self._TESTING_TARGETS,
-      builder=builder,
-      platforms=('current',),
-      interpreter=interpreter)
-    try:
-      builder = chroot.dump()
-      builder.freeze()
-      pex = PEX(builder.path(), interpreter=interpreter)
+    pex_info = PexInfo.default()
+    pex_info.entry_point = 'pytest'
+    with self.cached_chroot(interpreter=interpreter,
+                            pex_info=pex_info,
+                            targets=targets,
+                            extra_requirements=self._TESTING_TARGETS,
+                            platforms=('current',)) as chroot:
+      pex = PEX(chroot.path(), interpreter=interpreter)
       with self._maybe_shard() as shard_args:
         with self._maybe_emit_junit_xml(targets) as junit_args:
           with self._maybe_emit_coverage_data(targets,
-                                              builder.path(),
+                                              chroot.path(),
                                               pex,
                                               workunit) as coverage_args:
             yield pex, shard_args + junit_args + coverage_args
-    finally:
-      chroot.delete()
 
   def _do_run_tests_with_args(self, pex, workunit, args):
     try:
@@ -474,15 +521,15 @@ class PytestRun(PythonTask):
       # turn off stdin buffering that otherwise occurs.  Setting the PYTHONUNBUFFERED env var to
       # any value achieves this in python2.7.  We'll need a different solution when we support
       # running pants under CPython 3 which does not unbuffer stdin using this trick.
-      env = {
-        'PYTHONUNBUFFERED': '1',
-      }
+      #
+      # The environment is passed to the test process rather than set on this one, as tests may be
+      # run concurrently.
+      env = dict(os.environ, PYTHONUNBUFFERED='1')
       profile = self.get_DEPRECATED_PANTS_PROFILE()
       if profile:
         env['PEX_PROFILE'] = '{0}.subprocess.{1:.6f}'.format(profile, time.time())
-      with environment_as(**env):
-        rc = self._pex_run(pex, workunit, args=args, setsid=True)
-        return PythonTestResult.rc(rc)
+      rc = self._pex_run(pex, workunit, args=args, setsid=True, env=env)
+      return PythonTestResult.rc(rc)
     except Exception:
       self.context.log.error('Failed to run test!')
       self.context.log.info(traceback.format_exc())
@@ -558,6 +605,6 @@ class PytestRun(PythonTask):
           args.insert(0, '--resultlog={0}'.format(resultlog_path))
           return run_and_analyze(resultlog_path)
 
-  def _pex_run(self, pex, workunit, args, setsid=False):
-    return pex.run(args=args, setsid=setsid,
+  def _pex_run(self, pex, workunit, args, setsid=False, env=None):
+    return pex.run(args=args, setsid=setsid, env=env,
                    stdout=workunit.output('stdout'), stderr=workunit.output('stderr'))
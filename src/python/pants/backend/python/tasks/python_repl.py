@@ -44,15 +44,21 @@ class PythonRepl(PythonTask):
       else:
         entry_point = 'code:interact'
 
-      with self.temporary_chroot(interpreter=interpreter, targets=targets,
-                                 extra_requirements=extra_requirements,
-                                 pre_freeze=lambda ch: ch.builder.set_entry_point(entry_point)) as chroot:
-        pex = PEX(chroot.builder.path(), interpreter=interpreter)
-        self.context.release_lock()
-        with stty_utils.preserve_stty_settings():
-          with self.context.new_workunit(name='run', labels=[WorkUnit.RUN]):
-            po = pex.run(blocking=False, **pex_run_kwargs)
-            try:
-              return po.wait()
-            except KeyboardInterrupt:
-              pass
+      def set_entry_point(chroot):
+        chroot.builder.set_entry_point(entry_point)
+
+      with self.cached_chroot(interpreter=interpreter, targets=targets,
+                              extra_requirements=extra_requirements,
+                              pre_freeze=set_entry_point) as chroot:
+        # The REPL outlives the locks, so it runs from a copy of the chroot that other runs won't
+        # update underneath it.  The copy is hardlinked, and cleaned up on exit.
+        builder = chroot.builder.clone()
+      pex = PEX(builder.path(), interpreter=interpreter)
+      self.context.release_lock()
+      with stty_utils.preserve_stty_settings():
+        with self.context.new_workunit(name='run', labels=[WorkUnit.RUN]):
+          po = pex.run(blocking=False, **pex_run_kwargs)
+          try:
+            return po.wait()
+          except KeyboardInterrupt:
+            pass
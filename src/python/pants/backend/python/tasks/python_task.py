@@ -5,9 +5,14 @@
 from __future__ import (absolute_import, division, generators, nested_scopes, print_function,
                         unicode_literals, with_statement)
 
+import os
 import tempfile
+import time
 from contextlib import contextmanager
+from hashlib import sha1
 
+from lockfile import LockError
+from pex.interpreter import PythonInterpreter
 from pex.pex_builder import PEXBuilder
 from twitter.common.collections import OrderedSet
 
@@ -16,9 +21,14 @@ from pants.backend.python.interpreter_cache import PythonInterpreterCache
 from pants.backend.python.python_chroot import PythonChroot
 from pants.backend.python.python_setup import PythonRepos, PythonSetup
 from pants.base.exceptions import TaskError
+from pants.process.pidlock import OwnerPrintingPIDLockFile
+from pants.util.dirutil import safe_delete, safe_mkdir, safe_rmtree
 
 
 class PythonTask(Task):
+  # Cached chroots that no run has used for this long are deleted.
+  _CACHED_CHROOT_MAX_AGE_SECS = 7 * 24 * 60 * 60
+
   @classmethod
   def global_subsystems(cls):
     return super(PythonTask, cls).global_subsystems() + (PythonSetup, PythonRepos)
@@ -28,6 +38,7 @@ class PythonTask(Task):
     self._compatibilities = self.get_options().interpreter or [b'']
     self._interpreter_cache = None
     self._interpreter = None
+    self._evicted_chroots = False
 
   @property
   def interpreter_cache(self):
@@ -96,6 +107,80 @@ class PythonTask(Task):
     to allow for any extra modification.
     """
     path = tempfile.mkdtemp()
+    chroot = self._dump_chroot(path, None, interpreter, pex_info, targets, extra_requirements,
+                               platforms, pre_freeze)
+    yield chroot
+    chroot.delete()
+
+  @contextmanager
+  def cached_chroot(self, interpreter=None, pex_info=None, targets=None,
+                    extra_requirements=None, platforms=None, pre_freeze=None):
+    """Yields a PythonChroot created with the specified args, kept across runs.
+
+    The chroot is kept in the task's workdir, in a directory of its own for the given targets,
+    interpreter, platforms and extra requirements.  It is reused as is if none of the targets or
+    their dependencies changed since it was last dumped, and otherwise only the libraries that
+    changed are copied into it again.
+
+    pre_freeze is as for temporary_chroot, but may only modify the chroot builder's PexInfo, e.g.
+    set its entry point: files added to the chroot are not tracked across runs.
+
+    Other pants runs may use the same chroot, so it is locked from before it is dumped until the
+    block exits: callers that outlive the block must work from a copy of it.
+    """
+    interpreter = interpreter or PythonInterpreter.get()
+    hasher = sha1()
+    for spec in sorted(target.address.spec for target in targets or []):
+      hasher.update(spec)
+    hasher.update(str(interpreter.identity))
+    hasher.update(repr(tuple(platforms or ())))
+    hasher.update(repr(sorted(req.cache_key() for req in extra_requirements or [])))
+    chroots_dir = os.path.join(self.workdir, 'chroots')
+    path = os.path.join(chroots_dir, hasher.hexdigest())
+    self._evict_chroots(chroots_dir)
+
+    safe_mkdir(chroots_dir)
+    lock = OwnerPrintingPIDLockFile('{}.lock'.format(path))
+    lock.acquire()
+    try:
+      chroot = self._dump_chroot(path, '{}.manifest'.format(path), interpreter, pex_info, targets,
+                                 extra_requirements, platforms, pre_freeze)
+      # Mark the chroot as used, for eviction.
+      os.utime(path, None)
+      yield chroot
+    finally:
+      lock.release()
+
+  def _evict_chroots(self, chroots_dir):
+    """Deletes the cached chroots that no run has used for a while, once per task."""
+    if self._evicted_chroots or not os.path.isdir(chroots_dir):
+      return
+    self._evicted_chroots = True
+    horizon = time.time() - self._CACHED_CHROOT_MAX_AGE_SECS
+    for name in os.listdir(chroots_dir):
+      path = os.path.join(chroots_dir, name)
+      try:
+        if not os.path.isdir(path) or os.path.getmtime(path) >= horizon:
+          continue
+      except OSError:
+        # Concurrently evicted.
+        continue
+      lock = OwnerPrintingPIDLockFile('{}.lock'.format(path))
+      # Locks left by killed runs are broken by acquiring them.
+      if lock.is_locked() and lock.cmdline_for_pid(lock.read_pid()) is not None:
+        continue
+      try:
+        lock.acquire(timeout=0)
+      except LockError:
+        continue
+      try:
+        safe_delete('{}.manifest'.format(path))
+        safe_rmtree(path)
+      finally:
+        lock.release()
+
+  def _dump_chroot(self, path, manifest_path, interpreter, pex_info, targets, extra_requirements,
+                   platforms, pre_freeze):
     builder = PEXBuilder(path=path, interpreter=interpreter, pex_info=pex_info)
     with self.context.new_workunit('chroot'):
       chroot = PythonChroot(
@@ -106,10 +191,10 @@ class PythonTask(Task):
         extra_requirements=extra_requirements,
         builder=builder,
         platforms=platforms,
-        interpreter=interpreter)
+        interpreter=interpreter,
+        manifest_path=manifest_path)
       chroot.dump()
       if pre_freeze:
         pre_freeze(chroot)
       builder.freeze()
-    yield chroot
-    chroot.delete()
+    return chroot
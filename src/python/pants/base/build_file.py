@@ -9,7 +9,6 @@ import logging
 import os
 import re
 from abc import abstractmethod
-from collections import defaultdict
 from glob import glob1
 
 from twitter.common.collections import OrderedSet
@@ -61,13 +60,14 @@ class BuildFile(AbstractClass):
     """Returns all the BUILD files on a path"""
     results = []
     for build in self._glob1(path, '{prefix}*'.format(prefix=self._BUILD_FILE_PREFIX)):
-      if self._is_buildfile_name(build):
+      if self.is_buildfile_name(build):
         results.append(build)
     return sorted(results)
 
   @classmethod
-  def _is_buildfile_name(cls, name):
-    return cls._PATTERN.match(name)
+  def is_buildfile_name(cls, name):
+    """Returns whether name is the name of a BUILD file."""
+    return bool(cls._PATTERN.match(name))
 
   @classmethod
   def scan_buildfiles(cls, root_dir, base_path=None, spec_excludes=None):
@@ -78,44 +78,44 @@ class BuildFile(AbstractClass):
       or paths that are relative to the root_dir.
     """
 
-    def calc_exclude_roots(root_dir, excludes):
-      """Return a map of root directories to subdirectory names suitable for a quick evaluation
-      inside safe_walk()
-      """
-      result = defaultdict(set)
-      for exclude in excludes:
-        if exclude:
-          if not os.path.isabs(exclude):
-            exclude = os.path.join(root_dir, exclude)
-          if exclude.startswith(root_dir):
-            result[os.path.dirname(exclude)].add(os.path.basename(exclude))
-
-      return result
-
-    def find_excluded(root, dirs, exclude_roots):
-      """Removes any of the directories specified in exclude_roots from dirs.
-      """
-      to_remove = []
-      for exclude_root in exclude_roots:
-        # root ends with a /, trim it off
-        if root.rstrip('/') == exclude_root:
-          for subdir in exclude_roots[exclude_root]:
-            if subdir in dirs:
-              to_remove.append(subdir)
-      return to_remove
+    # A trie of the path components of the excluded directories, relative to root_dir.  The
+    # directories themselves are marked by a None key.
+    exclude_trie = {}
+    for exclude in spec_excludes or ():
+      if exclude:
+        if not os.path.isabs(exclude):
+          exclude = os.path.join(root_dir, exclude)
+        if exclude.startswith(root_dir):
+          relpath = os.path.relpath(exclude, root_dir)
+          if relpath != os.curdir and not relpath.startswith(os.pardir):
+            node = exclude_trie
+            for component in relpath.split(os.sep):
+              node = node.setdefault(component, {})
+            node[None] = True
+
+    # Start from the trie node for the scanned directory, if any of it is excluded.
+    node = exclude_trie
+    base_relpath = os.path.relpath(os.path.join(root_dir, base_path or ''), root_dir)
+    if base_relpath != os.curdir:
+      for component in base_relpath.split(os.sep):
+        node = node.get(component) if node else None
 
     buildfiles = []
-    if not spec_excludes:
-      exclude_roots = {}
-    else:
-      exclude_roots = calc_exclude_roots(root_dir, spec_excludes)
-
+    # The trie nodes of the directories yet to be walked that have excluded descendants.
+    exclude_nodes = {}
     for root, dirs, files in cls._walk(root_dir, base_path or '', topdown=True):
-      to_remove = find_excluded(root, dirs, exclude_roots)
-      for subdir in to_remove:
-        dirs.remove(subdir)
+      if node is None:
+        node = exclude_nodes.pop(root, None)
+      if node:
+        for subdir, subdir_node in node.items():
+          if subdir is not None and subdir in dirs:
+            if None in subdir_node:
+              dirs.remove(subdir)
+            else:
+              exclude_nodes[os.path.join(root, subdir)] = subdir_node
+      node = None
       for filename in files:
-        if cls._is_buildfile_name(filename):
+        if cls.is_buildfile_name(filename):
           buildfile_relpath = os.path.relpath(os.path.join(root, filename), root_dir)
           buildfiles.append(cls.from_cache(root_dir, buildfile_relpath))
     return OrderedSet(sorted(buildfiles, key=lambda buildfile: buildfile.full_path))
@@ -183,7 +183,7 @@ class BuildFile(AbstractClass):
         raise self.MissingBuildFileError('BUILD file does not exist at: {path}'
                                          .format(path=buildfile))
 
-      if not self._is_buildfile_name(os.path.basename(buildfile)):
+      if not self.is_buildfile_name(os.path.basename(buildfile)):
         raise self.MissingBuildFileError('{path} is not a BUILD file'
                                          .format(path=buildfile))
 
@@ -298,7 +298,16 @@ class FilesystemBuildFile(BuildFile):
   def _exists(self, path):
     return os.path.exists(path)
 
+  _index = None
+
   @classmethod
-  def _walk(self, root_dir, relpath, topdown=False):
+  def set_index(cls, index):
+    """Sets the BuildFileIndex to scan for BUILD files with, or None to walk the filesystem."""
+    cls._index = index
+
+  @classmethod
+  def _walk(cls, root_dir, relpath, topdown=False):
+    if cls._index is not None and cls._index.root_dir == root_dir:
+      return cls._index.walk(relpath)
     path = os.path.join(root_dir, relpath)
     return safe_walk(path, topdown=True)
@@ -5,6 +5,8 @@
 from __future__ import (absolute_import, division, generators, nested_scopes, print_function,
                         unicode_literals, with_statement)
 
+from twitter.common.collections import OrderedSet
+
 from pants.base.address import BuildFileAddress, SyntheticAddress, parse_spec
 from pants.base.address_lookup_error import AddressLookupError
 from pants.base.build_environment import get_buildroot
@@ -46,15 +48,17 @@ class BuildFileAddressMapper(object):
   class BuildFileScanError(AddressLookupError):
     """ Raised when a problem was encountered scanning a tree of BUILD files."""
 
-  def __init__(self, build_file_parser, build_file_type):
+  def __init__(self, build_file_parser, build_file_type, parse_workers=1):
     """Create a BuildFileAddressMapper.
 
     :param build_file_parser: An instance of BuildFileParser
     :param build_file_type: A subclass of BuildFile used to construct and cache BuildFile objects
+    :param int parse_workers: The number of processes to parse BUILD files in when scanning.
     """
     self._build_file_parser = build_file_parser
     self._spec_path_to_address_map_map = {}  # {spec_path: {address: addressable}} mapping
     self._build_file_type = build_file_type
+    self._parse_workers = parse_workers
 
   @property
   def root_dir(self):
@@ -137,21 +141,33 @@ class BuildFileAddressMapper(object):
     :returns {Address: (Address, <resolved Object>)}:
     """
     if spec_path not in self._spec_path_to_address_map_map:
+      self._parse_spec_paths([spec_path], workers=1)
+    return self._spec_path_to_address_map_map[spec_path]
+
+  def _parse_spec_paths(self, spec_paths, workers):
+    """Parses the BUILD file families in the given "directories" of the virtual address space."""
+    build_files = []
+    for spec_path in spec_paths:
       try:
+        build_files.append(self._build_file_type.from_cache(self.root_dir, spec_path))
+      except BuildFile.BuildFileError as e:
+        raise self.BuildFileScanError("{message}\n searching {spec_path}"
+                                      .format(message=e,
+                                              spec_path=spec_path))
+
+    mappings = self._build_file_parser.address_maps_from_build_files(build_files, workers=workers)
+    try:
+      for spec_path in spec_paths:
         try:
-          build_file = self._build_file_type.from_cache(self.root_dir, spec_path)
-        except BuildFile.BuildFileError as e:
-          raise self.BuildFileScanError("{message}\n searching {spec_path}"
-                                        .format(message=e,
-                                                spec_path=spec_path))
-        mapping = self._build_file_parser.address_map_from_build_file(build_file)
-      except BuildFileParser.BuildFileParserError as e:
-        raise AddressLookupError("{message}\n Loading addresses from '{spec_path}' failed."
-                                 .format(message=e, spec_path=spec_path))
-
-      address_map = {address: (address, addressed) for address, addressed in mapping.items()}
-      self._spec_path_to_address_map_map[spec_path] = address_map
-    return self._spec_path_to_address_map_map[spec_path]
+          _, mapping = next(mappings)
+        except BuildFileParser.BuildFileParserError as e:
+          raise AddressLookupError("{message}\n Loading addresses from '{spec_path}' failed."
+                                   .format(message=e, spec_path=spec_path))
+
+        address_map = {address: (address, addressed) for address, addressed in mapping.items()}
+        self._spec_path_to_address_map_map[spec_path] = address_map
+    finally:
+      mappings.close()
 
   def addresses_in_spec_path(self, spec_path):
     """Returns only the addresses gathered by `address_map_from_spec_path`, with no values."""
@@ -199,14 +215,28 @@ class BuildFileAddressMapper(object):
     :raises AddressLookupError: if there is a problem parsing a BUILD file
     :param path root: defaults to the root directory of the pants project.
     """
-    addresses = set()
     root = root or get_buildroot()
     try:
-      for build_file in self._build_file_type.scan_buildfiles(root, spec_excludes=spec_excludes):
-        for address in self.addresses_in_spec_path(build_file.spec_path):
-          addresses.add(address)
+      return self.addresses_in_build_files(
+        self._build_file_type.scan_buildfiles(root, spec_excludes=spec_excludes))
     except BuildFile.BuildFileError as e:
       # Handle exception from BuildFile out of paranoia.  Currently, there is no way to trigger it.
       raise self.BuildFileScanError("{message}\n while scanning BUILD files in '{root}'."
                                     .format(message=e, root=root))
+
+  def addresses_in_build_files(self, build_files):
+    """Returns the addresses defined by the families of the given BUILD files.
+
+    BUILD files not parsed yet are parsed in as many processes as this mapper was configured with.
+    Parse errors are raised just as they would be parsing the BUILD files one by one, in order.
+
+    :raises AddressLookupError: if there is a problem parsing a BUILD file
+    """
+    spec_paths = OrderedSet(build_file.spec_path for build_file in build_files)
+    self._parse_spec_paths([spec_path for spec_path in spec_paths
+                            if spec_path not in self._spec_path_to_address_map_map],
+                           workers=self._parse_workers)
+    addresses = set()
+    for spec_path in spec_paths:
+      addresses.update(self.addresses_in_spec_path(spec_path))
     return addresses
@@ -0,0 +1,126 @@
+# coding=utf-8
+# Copyright 2015 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (absolute_import, division, generators, nested_scopes, print_function,
+                        unicode_literals, with_statement)
+
+import os
+import stat
+import threading
+import time
+
+from pants.util.fileutil import RACY_WINDOW_SECS
+from pants.util.persistent_pickle import PersistentPickle
+from pants.util.strutil import ensure_text
+
+
+class BuildFileIndex(object):
+  """A persistent index of the directories under a build root and the BUILD files in them.
+
+  For each directory, the index records its mtime, its subdirectories and the names of the files
+  in it that could be BUILD files.  Adding, removing or renaming an entry in a directory changes
+  that directory's mtime, so a walk only lists the directories whose mtime changed since they were
+  indexed, and stats the rest.  Directories modified in the last couple of seconds are not
+  indexed, to avoid coarse-mtime races.
+  """
+
+  # Bump this whenever the format of the entries changes.
+  _VERSION = 1
+
+  def __init__(self, path, root_dir, is_candidate):
+    """
+    :param string path: The file the index is persisted to.
+    :param string root_dir: The build root the index covers.
+    :param is_candidate: A predicate on file names selecting the files to index.
+    """
+    self._store = PersistentPickle(path, self._VERSION)
+    self._root_dir = ensure_text(root_dir)
+    self._is_candidate = is_candidate
+    self._lock = threading.Lock()
+    self._entries = None
+    self._dirty = False
+
+  @property
+  def root_dir(self):
+    return self._root_dir
+
+  def walk(self, relpath):
+    """Walks the directory tree at relpath under the build root, like `os.walk` topdown.
+
+    Only candidate files are listed, and symlinked directories are neither listed nor descended,
+    just as `os.walk` does not descend them.  Removing subdirectories from the yielded lists
+    prunes the walk.
+    """
+    top = os.path.join(self._root_dir, ensure_text(relpath))
+    # Directories are keyed by their path relative to the build root, derived as we descend.
+    pending = [(top, os.path.relpath(top, self._root_dir))]
+    while pending:
+      path, key = pending.pop()
+      listing = self._listing(path, key)
+      if listing is None:
+        continue
+      subdirs, files = listing
+      subdirs = list(subdirs)
+      yield path, subdirs, list(files)
+      prefix = '' if key == os.curdir else key + os.sep
+      pending.extend((os.path.join(path, subdir), prefix + subdir) for subdir in reversed(subdirs))
+
+  def _listing(self, path, key):
+    try:
+      mtime = os.stat(path).st_mtime
+    except OSError:
+      return None
+    with self._lock:
+      entry = self._load().get(key)
+    if entry is not None and entry[0] == mtime:
+      return entry[1], entry[2]
+
+    subdirs = []
+    files = []
+    try:
+      names = os.listdir(path)
+    except OSError:
+      return None
+    for name in sorted(names):
+      child = os.path.join(path, name)
+      try:
+        mode = os.lstat(child).st_mode
+      except OSError:
+        continue
+      if stat.S_ISDIR(mode):
+        subdirs.append(name)
+      elif stat.S_ISLNK(mode) and os.path.isdir(child):
+        # Like os.walk, do not follow symlinked directories.
+        continue
+      elif self._is_candidate(name):
+        files.append(name)
+
+    with self._lock:
+      entries = self._load()
+      if entry is not None:
+        # Forget about the subtrees of subdirectories that are gone.
+        for gone in set(entry[1]) - set(subdirs):
+          prefix = os.path.join(key, gone) if key != os.curdir else gone
+          for indexed in [k for k in entries if k == prefix or k.startswith(prefix + os.sep)]:
+            del entries[indexed]
+      if mtime <= time.time() - RACY_WINDOW_SECS:
+        entries[key] = (mtime, tuple(subdirs), tuple(files))
+      else:
+        entries.pop(key, None)
+      self._dirty = True
+    return subdirs, files
+
+  def save(self):
+    """Persists the index if it changed."""
+    with self._lock:
+      if not self._dirty:
+        return
+      self._store.save((self._root_dir, self._entries))
+      self._dirty = False
+
+  def _load(self):
+    if self._entries is None:
+      root_dir, entries = self._store.load() or (None, None)
+      self._entries = entries if root_dir == self._root_dir else {}
+    return self._entries
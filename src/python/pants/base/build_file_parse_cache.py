@@ -0,0 +1,302 @@
+# coding=utf-8
+# Copyright 2015 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (absolute_import, division, generators, nested_scopes, print_function,
+                        unicode_literals, with_statement)
+
+import cPickle as pickle
+import inspect
+import os
+import sys
+import threading
+import time
+from hashlib import sha1
+from io import BytesIO
+
+from pants.base.build_environment import pants_version
+from pants.util.fileutil import RACY_WINDOW_SECS
+from pants.util.persistent_pickle import PersistentPickle
+
+
+_WILDCARD_CHARS = frozenset('*?[')
+
+
+def aliases_fingerprint(aliases, root_dir):
+  """Returns a fingerprint of the given BuildFileAliases that changes whenever parsed BUILD files
+  could mean something else.
+
+  This covers the registered alias names, the types or functions they are bound to, the source
+  files defining those and the pants version.
+  """
+  hasher = sha1()
+  hasher.update(pants_version())
+  hasher.update(root_dir)
+  for category in ('targets', 'objects', 'addressables', 'context_aware_object_factories'):
+    for alias, obj in sorted(getattr(aliases, category).items()):
+      if category == 'addressables' and hasattr(obj, 'get_target_type'):
+        obj = obj.get_target_type()
+      if not (inspect.isclass(obj) or inspect.isroutine(obj)):
+        obj = type(obj)
+      module = getattr(obj, '__module__', None) or ''
+      hasher.update('{0}\0{1}\0{2}.{3}\0'.format(category, alias, module,
+                                                 getattr(obj, '__name__', '')))
+      module_file = getattr(sys.modules.get(module), '__file__', None)
+      if module_file:
+        try:
+          hasher.update(repr(os.stat(module_file).st_mtime))
+        except OSError:
+          pass
+  return hasher.hexdigest()
+
+
+def family_fingerprint(build_files, fingerprint):
+  """Returns a fingerprint of the contents of a BUILD file family.
+
+  :param build_files: The BUILD files in the family.
+  :param string fingerprint: The fingerprint of the BUILD file aliases, as from
+    `aliases_fingerprint`.
+  """
+  hasher = sha1()
+  hasher.update(fingerprint)
+  for build_file in sorted(build_files, key=lambda build_file: build_file.relpath):
+    hasher.update(build_file.relpath.encode('utf-8'))
+    hasher.update(b'\0')
+    hasher.update(build_file.source())
+    hasher.update(b'\0')
+  return hasher.hexdigest()
+
+
+def watched_dirs(root_dir, filespecs):
+  """Returns the directories whose listings determine the result of the given glob filespecs.
+
+  :param string root_dir: The build root the filespec globs are relative to.
+  :param list filespecs: Filespecs, as produced by the glob wrappers exposed to BUILD files.
+  :returns: A dict from directory path, relative to root_dir, to that directory's mtime, or None
+    if it does not exist.  Returns None if a glob's directories can't be enumerated up front.
+  """
+  dirs = {}
+
+  def watch(reldir):
+    reldir = os.path.normpath(reldir)
+    if reldir not in dirs:
+      try:
+        dirs[reldir] = os.stat(os.path.join(root_dir, reldir)).st_mtime
+      except OSError:
+        dirs[reldir] = None
+
+  def watch_tree(reldir):
+    watch(reldir)
+    for root, subdirs, _ in os.walk(os.path.join(root_dir, reldir), followlinks=True):
+      for subdir in subdirs:
+        watch(os.path.relpath(os.path.join(root, subdir), root_dir))
+
+  pending = list(filespecs)
+  while pending:
+    filespec = pending.pop()
+    pending.extend(filespec.get('exclude', ()))
+    for glob in filespec.get('globs', ()):
+      components = os.path.normpath(glob).split(os.sep)
+      wildcards = [i for i, component in enumerate(components)
+                   if _WILDCARD_CHARS.intersection(component)]
+      if not wildcards:
+        watch(os.path.dirname(glob))
+      elif wildcards[0] == len(components) - 1 and components[-1] != '**':
+        watch(os.path.join('', *components[:-1]))
+      elif '**' in components[wildcards[0]:]:
+        watch_tree(os.path.join('', *components[:wildcards[0]]))
+      else:
+        # A wildcard in a non-recursive directory component: the matched directories can come and
+        # go without touching any directory we could reasonably watch.
+        return None
+  return dirs
+
+
+class ParseRecorder(object):
+  """Observes the context aware objects a BUILD file uses while it is executed, to tell whether
+  the resulting addressables may be cached and which directories their globs depend on.
+
+  Calls returning globbed filesets (anything with a `filespec`) are understood.  Any other use of a
+  context aware object may have side effects or depend on files we don't know about, and makes the
+  parse uncacheable.
+  """
+
+  class _Proxy(object):
+    def __init__(self, recorder, obj):
+      self._recorder = recorder
+      self._obj = obj
+
+    def __call__(self, *args, **kwargs):
+      result = self._obj(*args, **kwargs)
+      filespec = getattr(result, 'filespec', None)
+      if isinstance(filespec, dict):
+        self._recorder.filespecs.append(filespec)
+      else:
+        self._recorder.cacheable = False
+      return result
+
+    def __getattr__(self, name):
+      self._recorder.cacheable = False
+      return getattr(self._obj, name)
+
+  def __init__(self):
+    self.cacheable = True
+    self.filespecs = []
+
+  def wrap(self, obj):
+    """Returns a stand-in for the given context aware object that records how it is used."""
+    return self._Proxy(self, obj)
+
+
+class AddressablePickler(object):
+  """Pickles addressable kwargs with references to objects exposed to BUILD files kept by alias.
+
+  Exposed objects are shared by every BUILD file and may not be picklable themselves, so they are
+  stored by name and resolved back to the live objects when loaded.
+  """
+
+  def __init__(self, exposed_objects):
+    """
+    :param dict exposed_objects: The objects exposed to BUILD files, by alias.
+    """
+    self._alias_by_id = {id(obj): alias for alias, obj in exposed_objects.items()}
+    self._exposed_objects = exposed_objects
+
+  def dumps(self, entries):
+    buf = BytesIO()
+    pickler = pickle.Pickler(buf, pickle.HIGHEST_PROTOCOL)
+    pickler.persistent_id = lambda obj: self._alias_by_id.get(id(obj))
+    pickler.dump(entries)
+    return buf.getvalue()
+
+  def loads(self, payload):
+    unpickler = pickle.Unpickler(BytesIO(payload))
+    unpickler.persistent_load = self._exposed_objects.__getitem__
+    return unpickler.load()
+
+
+class BuildFileParseCache(object):
+  """A persistent cache of the addressables parsed from BUILD files.
+
+  Entries map the path of a BUILD file to a pickle of the addressables parsed from it, along with
+  the stat and content hash of the file, the mtimes of the directories its globs read and a
+  fingerprint of the BUILD file aliases it was parsed with.  An entry is reused while the file's
+  stat is unchanged, or its content hash matches, and none of its glob directories changed.  Files
+  modified in the last couple of seconds are not cached, to avoid coarse-mtime races.  Entries for
+  deleted files are evicted when the cache is saved.
+
+  BUILD files that read environment variables or other files, or import helpers, have inputs
+  that none of this covers, so the cache is opt-in.
+  """
+
+  # Bump this whenever the format of the entries changes.
+  _VERSION = 1
+
+  @staticmethod
+  def _stat(path):
+    st = os.stat(path)
+    return (st.st_mtime, st.st_size, st.st_ino)
+
+  @staticmethod
+  def _content_hash(source):
+    return sha1(source).hexdigest()
+
+  def __init__(self, path):
+    """
+    :param string path: The file the cache is persisted to.
+    """
+    self._store = PersistentPickle(path, self._VERSION)
+    self._lock = threading.Lock()
+    self._entries = None
+    self._used = set()
+    self._dirty = False
+    self._hits = 0
+    self._misses = 0
+
+  @property
+  def hits(self):
+    return self._hits
+
+  @property
+  def misses(self):
+    return self._misses
+
+  def get(self, build_file, fingerprint):
+    """Returns the cached payload for build_file if it is still valid.
+
+    :param build_file: A FilesystemBuildFile.
+    :param string fingerprint: The fingerprint of the BUILD file aliases as from
+      `aliases_fingerprint`.
+    :returns: The payload, or None if there is no valid entry for build_file.
+    """
+    path = build_file.full_path
+    with self._lock:
+      entry = self._load().get(path)
+    valid = entry is not None and entry[0] == fingerprint and self._validate(build_file, entry)
+    with self._lock:
+      if valid:
+        self._hits += 1
+        self._used.add(path)
+      else:
+        self._misses += 1
+    return entry[4] if valid else None
+
+  def _validate(self, build_file, entry):
+    _, stat, content_hash, dirs, _ = entry
+    try:
+      current_stat = self._stat(build_file.full_path)
+      if current_stat != stat:
+        if self._content_hash(build_file.source()) != content_hash:
+          return False
+        if current_stat[0] <= time.time() - RACY_WINDOW_SECS:
+          with self._lock:
+            self._entries[build_file.full_path] = (entry[0], current_stat) + entry[2:]
+            self._dirty = True
+    except (IOError, OSError):
+      return False
+    for reldir, mtime in dirs.items():
+      try:
+        current_mtime = os.stat(os.path.join(build_file.root_dir, reldir)).st_mtime
+      except OSError:
+        current_mtime = None
+      if current_mtime != mtime:
+        return False
+    return True
+
+  def put(self, build_file, fingerprint, source, dirs, payload):
+    """Records the payload parsed from build_file.
+
+    :param build_file: A FilesystemBuildFile.
+    :param string fingerprint: The fingerprint of the BUILD file aliases it was parsed with.
+    :param string source: The source of build_file that was parsed.
+    :param dict dirs: The directories globbed by build_file, as returned by `watched_dirs`.
+    :param string payload: The pickled addressables.
+    """
+    try:
+      stat = self._stat(build_file.full_path)
+    except OSError:
+      return
+    horizon = time.time() - RACY_WINDOW_SECS
+    if stat[0] > horizon or any(mtime > horizon for mtime in dirs.values() if mtime is not None):
+      return
+    entry = (fingerprint, stat, self._content_hash(source), dirs, payload)
+    with self._lock:
+      self._load()[build_file.full_path] = entry
+      self._used.add(build_file.full_path)
+      self._dirty = True
+
+  def save(self):
+    """Persists the cache if it changed, evicting entries for deleted BUILD files."""
+    with self._lock:
+      if not self._dirty:
+        return
+      for path in list(self._entries):
+        if path not in self._used and not os.path.exists(path):
+          del self._entries[path]
+      self._store.save(self._entries)
+      self._dirty = False
+
+  def _load(self):
+    if self._entries is None:
+      self._entries = self._store.load() or {}
+    return self._entries
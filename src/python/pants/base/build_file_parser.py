@@ -7,13 +7,39 @@ from __future__ import (absolute_import, division, generators, nested_scopes, pr
 
 import logging
 import warnings
+from multiprocessing import Pool
 
 import six
 
+from pants.base.address import BuildFileAddress
+from pants.base.build_file import FilesystemBuildFile
+from pants.base.build_file_parse_cache import (AddressablePickler, ParseRecorder,
+                                               aliases_fingerprint, watched_dirs)
+from pants.base.target_addressable import TargetAddressable
+
 
 logger = logging.getLogger(__name__)
 
 
+# The parser used by the processes of a parallel parse, which inherit it when forked.
+_worker_parser = None
+
+
+def _init_parse_worker(parser):
+  global _worker_parser
+  _worker_parser = parser
+  # Anything worth logging is logged by the parent, which parses files that warn again itself.
+  logging.disable(logging.CRITICAL)
+
+
+def _export_build_file_families(batch):
+  return [_worker_parser._export_family(build_file_type, relpath)
+          for build_file_type, relpath in batch]
+
+
+_NOT_EXPORTED = object()
+
+
 # Note: Significant effort has been made to keep the types BuildFile, BuildGraph, Address, and
 # Target separated appropriately.  The BulidFileParser is intended to have knowledge of just
 # BuildFile and Address.
@@ -51,10 +77,19 @@ class BuildFileParser(object):
   class ExecuteError(BuildFileParserError):
     """An exception was encountered executing code in the BUILD file"""
 
-  def __init__(self, build_configuration, root_dir, run_tracker=None):
+  def __init__(self, build_configuration, root_dir, run_tracker=None, parse_cache=None):
+    """
+    :param build_configuration: The BuildConfiguration whose aliases BUILD files are parsed with.
+    :param string root_dir: The build root.
+    :param run_tracker: The RunTracker for this run.
+    :param parse_cache: An optional BuildFileParseCache to reuse previously parsed addressables
+      from.
+    """
     self._build_configuration = build_configuration
     self._root_dir = root_dir
     self.run_tracker = run_tracker
+    self._parse_cache = parse_cache
+    self._export_state_value = None
 
   @property
   def root_dir(self):
@@ -64,17 +99,122 @@ class BuildFileParser(object):
     """Returns a copy of the registered build file aliases this build file parser uses."""
     return self._build_configuration.registered_aliases()
 
+  def subsystem_types(self):
+    """Returns the subsystem types used by the targets and objects BUILD files can refer to."""
+    return self._build_configuration.subsystem_types()
+
+  def aliases_fingerprint(self):
+    """Returns the `aliases_fingerprint` of the aliases BUILD files are parsed with."""
+    return self._export_state().fingerprint
+
   def address_map_from_build_file(self, build_file):
-    family_address_map_by_build_file = self.parse_build_file_family(build_file)
+    return self._merge_family(self.parse_build_file_family(build_file))
+
+  def address_maps_from_build_files(self, build_files, workers=1):
+    """Yields `(build_file, address_map_from_build_file(build_file))` for each given BUILD file.
+
+    With more than one worker, BUILD file families are parsed in a pool of that many processes.
+    Families that can't be carried back from a worker (because they failed to parse, used context
+    aware objects with side effects, or warned) are parsed again here in their turn, so errors,
+    warnings and side effects are exactly those of parsing the files one by one.
+
+    :param list build_files: The BUILD files to parse the families of.
+    :param int workers: The number of processes to parse BUILD files in.
+    """
+    build_files = list(build_files)
+    if workers <= 1 or len(build_files) <= 1 or not all(isinstance(bf, FilesystemBuildFile)
+                                                        for bf in build_files):
+      for build_file in build_files:
+        yield build_file, self.address_map_from_build_file(build_file)
+      return
+
+    # Families fully available in the parse cache are cheaper to read here than to ship around.
+    cached = {}
+    if self._parse_cache is not None:
+      for build_file in build_files:
+        members = list(build_file.family())
+        address_maps = [self._cached_address_map(member) for member in members]
+        if all(address_map is not None for address_map in address_maps):
+          cached[build_file] = dict(zip(members, address_maps))
+    to_parse = [build_file for build_file in build_files if build_file not in cached]
+
+    # Settle lazily computed state before it is forked into the workers.
+    self._export_state()
+    # Families are handed out in batches, to amortize the round trips to the workers.
+    batch_size = max(1, min(64, len(to_parse) // (4 * workers)))
+    batches = [[(type(build_file), build_file.relpath) for build_file in to_parse[i:i + batch_size]]
+               for i in range(0, len(to_parse), batch_size)]
+    pool = None
+    if batches:
+      pool = Pool(min(workers, len(batches)), initializer=_init_parse_worker, initargs=(self,))
+    try:
+      exported_batches = pool.imap(_export_build_file_families, batches) if pool else None
+      exports = iter(())
+      for build_file in build_files:
+        if build_file in cached:
+          address_maps = cached[build_file]
+          yield build_file, self._merge_family(self._parse_family(build_file, address_maps.get))
+          continue
+        exported = next(exports, _NOT_EXPORTED)
+        if exported is _NOT_EXPORTED:
+          # Use a timeout so that ctrl-c still works while waiting.
+          exports = iter(exported_batches.next(timeout=1000000000))
+          exported = next(exports)
+        if exported is None:
+          yield build_file, self.address_map_from_build_file(build_file)
+        else:
+          yield build_file, self._merge_family(self._import_family(build_file, exported))
+    finally:
+      if pool:
+        pool.terminate()
+        pool.join()
+
+  def _export_family(self, build_file_type, relpath):
+    """Parses a BUILD file family for another process, returning None if it can't be.
+
+    :returns: A list of (relpath, payload, source, watched dirs) for each member of the family.
+    """
+    exported = []
+    try:
+      for member in build_file_type.from_cache(self._root_dir, relpath).family():
+        recorder = ParseRecorder()
+        address_map, source = self._parse_build_file(member, recorder)
+        if not recorder.cacheable:
+          return None
+        payload = self._dump_address_map(member, address_map)
+        if payload is None:
+          return None
+        exported.append((member.relpath, payload, source,
+                         watched_dirs(self._root_dir, recorder.filespecs)))
+    except Exception:
+      return None
+    return exported
+
+  def _import_family(self, build_file, exported):
+    address_maps = {}
+    by_relpath = {member.relpath: member for member in build_file.family()}
+    fingerprint = self._export_state().fingerprint
+    for relpath, payload, source, dirs in exported:
+      member = by_relpath[relpath]
+      address_maps[member] = self._load_address_map(member, payload)
+      if self._parse_cache is not None and dirs is not None:
+        self._parse_cache.put(member, fingerprint, source, dirs, payload)
+    return self._parse_family(build_file, address_maps.get)
+
+  @staticmethod
+  def _merge_family(family_address_map_by_build_file):
     address_map = {}
     for build_file, sibling_address_map in family_address_map_by_build_file.items():
       address_map.update(sibling_address_map)
     return address_map
 
   def parse_build_file_family(self, build_file):
+    return self._parse_family(build_file, self.parse_build_file)
+
+  def _parse_family(self, build_file, parse):
     family_address_map_by_build_file = {}  # {build_file: {address: addressable}}
     for bf in build_file.family():
-      bf_address_map = self.parse_build_file(bf)
+      bf_address_map = parse(bf)
       for address, addressable in bf_address_map.items():
         for sibling_build_file, sibling_address_map in family_address_map_by_build_file.items():
           if address in sibling_address_map:
@@ -92,6 +232,23 @@ class BuildFileParser(object):
     Prepare a context for parsing, read a BUILD file from the filesystem, and return the
     Addressable instances generated by executing the code.
     """
+    cacheable = self._parse_cache is not None and isinstance(build_file, FilesystemBuildFile)
+    if cacheable:
+      address_map = self._cached_address_map(build_file)
+      if address_map is not None:
+        return address_map
+
+    recorder = ParseRecorder() if cacheable else None
+    address_map, source = self._parse_build_file(build_file, recorder)
+    if recorder and recorder.cacheable:
+      self._cache_address_map(build_file, source, address_map, recorder.filespecs)
+    return address_map
+
+  def _parse_build_file(self, build_file, recorder=None):
+    """Executes `build_file`, returning its address map and source.
+
+    :param recorder: An optional ParseRecorder to observe the use of context aware objects with.
+    """
 
     def _format_context_msg(lineno, offset, error_type, message):
       """Show the line of the BUILD file that has the error along with a few line of context"""
@@ -123,6 +280,7 @@ class BuildFileParser(object):
                  .format(build_file=build_file))
 
     try:
+      build_file_source = build_file.source()
       build_file_code = build_file.code()
     except SyntaxError as e:
       raise self.ParseError(_format_context_msg(e.lineno, e.offset, e.__class__.__name__, e))
@@ -132,9 +290,15 @@ class BuildFileParser(object):
                                       message=e, build_file=build_file))
 
     parse_state = self._build_configuration.initialize_parse_state(build_file)
+    if recorder:
+      for alias in self._export_state().context_aware_aliases:
+        parse_state.parse_globals[alias] = recorder.wrap(parse_state.parse_globals[alias])
     try:
       with warnings.catch_warnings(record=True) as warns:
         six.exec_(build_file_code, parse_state.parse_globals)
+        if warns and recorder:
+          # Warnings would not be repeated when the file is read back from the cache.
+          recorder.cacheable = False
         for warn in warns:
           logger.warning(_format_context_msg(lineno=warn.lineno,
                                              offset=None,
@@ -162,4 +326,70 @@ class BuildFileParser(object):
       logger.debug("  * {address}: {addressable}"
                    .format(address=address,
                            addressable=addressable))
+    return address_map, build_file_source
+
+  class _ExportState(object):
+    """What it takes to carry the addressables of parsed BUILD files out of this parser and back."""
+
+    def __init__(self, aliases, root_dir):
+      self.fingerprint = aliases_fingerprint(aliases, root_dir)
+      self.addressable_types = aliases.addressables
+      self.alias_by_addressable_type = {addressable_type: alias for alias, addressable_type
+                                        in aliases.addressables.items()}
+      self.context_aware_aliases = list(aliases.context_aware_object_factories)
+      self.pickler = AddressablePickler(aliases.objects)
+
+  def _export_state(self):
+    # Computed on first use, since aliases are registered after the parser is constructed.
+    if self._export_state_value is None:
+      self._export_state_value = self._ExportState(self.registered_aliases(), self._root_dir)
+    return self._export_state_value
+
+  def _dump_address_map(self, build_file, address_map):
+    """Returns the addressables of `address_map` pickled, or None if they can't be."""
+    state = self._export_state()
+    entries = []
+    for addressable in address_map.values():
+      alias = state.alias_by_addressable_type.get(type(addressable))
+      if alias is None or not isinstance(addressable, TargetAddressable):
+        return None
+      kwargs = dict(addressable.kwargs, dependencies=list(addressable.dependency_specs))
+      entries.append((alias, kwargs))
+    try:
+      return state.pickler.dumps(entries)
+    except Exception as e:
+      logger.debug('Cannot pickle the addressables of {build_file}: {error}'
+                   .format(build_file=build_file, error=e))
+      return None
+
+  def _load_address_map(self, build_file, payload):
+    """Rehydrates an address map for `build_file` from a payload from `_dump_address_map`."""
+    state = self._export_state()
+    address_map = {}
+    for alias, kwargs in state.pickler.loads(payload):
+      addressable = state.addressable_types[alias](**kwargs)
+      address_map[BuildFileAddress(build_file, addressable.addressable_name)] = addressable
     return address_map
+
+  def _cached_address_map(self, build_file):
+    """Returns the address map of `build_file` rehydrated from the parse cache, if valid there."""
+    payload = self._parse_cache.get(build_file, self._export_state().fingerprint)
+    if payload is None:
+      return None
+    try:
+      address_map = self._load_address_map(build_file, payload)
+    except Exception as e:
+      logger.debug('Failed to load cached addressables for {build_file}: {error}'
+                   .format(build_file=build_file, error=e))
+      return None
+    logger.debug("Read {count} Addressables for BUILD file {build_file} from the parse cache."
+                 .format(count=len(address_map), build_file=build_file))
+    return address_map
+
+  def _cache_address_map(self, build_file, source, address_map, filespecs):
+    dirs = watched_dirs(self._root_dir, filespecs)
+    if dirs is None:
+      return
+    payload = self._dump_address_map(build_file, address_map)
+    if payload is not None:
+      self._parse_cache.put(build_file, self._export_state().fingerprint, source, dirs, payload)
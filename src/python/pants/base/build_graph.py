@@ -28,15 +28,35 @@ class BuildGraph(object):
   class TransitiveLookupError(AddressLookupError):
     """Used to append the current node to the error message from an AddressLookupError """
 
-  def __init__(self, address_mapper, run_tracker=None):
+  def __init__(self, address_mapper, run_tracker=None, dependee_index=None,
+               source_owner_index=None):
+    """
+    :param address_mapper: The BuildFileAddressMapper to resolve addresses with.
+    :param run_tracker: The RunTracker of this run, if any.
+    :param dependee_index: A DependeeIndex to find dependees with instead of this graph, if any.
+    :param source_owner_index: A SourceOwnerIndex to find the owners of sources with, if any.
+    """
     self._address_mapper = address_mapper
     self.run_tracker = run_tracker
+    self._dependee_index = dependee_index
+    self._source_owner_index = source_owner_index
+    self._dependencies_version = 0
     self.reset()
 
   @property
   def address_mapper(self):
     return self._address_mapper
 
+  @property
+  def dependee_index(self):
+    """The persistent DependeeIndex for this graph's address space, or None if there is none."""
+    return self._dependee_index
+
+  @property
+  def source_owner_index(self):
+    """The persistent SourceOwnerIndex for this graph's address space, or None if there is none."""
+    return self._source_owner_index
+
   def reset(self):
     """Clear out the state of the BuildGraph, in particular Target mappings and dependencies."""
     self._addresses_already_closed = set()
@@ -44,6 +64,16 @@ class BuildGraph(object):
     self._target_dependencies_by_address = defaultdict(OrderedSet)
     self._target_dependees_by_address = defaultdict(set)
     self._derived_from_by_derivative_address = {}
+    self._sorted_targets = None
+    self._dependencies_version += 1
+
+  @property
+  def dependencies_version(self):
+    """A number that changes whenever a dependency is injected or the graph is reset.
+
+    Anything computed from the dependencies between targets can be memoized until it changes.
+    """
+    return self._dependencies_version
 
   def contains_address(self, address):
     return address in self._target_by_address
@@ -130,6 +160,7 @@ class BuildGraph(object):
       self._derived_from_by_derivative_address[target.address] = derived_from.address
 
     self._target_by_address[address] = target
+    self._sorted_targets = None
 
     for dependency_address in dependencies:
       self.inject_dependency(dependent=address, dependency=dependency_address)
@@ -170,6 +201,10 @@ class BuildGraph(object):
     else:
       self._target_dependencies_by_address[dependent].add(dependency)
       self._target_dependees_by_address[dependency].add(dependent)
+      self._sorted_targets = None
+      self._dependencies_version += 1
+      # Any transitive invalidation hashes memoized for the dependent and its dependees are stale.
+      self._target_by_address[dependent].mark_transitive_invalidation_hash_dirty()
 
   def targets(self, predicate=None):
     """Returns all the targets in the graph in no particular order.
@@ -179,8 +214,13 @@ class BuildGraph(object):
     return filter(predicate, self._target_by_address.values())
 
   def sorted_targets(self):
-    """:return: targets ordered from most dependent to least."""
-    return sort_targets(self._target_by_address.values())
+    """:return: targets ordered from most dependent to least.
+
+    The order is computed once, and recomputed only after targets or dependencies are injected.
+    """
+    if self._sorted_targets is None:
+      self._sorted_targets = sort_targets(self._target_by_address.values())
+    return list(self._sorted_targets)
 
   def walk_transitive_dependency_graph(self, addresses, work, predicate=None, postorder=False):
     """Given a work function, walks the transitive dependency closure of `addresses` using DFS.
@@ -195,20 +235,8 @@ class BuildGraph(object):
       walked, nor will its dependencies.  Thus predicate effectively trims out any subgraph
       that would only be reachable through Targets that fail the predicate.
     """
-    walked = set()
-    def _walk_rec(address):
-      if address not in walked:
-        walked.add(address)
-        target = self._target_by_address[address]
-        if not predicate or predicate(target):
-          if not postorder:
-            work(target)
-          for dep_address in self._target_dependencies_by_address[address]:
-            _walk_rec(dep_address)
-          if postorder:
-            work(target)
-    for address in addresses:
-      _walk_rec(address)
+    self._walk_transitive_graph(addresses, self._target_dependencies_by_address, work,
+                                predicate=predicate, postorder=postorder)
 
   def walk_transitive_dependee_graph(self, addresses, work, predicate=None, postorder=False):
     """Identical to `walk_transitive_dependency_graph`, but walks dependees preorder (or postorder
@@ -217,20 +245,36 @@ class BuildGraph(object):
     This is identical to reversing the direction of every arrow in the DAG, then calling
     `walk_transitive_dependency_graph`.
     """
+    self._walk_transitive_graph(addresses, self._target_dependees_by_address, work,
+                                predicate=predicate, postorder=postorder)
+
+  def _walk_transitive_graph(self, addresses, edges_by_address, work, predicate, postorder):
+    # An explicit stack of (target, iterator over the addresses it has edges to), so that deep
+    # graphs can't exhaust Python's stack.
     walked = set()
-    def _walk_rec(address):
+    stack = []
+
+    def enter(address):
+      walked.add(address)
+      target = self._target_by_address[address]
+      if not predicate or predicate(target):
+        if not postorder:
+          work(target)
+        stack.append((target, iter(edges_by_address[address])))
+
+    for address in addresses:
       if address not in walked:
-        walked.add(address)
-        target = self._target_by_address[address]
-        if not predicate or predicate(target):
-          if not postorder:
-            work(target)
-          for dep_address in self._target_dependees_by_address[address]:
-            _walk_rec(dep_address)
+        enter(address)
+      while stack:
+        target, next_addresses = stack[-1]
+        for next_address in next_addresses:
+          if next_address not in walked:
+            enter(next_address)
+            break
+        else:
+          stack.pop()
           if postorder:
             work(target)
-    for address in addresses:
-      _walk_rec(address)
 
   def transitive_dependees_of_addresses(self, addresses, predicate=None, postorder=False):
     """Returns all transitive dependees of `address`.
@@ -371,7 +415,6 @@ class BuildGraph(object):
         if traversable_spec_target not in target.dependencies:
           self.inject_dependency(dependent=target.address,
                                  dependency=traversable_spec_target.address)
-          target.mark_transitive_invalidation_hash_dirty()
 
       for traversable_spec in target.traversable_specs:
         inject_spec_closure(traversable_spec)
@@ -410,44 +453,63 @@ class CycleException(Exception):
     ))
 
 
+_VISITING = 1
+_VISITED = 2
+
+
 def sort_targets(targets):
   """:return: the targets that targets depend on sorted from most dependent to least."""
-  roots = OrderedSet()
-  inverted_deps = defaultdict(OrderedSet)  # target -> dependent targets
-  visited = set()
-  path = OrderedSet()
-
-  def invert(target):
-    if target in path:
-      path_list = list(path)
-      cycle_head = path_list.index(target)
-      cycle = path_list[cycle_head:] + [target]
-      raise CycleException(cycle)
-    path.add(target)
-    if target not in visited:
-      visited.add(target)
-      for dependency in target.dependencies:
-        inverted_deps[dependency].add(target)
-        invert(dependency)
+  # Both passes below are depth-first walks with explicit stacks, so that deep graphs can't exhaust
+  # Python's stack.  Each target is assigned an index when first reached, which indexes its color:
+  # _VISITING while on the path of the walk, and _VISITED once all its dependencies are done.
+  roots = []
+  # target -> dependent targets.  Each target's dependencies are iterated just once, so these lists
+  # hold no duplicates.
+  inverted_deps = defaultdict(list)
+  index_by_target = {}
+  colors = []
+
+  for root in targets:
+    if root in index_by_target:
+      continue
+    index_by_target[root] = len(colors)
+    colors.append(_VISITING)
+    path = [(root, iter(root.dependencies))]
+    while path:
+      target, dependencies = path[-1]
+      for dependency in dependencies:
+        inverted_deps[dependency].append(target)
+        index = index_by_target.get(dependency)
+        if index is None:
+          index_by_target[dependency] = len(colors)
+          colors.append(_VISITING)
+          path.append((dependency, iter(dependency.dependencies)))
+          break
+        elif colors[index] == _VISITING:
+          path_list = [t for t, _ in path]
+          cycle_head = path_list.index(dependency)
+          raise CycleException(path_list[cycle_head:] + [dependency])
       else:
-        roots.add(target)
-    path.remove(target)
-
-  for target in targets:
-    invert(target)
+        path.pop()
+        colors[index_by_target[target]] = _VISITED
+        roots.append(target)
 
   ordered = []
-  visited.clear()
-
-  def topological_sort(target):
-    if target not in visited:
-      visited.add(target)
-      if target in inverted_deps:
-        for dep in inverted_deps[target]:
-          topological_sort(dep)
-      ordered.append(target)
-
+  visited = set()
   for root in roots:
-    topological_sort(root)
+    if root in visited:
+      continue
+    visited.add(root)
+    stack = [(root, iter(inverted_deps.get(root, ())))]
+    while stack:
+      target, dependents = stack[-1]
+      for dependent in dependents:
+        if dependent not in visited:
+          visited.add(dependent)
+          stack.append((dependent, iter(inverted_deps.get(dependent, ()))))
+          break
+      else:
+        stack.pop()
+        ordered.append(target)
 
   return ordered
@@ -6,14 +6,18 @@ from __future__ import (absolute_import, division, generators, nested_scopes, pr
                         unicode_literals, with_statement)
 
 import errno
+import fcntl
 import hashlib
 import os
+import threading
 from collections import namedtuple
+from contextlib import contextmanager
 
 from pants.base.hash_utils import hash_all
 from pants.base.target import Target
 from pants.fs.fs import safe_filename
 from pants.util.dirutil import safe_mkdir
+from pants.util.fileutil import atomic_replace
 
 
 # A CacheKey represents some version of a set of targets.
@@ -134,6 +138,12 @@ class BuildInvalidator(object):
     """
     return self._read_sha_by_id(id)
 
+  def flush(self):
+    """Durably records any updates made so far.
+
+    Updates are written through to their hash files as they are made, so this is a no-op.
+    """
+
   def _sha_file(self, cache_key):
     return self._sha_file_by_id(cache_key.id)
 
@@ -155,3 +165,146 @@ class BuildInvalidator(object):
       if e.errno != errno.ENOENT:
         raise
       return None  # File doesn't exist.
+
+
+class IndexedBuildInvalidator(BuildInvalidator):
+  """A BuildInvalidator that keeps all of its hashes in a single append-only index file.
+
+  The index is read once, on first use, and all needs_update checks are then answered from memory.
+  Updates are buffered and appended to the index with a single write and fsync when flush() is
+  called, so a no-op check of N targets costs one file read instead of N file opens.
+
+  Each index record is a line of the form `<id>\t<hash>`; an empty hash records a forced
+  invalidation.  Later records win.
+
+  Concurrent runs may append to the index together, but compacting it excludes them, via a lock
+  file next to the index, and merges in any records they appended since this run read it.
+  """
+
+  INDEX_FILENAME = 'index'
+
+  # The index is rewritten from its live records when it holds more than this many times as many
+  # records as there are live ids.
+  _COMPACTION_RATIO = 4
+
+  def __init__(self, root):
+    super(IndexedBuildInvalidator, self).__init__(root)
+    self._index_file = os.path.join(self._root, self.INDEX_FILENAME)
+    self._lock_file = '{}.lock'.format(self._index_file)
+    self._lock = threading.RLock()
+    self._hashes = None
+    self._record_count = 0
+    self._pending = []
+
+  def force_invalidate_all(self):
+    with self._lock:
+      super(IndexedBuildInvalidator, self).force_invalidate_all()
+      self._hashes = {}
+      self._record_count = 0
+      self._pending = []
+
+  def force_invalidate(self, cache_key):
+    self._record(cache_key.id, '')
+
+  def flush(self):
+    """Appends all buffered updates to the index with a single write and fsync."""
+    with self._lock:
+      if not self._pending:
+        return
+      if self._record_count > self._COMPACTION_RATIO * max(len(self._hashes), 1):
+        self._compact()
+      else:
+        with self._file_lock(fcntl.LOCK_SH):
+          with open(self._index_file, 'ab') as fd:
+            fd.write(''.join(self._format_record(id, hash) for id, hash in self._pending))
+            fd.flush()
+            os.fsync(fd.fileno())
+      self._pending = []
+
+  def _write_sha(self, cache_key):
+    self._record(cache_key.id, cache_key.hash)
+
+  def _read_sha_by_id(self, id):
+    with self._lock:
+      return self._load().get(id)
+
+  def _record(self, id, hash):
+    with self._lock:
+      self._apply(self._load(), id, hash)
+      self._pending.append((id, hash))
+      self._record_count += 1
+
+  def _load(self):
+    if self._hashes is None:
+      self._hashes = {}
+      for id, hash in self._read_records():
+        self._apply(self._hashes, id, hash)
+        self._record_count += 1
+    return self._hashes
+
+  def _read_records(self):
+    records = []
+    try:
+      with open(self._index_file, 'rb') as fd:
+        for line in fd:
+          # A record without a trailing newline is the remnant of an interrupted write.
+          if not line.endswith('\n'):
+            break
+          id, _, hash = line.rstrip('\n').partition('\t')
+          records.append((id, hash))
+    except IOError as e:
+      if e.errno != errno.ENOENT:
+        raise
+    return records
+
+  @staticmethod
+  def _apply(hashes, id, hash):
+    if hash:
+      hashes[id] = hash
+    else:
+      hashes.pop(id, None)
+
+  def _compact(self):
+    with self._file_lock(fcntl.LOCK_EX):
+      # Other runs may have appended to the index since it was loaded, so rebuild it from what is
+      # on disk now, with the pending records last as they are the newest.
+      hashes = {}
+      for id, hash in self._read_records() + self._pending:
+        self._apply(hashes, id, hash)
+      with atomic_replace(self._index_file) as tmp_file:
+        with open(tmp_file, 'wb') as fd:
+          fd.write(''.join(self._format_record(id, hash) for id, hash in sorted(hashes.items())))
+          fd.flush()
+          os.fsync(fd.fileno())
+    self._hashes = hashes
+    self._record_count = len(hashes)
+
+  @contextmanager
+  def _file_lock(self, operation):
+    """Holds a lock on the index against other processes for the duration of the block."""
+    with open(self._lock_file, 'a') as fd:
+      fcntl.flock(fd, operation)
+      try:
+        yield
+      finally:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+
+  @staticmethod
+  def _format_record(id, hash):
+    return '{}\t{}\n'.format(id, hash)
+
+
+# The available BuildInvalidator implementations, by the name used to select them in options.
+BUILD_INVALIDATORS = {
+  'files': BuildInvalidator,
+  'index': IndexedBuildInvalidator,
+}
+
+
+def create_build_invalidator(root, backend=None):
+  """Creates a BuildInvalidator rooted at root using the named backend.
+
+  :param string root: The directory to store invalidation state under.
+  :param string backend: One of the keys of BUILD_INVALIDATORS; defaults to 'index'.
+  """
+  return BUILD_INVALIDATORS[backend or 'index'](root)
@@ -6,9 +6,10 @@ from __future__ import (absolute_import, division, generators, nested_scopes, pr
                         unicode_literals, with_statement)
 
 import sys
+from multiprocessing.pool import ThreadPool
 
 from pants.base.build_graph import sort_targets
-from pants.base.build_invalidator import BuildInvalidator, CacheKeyGenerator
+from pants.base.build_invalidator import CacheKeyGenerator, create_build_invalidator
 from pants.base.target import Target
 
 
@@ -191,11 +192,14 @@ class InvalidationCacheManager(object):
                cache_key_generator,
                build_invalidator_dir,
                invalidate_dependents,
-               fingerprint_strategy=None):
+               fingerprint_strategy=None,
+               build_invalidator_backend=None,
+               fingerprint_workers=1):
     self._cache_key_generator = cache_key_generator
     self._invalidate_dependents = invalidate_dependents
-    self._invalidator = BuildInvalidator(build_invalidator_dir)
+    self._invalidator = create_build_invalidator(build_invalidator_dir, build_invalidator_backend)
     self._fingerprint_strategy = fingerprint_strategy
+    self._fingerprint_workers = fingerprint_workers
 
   def update(self, vts):
     """Mark a changed or invalidated VersionedTargetSet as successfully processed."""
@@ -213,6 +217,10 @@ class InvalidationCacheManager(object):
     self._invalidator.force_invalidate(vts.cache_key)
     vts.valid = False
 
+  def flush(self):
+    """Durably records all updates and invalidations made through this cache manager so far."""
+    self._invalidator.flush()
+
   def check(self,
             targets,
             partition_size_hint=None,
@@ -230,10 +238,48 @@ class InvalidationCacheManager(object):
     If target_colors is specified, it must be a map from Target -> opaque 'color' values.
     Two Targets will be in the same partition only if they have the same color.
     """
+    self._precompute_keys(targets)
     all_vts = self._wrap_targets(targets, topological_order=topological_order)
     invalid_vts = filter(lambda vt: not vt.valid, all_vts)
     return InvalidationCheck(all_vts, invalid_vts, partition_size_hint, target_colors)
 
+  def _precompute_keys(self, targets):
+    """Computes the fingerprints that the cache keys of targets are built from, in bulk.
+
+    The per-target fingerprints, which involve reading and hashing sources, are computed
+    concurrently across a pool of fingerprint_workers threads.  When invalidating dependents, the
+    transitive hashes are then combined on this thread in dependency order, so that each is just
+    a hash over already computed hashes.
+
+    Fingerprints are memoized on the targets, so the keys computed afterwards reuse this work.
+    """
+    if self._invalidate_dependents:
+      ordered_targets = list(reversed(sort_targets(targets)))
+    else:
+      ordered_targets = list(targets)
+
+    num_workers = min(self._fingerprint_workers or 1, len(ordered_targets))
+    if num_workers > 1:
+      def fingerprint(target):
+        try:
+          target.invalidation_hash(self._fingerprint_strategy)
+        except Exception:
+          # The failure will recur and be reported with context when the target's key is computed.
+          pass
+
+      pool = ThreadPool(processes=num_workers)
+      try:
+        # We need to specify a timeout explicitly, because otherwise python ignores SIGINT when
+        # waiting on a condition variable, so we won't be able to ctrl-c out.
+        pool.map_async(fingerprint, ordered_targets).get(timeout=1000000000)
+      finally:
+        pool.close()
+        pool.join()
+
+    if self._invalidate_dependents:
+      for target in ordered_targets:
+        self._key_for(target)
+
   def _wrap_targets(self, targets, topological_order=False):
     """Wrap targets and their computed cache keys in VersionedTargets.
 
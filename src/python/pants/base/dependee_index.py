@@ -0,0 +1,171 @@
+# coding=utf-8
+# Copyright 2015 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (absolute_import, division, generators, nested_scopes, print_function,
+                        unicode_literals, with_statement)
+
+import os
+from collections import OrderedDict
+
+from twitter.common.collections import OrderedSet
+
+from pants.base.address import SyntheticAddress
+from pants.base.build_file_parse_cache import family_fingerprint
+from pants.base.hash_utils import hash_all
+from pants.util.persistent_pickle import PersistentPickle
+
+
+class DependeeIndex(object):
+  """A persistent index of the targets depending on each target, by address spec.
+
+  For each BUILD file family, the index records the dependencies of the targets it defines, keyed
+  by a hash of the family's contents and of the options of the subsystems targets use, as targets
+  may derive dependencies from those options, and the reverse of all those edges.  Updating the
+  index only re-parses the families whose contents changed since they were indexed, so dependees
+  can be found without constructing the build graph.  Entries for families whose BUILD files were
+  deleted are evicted when the index is saved.
+
+  BUILD files that read environment variables or other files, or import helpers, have inputs
+  that none of this covers, so the index is opt-in.
+  """
+
+  # Bump this whenever the format of the entries changes.
+  _VERSION = 1
+
+  @staticmethod
+  def _spec_path(spec):
+    return spec.rpartition(':')[0]
+
+  def __init__(self, path, build_file_parser):
+    """
+    :param string path: The file the index is persisted to.
+    :param build_file_parser: The BuildFileParser BUILD files are parsed with.
+    """
+    self._store = PersistentPickle(path, self._VERSION)
+    self._build_file_parser = build_file_parser
+    # {spec_path: (family hash, (BUILD file path, ...), {spec: (dependency spec, ...)})}
+    self._families = None
+    # {spec: set(dependee spec)}
+    self._dependees = None
+    self._seen = set()
+    self._dirty = False
+
+  def update(self, build_graph, build_files):
+    """Brings the index up to date with the families of the given BUILD files.
+
+    :param build_graph: The BuildGraph whose address mapper parses changed families.  Targets are
+      constructed against it, but not injected, to find the dependencies they add to those written
+      down in their BUILD files.
+    :param build_files: The BUILD files to index.
+    :returns: The spec paths of the indexed families, to scope queries with.
+    :raises AddressLookupError: if there is a problem parsing a changed BUILD file.
+    """
+    members_by_spec_path = OrderedDict()
+    for build_file in build_files:
+      members_by_spec_path.setdefault(build_file.spec_path, []).append(build_file)
+
+    families = self._load()
+    fingerprint = hash_all([self._build_file_parser.aliases_fingerprint(),
+                            self._options_fingerprint()])
+    stale = OrderedDict()
+    for spec_path, members in members_by_spec_path.items():
+      family_hash = family_fingerprint(members, fingerprint)
+      entry = families.get(spec_path)
+      if entry is None or entry[0] != family_hash:
+        stale[spec_path] = (family_hash, members)
+    self._seen.update(members_by_spec_path)
+
+    if stale:
+      address_mapper = build_graph.address_mapper
+      address_mapper.addresses_in_build_files(member for _, members in stale.values()
+                                              for member in members)
+      for spec_path, (family_hash, members) in stale.items():
+        edges = {}
+        for address in address_mapper.addresses_in_spec_path(spec_path):
+          edges[address.spec] = self._dependency_specs(address_mapper, build_graph, address)
+        self._replace(spec_path,
+                      (family_hash, tuple(member.full_path for member in members), edges))
+
+    return set(members_by_spec_path)
+
+  def _dependency_specs(self, address_mapper, build_graph, address):
+    target_address, addressable = address_mapper.resolve(address)
+    specs = OrderedSet()
+    for spec in addressable.dependency_specs:
+      specs.add(SyntheticAddress.parse(spec, relative_to=target_address.spec_path).spec)
+    # Targets can add dependencies of their own, which are only known once they are constructed.
+    if build_graph.contains_address(target_address):
+      target = build_graph.get_target(target_address)
+    else:
+      target = build_graph._target_addressable_to_target(target_address, addressable)
+    for spec in target.traversable_dependency_specs:
+      specs.add(SyntheticAddress.parse(spec, relative_to=target_address.spec_path).spec)
+    return tuple(specs)
+
+  def _options_fingerprint(self):
+    """Returns a fingerprint of the options of the subsystems used by indexed targets."""
+    entries = []
+    for subsystem_type in sorted(self._build_file_parser.subsystem_types(),
+                                 key=lambda subsystem_type: subsystem_type.scope_qualifier()):
+      options = subsystem_type.global_instance().get_options()
+      for name in options:
+        entries.append('{}.{}={!r}\0'.format(subsystem_type.scope_qualifier(), name,
+                                             options[name]).encode('utf-8'))
+    return hash_all(entries)
+
+  def _replace(self, spec_path, entry):
+    families = self._load()
+    old_entry = families.pop(spec_path, None)
+    if old_entry is not None:
+      for spec, dependency_specs in old_entry[2].items():
+        for dependency_spec in dependency_specs:
+          dependees = self._dependees.get(dependency_spec)
+          if dependees is not None:
+            dependees.discard(spec)
+            if not dependees:
+              del self._dependees[dependency_spec]
+    if entry is not None:
+      families[spec_path] = entry
+      for spec, dependency_specs in entry[2].items():
+        for dependency_spec in dependency_specs:
+          self._dependees.setdefault(dependency_spec, set()).add(spec)
+    self._dirty = True
+
+  def dependees(self, specs, spec_paths, transitive=False):
+    """Returns the specs of the targets depending on any of the given targets.
+
+    :param specs: The address specs of the targets to find the dependees of.
+    :param spec_paths: The spec paths, as returned by `update`, of the families dependees may be
+      defined in.  Dependees elsewhere are neither returned nor, when transitive, followed.
+    :param bool transitive: True to find transitive dependees, False for direct dependees only.
+    :returns: A set of address specs.  The given specs are included only if they depend on one
+      another.
+    """
+    self._load()
+    found = set()
+    pending = list(specs)
+    while pending:
+      spec = pending.pop()
+      for dependee in self._dependees.get(spec, ()):
+        if dependee not in found and self._spec_path(dependee) in spec_paths:
+          found.add(dependee)
+          if transitive:
+            pending.append(dependee)
+    return found
+
+  def save(self):
+    """Persists the index if it changed, evicting entries for deleted BUILD files."""
+    families = self._load()
+    for spec_path, entry in list(families.items()):
+      if spec_path not in self._seen and not any(os.path.exists(path) for path in entry[1]):
+        self._replace(spec_path, None)
+    if not self._dirty:
+      return
+    self._store.save((self._families, self._dependees))
+    self._dirty = False
+
+  def _load(self):
+    if self._families is None:
+      self._families, self._dependees = self._store.load() or ({}, {})
+    return self._families
@@ -9,6 +9,7 @@ import os
 from collections import defaultdict
 
 from pants.base.build_environment import get_buildroot
+from pants.base.payload_field import SourcesField
 
 
 class LazySourceMapper(object):
@@ -25,9 +26,13 @@ class LazySourceMapper(object):
 
   A LazySourceMapper reuses computed mappings and only searches a given path once as
   populating the BuildGraph is expensive, so in general there should only be one instance of it.
+
+  With a SourceOwnerIndex, the sources owned by the targets of unchanged BUILD file families are
+  read from the index instead, and no targets are constructed for them.  That makes searching all
+  parent directories cheap enough that stop-after-match mode need not be used for speed.
   """
 
-  def __init__(self, address_mapper, build_graph, stop_after_match=False):
+  def __init__(self, address_mapper, build_graph, stop_after_match=False, source_owner_index=None):
     """Initialize LazySourceMapper.
 
     :param AddressMapper address_mapper: An address mapper that can be used to populate the
@@ -35,10 +40,14 @@ class LazySourceMapper(object):
     :param BuildGraph build_graph: The build graph to map sources from.
     :param bool stop_after_match: If `True` a search will not traverse into parent directories once
       an owner is identified.
+    :param source_owner_index: A SourceOwnerIndex to reuse the sources owned by the targets of
+      BUILD file families from, and record them to, or None.
     """
     self._stop_after_match = stop_after_match
     self._build_graph = build_graph
     self._address_mapper = address_mapper
+    self._source_owner_index = source_owner_index
+    self._address_by_spec = {}
     self._source_to_address = defaultdict(set)
     self._mapped_paths = set()
     self._searched_sources = set()
@@ -68,7 +77,10 @@ class LazySourceMapper(object):
       if path not in self._mapped_paths:
         candidate = self._address_mapper.from_cache(root_dir=root, relpath=path, must_exist=False)
         if candidate.file_exists():
-          self._map_sources_from_family(candidate.family())
+          if self._source_owner_index is None:
+            self._map_sources_from_family(candidate.family())
+          else:
+            self._map_sources_from_indexed_family(candidate)
         self._mapped_paths.add(path)
       elif not self._stop_after_match:
         # If not in stop-after-match mode, once a path is seen visited, all parents can be assumed.
@@ -101,6 +113,61 @@ class LazySourceMapper(object):
         if not target.is_synthetic:
           self._source_to_address[target.address.build_file.relpath].add(target.address)
 
+  def _map_sources_from_indexed_family(self, build_file):
+    """Populate mapping of source to owning addresses from the index entry for a BUILD family.
+
+    The entry is computed and recorded first if the family is not indexed or changed since.
+
+    :param BuildFile build_file: a BUILD file of the family from which to map sources.
+    """
+    owners = self._source_owner_index.get(build_file)
+    if owners is None:
+      owners = self._index_family(build_file)
+    for source, specs in owners.items():
+      for spec in specs:
+        address = self._address_by_spec.get(spec)
+        if address is None:
+          address = self._address_mapper.spec_to_address(spec)
+          self._address_by_spec[spec] = address
+        self._source_to_address[source].add(address)
+
+  def _index_family(self, build_file):
+    owners = defaultdict(set)
+    dependency_spec_paths = set()
+    filespecs = []
+    cacheable = True
+
+    def add_sources(target, owner):
+      for item in target.sources_relative_to_buildroot():
+        owners[item].add(owner.address.spec)
+      for _, payload_field in target.payload.fields:
+        if isinstance(payload_field, SourcesField):
+          if payload_field.filespec is not None:
+            filespecs.append(payload_field.filespec)
+          elif payload_field.source_paths:
+            # Sources we can't tell the origin of may change without the BUILD file changing.
+            return False
+      return True
+
+    address_map = self._address_mapper._address_map_from_spec_path(build_file.spec_path)
+    for address, addressable in address_map.values():
+      self._build_graph.inject_address_closure(address)
+      target = self._build_graph._target_addressable_to_target(address, addressable)
+      for dependency in target.dependencies:
+        dependency_spec_paths.add(dependency.concrete_derived_from.address.spec_path)
+      if target.has_resources:
+        for resource in target.resources:
+          dependency_spec_paths.add(resource.concrete_derived_from.address.spec_path)
+          cacheable = add_sources(resource, target) and cacheable
+      cacheable = add_sources(target, target) and cacheable
+      if not target.is_synthetic:
+        owners[target.address.build_file.relpath].add(target.address.spec)
+
+    owners = {source: tuple(specs) for source, specs in owners.items()}
+    if cacheable:
+      self._source_owner_index.put(build_file, owners, dependency_spec_paths, filespecs)
+    return owners
+
   def target_addresses_for_source(self, source):
     """Attempt to find targets which own a source by searching up directory structure to buildroot.
 
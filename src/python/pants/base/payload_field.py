@@ -85,6 +85,17 @@ class FingerprintedField(PayloadField):
 
 class SourcesField(PayloadField):
   """A PayloadField encapsulating specified sources."""
+
+  _digest_cache = None
+
+  @classmethod
+  def set_digest_cache(cls, digest_cache):
+    """Sets a SourceDigestCache to reuse source fingerprints from across runs, or None to disable.
+
+    :param digest_cache: A :class:`pants.base.source_digest_cache.SourceDigestCache`.
+    """
+    cls._digest_cache = digest_cache
+
   def __init__(self, sources_rel_path, sources, ref_address=None, filespec=None):
     """
     :param sources_rel_path: path that sources parameter may be relative to
@@ -135,9 +146,23 @@ class SourcesField(PayloadField):
     return [os.path.join(self.rel_path, source) for source in self.source_paths]
 
   def _compute_fingerprint(self):
+    sources = sorted(self.relative_to_buildroot())
+    digest_cache = self._digest_cache
+    if digest_cache is None:
+      return self._hash_sources(sources)
+
+    key = digest_cache.key_for(self._rel_path or '', *sources)
+    fingerprint = digest_cache.get(key)
+    if fingerprint is None:
+      fingerprint = self._hash_sources(sources)
+      digest_cache.put(key, [os.path.join(get_buildroot(), source) for source in sources],
+                       fingerprint)
+    return fingerprint
+
+  def _hash_sources(self, sources):
     hasher = sha1()
     hasher.update(self._rel_path)
-    for source in sorted(self.relative_to_buildroot()):
+    for source in sources:
       hasher.update(source)
       with open(os.path.join(get_buildroot(), source), 'rb') as f:
         hasher.update(f.read())
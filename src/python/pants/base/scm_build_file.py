@@ -18,23 +18,29 @@ class ScmBuildFile(BuildFile):
 
   _rev = None
   _scm = None
+  # The contents of a rev don't change, so directory listings are kept until the rev does.
+  _listings = {}
+  _cached_scm_worktree = None
   _root_dir = None
 
   @classmethod
   def set_rev(cls, rev):
     cls._rev = rev
+    cls._listings = {}
     if cls._scm:
       cls._reader = cls._scm.repo_reader(cls._rev)
 
   @classmethod
   def set_scm(cls, scm):
     cls._scm = scm
+    cls._cached_scm_worktree = None
+    cls._listings = {}
     if cls._rev:
       cls._reader = cls._scm.repo_reader(cls._rev)
 
   @classmethod
   def _scm_worktree(cls):
-    if not hasattr(cls, '_cached_scm_worktree'):
+    if cls._cached_scm_worktree is None:
       cls._cached_scm_worktree = cls._scm.detect_worktree()
     return cls._cached_scm_worktree
 
@@ -88,30 +94,48 @@ class ScmBuildFile(BuildFile):
       relpath = os.path.join(scm_rootpath, root)
     else:
       relpath = scm_rootpath
-    for path, dirnames, filenames in cls._do_walk(relpath, topdown=topdown):
+    for path, dirnames, filenames in cls._do_walk(os.path.normpath(relpath), topdown=topdown):
       yield (os.path.join(worktree, path), dirnames, filenames)
 
   @classmethod
   def _do_walk(cls, root, topdown=False):
     """Helper method for _walk"""
-    if cls._reader.isdir(root):
-      filenames = []
+    if not cls._reader.isdir(root):
+      return
+
+    if not topdown:
+      for item in cls._do_walk_bottomup(root):
+        yield item
+      return
+
+    pending = [root]
+    while pending:
+      path = pending.pop()
+      dirnames, filenames = cls._listdir(path)
+      dirnames = list(dirnames)
+      yield (path, dirnames, list(filenames))
+      # Honor any pruning of dirnames by the caller, as os.walk does.
+      pending.extend(os.path.join(path, dirname) for dirname in reversed(dirnames))
+
+  @classmethod
+  def _do_walk_bottomup(cls, root):
+    dirnames, filenames = cls._listdir(root)
+    for dirname in dirnames:
+      for item in cls._do_walk_bottomup(os.path.join(root, dirname)):
+        yield item
+    yield (root, list(dirnames), list(filenames))
+
+  @classmethod
+  def _listdir(cls, path):
+    """Returns the names of the directories and of the files in path at the current rev."""
+    listing = cls._listings.get(path)
+    if listing is None:
       dirnames = []
-      dirpaths = []
-      for filename in cls._reader.listdir(root):
-        path = os.path.join(root, filename)
-        if cls._reader.isdir(path):
+      filenames = []
+      for filename in cls._reader.listdir(path):
+        if cls._reader.isdir(os.path.join(path, filename)):
           dirnames.append(filename)
-          dirpaths.append(path)
         else:
           filenames.append(filename)
-
-      if topdown:
-        yield (root, dirnames, filenames)
-
-      for dirpath in dirpaths:
-        for item in cls._do_walk(dirpath, topdown=topdown):
-          yield item
-
-      if not topdown:
-        yield (root, dirnames, filenames)
+      listing = cls._listings[path] = (tuple(dirnames), tuple(filenames))
+    return listing
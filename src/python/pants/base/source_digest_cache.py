@@ -0,0 +1,121 @@
+# coding=utf-8
+# Copyright 2015 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (absolute_import, division, generators, nested_scopes, print_function,
+                        unicode_literals, with_statement)
+
+import os
+import threading
+import time
+from hashlib import sha1
+
+from pants.util.fileutil import RACY_WINDOW_SECS
+from pants.util.persistent_pickle import PersistentPickle
+
+
+class SourceDigestCache(object):
+  """A persistent cache of source set digests, validated by the stat of each source file.
+
+  Entries map a key identifying a set of sources to the digest previously computed over the
+  contents of those sources, along with the (mtime, size, inode) of each file at that time.  An
+  entry is reused only while every one of its files still has the same stat tuple; otherwise the
+  caller recomputes the digest and stores it afresh.  Entries that refer to deleted files, or that
+  no run has used for a while, are evicted when the cache is saved.
+
+  The digests themselves are computed by callers, so using the cache never changes them.
+  """
+
+  # Bump this whenever the format of the entries changes.
+  _VERSION = 1
+
+  # Entries no run has used for this long are evicted, so that the cache doesn't grow without
+  # bound with the sources of old branches, moved files and the like.
+  _MAX_UNUSED_SECS = 14 * 24 * 60 * 60
+
+  # How stale the recorded last use of an entry may get before using it calls for a save.  This
+  # bounds how often runs that only read the cache write it.
+  _USE_RESOLUTION_SECS = 24 * 60 * 60
+
+  @staticmethod
+  def key_for(*components):
+    """Returns a cache key for a source set identified by the given strings."""
+    hasher = sha1()
+    for component in components:
+      hasher.update(component)
+      hasher.update(b'\0')
+    return hasher.hexdigest()
+
+  @staticmethod
+  def _stat(path):
+    st = os.stat(path)
+    return [st.st_mtime, st.st_size, st.st_ino]
+
+  def __init__(self, path):
+    """
+    :param string path: The file the cache is persisted to.
+    """
+    self._store = PersistentPickle(path, self._VERSION)
+    self._lock = threading.Lock()
+    self._entries = None
+    self._used = set()
+    self._dirty = False
+
+  def get(self, key):
+    """Returns the cached digest for key if none of its files have changed since it was stored.
+
+    :param string key: A key as returned by `key_for`.
+    :returns: The digest, or None if there is no valid entry for key.
+    """
+    with self._lock:
+      entry = self._load().get(key)
+    if entry is None:
+      return None
+    digest, stats, used_at = entry
+    try:
+      if any(self._stat(path) != stat for path, stat in stats):
+        return None
+    except OSError:
+      return None
+    with self._lock:
+      self._used.add(key)
+      if used_at < time.time() - self._USE_RESOLUTION_SECS:
+        self._dirty = True
+    return digest
+
+  def put(self, key, paths, digest):
+    """Records digest as the digest of the given files under key.
+
+    :param string key: A key as returned by `key_for`.
+    :param list paths: The absolute paths of the files that digest was computed over.
+    :param string digest: The digest.
+    """
+    stats = [[path, self._stat(path)] for path in paths]
+    now = time.time()
+    horizon = now - RACY_WINDOW_SECS
+    if any(stat[0] > horizon for _, stat in stats):
+      return
+    with self._lock:
+      self._load()[key] = [digest, stats, now]
+      self._used.add(key)
+      self._dirty = True
+
+  def save(self):
+    """Persists the cache if it changed, evicting entries for deleted files and unused entries."""
+    with self._lock:
+      if not self._dirty:
+        return
+      now = time.time()
+      horizon = now - self._MAX_UNUSED_SECS
+      for key, entry in self._entries.items():
+        if key in self._used:
+          entry[2] = now
+        elif entry[2] < horizon or not all(os.path.exists(path) for path, _ in entry[1]):
+          del self._entries[key]
+      self._store.save(self._entries)
+      self._dirty = False
+
+  def _load(self):
+    if self._entries is None:
+      self._entries = self._store.load() or {}
+    return self._entries
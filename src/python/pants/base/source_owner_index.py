@@ -0,0 +1,125 @@
+# coding=utf-8
+# Copyright 2015 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (absolute_import, division, generators, nested_scopes, print_function,
+                        unicode_literals, with_statement)
+
+import os
+import time
+
+from pants.base.build_file_parse_cache import family_fingerprint, watched_dirs
+from pants.util.fileutil import RACY_WINDOW_SECS
+from pants.util.persistent_pickle import PersistentPickle
+
+
+class SourceOwnerIndex(object):
+  """A persistent index of the sources owned by the targets of each BUILD file family.
+
+  An entry maps the sources of a family's targets, including their resources and the BUILD files
+  themselves, to the address specs of the targets owning them.  It is reused while the contents of
+  the family and of the families its targets depend on are unchanged, and none of the directories
+  its sources were globbed from changed.  Families whose glob directories were modified in the
+  last couple of seconds are not indexed, to avoid coarse-mtime races.  Entries for families whose
+  BUILD files were deleted are evicted when the index is saved.
+
+  BUILD files that read environment variables or other files, or import helpers, have inputs
+  that none of this covers, so the index is opt-in.
+  """
+
+  # Bump this whenever the format of the entries changes.
+  _VERSION = 1
+
+  def __init__(self, path, build_file_parser):
+    """
+    :param string path: The file the index is persisted to.
+    :param build_file_parser: The BuildFileParser BUILD files are parsed with.
+    """
+    self._store = PersistentPickle(path, self._VERSION)
+    self._build_file_parser = build_file_parser
+    # {spec_path: (family hash, (BUILD file path, ...), {spec_path: family hash}, dirs, owners)}
+    self._entries = None
+    self._family_hashes = {}
+    self._seen = set()
+    self._dirty = False
+
+  def _family_hash(self, build_file, spec_path):
+    """Returns the hash of the family at spec_path, or None if there is no BUILD file there."""
+    if spec_path not in self._family_hashes:
+      family_hash = None
+      candidate = build_file.from_cache(build_file.root_dir, spec_path, must_exist=False)
+      if candidate.file_exists():
+        family_hash = family_fingerprint(candidate.family(),
+                                         self._build_file_parser.aliases_fingerprint())
+      self._family_hashes[spec_path] = family_hash
+    return self._family_hashes[spec_path]
+
+  def get(self, build_file):
+    """Returns the sources owned by the targets of build_file's family, if indexed and valid.
+
+    :param build_file: A BUILD file of the family.
+    :returns: A dict from source path, relative to the build root, to a tuple of the address specs
+      of its owners, or None if there is no valid entry for the family.
+    """
+    spec_path = build_file.spec_path
+    self._seen.add(spec_path)
+    entry = self._load().get(spec_path)
+    if entry is None:
+      return None
+    family_hash, _, dependency_hashes, dirs, owners = entry
+    if family_hash != self._family_hash(build_file, spec_path):
+      return None
+    for dependency_spec_path, dependency_hash in dependency_hashes.items():
+      if dependency_hash != self._family_hash(build_file, dependency_spec_path):
+        return None
+    for reldir, mtime in dirs.items():
+      try:
+        current_mtime = os.stat(os.path.join(build_file.root_dir, reldir)).st_mtime
+      except OSError:
+        current_mtime = None
+      if current_mtime != mtime:
+        return None
+    return owners
+
+  def put(self, build_file, owners, dependency_spec_paths, filespecs):
+    """Records the sources owned by the targets of build_file's family.
+
+    :param build_file: A BUILD file of the family.
+    :param dict owners: A dict from source path, relative to the build root, to a tuple of the
+      address specs of its owners.
+    :param dependency_spec_paths: The spec paths of the families defining the dependencies and
+      resources of the family's targets.
+    :param list filespecs: The filespecs the family's sources were globbed from.
+    """
+    dirs = watched_dirs(build_file.root_dir, filespecs)
+    if dirs is None:
+      return
+    horizon = time.time() - RACY_WINDOW_SECS
+    if any(mtime > horizon for mtime in dirs.values() if mtime is not None):
+      return
+    spec_path = build_file.spec_path
+    dependency_hashes = {dependency_spec_path: self._family_hash(build_file, dependency_spec_path)
+                         for dependency_spec_path in dependency_spec_paths
+                         if dependency_spec_path != spec_path}
+    paths = tuple(member.full_path for member in build_file.family())
+    self._load()[spec_path] = (self._family_hash(build_file, spec_path), paths, dependency_hashes,
+                               dirs, owners)
+    self._seen.add(spec_path)
+    self._dirty = True
+
+  def save(self):
+    """Persists the index if it changed, evicting entries for deleted BUILD files."""
+    entries = self._load()
+    for spec_path, entry in list(entries.items()):
+      if spec_path not in self._seen and not any(os.path.exists(path) for path in entry[1]):
+        del entries[spec_path]
+        self._dirty = True
+    if not self._dirty:
+      return
+    self._store.save(self._entries)
+    self._dirty = False
+
+  def _load(self):
+    if self._entries is None:
+      self._entries = self._store.load() or {}
+    return self._entries
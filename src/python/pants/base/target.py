@@ -13,6 +13,7 @@ from six import string_types
 from pants.backend.core.wrapped_globs import FilesetWithSpec
 from pants.base.address import Addresses, SyntheticAddress
 from pants.base.build_environment import get_buildroot
+from pants.base.build_graph import CycleException
 from pants.base.exceptions import TargetDefinitionException
 from pants.base.fingerprint_strategy import DefaultFingerprintStrategy
 from pants.base.hash_utils import hash_all
@@ -238,8 +239,8 @@ class Target(AbstractTarget):
 
   def mark_invalidation_hash_dirty(self):
     self._cached_fingerprint_map = {}
-    self._cached_transitive_fingerprint_map = {}
     self.mark_extra_invalidation_hash_dirty()
+    self.mark_transitive_invalidation_hash_dirty()
 
   def transitive_invalidation_hash(self, fingerprint_strategy=None):
     """
@@ -252,36 +253,70 @@ class Target(AbstractTarget):
     """
     fingerprint_strategy = fingerprint_strategy or DefaultFingerprintStrategy()
     if fingerprint_strategy not in self._cached_transitive_fingerprint_map:
-      hasher = sha1()
-      def dep_hash_iter():
-        for dep in self.dependencies:
-          dep_hash = dep.transitive_invalidation_hash(fingerprint_strategy)
-          if dep_hash is not None:
-            yield dep_hash
-      dep_hashes = sorted(list(dep_hash_iter()))
-      for dep_hash in dep_hashes:
-        hasher.update(dep_hash)
-      target_hash = self.invalidation_hash(fingerprint_strategy)
-      if target_hash is None and not dep_hashes:
-        return None
-      dependencies_hash = hasher.hexdigest()[:12]
-      combined_hash = '{target_hash}.{deps_hash}'.format(target_hash=target_hash,
-                                                         deps_hash=dependencies_hash)
-      self._cached_transitive_fingerprint_map[fingerprint_strategy] = combined_hash
+      # Memoize the hashes of any dependencies that lack one first, in postorder.  The walk keeps
+      # its own stack, so that deep graphs can't exhaust Python's, and the path of targets on the
+      # stack lets us report any cycle.
+      path = [(self, iter(self.dependencies))]
+      on_path = {self}
+      while path:
+        target, dependencies = path[-1]
+        for dep in dependencies:
+          if fingerprint_strategy in dep._cached_transitive_fingerprint_map:
+            continue
+          if dep in on_path:
+            cycle = [t for t, _ in path]
+            raise CycleException(cycle[cycle.index(dep):] + [dep])
+          path.append((dep, iter(dep.dependencies)))
+          on_path.add(dep)
+          break
+        else:
+          path.pop()
+          on_path.remove(target)
+          target._cached_transitive_fingerprint_map[fingerprint_strategy] = (
+            target._compute_transitive_invalidation_hash(fingerprint_strategy))
     return self._cached_transitive_fingerprint_map[fingerprint_strategy]
 
+  def _compute_transitive_invalidation_hash(self, fingerprint_strategy):
+    # Assumes the transitive hashes of all dependencies are memoized.
+    dep_hashes = sorted(dep_hash for dep_hash in
+                        (dep._cached_transitive_fingerprint_map[fingerprint_strategy]
+                         for dep in self.dependencies)
+                        if dep_hash is not None)
+    target_hash = self.invalidation_hash(fingerprint_strategy)
+    if target_hash is None and not dep_hashes:
+      return None
+    hasher = sha1()
+    for dep_hash in dep_hashes:
+      hasher.update(dep_hash)
+    dependencies_hash = hasher.hexdigest()[:12]
+    return '{target_hash}.{deps_hash}'.format(target_hash=target_hash,
+                                              deps_hash=dependencies_hash)
+
   def mark_transitive_invalidation_hash_dirty(self):
-    self._cached_transitive_fingerprint_map = {}
-    self.mark_extra_transitive_invalidation_hash_dirty()
+    """Forgets the transitive hashes of this target and of all the targets that depend on it.
+
+    A transitive hash is only ever memoized after those of the target's dependencies, so the
+    dependees of a target without any memoized transitive hash have none either, and dirtiness
+    need not propagate past it.
+    """
+    stack = [self]
+    while stack:
+      target = stack.pop()
+      target._cached_transitive_fingerprint_map = {}
+      target.mark_extra_transitive_invalidation_hash_dirty()
+      build_graph = target._build_graph
+      if build_graph is not None and build_graph.contains_address(target.address):
+        for dependee_address in build_graph.dependents_of(target.address):
+          dependee = build_graph.get_target(dependee_address)
+          if dependee._cached_transitive_fingerprint_map:
+            stack.append(dependee)
 
   def mark_extra_transitive_invalidation_hash_dirty(self):
     pass
 
   def inject_dependency(self, dependency_address):
+    # The build graph marks our transitive hash, and those of our dependees, dirty.
     self._build_graph.inject_dependency(dependent=self.address, dependency=dependency_address)
-    def invalidate_dependee(dependee):
-      dependee.mark_transitive_invalidation_hash_dirty()
-    self._build_graph.walk_transitive_dependee_graph([self.address], work=invalidate_dependee)
 
   def has_sources(self, extension=''):
     """
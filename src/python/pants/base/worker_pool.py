@@ -38,6 +38,7 @@ class WorkerPool(object):
 
   def __init__(self, parent_workunit, run_tracker, num_workers):
     self._run_tracker = run_tracker
+    self._num_workers = num_workers
     # All workers accrue work to the same root.
     self._pool = ThreadPool(processes=num_workers,
                             initializer=self._run_tracker.register_thread,
@@ -49,6 +50,11 @@ class WorkerPool(object):
 
     self._shutdown_hooks = []
 
+  @property
+  def num_workers(self):
+    """The number of work items the pool runs at once."""
+    return self._num_workers
+
   def add_shutdown_hook(self, hook):
     self._shutdown_hooks.append(hook)
 
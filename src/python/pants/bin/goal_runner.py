@@ -6,6 +6,7 @@ from __future__ import (absolute_import, division, generators, nested_scopes, pr
                         unicode_literals, with_statement)
 
 import logging
+import os
 import sys
 
 import pkg_resources
@@ -15,11 +16,17 @@ from pants.backend.jvm.tasks.nailgun_task import NailgunTask  # XXX(pl)
 from pants.base.build_environment import get_buildroot, get_scm
 from pants.base.build_file import FilesystemBuildFile
 from pants.base.build_file_address_mapper import BuildFileAddressMapper
+from pants.base.build_file_index import BuildFileIndex
+from pants.base.build_file_parse_cache import BuildFileParseCache
 from pants.base.build_file_parser import BuildFileParser
 from pants.base.build_graph import BuildGraph
 from pants.base.cmd_line_spec_parser import CmdLineSpecParser
+from pants.base.dependee_index import DependeeIndex
 from pants.base.extension_loader import load_plugins_and_backends
+from pants.base.payload_field import SourcesField
 from pants.base.scm_build_file import ScmBuildFile
+from pants.base.source_digest_cache import SourceDigestCache
+from pants.base.source_owner_index import SourceOwnerIndex
 from pants.base.workunit import WorkUnit
 from pants.engine.round_engine import RoundEngine
 from pants.goal.context import Context
@@ -129,20 +136,56 @@ class GoalRunner(object):
     else:
       self.run_tracker.log(Report.INFO, '(To run a reporting server: ./pants server)')
 
+    if self.global_options.source_digest_cache:
+      self.source_digest_cache = SourceDigestCache(
+        os.path.join(self.global_options.pants_workdir, 'source_digests', 'digests.pickle'))
+    else:
+      self.source_digest_cache = None
+    SourcesField.set_digest_cache(self.source_digest_cache)
+
+    if self.global_options.build_file_cache:
+      self.build_file_parse_cache = BuildFileParseCache(
+        os.path.join(self.global_options.pants_workdir, 'build_file_parse_cache', 'cache.pickle'))
+    else:
+      self.build_file_parse_cache = None
+
     self.build_file_parser = BuildFileParser(build_configuration=build_configuration,
                                              root_dir=self.root_dir,
-                                             run_tracker=self.run_tracker)
+                                             run_tracker=self.run_tracker,
+                                             parse_cache=self.build_file_parse_cache)
 
     rev = self.options.for_global_scope().build_file_rev
+    self.build_file_index = None
     if rev:
       ScmBuildFile.set_rev(rev)
       ScmBuildFile.set_scm(get_scm())
       build_file_type = ScmBuildFile
     else:
+      if self.global_options.build_file_index:
+        self.build_file_index = BuildFileIndex(
+          os.path.join(self.global_options.pants_workdir, 'build_file_index', 'index.pickle'),
+          self.root_dir, FilesystemBuildFile.is_buildfile_name)
+      FilesystemBuildFile.set_index(self.build_file_index)
       build_file_type = FilesystemBuildFile
-    self.address_mapper = BuildFileAddressMapper(self.build_file_parser, build_file_type)
+    self.address_mapper = BuildFileAddressMapper(
+      self.build_file_parser, build_file_type,
+      parse_workers=self.global_options.build_file_parse_workers)
+    if self.global_options.dependee_index:
+      self.dependee_index = DependeeIndex(
+        os.path.join(self.global_options.pants_workdir, 'dependee_index', 'index.pickle'),
+        self.build_file_parser)
+    else:
+      self.dependee_index = None
+    if self.global_options.source_owner_index:
+      self.source_owner_index = SourceOwnerIndex(
+        os.path.join(self.global_options.pants_workdir, 'source_owner_index', 'index.pickle'),
+        self.build_file_parser)
+    else:
+      self.source_owner_index = None
     self.build_graph = BuildGraph(run_tracker=self.run_tracker,
-                                  address_mapper=self.address_mapper)
+                                  address_mapper=self.address_mapper,
+                                  dependee_index=self.dependee_index,
+                                  source_owner_index=self.source_owner_index)
 
     # TODO(John Sirois): Kill when source root registration is lifted out of BUILD files.
     with self.run_tracker.new_workunit(name='bootstrap', labels=[WorkUnit.SETUP]):
@@ -222,6 +265,7 @@ class GoalRunner(object):
       fail()
       raise
     finally:
+      self._save_persistent_caches()
       self.run_tracker.end()
       # Must kill nailguns only after run_tracker.end() is called, otherwise there may still
       # be pending background work that needs a nailgun.
@@ -232,6 +276,17 @@ class GoalRunner(object):
         NailgunTask.killall()
     return result
 
+  def _save_persistent_caches(self):
+    # The caches only speed up later runs, so failing to save one must neither fail this run nor
+    # mask the error it is failing with, nor keep the run from being ended.
+    for cache in (self.source_digest_cache, self.build_file_parse_cache, self.build_file_index,
+                  self.dependee_index, self.source_owner_index):
+      if cache:
+        try:
+          cache.save()
+        except Exception as e:
+          logger.warning('Failed to save {}: {}'.format(type(cache).__name__, e))
+
   def _do_run(self):
     # Update the reporting settings, now that we have flags etc.
     def is_quiet_task():
@@ -8,9 +8,13 @@ from __future__ import (absolute_import, division, generators, nested_scopes, pr
 import errno
 import os
 import shutil
+import stat
 import tarfile
+from contextlib import contextmanager
+from hashlib import sha1
 
-from pants.util.contextutil import open_tar
+from pants.cache.compression import CompressingWriter, CompressionError, DecompressingReader
+from pants.util.contextutil import open_tar, temporary_file
 from pants.util.dirutil import safe_mkdir, safe_mkdir_for, safe_walk
 
 
@@ -18,6 +22,19 @@ class ArtifactError(Exception):
   pass
 
 
+@contextmanager
+def read_tarball(fileobj):
+  """A with-context that reads the tarball of a TarballArtifact sequentially from fileobj.
+
+  Yields a stream-mode TarFile, whose members must be processed in order.
+  """
+  try:
+    with open_tar(DecompressingReader(fileobj), 'r|', errorlevel=2) as tarin:
+      yield tarin
+  except (CompressionError, tarfile.ReadError) as e:
+    raise ArtifactError(str(e))
+
+
 class Artifact(object):
   """Represents a set of files in an artifact."""
   def __init__(self, artifact_root):
@@ -72,52 +89,231 @@ class DirectoryArtifact(Artifact):
 
 
 class TarballArtifact(Artifact):
-  """An artifact stored in a tarball."""
-  def __init__(self, artifact_root, tarfile, compression=9):
+  """An artifact stored in a tarball.
+
+  The tarball may be compressed with any of the codecs in `pants.cache.compression`.  Whichever
+  codec was used is detected when the tarball is read.
+  """
+  def __init__(self, artifact_root, tarfile, compression=9, codec='gzip', threads=1):
+    """
+    :param str artifact_root: The path under which the artifact's files are read/written.
+    :param str tarfile: The path of the tarball.
+    :param int compression: The compression level for created tarballs.
+    :param str codec: The codec to compress created tarballs with.
+    :param int threads: The number of threads to compress created tarballs with, if the codec
+                        supports it.
+    """
     Artifact.__init__(self, artifact_root)
     self._tarfile = tarfile
     self._compression = compression
+    self._codec = codec
+    self._threads = threads
 
   def collect(self, paths):
     # In our tests, gzip is slightly less compressive than bzip2 on .class files,
     # but decompression times are much faster.
-    mode = 'w:gz'
+    try:
+      with open(self._tarfile, 'wb') as fp:
+        with CompressingWriter(fp, self._codec, self._compression, self._threads) as out:
+          with open_tar(out, 'w|', dereference=True, errorlevel=2) as tarout:
+            for path in paths or ():
+              # Adds dirs recursively.
+              relpath = os.path.relpath(path, self._artifact_root)
+              tarout.add(path, relpath)
+              self._relpaths.add(relpath)
+    except CompressionError as e:
+      raise ArtifactError(str(e))
 
-    tar_kwargs = {'dereference': True, 'errorlevel': 2}
-    tar_kwargs['compresslevel'] = self._compression
+  def extract(self):
+    with open(self._tarfile, 'rb') as fp:
+      self.extract_from(fp)
 
-    with open_tar(self._tarfile, mode, **tar_kwargs) as tarout:
-      for path in paths or ():
-        # Adds dirs recursively.
-        relpath = os.path.relpath(path, self._artifact_root)
-        tarout.add(path, relpath)
-        self._relpaths.add(relpath)
+  def extract_from(self, fileobj):
+    """Extract the files in this artifact, reading its tarball sequentially from fileobj.
 
-  def extract(self):
-    try:
-      with open_tar(self._tarfile, 'r', errorlevel=2) as tarin:
-        # Note: We create all needed paths proactively, even though extractall() can do this for us.
-        # This is because we may be called concurrently on multiple artifacts that share directories,
-        # and there will be a race condition inside extractall(): task T1 A) sees that a directory
-        # doesn't exist and B) tries to create it. But in the gap between A) and B) task T2 creates
-        # the same directory, so T1 throws "File exists" in B).
+    Members are extracted as they are read, so extraction can proceed while the tarball is still
+    being produced, e.g., downloaded.  The artifact's own tarfile is not read.
+    """
+    with read_tarball(fileobj) as tarin:
+      for tarinfo in tarin:
+        # Note: We create all needed paths proactively, rather than letting extract() do it.
+        # This is because we may be called concurrently on multiple artifacts that share
+        # directories, and there will be a race condition inside extract(): task T1 A) sees that a
+        # directory doesn't exist and B) tries to create it. But in the gap between A) and B) task
+        # T2 creates the same directory, so T1 throws "File exists" in B).
         # This actually happened, and was very hard to debug.
         # Creating the paths here up front allows us to squelch that "File exists" error.
-        paths = []
-        dirs = set()
-        for tarinfo in tarin.getmembers():
-          paths.append(tarinfo.name)
+        self._makedirs(self._dir_for(tarinfo))
+        # Track the member before extracting it, so that a partial extraction is known too.
+        self._relpaths.add(tarinfo.name)
+        tarin.extract(tarinfo, self._artifact_root)
+
+  @staticmethod
+  def _dir_for(tarinfo):
+    return tarinfo.name if tarinfo.isdir() else os.path.dirname(tarinfo.name)
+
+  def _makedirs(self, relpath):
+    try:
+      os.makedirs(os.path.join(self._artifact_root, relpath))
+    except OSError as e:
+      if e.errno != errno.EEXIST:
+        raise
+
+
+class ContentAddressedArtifact(Artifact):
+  """An artifact stored as a manifest of files whose contents are kept in a shared blob store.
+
+  Each file's contents are stored once in the blob store, under their sha1, no matter how many
+  artifacts contain it.  The manifest lists the directories and files of the artifact, and for
+  each file the hash, permission bits and size of its contents.  Extraction copies blobs into place,
+  so files under artifact_root never share storage with the blob store and can be freely modified.
+  """
+
+  _BUFSIZE = 64 * 1024
+
+  @classmethod
+  def read_manifest(cls, manifest):
+    """Returns the entries of the given manifest.
+
+    Directory entries are ('d', relpath) and file entries are ('f', relpath, sha, mode, size).
+    """
+    entries = []
+    with open(manifest, 'rb') as fp:
+      for line in fp:
+        line = line.decode('utf-8').rstrip('\n')
+        if line.startswith('d '):
+          entries.append(('d', line[2:]))
+        elif line.startswith('f '):
+          _, sha, mode, size, relpath = line.split(' ', 4)
+          entries.append(('f', relpath, sha, int(mode, 8), int(size)))
+        else:
+          raise ArtifactError('Corrupt artifact manifest {0}: {1!r}'.format(manifest, line))
+    return entries
+
+  @staticmethod
+  def blob_path(blob_dir, sha):
+    return os.path.join(blob_dir, sha[:2], sha)
+
+  def __init__(self, artifact_root, manifest, blob_dir):
+    """
+    :param str artifact_root: The path under which the artifact's files are read/written.
+    :param str manifest: The path of the artifact's manifest.
+    :param str blob_dir: The blob store shared by all artifacts of a cache.
+    """
+    Artifact.__init__(self, artifact_root)
+    self._manifest = manifest
+    self._blob_dir = blob_dir
+
+  def collect(self, paths):
+    entries = []
+    for path in paths or ():
+      relpath = os.path.relpath(path, self._artifact_root)
+      if os.path.isdir(path):
+        entries.append(('d', relpath))
+        for dir_name, dirnames, filenames in safe_walk(path, followlinks=True):
+          dirnames.sort()
+          for dirname in dirnames:
+            entries.append(('d', os.path.relpath(os.path.join(dir_name, dirname),
+                                                 self._artifact_root)))
+          for filename in sorted(filenames):
+            entries.append(self._collect_file(os.path.join(dir_name, filename)))
+      else:
+        entries.append(self._collect_file(path))
+      self._relpaths.add(relpath)
+    self._write_manifest(entries)
+
+  def collect_tarball(self, tarball):
+    """Collect the files in the given tarball, as created by a TarballArtifact, into this artifact.
+
+    The tarball's files are stored directly, rather than via artifact_root.
+    """
+    entries = []
+    with open(tarball, 'rb') as fp:
+      with read_tarball(fp) as tarin:
+        for tarinfo in tarin:
           if tarinfo.isdir():
-            dirs.add(tarinfo.name)
+            entries.append(('d', tarinfo.name))
+          elif tarinfo.isfile():
+            sha = self._store_blob(tarin.extractfile(tarinfo))
+            entries.append(('f', tarinfo.name, sha, stat.S_IMODE(tarinfo.mode), tarinfo.size))
           else:
-            dirs.add(os.path.dirname(tarinfo.name))
-        for d in dirs:
-          try:
-            os.makedirs(os.path.join(self._artifact_root, d))
-          except OSError as e:
-            if e.errno != errno.EEXIST:
-              raise
-        tarin.extractall(self._artifact_root)
-        self._relpaths.update(paths)
-    except tarfile.ReadError as e:
+            raise ArtifactError('Unsupported member {0} in {1}'.format(tarinfo.name, tarball))
+          self._relpaths.add(tarinfo.name)
+    self._write_manifest(entries)
+
+  def extract(self):
+    try:
+      entries = self.read_manifest(self._manifest)
+    except IOError as e:
       raise ArtifactError(str(e))
+    for entry in entries:
+      if entry[0] == 'd':
+        safe_mkdir(os.path.join(self._artifact_root, entry[1]))
+        self._relpaths.add(entry[1])
+    for entry in entries:
+      if entry[0] == 'f':
+        _, relpath, sha, mode, _ = entry
+        dst = os.path.join(self._artifact_root, relpath)
+        safe_mkdir_for(dst)
+        # Write a fresh file rather than into any existing one, which might be hardlinked elsewhere.
+        with temporary_file(root_dir=os.path.dirname(dst), cleanup=False) as tmp:
+          try:
+            with open(self.blob_path(self._blob_dir, sha), 'rb') as blob:
+              shutil.copyfileobj(blob, tmp, self._BUFSIZE)
+          except IOError as e:
+            tmp.close()
+            os.unlink(tmp.name)
+            raise ArtifactError('Missing blob for {0}: {1}'.format(relpath, e))
+        os.chmod(tmp.name, mode)
+        os.rename(tmp.name, dst)
+        self._relpaths.add(relpath)
+
+  def _collect_file(self, path):
+    st = os.stat(path)
+    hasher = sha1()
+    with open(path, 'rb') as fp:
+      for chunk in iter(lambda: fp.read(self._BUFSIZE), b''):
+        hasher.update(chunk)
+    sha = hasher.hexdigest()
+    if not self._reuse_blob(sha):
+      with open(path, 'rb') as fp:
+        self._store_blob(fp)
+    return ('f', os.path.relpath(path, self._artifact_root), sha, stat.S_IMODE(st.st_mode),
+            st.st_size)
+
+  def _reuse_blob(self, sha):
+    try:
+      # Refresh the blob's mtime, so that it is not collected as garbage before our manifest exists.
+      os.utime(self.blob_path(self._blob_dir, sha), None)
+      return True
+    except OSError:
+      return False
+
+  def _store_blob(self, fileobj):
+    """Stores the contents of fileobj in the blob store and returns their sha1."""
+    safe_mkdir(self._blob_dir)
+    hasher = sha1()
+    with temporary_file(root_dir=self._blob_dir, cleanup=False) as tmp:
+      for chunk in iter(lambda: fileobj.read(self._BUFSIZE), b''):
+        hasher.update(chunk)
+        tmp.write(chunk)
+    sha = hasher.hexdigest()
+    if self._reuse_blob(sha):
+      os.unlink(tmp.name)
+    else:
+      dst = self.blob_path(self._blob_dir, sha)
+      safe_mkdir_for(dst)
+      # Blobs are only ever replaced by identical contents, so racing writers are harmless.
+      os.rename(tmp.name, dst)
+    return sha
+
+  def _write_manifest(self, entries):
+    safe_mkdir_for(self._manifest)
+    with temporary_file(root_dir=os.path.dirname(self._manifest), cleanup=False) as tmp:
+      for entry in entries:
+        if entry[0] == 'd':
+          tmp.write('d {0}\n'.format(entry[1]).encode('utf-8'))
+        else:
+          _, relpath, sha, mode, size = entry
+          tmp.write('f {0} {1:o} {2} {3}\n'.format(sha, mode, size, relpath).encode('utf-8'))
+    os.rename(tmp.name, self._manifest)
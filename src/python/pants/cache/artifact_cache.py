@@ -100,6 +100,17 @@ class ArtifactCache(object):
   def has(self, cache_key):
     pass
 
+  def has_many(self, cache_keys):
+    """Check which of several keys are in the cache.
+
+    Implementations may override this to answer for all the keys at once, e.g., in a single
+    request to a remote cache.
+
+    :param list cache_keys: A list of CacheKey objects.
+    :returns: A list of booleans, indicating whether the corresponding key is in the cache.
+    """
+    return [bool(self.has(cache_key)) for cache_key in cache_keys]
+
   def use_cached_files(self, cache_key):
     """Use the files cached for the given key.
 
@@ -129,6 +140,13 @@ class ArtifactCache(object):
     """
     pass
 
+  def prune(self):
+    """Evict artifacts as needed to keep the cache within any configured bounds.
+
+    This may be slow, so callers should call it off the critical path, e.g., in background work.
+    """
+    pass
+
 def call_use_cached_files(tup):
   """Importable helper for multi-proc calling of ArtifactCache.use_cached_files on a cache instance.
 
@@ -11,7 +11,9 @@ import urlparse
 from six.moves import range
 
 from pants.cache.artifact_cache import ArtifactCacheError
-from pants.cache.local_artifact_cache import LocalArtifactCache, TempLocalArtifactCache
+from pants.cache.compression import codec_available
+from pants.cache.local_artifact_cache import (ContentAddressedLocalArtifactCache,
+                                              LocalArtifactCache, TempLocalArtifactCache)
 from pants.cache.pinger import Pinger
 from pants.cache.restful_artifact_cache import RESTfulArtifactCache
 
@@ -45,7 +47,8 @@ def select_best_url(spec, pinger, log):
 
 
 def create_artifact_cache(log, artifact_root, spec, task_name, compression,
-                          action='using', local=None):
+                          action='using', local=None, bulk_lookup=False, max_entries=None,
+                          max_bytes=None, dedup=False, codec='gzip', compression_threads=1):
   """Returns an artifact cache for the specified spec.
 
   spec can be:
@@ -58,23 +61,35 @@ def create_artifact_cache(log, artifact_root, spec, task_name, compression,
   :param str artifact_root: The path under which cacheable products will be read/written.
   :param str spec: See above.
   :param str task_name: The name of the task using this cache (eg 'ScalaCompile')
-  :param int compression: The gzip compression level for created artifacts.
-                          Valid values are 0-9.  0 means that gzip is used in a mode where it
-                          does not compress the input data; this is used for its side-effect of
-                          providing checksums.
+  :param int compression: The compression level for created artifacts.
+                          Valid values are 0-9.  With gzip, 0 means that gzip is used in a mode
+                          where it does not compress the input data; this is used for its
+                          side-effect of providing checksums.
   :param str action: A verb, eg 'read' or 'write' for printed messages.
   :param LocalArtifactCache local: A local cache for use by created remote caches
+  :param bool bulk_lookup: Whether created remote caches should try bulk existence checks.
+  :param int max_entries: The maximum number of artifacts created local caches should keep.
+  :param int max_bytes: The maximum total size of the artifacts created local caches should keep.
+  :param bool dedup: Whether created local caches should store each distinct file only once.
+  :param str codec: The codec to compress created artifacts with. Falls back to gzip if the codec
+                    is not available.
+  :param int compression_threads: The number of threads to compress created artifacts with.
   """
   if not spec:
     raise EmptyCacheSpecError()
   if compression not in range(10):
     raise ValueError('compression value must be an integer between 0 and 9 inclusive: {com}'.format(
       com=compression))
+  if not codec_available(codec):
+    log.warn('The {0} artifact cache codec is not available, using gzip.'.format(codec))
+    codec = 'gzip'
 
   def recurse(new_spec, new_local=local):
     return create_artifact_cache(log=log, artifact_root=artifact_root, spec=new_spec,
                                  task_name=task_name, compression=compression, action=action,
-                                 local=new_local)
+                                 local=new_local, bulk_lookup=bulk_lookup,
+                                 max_entries=max_entries, max_bytes=max_bytes, dedup=dedup,
+                                 codec=codec, compression_threads=compression_threads)
 
   def is_remote(spec):
     return spec.startswith('http://') or spec.startswith('https://')
@@ -83,7 +98,9 @@ def create_artifact_cache(log, artifact_root, spec, task_name, compression,
     if spec.startswith('/') or spec.startswith('~'):
       path = os.path.join(spec, task_name)
       log.debug('{0} {1} local artifact cache at {2}'.format(task_name, action, path))
-      return LocalArtifactCache(artifact_root, path, compression)
+      cache_type = ContentAddressedLocalArtifactCache if dedup else LocalArtifactCache
+      return cache_type(artifact_root, path, compression, max_entries=max_entries,
+                        max_bytes=max_bytes, codec=codec, compression_threads=compression_threads)
     elif is_remote(spec):
       # Caches are supposed to be close, and we don't want to waste time pinging on no-op builds.
       # So we ping twice with a short timeout.
@@ -92,8 +109,9 @@ def create_artifact_cache(log, artifact_root, spec, task_name, compression,
       if best_url:
         url = best_url.rstrip('/') + '/' + task_name
         log.debug('{0} {1} remote artifact cache at {2}'.format(task_name, action, url))
-        local = local or TempLocalArtifactCache(artifact_root, compression)
-        return RESTfulArtifactCache(artifact_root, url, local)
+        local = local or TempLocalArtifactCache(artifact_root, compression, codec=codec,
+                                                compression_threads=compression_threads)
+        return RESTfulArtifactCache(artifact_root, url, local, bulk_lookup=bulk_lookup)
       else:
         log.warn('{0} has no reachable artifact cache in {1}.'.format(task_name, spec))
         return None
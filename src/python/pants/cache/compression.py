@@ -0,0 +1,256 @@
+# coding=utf-8
+# Copyright 2015 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (absolute_import, division, generators, nested_scopes, print_function,
+                        unicode_literals, with_statement)
+
+import collections
+import zlib
+from multiprocessing.pool import ThreadPool
+
+
+# The lz4 and zstd codecs are available only if their optional modules are installed.
+try:
+  import lz4.frame as lz4_frame
+except ImportError:
+  lz4_frame = None
+
+try:
+  import zstandard
+except ImportError:
+  zstandard = None
+
+
+class CompressionError(Exception):
+  pass
+
+
+CODECS = ('none', 'gzip', 'lz4', 'zstd')
+
+# The extensions of tarballs compressed with each codec.  Artifacts created with different codecs
+# are stored apart, so that pants versions that predate a codec find no artifact rather than one
+# they can't read.
+TARBALL_EXTENSIONS = {'none': '.tar', 'gzip': '.tgz', 'lz4': '.tar.lz4', 'zstd': '.tar.zst'}
+
+_GZIP_MAGIC = b'\x1f\x8b'
+_LZ4_MAGIC = b'\x04\x22\x4d\x18'
+_ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+_MAGIC_LEN = 4
+
+
+def codec_available(codec):
+  """Returns whether the named codec can be used in this interpreter."""
+  if codec == 'lz4':
+    return lz4_frame is not None
+  if codec == 'zstd':
+    return zstandard is not None
+  return codec in CODECS
+
+
+class _Identity(object):
+  """A codec that leaves data as is, with the interface of zlib (de)compression objects."""
+
+  def compress(self, data):
+    return data
+
+  def flush(self):
+    return b''
+
+  def decompress(self, data):
+    return data
+
+
+def _gzip_compressobj(level):
+  # The wbits offset has zlib write a gzip header and trailer, so that the output is a gzip member.
+  return zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+
+class _Lz4Compressor(object):
+  """Adapts an lz4 frame compressor to the interface of zlib compression objects."""
+
+  def __init__(self):
+    self._compressor = lz4_frame.LZ4FrameCompressor()
+    self._started = False
+
+  def compress(self, data):
+    header = b''
+    if not self._started:
+      header = self._compressor.begin()
+      self._started = True
+    return header + self._compressor.compress(data)
+
+  def flush(self):
+    return self.compress(b'') + self._compressor.flush()
+
+
+def _compressobj(codec, level):
+  if not codec_available(codec):
+    raise CompressionError('The {0} codec is not available.'.format(codec))
+  if codec == 'none':
+    return _Identity()
+  elif codec == 'gzip':
+    return _gzip_compressobj(level)
+  elif codec == 'lz4':
+    return _Lz4Compressor()
+  else:
+    return zstandard.ZstdCompressor(level=level).compressobj()
+
+
+class CompressingWriter(object):
+  """A write-only file-like object that compresses what is written to it into another file.
+
+  With more than one thread, gzip output is compressed in blocks across a pool of threads, each
+  block becoming a separate gzip member.  A sequence of gzip members is itself a valid gzip stream,
+  so the output can be read by any gzip reader.  zlib releases the GIL while compressing, so the
+  blocks really are compressed in parallel.
+
+  The underlying file is not closed by `close`.
+  """
+
+  _BLOCK_SIZE = 1024 * 1024
+
+  def __init__(self, fileobj, codec='gzip', level=9, threads=1):
+    """
+    :param fileobj: The file to write compressed output to.
+    :param str codec: One of CODECS.
+    :param int level: The compression level, with the meaning given to it by the codec.
+    :param int threads: The number of threads to compress gzip output with.
+    """
+    self._fileobj = fileobj
+    self._level = level
+    self._pool = None
+    self._compressor = None
+    if codec == 'gzip' and threads > 1:
+      self._pool = ThreadPool(threads)
+      # Bound the output held in memory, while keeping every thread busy.
+      self._max_pending = 2 * threads
+      self._pending = collections.deque()
+      self._block = []
+      self._block_len = 0
+    else:
+      self._compressor = _compressobj(codec, level)
+
+  def write(self, data):
+    if self._pool is None:
+      self._fileobj.write(self._compressor.compress(data))
+      return
+    self._block.append(data)
+    self._block_len += len(data)
+    if self._block_len >= self._BLOCK_SIZE:
+      self._submit_block()
+
+  def close(self):
+    if self._pool is None:
+      if self._compressor:
+        self._fileobj.write(self._compressor.flush())
+        self._compressor = None
+      return
+    try:
+      if self._block_len:
+        self._submit_block()
+      while self._pending:
+        self._write_pending()
+    finally:
+      self._pool.close()
+      self._pool = None
+      self._compressor = None
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, exc_type, exc_val, exc_tb):
+    if exc_type is None:
+      self.close()
+    elif self._pool is not None:
+      self._pool.terminate()
+      self._pool = None
+
+  def _submit_block(self):
+    block = b''.join(self._block)
+    self._block = []
+    self._block_len = 0
+    self._pending.append(self._pool.apply_async(_compress_gzip_member, (block, self._level)))
+    while len(self._pending) > self._max_pending:
+      self._write_pending()
+
+  def _write_pending(self):
+    # Use a timeout so that ctrl-c still works while waiting.
+    self._fileobj.write(self._pending.popleft().get(timeout=1000000000))
+
+
+def _compress_gzip_member(block, level):
+  compressor = _gzip_compressobj(level)
+  return compressor.compress(block) + compressor.flush()
+
+
+class DecompressingReader(object):
+  """A read-only, sequential file-like object that decompresses another file as it is read.
+
+  The codec is detected from the leading bytes of the file, and anything not recognized as
+  compressed is passed through as is.  Gzip streams may consist of several members.
+  """
+
+  _CHUNK_SIZE = 64 * 1024
+
+  def __init__(self, fileobj):
+    self._fileobj = fileobj
+    prefix = b''
+    while len(prefix) < _MAGIC_LEN:
+      chunk = fileobj.read(_MAGIC_LEN - len(prefix))
+      if not chunk:
+        break
+      prefix += chunk
+    self._gzip = prefix.startswith(_GZIP_MAGIC)
+    self._decompressor = self._decompressobj(prefix)
+    self._pending = prefix
+    # Decompressed data is consumed by advancing an offset into it, rather than by slicing off what
+    # was read, which would copy the rest of the buffer on every read.
+    self._buf = b''
+    self._pos = 0
+
+  def _decompressobj(self, prefix):
+    if self._gzip:
+      return zlib.decompressobj(16 + zlib.MAX_WBITS)
+    elif prefix.startswith(_LZ4_MAGIC):
+      if lz4_frame is None:
+        raise CompressionError('Reading lz4 data requires the lz4 module.')
+      return lz4_frame.LZ4FrameDecompressor()
+    elif prefix.startswith(_ZSTD_MAGIC):
+      if zstandard is None:
+        raise CompressionError('Reading zstd data requires the zstandard module.')
+      return zstandard.ZstdDecompressor().decompressobj()
+    else:
+      return _Identity()
+
+  def _fill(self):
+    """Decompresses more data into the buffer, returning False at the end of the input."""
+    while self._pos >= len(self._buf):
+      data = self._pending or self._fileobj.read(self._CHUNK_SIZE)
+      self._pending = b''
+      if not data:
+        return False
+      try:
+        self._buf, self._pos = self._decompressor.decompress(data), 0
+        if self._gzip and self._decompressor.unused_data:
+          # The end of a gzip member, followed by another.
+          self._pending = self._decompressor.unused_data
+          self._decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+      except zlib.error as e:
+        raise CompressionError(str(e))
+    return True
+
+  def read(self, size=-1):
+    parts = []
+    remaining = size
+    while size < 0 or remaining > 0:
+      if self._pos >= len(self._buf) and not self._fill():
+        break
+      end = len(self._buf) if size < 0 else min(len(self._buf), self._pos + remaining)
+      parts.append(self._buf[self._pos:end])
+      remaining -= end - self._pos
+      self._pos = end
+    return b''.join(parts)
+
+  def close(self):
+    pass
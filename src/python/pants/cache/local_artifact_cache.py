@@ -7,29 +7,122 @@ from __future__ import (absolute_import, division, generators, nested_scopes, pr
 
 import logging
 import os
+import Queue as queue
+import sys
+import threading
+import time
 from contextlib import contextmanager
 
-from pants.cache.artifact import TarballArtifact
+import six
+
+from pants.cache.artifact import ContentAddressedArtifact, TarballArtifact
 from pants.cache.artifact_cache import ArtifactCache, UnreadableArtifact
+from pants.cache.compression import TARBALL_EXTENSIONS
 from pants.util.contextutil import temporary_file
 from pants.util.dirutil import safe_delete, safe_mkdir, safe_mkdir_for
 
 
 logger = logging.getLogger(__name__)
 
+
+class _ChunkStream(object):
+  """A read-only, sequential file-like view of an iterator of byte chunks.
+
+  Chunks are pulled from the iterator on a background thread and written to a tee file before being
+  handed to the reader through a bounded queue.  This overlaps producing the chunks, e.g., reading
+  them off the network, with consuming them, e.g., decompressing and extracting them.
+  """
+
+  _DONE = object()
+
+  class _Failure(object):
+    def __init__(self, exc_info):
+      self.exc_info = exc_info
+
+  def __init__(self, chunks, tee, max_buffered_chunks=4):
+    self._queue = queue.Queue(maxsize=max_buffered_chunks)
+    self._closed = threading.Event()
+    self._chunk = b''
+    self._pos = 0
+    self._eof = False
+    self._producer = threading.Thread(target=self._produce, args=(chunks, tee))
+    self._producer.daemon = True
+    self._producer.start()
+
+  def _produce(self, chunks, tee):
+    try:
+      for chunk in chunks:
+        tee.write(chunk)
+        if not self._put(chunk):
+          return
+      self._put(self._DONE)
+    except Exception:
+      self._put(self._Failure(sys.exc_info()))
+
+  def _put(self, item):
+    while not self._closed.is_set():
+      try:
+        self._queue.put(item, timeout=0.1)
+        return True
+      except queue.Full:
+        pass
+    return False
+
+  def _next_chunk(self):
+    if self._eof:
+      return False
+    item = self._queue.get()
+    if item is self._DONE:
+      self._eof = True
+      return False
+    if isinstance(item, self._Failure):
+      self._eof = True
+      # Re-raise with the producer's traceback, which locates the failure.
+      six.reraise(*item.exc_info)
+    self._chunk, self._pos = item, 0
+    return True
+
+  def read(self, size=-1):
+    parts = []
+    remaining = size
+    while size < 0 or remaining > 0:
+      if self._pos >= len(self._chunk) and not self._next_chunk():
+        break
+      end = len(self._chunk) if size < 0 else min(len(self._chunk), self._pos + remaining)
+      parts.append(self._chunk[self._pos:end])
+      remaining -= end - self._pos
+      self._pos = end
+    return b''.join(parts)
+
+  def close(self):
+    """Stops the producer, which will have teed all chunks if this stream was read to the end."""
+    self._closed.set()
+    self._producer.join()
+
+
 class BaseLocalArtifactCache(ArtifactCache):
-  def __init__(self, artifact_root, compression):
+  def __init__(self, artifact_root, compression, codec='gzip', compression_threads=1):
     """
     :param str artifact_root: The path under which cacheable products will be read/written.
-    :param int compression: The gzip compression level for created artifacts.
+    :param int compression: The compression level for created artifacts.
                             Valid values are 0-9.
+    :param str codec: The codec to compress created artifacts with.
+    :param int compression_threads: The number of threads to compress created artifacts with.
     """
     super(BaseLocalArtifactCache, self).__init__(artifact_root)
     self._compression = compression
+    self._codec = codec
+    self._compression_threads = compression_threads
     self._cache_root = None
 
+  @property
+  def tarball_extension(self):
+    """The extension of the tarballs this cache creates, which depends on their codec."""
+    return TARBALL_EXTENSIONS[self._codec]
+
   def _artifact(self, path):
-    return TarballArtifact(self.artifact_root, path, self._compression)
+    return TarballArtifact(self.artifact_root, path, self._compression, codec=self._codec,
+                           threads=self._compression_threads)
 
   @contextmanager
   def _tmpfile(self, cache_key, use):
@@ -47,34 +140,93 @@ class BaseLocalArtifactCache(ArtifactCache):
   def store_and_use_artifact(self, cache_key, src):
     """
       Read the contents of an tarball from an iterator and return an artifact stored in the cache
+
+      The tarball is extracted as it is read, while also being written to the cache, rather than
+      being extracted from the cache only once it has been read in full.  If reading or extracting
+      it fails, the files extracted so far are removed, so that no partial artifact is left behind.
     """
     with self._tmpfile(cache_key, 'read') as tmp:
-      for chunk in src:
-        tmp.write(chunk)
+      stream = _ChunkStream(src, tmp)
+      artifact = self._artifact(tmp.name)
+      try:
+        artifact.extract_from(stream)
+        # Consume any trailing padding, so that the whole tarball is stored.
+        stream.read()
+      except Exception:
+        exc_info = sys.exc_info()
+        self._remove_extracted(artifact)
+        six.reraise(*exc_info)
+      finally:
+        stream.close()
       tmp.close()
-      self._artifact(self._store_tarball(cache_key, tmp.name)).extract()
+      self._store_tarball(cache_key, tmp.name)
       return True
 
   def _store_tarball(self, cache_key, src):
     """Given a src path to an artifact tarball, store it and return stored artifact's path."""
     pass
 
+  @staticmethod
+  def _remove_extracted(artifact):
+    # Directories are left, as they may be shared with other artifacts or have predated this one.
+    for path in artifact.get_paths():
+      if os.path.islink(path) or os.path.isfile(path):
+        safe_delete(path)
+
+
 class LocalArtifactCache(BaseLocalArtifactCache):
-  """An artifact cache that stores the artifacts in local files."""
-  def __init__(self, artifact_root, cache_root, compression):
+  """An artifact cache that stores the artifacts in local files.
+
+  The cache may be bounded in the number of artifacts and/or in their total size, in which case
+  `prune` evicts the least recently used artifacts once a bound is exceeded.  Recency is tracked
+  by the mtime of each artifact, which is refreshed whenever the artifact is used.
+
+  Hits, misses and evictions are appended to a ledger in the cache root, and reported by `stats`.
+  """
+
+  STATS_FILE = '.stats'
+
+  # Artifacts created with any codec count towards the bounds, whichever codec is now in use.
+  _ARTIFACT_EXTS = tuple(TARBALL_EXTENSIONS.values())
+
+  # Each insert may trigger a prune, so bound how often the cache is actually scanned.
+  _PRUNE_INTERVAL_SECS = 10
+
+  # Once the ledger grows beyond this size, pruning folds it into a single line of totals.
+  _MAX_STATS_FILE_BYTES = 1024 * 1024
+
+  def __init__(self, artifact_root, cache_root, compression, max_entries=None, max_bytes=None,
+               codec='gzip', compression_threads=1):
     """
     :param str artifact_root: The path under which cacheable products will be read/written.
     :param str cache_root: The locally cached files are stored under this directory.
-    :param int compression: The gzip compression level for created artifacts (1-9 or false-y).
+    :param int compression: The compression level for created artifacts (1-9 or false-y).
+    :param int max_entries: The maximum number of artifacts to keep, or None for no limit.
+    :param int max_bytes: The maximum total size of the artifacts to keep, or None for no limit.
+    :param str codec: The codec to compress created artifacts with.
+    :param int compression_threads: The number of threads to compress created artifacts with.
     """
-    super(LocalArtifactCache, self).__init__(artifact_root, compression)
+    super(LocalArtifactCache, self).__init__(artifact_root, compression, codec=codec,
+                                             compression_threads=compression_threads)
     self._cache_root = os.path.realpath(os.path.expanduser(cache_root))
+    self._max_entries = max_entries
+    self._max_bytes = max_bytes
+    self._last_prune = 0
 
     safe_mkdir(self._cache_root)
 
   def has(self, cache_key):
     return os.path.isfile(self._cache_file_for_key(cache_key))
 
+  def has_many(self, cache_keys):
+    # Lookups go through here ahead of any reads, so this is where most misses are seen.  `has`
+    # alone is also used to skip redundant inserts, so it records nothing.
+    results = super(LocalArtifactCache, self).has_many(cache_keys)
+    for found in results:
+      if not found:
+        self._record('miss')
+    return results
+
   def _store_tarball(self, cache_key, src):
     dest = self._cache_file_for_key(cache_key)
     safe_mkdir_for(dest)
@@ -85,15 +237,148 @@ class LocalArtifactCache(BaseLocalArtifactCache):
     try:
       tarfile = self._cache_file_for_key(cache_key)
       if os.path.exists(tarfile):
-        self._artifact(tarfile).extract()
+        self._stored_artifact(tarfile).extract()
+        self._touch(tarfile)
+        self._record('hit')
         return True
     except Exception as e:
       # TODO(davidt): Consider being more granular in what is caught.
       logger.warn('Error while reading from local artifact cache: {0}'.format(e))
       return UnreadableArtifact(cache_key, e)
 
+    self._record('miss')
     return False
 
+  def prune(self):
+    """Evicts the least recently used artifacts until the cache is within its bounds.
+
+    A no-op if the cache is unbounded, or if it was pruned within the last few seconds.
+    """
+    if not self._max_entries and not self._max_bytes:
+      return
+    now = time.time()
+    if now - self._last_prune < self._PRUNE_INTERVAL_SECS:
+      return
+    self._last_prune = now
+
+    artifacts = sorted(self._list_artifacts())
+    entries = len(artifacts)
+    total_bytes = sum(size for _, size, _ in artifacts)
+    evicted_entries = 0
+    evicted_bytes = 0
+    for _, size, path in artifacts:
+      if ((not self._max_entries or entries <= self._max_entries) and
+          (not self._max_bytes or total_bytes <= self._max_bytes)):
+        break
+      safe_delete(path)
+      entries -= 1
+      total_bytes -= size
+      evicted_entries += 1
+      evicted_bytes += size
+    if evicted_entries:
+      logger.debug('Evicted {0} artifacts ({1} bytes) from {2}'.format(
+        evicted_entries, evicted_bytes, self._cache_root))
+      self._record('evict {0} {1}'.format(evicted_entries, evicted_bytes))
+      self._collect_garbage()
+    self._compact_stats()
+
+  def stats(self):
+    """Returns a dict describing the contents and usage of this cache.
+
+    The keys are `entries` and `bytes`, for the artifacts currently in the cache, and `hits`,
+    `misses`, `evicted_entries` and `evicted_bytes`, for its recorded history.
+    """
+    artifacts = self._list_artifacts()
+    stats = dict(entries=len(artifacts), bytes=sum(size for _, size, _ in artifacts))
+    stats.update(self._read_stats())
+    return stats
+
+  def _list_artifacts(self):
+    """Returns a list of (mtime, size, path) for each artifact in the cache."""
+    artifacts = []
+    for root, dirs, files in os.walk(self._cache_root):
+      # Skip bookkeeping, like the blob store of a ContentAddressedLocalArtifactCache.
+      dirs[:] = [d for d in dirs if not d.startswith('.')]
+      for f in files:
+        if f.endswith(self._ARTIFACT_EXTS):
+          path = os.path.join(root, f)
+          try:
+            st = os.stat(path)
+          except OSError:
+            # Concurrently evicted.
+            continue
+          artifacts.append((st.st_mtime, self._artifact_size(path, st), path))
+    return artifacts
+
+  def _stored_artifact(self, path):
+    """Returns the artifact stored at the given path in this cache."""
+    return self._artifact(path)
+
+  def _artifact_size(self, path, st):
+    """Returns the number of bytes the artifact stored at path counts against max_bytes."""
+    return st.st_size
+
+  def _collect_garbage(self):
+    """Called after evicting artifacts, to free any storage they no longer need."""
+    pass
+
+  def _touch(self, path):
+    try:
+      os.utime(path, None)
+    except OSError:
+      # Concurrently evicted, which is fine as we've already used it.
+      pass
+
+  def _stats_file(self):
+    return os.path.join(self._cache_root, self.STATS_FILE)
+
+  def _record(self, event):
+    # Lines shorter than PIPE_BUF are appended atomically, so this is safe from concurrent workers.
+    # The stats are informational, so failing to record them is not an error.
+    try:
+      with open(self._stats_file(), 'a') as fp:
+        fp.write(event + '\n')
+    except IOError as e:
+      logger.debug('Failed to record artifact cache stats: {0}'.format(e))
+
+  def _read_stats(self):
+    counts = dict(hits=0, misses=0, evicted_entries=0, evicted_bytes=0)
+    try:
+      with open(self._stats_file(), 'r') as fp:
+        for line in fp:
+          fields = line.split()
+          try:
+            if fields == ['hit']:
+              counts['hits'] += 1
+            elif fields == ['miss']:
+              counts['misses'] += 1
+            elif len(fields) == 3 and fields[0] == 'evict':
+              counts['evicted_entries'] += int(fields[1])
+              counts['evicted_bytes'] += int(fields[2])
+            elif len(fields) == 5 and fields[0] == 'totals':
+              for name, value in zip(('hits', 'misses', 'evicted_entries', 'evicted_bytes'),
+                                     fields[1:]):
+                counts[name] += int(value)
+          except ValueError:
+            # Skip any line truncated by a crash.
+            pass
+    except IOError:
+      pass
+    return counts
+
+  def _compact_stats(self):
+    try:
+      if os.path.getsize(self._stats_file()) < self._MAX_STATS_FILE_BYTES:
+        return
+    except OSError:
+      return
+    counts = self._read_stats()
+    # Events recorded between reading and replacing the ledger are lost, which is acceptable for
+    # informational stats.
+    with temporary_file(root_dir=self._cache_root, cleanup=False) as tmp:
+      tmp.write('totals {hits} {misses} {evicted_entries} {evicted_bytes}\n'.format(**counts))
+    os.rename(tmp.name, self._stats_file())
+
   def try_insert(self, cache_key, paths):
     with self.insert_paths(cache_key, paths) as tmp:
       pass
@@ -104,7 +389,95 @@ class LocalArtifactCache(BaseLocalArtifactCache):
   def _cache_file_for_key(self, cache_key):
     # Note: it's important to use the id as well as the hash, because two different targets
     # may have the same hash if both have no sources, but we may still want to differentiate them.
-    return os.path.join(self._cache_root, cache_key.id, cache_key.hash) + '.tgz'
+    return os.path.join(self._cache_root, cache_key.id, cache_key.hash) + self._artifact_ext()
+
+  def _artifact_ext(self):
+    return self.tarball_extension
+
+
+class ContentAddressedLocalArtifactCache(LocalArtifactCache):
+  """A local artifact cache that stores each distinct file once, however many artifacts contain it.
+
+  Each artifact is a manifest under `<cache_root>/<id>/<hash>.manifest`, and the contents of its
+  files are stored by hash in a blob store shared by all the artifacts in the cache.  Inserting an
+  artifact only copies files whose contents aren't already stored, and extracting one copies its
+  files into place without any decompression.
+
+  For the purposes of `max_bytes`, each artifact counts the full size of its files, so the cache
+  never uses more than that on disk.  Blobs are collected once no manifest refers to them.
+  """
+
+  BLOB_DIR = '.blobs'
+
+  _ARTIFACT_EXTS = ('.manifest',)
+
+  # Blobs younger than this are not collected, as their manifests may still be being written.
+  _BLOB_GRACE_SECS = 3600
+
+  def __init__(self, artifact_root, cache_root, compression, max_entries=None, max_bytes=None,
+               codec='gzip', compression_threads=1):
+    """
+    :param str artifact_root: The path under which cacheable products will be read/written.
+    :param str cache_root: The locally cached files are stored under this directory.
+    :param int compression: The compression level for tarballs exchanged with remote caches.
+    :param int max_entries: The maximum number of artifacts to keep, or None for no limit.
+    :param int max_bytes: The maximum total size of the artifacts to keep, or None for no limit.
+    :param str codec: The codec to compress tarballs exchanged with remote caches with.
+    :param int compression_threads: The number of threads to compress tarballs with.
+    """
+    super(ContentAddressedLocalArtifactCache, self).__init__(
+      artifact_root, cache_root, compression, max_entries=max_entries, max_bytes=max_bytes,
+      codec=codec, compression_threads=compression_threads)
+    self._blob_dir = os.path.join(self._cache_root, self.BLOB_DIR)
+
+  @contextmanager
+  def insert_paths(self, cache_key, paths):
+    # Remote caches exchange tarballs, so create one for them as well as storing the files.
+    with self._tmpfile(cache_key, 'write') as tmp:
+      self._artifact(tmp.name).collect(paths)
+      self.try_insert(cache_key, paths)
+      yield tmp.name
+
+  def try_insert(self, cache_key, paths):
+    self._stored_artifact(self._cache_file_for_key(cache_key)).collect(paths)
+
+  def _store_tarball(self, cache_key, src):
+    dest = self._cache_file_for_key(cache_key)
+    self._stored_artifact(dest).collect_tarball(src)
+    return dest
+
+  def _stored_artifact(self, path):
+    return ContentAddressedArtifact(self.artifact_root, path, self._blob_dir)
+
+  def _artifact_ext(self):
+    return self._ARTIFACT_EXTS[0]
+
+  def _artifact_size(self, path, st):
+    try:
+      entries = ContentAddressedArtifact.read_manifest(path)
+    except Exception:
+      return st.st_size
+    return st.st_size + sum(entry[4] for entry in entries if entry[0] == 'f')
+
+  def _collect_garbage(self):
+    referenced = set()
+    for _, _, path in self._list_artifacts():
+      try:
+        entries = ContentAddressedArtifact.read_manifest(path)
+      except Exception:
+        # Concurrently evicted, or corrupt: either way it won't be extracted.
+        continue
+      referenced.update(entry[2] for entry in entries if entry[0] == 'f')
+
+    horizon = time.time() - self._BLOB_GRACE_SECS
+    for root, _, files in os.walk(self._blob_dir):
+      for f in files:
+        path = os.path.join(root, f)
+        try:
+          if f not in referenced and os.path.getmtime(path) < horizon:
+            os.unlink(path)
+        except OSError:
+          pass
 
 
 class TempLocalArtifactCache(BaseLocalArtifactCache):
@@ -113,11 +486,13 @@ class TempLocalArtifactCache(BaseLocalArtifactCache):
     This implementation does not have a backing _cache_root, and never
     actually stores files between calls, but is useful for handling file IO for a remote cache.
   """
-  def __init__(self, artifact_root, compression):
+  def __init__(self, artifact_root, compression, codec='gzip', compression_threads=1):
     """
     :param str artifact_root: The path under which cacheable products will be read/written.
     """
-    super(TempLocalArtifactCache, self).__init__(artifact_root, compression=compression)
+    super(TempLocalArtifactCache, self).__init__(artifact_root, compression=compression,
+                                                 codec=codec,
+                                                 compression_threads=compression_threads)
 
   def _store_tarball(self, cache_key, src):
     return src
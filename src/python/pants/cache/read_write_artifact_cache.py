@@ -43,6 +43,12 @@ class ReadWriteArtifactCache(ArtifactCache):
     else:
       return False
 
+  def has_many(self, cache_keys):
+    if self._read_artifact_cache:
+      return self._read_artifact_cache.has_many(cache_keys)
+    else:
+      return [False] * len(cache_keys)
+
   def use_cached_files(self, cache_key):
     if self._read_artifact_cache:
       return self._read_artifact_cache.use_cached_files(cache_key)
@@ -52,3 +58,9 @@ class ReadWriteArtifactCache(ArtifactCache):
   def delete(self, cache_key):
     if self._write_artifact_cache:
       self._write_artifact_cache.delete(cache_key)
+
+  def prune(self):
+    if self._read_artifact_cache:
+      self._read_artifact_cache.prune()
+    if self._write_artifact_cache and self._write_artifact_cache is not self._read_artifact_cache:
+      self._write_artifact_cache.prune()
@@ -7,9 +7,11 @@ from __future__ import (absolute_import, division, generators, nested_scopes, pr
 
 import logging
 import urlparse
+from multiprocessing.pool import ThreadPool
 
 import requests
 from requests import RequestException
+from requests.adapters import HTTPAdapter
 
 from pants.cache.artifact_cache import (ArtifactCache, ArtifactCacheError,
                                         NonfatalArtifactCacheError, UnreadableArtifact)
@@ -26,11 +28,18 @@ class InvalidRESTfulCacheProtoError(ArtifactCacheError):
   pass
 
 class RequestsSession(object):
+  # The number of keep-alive connections to pool per host; enough for the concurrent requests made
+  # by RESTfulArtifactCache's batch operations.
+  MAX_CONNECTIONS = 16
+
   _session = None
   @classmethod
   def instance(cls):
     if cls._session is None:
       cls._session = requests.Session()
+      adapter = HTTPAdapter(pool_maxsize=cls.MAX_CONNECTIONS)
+      cls._session.mount('http://', adapter)
+      cls._session.mount('https://', adapter)
     return cls._session
 
 class RESTfulArtifactCache(ArtifactCache):
@@ -38,12 +47,20 @@ class RESTfulArtifactCache(ArtifactCache):
 
   READ_SIZE_BYTES = 4 * 1024 * 1024
 
-  def __init__(self, artifact_root, url_base, local):
+  # Bulk lookups are given up on for the rest of the run after this many fail in a row.
+  MAX_BULK_LOOKUP_FAILURES = 3
+
+  def __init__(self, artifact_root, url_base, local, bulk_lookup=False):
     """
     :param str artifact_root: The path under which cacheable products will be read/written.
     :param str url_base: The prefix for urls on some RESTful service. We must be able to PUT and GET to any
               path under this base.
     :param BaseLocalArtifactCache local: local cache instance for storing and creating artifacts
+    :param bool bulk_lookup: Whether the service supports bulk existence checks: a POST to url_base
+              with a body of newline-separated artifact paths relative to url_base, answered with
+              the newline-separated subset of those paths that exist.  Should a bulk check fail, we
+              fall back to concurrent HEAD requests for it, and for the rest of the run if the
+              service doesn't have the endpoint or bulk checks keep failing.
     """
     super(RESTfulArtifactCache, self).__init__(artifact_root)
     parsed_url = urlparse.urlparse(url_base)
@@ -58,6 +75,8 @@ class RESTfulArtifactCache(ArtifactCache):
     self._netloc = parsed_url.netloc
     self._path_prefix = parsed_url.path.rstrip(b'/')
     self._localcache = local
+    self._bulk_lookup = bulk_lookup
+    self._bulk_lookup_failures = 0
 
   def try_insert(self, cache_key, paths):
     # Delegate creation of artifact to local cache.
@@ -74,6 +93,21 @@ class RESTfulArtifactCache(ArtifactCache):
       return True
     return self._request('HEAD', self._remote_path_for_key(cache_key)) is not None
 
+  def has_many(self, cache_keys):
+    results = self._localcache.has_many(cache_keys)
+    remote_indices = [i for i, found in enumerate(results) if not found]
+    remote_keys = [cache_keys[i] for i in remote_indices]
+
+    remote_results = self._bulk_has(remote_keys) if self._bulk_lookup and remote_keys else None
+    if remote_results is None:
+      remote_results = self._map_concurrently(
+        lambda cache_key: self._request('HEAD', self._remote_path_for_key(cache_key)) is not None,
+        remote_keys)
+
+    for i, found in zip(remote_indices, remote_results):
+      results[i] = found
+    return results
+
   def use_cached_files(self, cache_key):
     if self._localcache.has(cache_key):
       return self._localcache.use_cached_files(cache_key)
@@ -96,8 +130,53 @@ class RESTfulArtifactCache(ArtifactCache):
     remote_path = self._remote_path_for_key(cache_key)
     self._request('DELETE', remote_path)
 
+  def prune(self):
+    # The remote cache manages its own storage, but a local cache in front of it may be bounded.
+    self._localcache.prune()
+
+  def _bulk_has(self, cache_keys):
+    """Returns whether each of cache_keys is in the remote cache, using a single bulk request.
+
+    Returns None if the bulk request failed, so that the keys should be looked up individually.
+    """
+    relpaths = [self._relpath_for_key(cache_key) for cache_key in cache_keys]
+    try:
+      response = self._request('POST', '{0}/'.format(self._path_prefix), body='\n'.join(relpaths))
+      if response is None:
+        # The service doesn't have the endpoint, so there's no point in trying again.
+        self._bulk_lookup_failures = self.MAX_BULK_LOOKUP_FAILURES
+    except NonfatalArtifactCacheError as e:
+      # Possibly transient, so only give up on bulk lookups if this keeps happening.
+      response = None
+      self._bulk_lookup_failures += 1
+      logger.debug('Bulk lookup failed: {0}'.format(e))
+    if response is None:
+      if self._bulk_lookup_failures >= self.MAX_BULK_LOOKUP_FAILURES:
+        logger.debug('Falling back to individual lookups for {0}.'.format(self._url_string('')))
+        self._bulk_lookup = False
+      return None
+    self._bulk_lookup_failures = 0
+    present = set(response.text.splitlines())
+    return [relpath in present for relpath in relpaths]
+
+  def _map_concurrently(self, func, cache_keys):
+    """Maps func over cache_keys using concurrent requests over pooled keep-alive connections."""
+    if len(cache_keys) <= 1:
+      return map(func, cache_keys)
+    pool = ThreadPool(processes=min(len(cache_keys), RequestsSession.MAX_CONNECTIONS))
+    try:
+      # We need to specify a timeout explicitly, because otherwise python ignores SIGINT when
+      # waiting on a condition variable, so we won't be able to ctrl-c out.
+      return pool.map_async(func, cache_keys, chunksize=1).get(timeout=1000000000)
+    finally:
+      pool.close()
+      pool.join()
+
+  def _relpath_for_key(self, cache_key):
+    return '{0}/{1}{2}'.format(cache_key.id, cache_key.hash, self._localcache.tarball_extension)
+
   def _remote_path_for_key(self, cache_key):
-    return '{0}/{1}/{2}.tgz'.format(self._path_prefix, cache_key.id, cache_key.hash)
+    return '{0}/{1}'.format(self._path_prefix, self._relpath_for_key(cache_key))
 
   # Returns a response if we get a 200, None if we get a 404 and raises an exception otherwise.
   def _request(self, method, path, body=None):
@@ -110,6 +189,8 @@ class RESTfulArtifactCache(ArtifactCache):
       response = None
       if 'PUT' == method:
         response = session.put(url, data=body, timeout=self._timeout_secs)
+      elif 'POST' == method:
+        response = session.post(url, data=body, timeout=self._timeout_secs)
       elif 'GET' == method:
         response = session.get(url, timeout=self._timeout_secs, stream=True)
       elif 'HEAD' == method:
@@ -35,6 +35,7 @@ class GoalExecutor(object):
     goal_workdir = os.path.join(self._context.options.for_global_scope().pants_workdir,
                                 self._goal.name)
     with self._context.new_workunit(name=self._goal.name, labels=[WorkUnit.GOAL]):
+      calls, closures, secs = self._context.targets_stats
       for name, task_type in reversed(self._tasktypes_by_name.items()):
         with self._context.new_workunit(name=name, labels=[WorkUnit.TASK]):
           if explain:
@@ -44,6 +45,14 @@ class GoalExecutor(object):
             task = task_type(self._context, task_workdir)
             task.execute()
 
+      stats = self._context.targets_stats
+      self._context.log.debug('{goal} spent {secs:.3f}s in {calls} calls to Context.targets, '
+                              '{closures} of which computed the targets in play.'
+                              .format(goal=self._goal.name,
+                                      secs=stats.secs - secs,
+                                      calls=stats.calls - calls,
+                                      closures=stats.closures - closures))
+
       if explain:
         reversed_tasktypes_by_name = reversed(self._tasktypes_by_name.items())
         goal_to_task = ', '.join(
@@ -5,9 +5,11 @@
 from __future__ import (absolute_import, division, generators, nested_scopes, print_function,
                         unicode_literals, with_statement)
 
+import inspect
 import os
 import sys
-from collections import defaultdict
+import time
+from collections import OrderedDict, defaultdict, namedtuple
 from contextlib import contextmanager
 
 from twitter.common.collections import OrderedSet
@@ -56,6 +58,31 @@ class Context(object):
     def fatal(self, *msg_elements):
       self._run_tracker.log(Report.FATAL, *msg_elements)
 
+  class TargetsStats(namedtuple('TargetsStats', ['calls', 'closures', 'secs'])):
+    """How many times `Context.targets` was called, how many of those calls had to compute the
+    closure of the targets in play and how many seconds were spent in it overall."""
+
+  class _Closure(object):
+    """The targets in play at a version of the build graph, indexed by type."""
+
+    def __init__(self, dependencies_version, targets):
+      self.dependencies_version = dependencies_version
+      self.targets = list(targets)
+      self._targets_by_type = OrderedDict()
+      for index, target in enumerate(self.targets):
+        self._targets_by_type.setdefault(type(target), []).append((index, target))
+      self._targets_of_type = {}
+
+    def of_type(self, types):
+      """Returns the targets that are instances of types, in closure order."""
+      if types not in self._targets_of_type:
+        matching = [indexed_target
+                    for target_type, indexed_targets in self._targets_by_type.items()
+                    if issubclass(target_type, types)
+                    for indexed_target in indexed_targets]
+        self._targets_of_type[types] = [target for _, target in sorted(matching)]
+      return list(self._targets_of_type[types])
+
   # TODO: Figure out a more structured way to construct and use context than this big flat
   # repository of attributes?
   def __init__(self, options, run_tracker, target_roots,
@@ -78,6 +105,8 @@ class Context(object):
     self._scm = scm or get_scm()
     self._workspace = workspace or (ScmWorkspace(self._scm) if self._scm else None)
     self._spec_excludes = spec_excludes
+    self._closures = {}  # postorder -> _Closure, memoized by `targets`.
+    self._targets_stats = self.TargetsStats(calls=0, closures=0, secs=0.0)
     self._replace_targets(target_roots)
     self._synthetic_targets = defaultdict(list)
 
@@ -231,6 +260,7 @@ class Context(object):
     # only 1 remaining known use case in the Foursquare codebase that will be able to go away with
     # the post RoundEngine engine - kill the method at that time.
     self._target_roots = list(target_roots)
+    self._closures.clear()
 
   def add_new_target(self, address, target_type, dependencies=None, derived_from=None, **kwargs):
     """Creates a new target, adds it to the context and returns it.
@@ -254,6 +284,7 @@ class Context(object):
 
     if derived_from:
       self._synthetic_targets[derived_from].append(new_target)
+    self._closures.clear()
 
     return new_target
 
@@ -263,13 +294,42 @@ class Context(object):
     Also includes any new synthetic targets created from the target roots or their transitive
     dependencies during the course of the run.
 
+    The targets in play are computed once and reused until targets are added to the context, the
+    target roots are replaced or dependencies are injected into the build graph.
+
     :param predicate: If specified, the predicate will be used to narrow the scope of targets
-                      returned.
+                      returned.  A Target subclass, or a tuple of them, selects the targets of
+                      those types from an index.
     :param bool postorder: `True` to gather transitive dependencies with a postorder traversal;
                           `False` or preorder by default.
     :returns: A list of matching targets.
     """
-    target_root_addresses = [target.address for target in self.target_roots]
+    start = time.time()
+    dependencies_version = self.build_graph.dependencies_version
+    closure = self._closures.get(postorder)
+    computed = closure is None or closure.dependencies_version != dependencies_version
+    try:
+      if computed:
+        closure = self._Closure(dependencies_version, self._collect_targets_in_play(postorder))
+        self._closures[postorder] = closure
+      if predicate is None:
+        return list(closure.targets)
+      elif isinstance(predicate, tuple) or inspect.isclass(predicate):
+        return closure.of_type(predicate)
+      else:
+        return filter(predicate, closure.targets)
+    finally:
+      calls, closures, secs = self._targets_stats
+      self._targets_stats = self.TargetsStats(calls=calls + 1,
+                                              closures=closures + (1 if computed else 0),
+                                              secs=secs + time.time() - start)
+
+  @property
+  def targets_stats(self):
+    """Returns the `TargetsStats` of the calls to `targets` so far in this run."""
+    return self._targets_stats
+
+  def _collect_targets_in_play(self, postorder):
     target_set = self._collect_targets(self.target_roots, postorder=postorder)
 
     synthetics = OrderedSet()
@@ -280,8 +340,7 @@ class Context(object):
     synthetic_set = self._collect_targets(synthetics, postorder=postorder)
 
     target_set.update(synthetic_set)
-
-    return filter(predicate, target_set)
+    return target_set
 
   def _collect_targets(self, root_targets, postorder=False):
     addresses = [target.address for target in root_targets]
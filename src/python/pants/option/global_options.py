@@ -5,6 +5,8 @@
 from __future__ import (absolute_import, division, generators, nested_scopes, print_function,
                         unicode_literals, with_statement)
 
+import multiprocessing
+
 from pants.option.options import Options
 
 
@@ -65,8 +67,64 @@ def register_global_options(register):
            help='If writing to build artifacts to cache, overwrite (instead of skip) existing.')
   register('--cache-key-gen-version', advanced=True, default='200', recursive=True,
            help='The cache key generation. Bump this to invalidate every artifact for a scope.')
+  register('--build-invalidator', advanced=True, choices=['files', 'index'], default='index',
+           help='How to store target invalidation state: one hash file per target (files) or a '
+                'single index file per task that is read once and updated in batches (index).')
+  register('--source-digest-cache', action='store_true', default=True, advanced=True,
+           help='Reuse the fingerprints of source files computed by previous runs while the '
+                'files\' mtime, size and inode are unchanged.')
+  register('--build-file-cache', action='store_true', default=False, advanced=True,
+           help='Reuse the targets parsed from BUILD files by previous runs while the files and '
+                'the directories they glob are unchanged, instead of executing the files again. '
+                'Only safe if BUILD files depend on nothing else: results that read environment '
+                'variables or other files, or call into helpers outside the registered aliases, '
+                'may be replayed stale.')
+  register('--build-file-index', action='store_true', default=True, advanced=True,
+           help='Keep an index of the directories in the build root and the BUILD files in '
+                'them, so that scanning for BUILD files only lists directories changed since.')
+  register('--dependee-index', action='store_true', default=False, advanced=True,
+           help='Keep an index of the dependees of every target, updated as BUILD files change, '
+                'so that dependees and changed need not construct the whole build graph. '
+                'Only safe if BUILD files depend on nothing else: dependencies that come from '
+                'environment variables or other files, or from helpers outside the registered '
+                'aliases, may be answered stale.')
+  register('--source-owner-index', action='store_true', default=False, advanced=True,
+           help='Keep an index of the sources owned by the targets of every BUILD file, updated '
+                'as BUILD files and the directories they glob change, to map changed files to '
+                'the targets owning them. Only safe if BUILD files depend on nothing else: '
+                'sources that come from environment variables or other files, or from helpers '
+                'outside the registered aliases, may be mapped to stale owners.')
+  register('--build-file-parse-workers', advanced=True, type=int, default=1,
+           help='The number of processes to parse BUILD files in when scanning many of them, '
+                'e.g. for ::, dependees or changed.')
+  register('--fingerprint-workers', advanced=True, type=int, default=multiprocessing.cpu_count(),
+           help='The number of threads to use when fingerprinting targets for invalidation.')
   register('--cache-compression', advanced=True, type=int, default=5, recursive=True,
-           help='The gzip compression level for created artifacts.')
+           help='The compression level for created artifacts.')
+  register('--cache-codec', advanced=True, choices=['none', 'gzip', 'lz4', 'zstd'],
+           default='gzip', recursive=True,
+           help='The codec to compress created artifacts with. The lz4 and zstd codecs require '
+                'the lz4 and zstandard modules respectively, and fall back to gzip without them. '
+                'Artifacts are readable whichever codec they were created with, but are cached '
+                'under names of their own for each codec, so that pants versions without support '
+                'for a codec miss its artifacts rather than fail to read them. Changing the codec '
+                'therefore starts over with cold caches.')
+  register('--cache-compression-threads', advanced=True, type=int, default=1, recursive=True,
+           help='Compress each created artifact with this many threads. Only gzip compression '
+                'is parallelized.')
+  register('--cache-bulk-lookup', advanced=True, action='store_true', recursive=True,
+           help='Check which artifacts a RESTful cache has with a single POST of the artifact '
+                'paths, rather than one HEAD request per artifact. Falls back to HEAD requests if '
+                'the cache server does not support this.')
+  register('--cache-max-entries', advanced=True, type=int, recursive=True,
+           help='The maximum number of artifacts to keep in each task\'s local artifact cache. The '
+                'least recently used artifacts are evicted beyond this.')
+  register('--cache-max-bytes', advanced=True, type=int, recursive=True,
+           help='The maximum total size of the artifacts to keep in each task\'s local artifact '
+                'cache. The least recently used artifacts are evicted beyond this.')
+  register('--cache-dedup', advanced=True, action='store_true', recursive=True,
+           help='Store the files of local artifact caches by content hash, so that each distinct '
+                'file is stored once no matter how many of a task\'s artifacts contain it.')
   register('--print-exception-stacktrace', action='store_true',
            help='Print to console the full exception stack trace if encountered.')
   register('--fail-fast', action='store_true',
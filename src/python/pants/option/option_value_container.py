@@ -100,6 +100,10 @@ class OptionValueContainer(object):
     # getattr(option, key_var).
     return getattr(self, key)
 
+  def __iter__(self):
+    """Returns an iterator over the names of the options in this container, in sorted order."""
+    return iter(sorted(self._forwardings))
+
   def __getattr__(self, key):
     # Note: Called only if regular attribute lookup fails, so accesses
     # to non-forwarded attributes will be handled the normal way.
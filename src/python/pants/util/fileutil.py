@@ -7,8 +7,15 @@ from __future__ import (absolute_import, division, generators, nested_scopes, pr
 
 import os
 import shutil
+from contextlib import contextmanager
 
 from pants.util.contextutil import temporary_file
+from pants.util.dirutil import safe_delete, safe_mkdir_for
+
+
+# Files modified this recently may be modified again without changing their mtime, given coarse
+# filesystem timestamps, so state derived from them should not be cached against their mtimes.
+RACY_WINDOW_SECS = 2
 
 
 def atomic_copy(src, dst):
@@ -16,3 +23,19 @@ def atomic_copy(src, dst):
   with temporary_file(root_dir=os.path.dirname(dst)) as tmp_dst:
     shutil.copyfile(src, tmp_dst.name)
     os.rename(tmp_dst.name, dst)
+
+
+@contextmanager
+def atomic_replace(path):
+  """Yields a temporary path to write a file to, which then replaces the file at path atomically.
+
+  The temporary file is deleted instead if the block raises.
+  """
+  safe_mkdir_for(path)
+  tmp_path = '{}.tmp.{}'.format(path, os.getpid())
+  try:
+    yield tmp_path
+    os.rename(tmp_path, path)
+  except BaseException:
+    safe_delete(tmp_path)
+    raise
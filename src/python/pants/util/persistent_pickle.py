@@ -0,0 +1,50 @@
+# coding=utf-8
+# Copyright 2015 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (absolute_import, division, generators, nested_scopes, print_function,
+                        unicode_literals, with_statement)
+
+import cPickle as pickle
+import errno
+
+from pants.util.fileutil import atomic_replace
+
+
+class PersistentPickle(object):
+  """A value pickled to a file, along with the version of its format.
+
+  The file only caches state that can be rebuilt, so a missing or corrupt file, or one written
+  with another version of the format, loads as no value at all.
+  """
+
+  def __init__(self, path, version):
+    """
+    :param string path: The file the value is persisted to.
+    :param int version: The version of the format of the value; bump it whenever that changes.
+    """
+    self._path = path
+    self._version = version
+
+  @property
+  def path(self):
+    return self._path
+
+  def load(self):
+    """Returns the persisted value, or None if there is no usable one."""
+    try:
+      with open(self._path, 'rb') as fp:
+        version, value = pickle.load(fp)
+    except IOError as e:
+      if e.errno != errno.ENOENT:
+        raise
+      return None
+    except Exception:
+      return None
+    return value if version == self._version else None
+
+  def save(self, value):
+    """Persists the value, replacing the file atomically."""
+    with atomic_replace(self._path) as tmp_path:
+      with open(tmp_path, 'wb') as fp:
+        pickle.dump((self._version, value), fp, pickle.HIGHEST_PROTOCOL)
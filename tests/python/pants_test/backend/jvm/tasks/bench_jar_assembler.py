@@ -0,0 +1,90 @@
+# coding=utf-8
+# Copyright 2015 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (absolute_import, division, generators, nested_scopes, print_function,
+                        unicode_literals, with_statement)
+
+import os
+import random
+import sys
+import time
+import zipfile
+
+from pants.backend.jvm.tasks.jar_assembler import JarAssembler
+from pants.util.contextutil import open_zip, temporary_dir
+
+
+ENTRIES_PER_JAR = 200
+ENTRY_SIZE = 4 * 1024
+# Every jar also holds this many entries shared with all the others, which the first jar wins.
+SHARED_ENTRIES = 5
+
+
+def _write_jars(tmpdir, num_jars):
+  """Writes num_jars jars of about as compressible, partially repetitive data as class files."""
+  rand = random.Random(0)
+  words = [os.urandom(rand.randint(4, 24)) for _ in range(512)]
+
+  def contents():
+    return b''.join(rand.choice(words) for _ in range(ENTRY_SIZE // 14))
+
+  jars = []
+  for i in range(num_jars):
+    path = os.path.join(tmpdir, 'dep{}.jar'.format(i))
+    with open_zip(path, 'w', compression=zipfile.ZIP_DEFLATED) as jar:
+      for j in range(ENTRIES_PER_JAR):
+        jar.writestr('com/dep{}/Class{}.class'.format(i, j), contents())
+      for j in range(SHARED_ENTRIES):
+        jar.writestr('com/shared/Shared{}.class'.format(j), contents())
+    jars.append(path)
+  return jars
+
+
+def _recompressing_copy(path, jars):
+  """Copies the entries of jars, first wins, inflating and deflating each as the jar tool does."""
+  seen = set()
+  with open_zip(path, 'w', compression=zipfile.ZIP_DEFLATED) as out:
+    for jar_path in jars:
+      with open_zip(jar_path) as jar:
+        for info in jar.infolist():
+          if info.filename not in seen:
+            seen.add(info.filename)
+            out.writestr(info.filename, jar.read(info))
+
+
+def main(num_jars):
+  """Times assembling a deploy jar from a synthetic classpath with JarAssembler and by
+  recompressing every entry.
+
+  The jar tool itself needs a JVM, so a recompressing copy in Python stands in for it.  Run by
+  hand, eg:
+
+    PYTHONPATH=src/python \
+      python tests/python/pants_test/backend/jvm/tasks/bench_jar_assembler.py 300
+  """
+  with temporary_dir() as tmpdir:
+    jars = _write_jars(tmpdir, num_jars)
+    size = sum(os.path.getsize(jar) for jar in jars)
+    print('{} jars of {} entries, {:.1f}MB'.format(num_jars, ENTRIES_PER_JAR + SHARED_ENTRIES,
+                                                    size / 1024 / 1024))
+    path = os.path.join(tmpdir, 'deploy.jar')
+
+    def report(name, start):
+      elapsed = time.time() - start
+      with open_zip(path) as jar:
+        num_entries = len(jar.infolist())
+      print('  {:<24} {:8.3f}s  {} entries'.format(name, elapsed, num_entries))
+
+    start = time.time()
+    _recompressing_copy(path, jars)
+    report('recompressing copy', start)
+
+    for threads in (1, 4):
+      start = time.time()
+      JarAssembler(threads=threads).assemble(path, jars)
+      report('JarAssembler x{}'.format(threads), start)
+
+
+if __name__ == '__main__':
+  main(int(sys.argv[1]) if len(sys.argv) > 1 else 300)
@@ -0,0 +1,96 @@
+# coding=utf-8
+# Copyright 2015 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (absolute_import, division, generators, nested_scopes, print_function,
+                        unicode_literals, with_statement)
+
+import os
+import random
+import sys
+import time
+
+from pants.backend.jvm.tasks.jvm_compile.java.jmake_analysis_parser import JMakeAnalysisParser
+from pants.util.contextutil import temporary_dir
+
+
+CLASSES_PER_SOURCE = 3
+DEPS_PER_SOURCE = 20
+BLOB_SIZE = 256
+NUM_LOOKUPS = 200
+
+
+def _source(i):
+  return '/src/java/org/pantsbuild/pkg{}/Class{}.java'.format(i // 100, i)
+
+
+def _class(i, j):
+  # Each source's first class is named for it, and the rest are its inner classes.
+  name = 'org/pantsbuild/pkg{}/Class{}'.format(i // 100, i)
+  return '{}$Inner{}'.format(name, j) if j else name
+
+
+def _write_analysis(path, num_sources):
+  """Writes a jmake analysis of num_sources sources, each with a few classes and dependencies."""
+  rand = random.Random(0)
+  classes = [(_class(i, j), _source(i))
+             for i in range(num_sources) for j in range(CLASSES_PER_SOURCE)]
+  with open(path, 'wb') as fp:
+    fp.write(b'pcd entries:\n{} items\n'.format(len(classes)))
+    for cls, source in classes:
+      fp.write(b'{}\t{}\t1430672789000\t{}\t{}\n'.format(cls, source, rand.randint(0, 2 ** 32),
+                                                         b'B' * BLOB_SIZE))
+    fp.write(b'dependencies:\n{} items\n'.format(num_sources))
+    for i in range(num_sources):
+      deps = [rand.choice(classes)[0] for _ in range(DEPS_PER_SOURCE)]
+      fp.write(b'{}\t{}\n'.format(_source(i), '\t'.join(['java/lang/Object'] + deps)))
+
+
+def _time(func):
+  start = time.time()
+  result = func()
+  return result, time.time() - start
+
+
+def main(num_sources):
+  """Times looking up the products of an analysis by parsing its text and through its index.
+
+  Run by hand, eg:
+
+    PYTHONPATH=src/python \
+      python tests/python/pants_test/backend/jvm/tasks/jvm_compile/bench_analysis_index.py 50000
+  """
+  parser = JMakeAnalysisParser()
+  lookups = [_source(i) for i in random.Random(0).sample(range(num_sources), NUM_LOOKUPS)]
+  with temporary_dir() as tmpdir:
+    analysis = os.path.join(tmpdir, 'analysis')
+    classes_dir = os.path.join(tmpdir, 'classes')
+    _write_analysis(analysis, num_sources)
+    # Age the analysis past the racy window, so that its index is written out.
+    mtime = time.time() - 60
+    os.utime(analysis, (mtime, mtime))
+    print('{} sources, {:.1f}MB analysis'.format(num_sources,
+                                                 os.path.getsize(analysis) / 1024 / 1024))
+
+    def report(name, secs):
+      print('  {:<40} {:8.3f}s'.format(name, secs))
+
+    # As the strategies used to: parse the products, then look them up or list them all.
+    products, secs = _time(lambda: parser.parse_products_from_path(analysis, classes_dir))
+    report('text: parse products', secs)
+    expected = [sorted(products.get(source, [])) for source in lookups]
+
+    index, secs = _time(lambda: parser.products_index_from_path(analysis, classes_dir))
+    report('index: cold, parse and write sidecar', secs)
+
+    index, secs = _time(lambda: parser.products_index_from_path(analysis, classes_dir))
+    report('index: warm, open sidecar', secs)
+    found, secs = _time(lambda: [sorted(index.products_for(source)) for source in lookups])
+    report('index: look up {} sources'.format(NUM_LOOKUPS), secs)
+    assert found == expected
+    _, secs = _time(index.products)
+    report('index: list all products', secs)
+
+
+if __name__ == '__main__':
+  main(int(sys.argv[1]) if len(sys.argv) > 1 else 50000)
@@ -0,0 +1,127 @@
+# coding=utf-8
+# Copyright 2015 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (absolute_import, division, generators, nested_scopes, print_function,
+                        unicode_literals, with_statement)
+
+import os
+import random
+import shutil
+import sys
+import time
+
+from pants.backend.jvm.tasks.jvm_compile.analysis_store import AnalysisStore
+from pants.backend.jvm.tasks.jvm_compile.analysis_tools import AnalysisTools
+from pants.backend.jvm.tasks.jvm_compile.java.jmake_analysis import JMakeAnalysis
+from pants.backend.jvm.tasks.jvm_compile.java.jmake_analysis_parser import JMakeAnalysisParser
+from pants.util.contextutil import temporary_dir
+
+
+NUM_PARTITIONS = 20
+SOURCES_PER_PARTITION = 200
+DEPS_PER_SOURCE = 20
+BLOB_SIZE = 256
+
+
+def _source(i):
+  return '/src/java/org/pantsbuild/pkg{}/Class{}.java'.format(i // 100, i)
+
+
+def _class(i):
+  return 'org/pantsbuild/pkg{}/Class{}'.format(i // 100, i)
+
+
+def _write_analysis(path, num_sources):
+  """Writes a jmake analysis of num_sources sources, each with one class and some dependencies."""
+  rand = random.Random(0)
+  with open(path, 'wb') as fp:
+    fp.write(b'pcd entries:\n{} items\n'.format(num_sources))
+    for i in range(num_sources):
+      fp.write(b'{}\t{}\t1430672789000\t{}\t{}\n'.format(
+        _class(i), _source(i), rand.randint(0, 2 ** 32), b'B' * BLOB_SIZE))
+    fp.write(b'dependencies:\n{} items\n'.format(num_sources))
+    for i in range(num_sources):
+      deps = [_class(rand.randrange(num_sources)) for _ in range(DEPS_PER_SOURCE)]
+      fp.write(b'{}\t{}\n'.format(_source(i), '\t'.join(['java/lang/Object'] + deps)))
+
+
+def _compile_with_files(tools, tmpdir, valid, invalid, partitions):
+  """The analysis traffic of a global strategy compile as it was before AnalysisStore."""
+  invalid_sources = [source for sources in partitions for source in sources]
+  valid_tmp = os.path.join(tmpdir, 'valid_analysis')
+  tools.split_to_paths(valid, [(invalid_sources, invalid)], valid_tmp)
+  shutil.move(valid_tmp, valid)
+
+  splits = [(sources, os.path.join(tmpdir, 'partition{}'.format(i)))
+            for i, sources in enumerate(partitions)]
+  tools.split_to_paths(invalid, splits)
+
+  for sources, analysis_file in splits:
+    # The compile's analysis is the partition's, as if zinc had recompiled it unchanged.
+    new_valid = analysis_file + '.valid.new'
+    tools.merge_from_paths([valid, analysis_file], new_valid)
+    shutil.move(new_valid, valid)
+
+    new_invalid = analysis_file + '.invalid.new'
+    tools.split_to_paths(invalid, [(sources, analysis_file + '.invalid.discard')], new_invalid)
+    shutil.move(new_invalid, invalid)
+
+
+def _compile_with_store(tools, tmpdir, valid, invalid, partitions):
+  """The analysis traffic of a global strategy compile through AnalysisStores."""
+  valid_store = AnalysisStore(tools, valid)
+  invalid_store = AnalysisStore(tools, invalid)
+  invalid_sources = [source for sources in partitions for source in sources]
+  invalid_store.merge([valid_store.discard(invalid_sources)])
+  invalid_store.flush()
+  valid_store.flush()
+
+  splits = [(sources, os.path.join(tmpdir, 'partition{}'.format(i)))
+            for i, sources in enumerate(partitions)]
+  invalid_store.split_to_paths(splits)
+
+  try:
+    for sources, analysis_file in splits:
+      valid_store.merge_from_paths([analysis_file])
+      valid_store.flush()
+      invalid_store.discard(sources)
+  finally:
+    invalid_store.flush()
+
+
+def main(num_sources):
+  """Times the analysis splits and merges of a 20-partition global strategy compile.
+
+  Run by hand, eg:
+
+    PYTHONPATH=src/python \
+      python tests/python/pants_test/backend/jvm/tasks/jvm_compile/bench_analysis_store.py 20000
+  """
+  tools = AnalysisTools('/java/home', JMakeAnalysisParser(), JMakeAnalysis)
+  rand = random.Random(0)
+  invalidated = rand.sample(range(num_sources), NUM_PARTITIONS * SOURCES_PER_PARTITION)
+  partitions = [[_source(i) for i in invalidated[p::NUM_PARTITIONS]]
+                for p in range(NUM_PARTITIONS)]
+
+  with temporary_dir() as tmpdir:
+    analysis = os.path.join(tmpdir, 'global.analysis')
+    _write_analysis(analysis, num_sources)
+    print('{} sources, {:.1f}MB analysis, {} partitions of {} sources'.format(
+      num_sources, os.path.getsize(analysis) / 1024 / 1024, NUM_PARTITIONS,
+      SOURCES_PER_PARTITION))
+
+    for name, compile_analyses in (('files', _compile_with_files),
+                                   ('AnalysisStore', _compile_with_store)):
+      with temporary_dir() as workdir:
+        valid = os.path.join(workdir, 'global_analysis.valid')
+        shutil.copy(analysis, valid)
+        invalid = os.path.join(workdir, 'global_analysis.invalid')
+        start = time.time()
+        compile_analyses(tools, workdir, valid, invalid, partitions)
+        elapsed = time.time() - start
+        print('  {:<14} {:8.3f}s'.format(name, elapsed))
+
+
+if __name__ == '__main__':
+  main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
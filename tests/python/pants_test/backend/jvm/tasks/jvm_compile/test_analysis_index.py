@@ -0,0 +1,90 @@
+# coding=utf-8
+# Copyright 2015 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (absolute_import, division, generators, nested_scopes, print_function,
+                        unicode_literals, with_statement)
+
+import os
+import shutil
+import time
+import unittest
+
+from pants.backend.jvm.tasks.jvm_compile.analysis_index import AnalysisIndex
+from pants.backend.jvm.tasks.jvm_compile.java.jmake_analysis_parser import JMakeAnalysisParser
+from pants.util.contextutil import temporary_dir
+
+
+GREETING = b'/src/pants/examples/src/java/org/pantsbuild/example/hello/greet/Greeting.java'
+HELLO_MAIN = b'/src/pants/examples/src/java/org/pantsbuild/example/hello/main/HelloMain.java'
+
+
+class CountingParser(JMakeAnalysisParser):
+  def __init__(self):
+    super(CountingParser, self).__init__()
+    self.parses = 0
+
+  def parse_products(self, lines_iter, classes_dir):
+    self.parses += 1
+    return super(CountingParser, self).parse_products(lines_iter, classes_dir)
+
+
+class AnalysisIndexTest(unittest.TestCase):
+  def setUp(self):
+    self.parser = CountingParser()
+
+  def copy_analysis(self, tmpdir, name='simple.analysis', age=60):
+    path = os.path.join(tmpdir, 'analysis')
+    shutil.copy(os.path.join(os.path.dirname(__file__), 'java', 'testdata', 'simple', name), path)
+    old = time.time() - age
+    os.utime(path, (old, old))
+    return path
+
+  def test_products(self):
+    with temporary_dir() as tmpdir:
+      path = self.copy_analysis(tmpdir)
+      expected = self.parser.parse_products_from_path(path, '/classes')
+      index = self.parser.products_index_from_path(path, '/classes')
+
+      self.assertEquals(2, len(index))
+      self.assertEquals(sorted([GREETING, HELLO_MAIN]), index.sources())
+      self.assertEquals(expected[GREETING], index.products_for(GREETING))
+      self.assertEquals(expected[HELLO_MAIN], index.products_for(HELLO_MAIN.decode('utf-8')))
+      self.assertEquals([], index.products_for(b'/src/Missing.java'))
+      self.assertEquals(dict(expected), index.products())
+
+  def test_sidecar_reused(self):
+    with temporary_dir() as tmpdir:
+      path = self.copy_analysis(tmpdir)
+      self.parser.products_index_from_path(path, '/classes')
+      self.assertTrue(os.path.exists(AnalysisIndex.sidecar_path(path)))
+      index = self.parser.products_index_from_path(path, '/classes')
+      self.assertEquals(1, self.parser.parses)
+      self.assertEquals(2, len(index))
+
+      # A different classes dir makes for different products.
+      self.parser.products_index_from_path(path, '/other/classes')
+      self.assertEquals(2, self.parser.parses)
+
+  def test_changed_analysis_reindexed(self):
+    with temporary_dir() as tmpdir:
+      path = self.copy_analysis(tmpdir)
+      self.parser.products_index_from_path(path, '/classes')
+      path = self.copy_analysis(tmpdir, name='simple_split0.analysis', age=30)
+      index = self.parser.products_index_from_path(path, '/classes')
+      self.assertEquals(2, self.parser.parses)
+      self.assertEquals([GREETING], index.sources())
+
+  def test_recently_modified_not_persisted(self):
+    with temporary_dir() as tmpdir:
+      path = self.copy_analysis(tmpdir, age=0)
+      self.assertEquals(2, len(self.parser.products_index_from_path(path, '/classes')))
+      self.assertFalse(os.path.exists(AnalysisIndex.sidecar_path(path)))
+
+  def test_corrupt_sidecar(self):
+    with temporary_dir() as tmpdir:
+      path = self.copy_analysis(tmpdir)
+      for garbage in (b'', b'garbage'):
+        with open(AnalysisIndex.sidecar_path(path), 'wb') as fp:
+          fp.write(garbage)
+        self.assertEquals(2, len(self.parser.products_index_from_path(path, '/classes')))
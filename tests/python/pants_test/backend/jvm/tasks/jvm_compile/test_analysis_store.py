@@ -0,0 +1,84 @@
+# coding=utf-8
+# Copyright 2015 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (absolute_import, division, generators, nested_scopes, print_function,
+                        unicode_literals, with_statement)
+
+import os
+import shutil
+import unittest
+
+from pants.backend.jvm.tasks.jvm_compile.analysis_store import AnalysisStore
+from pants.backend.jvm.tasks.jvm_compile.analysis_tools import AnalysisTools
+from pants.backend.jvm.tasks.jvm_compile.java.jmake_analysis import JMakeAnalysis
+from pants.backend.jvm.tasks.jvm_compile.java.jmake_analysis_parser import JMakeAnalysisParser
+from pants.util.contextutil import temporary_dir
+
+
+GREETING = b'/src/pants/examples/src/java/org/pantsbuild/example/hello/greet/Greeting.java'
+HELLO_MAIN = b'/src/pants/examples/src/java/org/pantsbuild/example/hello/main/HelloMain.java'
+
+
+class CountingParser(JMakeAnalysisParser):
+  def __init__(self):
+    super(CountingParser, self).__init__()
+    self.parsed = []
+
+  def parse_from_path(self, infile_path):
+    self.parsed.append(os.path.basename(infile_path))
+    return super(CountingParser, self).parse_from_path(infile_path)
+
+
+class AnalysisStoreTest(unittest.TestCase):
+  def setUp(self):
+    self.parser = CountingParser()
+    self.tools = AnalysisTools('/java/home', self.parser, JMakeAnalysis)
+
+  def data_path(self, name):
+    return os.path.join(os.path.dirname(__file__), 'java', 'testdata', 'simple', name)
+
+  def parse(self, path):
+    return JMakeAnalysisParser().parse_from_path(path)
+
+  def assertAnalysisEqual(self, expected_path, actual):
+    expected = self.parse(self.data_path(expected_path))
+    self.assertEquals((sorted(expected.pcd_entries), expected.src_to_deps),
+                      (sorted(actual.pcd_entries), actual.src_to_deps))
+
+  def test_split_and_merge_in_memory(self):
+    with temporary_dir() as tmpdir:
+      path = os.path.join(tmpdir, 'global.analysis')
+      shutil.copy(self.data_path('simple.analysis'), path)
+      store = AnalysisStore(self.tools, path)
+      self.assertFalse(store.is_empty())
+
+      split_path = os.path.join(tmpdir, 'split.analysis')
+      store.split_to_paths([([HELLO_MAIN], split_path)])
+      self.assertAnalysisEqual('simple_split1.analysis', self.parse(split_path))
+
+      discarded = store.discard([GREETING])
+      self.assertAnalysisEqual('simple_split0.analysis', discarded)
+      # The file is only rewritten when flushed.
+      self.assertAnalysisEqual('simple.analysis', self.parse(path))
+      store.flush()
+      self.assertAnalysisEqual('simple_split1.analysis', self.parse(path))
+
+      store.merge_from_paths([self.data_path('simple_split0.analysis')])
+      store.flush()
+      self.assertAnalysisEqual('simple.analysis', self.parse(path))
+
+      self.assertEquals(['global.analysis', 'simple_split0.analysis'], self.parser.parsed)
+
+  def test_empty(self):
+    with temporary_dir() as tmpdir:
+      store = AnalysisStore(self.tools, os.path.join(tmpdir, 'missing.analysis'))
+      self.assertTrue(store.is_empty())
+      self.assertIsNone(store.discard([GREETING]))
+      store.flush()
+      self.assertFalse(os.path.exists(store.path))
+
+      store.merge_from_paths([self.data_path('simple_split0.analysis')])
+      self.assertFalse(store.is_empty())
+      store.discard([GREETING])
+      self.assertTrue(store.is_empty())
@@ -0,0 +1,53 @@
+# coding=utf-8
+# Copyright 2015 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (absolute_import, division, generators, nested_scopes, print_function,
+                        unicode_literals, with_statement)
+
+import os
+import time
+import unittest
+
+from pants.backend.jvm.tasks.jvm_compile.compile_durations import CompileDurations
+from pants.util.contextutil import temporary_dir
+from pants.util.persistent_pickle import PersistentPickle
+
+
+class CompileDurationsTest(unittest.TestCase):
+  def test_estimates(self):
+    with temporary_dir() as workdir:
+      path = os.path.join(workdir, 'durations', 'durations.pickle')
+      durations = CompileDurations(path)
+      self.assertEquals(0.5, durations.estimate('a:a', 5))
+      durations.record('a:a', 4, 2.0)
+      durations.record('b:b', 1, 6.0)
+      durations.save()
+
+      durations = CompileDurations(path)
+      # Scaled from the target's own history.
+      self.assertEquals(3.0, durations.estimate('a:a', 6))
+      # At the mean time per source.
+      self.assertEquals(3.2, durations.estimate('c:c', 2))
+
+  def test_corrupt(self):
+    with temporary_dir() as workdir:
+      path = os.path.join(workdir, 'durations.pickle')
+      with open(path, 'w') as fp:
+        fp.write('garbage')
+      self.assertEquals(0.1, CompileDurations(path).estimate('a:a', 0))
+
+  def test_unused_evicted(self):
+    with temporary_dir() as workdir:
+      path = os.path.join(workdir, 'durations.pickle')
+      long_ago = time.time() - CompileDurations._MAX_UNUSED_SECS - 60
+      PersistentPickle(path, CompileDurations._VERSION).save({'a:a': (1, 2.0, long_ago),
+                                                              'b:b': (1, 4.0, long_ago)})
+      durations = CompileDurations(path)
+      self.assertEquals(2.0, durations.estimate('a:a', 1))
+      durations.save()
+
+      durations = CompileDurations(path)
+      self.assertEquals(2.0, durations.estimate('a:a', 1))
+      # Only a:a is left to take the mean time per source of.
+      self.assertEquals(2.0, durations.estimate('b:b', 1))
@@ -0,0 +1,116 @@
+# coding=utf-8
+# Copyright 2015 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (absolute_import, division, generators, nested_scopes, print_function,
+                        unicode_literals, with_statement)
+
+import os
+import unittest
+import zipfile
+
+from pants.backend.jvm.targets.jvm_binary import Duplicate, JarRules, Skip
+from pants.backend.jvm.tasks.jar_assembler import JarAssembler
+from pants.java.jar.manifest import Manifest
+from pants.util.contextutil import open_zip, temporary_dir
+
+
+class JarAssemblerTest(unittest.TestCase):
+
+  def jar(self, tmpdir, name, entries, compress_type=zipfile.ZIP_DEFLATED):
+    path = os.path.join(tmpdir, '{}.jar'.format(name))
+    with open_zip(path, 'w', compression=compress_type) as jar:
+      for entry, contents in entries:
+        jar.writestr(entry, contents)
+    return path
+
+  def assemble(self, tmpdir, jars, base_jar=None, jar_rules=None, threads=2):
+    """Assembles the given jars.
+
+    :returns: The entries of the assembled jar as a list of (name, contents).
+    """
+    path = os.path.join(tmpdir, 'assembled.jar')
+    JarAssembler(jar_rules=jar_rules, threads=threads).assemble(path, jars, base_jar=base_jar)
+    with open_zip(path) as jar:
+      self.assertIsNone(jar.testzip())
+      return [(info.filename, jar.read(info)) for info in jar.infolist()]
+
+  def test_entries_copied_as_compressed(self):
+    with temporary_dir() as tmpdir:
+      a = self.jar(tmpdir, 'a', [('a/A.class', b'A' * 1000)])
+      b = self.jar(tmpdir, 'b', [('b/B.class', b'B' * 1000)], compress_type=zipfile.ZIP_STORED)
+      path = os.path.join(tmpdir, 'assembled.jar')
+      JarAssembler().assemble(path, [a, b])
+      with open_zip(path) as jar:
+        self.assertEqual(zipfile.ZIP_DEFLATED, jar.getinfo('a/A.class').compress_type)
+        self.assertEqual(zipfile.ZIP_STORED, jar.getinfo('b/B.class').compress_type)
+        self.assertEqual(b'A' * 1000, jar.read('a/A.class'))
+        self.assertEqual(b'B' * 1000, jar.read('b/B.class'))
+
+  def test_first_wins(self):
+    with temporary_dir() as tmpdir:
+      a = self.jar(tmpdir, 'a', [('x/', b''), ('x/X.class', b'a')])
+      b = self.jar(tmpdir, 'b', [('x/', b''), ('x/X.class', b'b'), ('y/Y.class', b'b')])
+      self.assertEqual([('META-INF/', b''),
+                        ('META-INF/MANIFEST.MF', b'Manifest-Version: 1.0\nCreated-By: pants\n'),
+                        ('x/', b''), ('x/X.class', b'a'), ('y/Y.class', b'b')],
+                       self.assemble(tmpdir, [a, b]))
+
+  def test_base_jar_manifest_kept(self):
+    with temporary_dir() as tmpdir:
+      base = self.jar(tmpdir, 'base', [('META-INF/', b''),
+                                       (Manifest.PATH, b'Main-Class: Main\n'),
+                                       ('Main.class', b'base')])
+      a = self.jar(tmpdir, 'a', [('META-INF/', b''),
+                                 (Manifest.PATH, b'Main-Class: A\n'),
+                                 ('Main.class', b'a')])
+      self.assertEqual([('META-INF/', b''),
+                        (Manifest.PATH, b'Main-Class: Main\n'),
+                        ('Main.class', b'base')],
+                       self.assemble(tmpdir, [a], base_jar=base))
+
+  def test_default_rules(self):
+    with temporary_dir() as tmpdir:
+      a = self.jar(tmpdir, 'a', [('META-INF/A.SF', b'sig'),
+                                 ('META-INF/services/S', b'a\n')])
+      b = self.jar(tmpdir, 'b', [('META-INF/services/S', b'b\n')])
+      entries = dict(self.assemble(tmpdir, [a, b]))
+      self.assertNotIn('META-INF/A.SF', entries)
+      self.assertEqual(b'a\nb\n', entries['META-INF/services/S'])
+
+  def test_replace(self):
+    with temporary_dir() as tmpdir:
+      a = self.jar(tmpdir, 'a', [('X.class', b'a'), ('Y.class', b'a')])
+      b = self.jar(tmpdir, 'b', [('X.class', b'b')])
+      c = self.jar(tmpdir, 'c', [('X.class', b'c')])
+      jar_rules = JarRules(rules=[Duplicate(r'^X', Duplicate.REPLACE)])
+      self.assertEqual([('META-INF/', b''),
+                        ('META-INF/MANIFEST.MF', b'Manifest-Version: 1.0\nCreated-By: pants\n'),
+                        ('X.class', b'c'), ('Y.class', b'a')],
+                       self.assemble(tmpdir, [a, b, c], jar_rules=jar_rules))
+
+  def test_fail(self):
+    with temporary_dir() as tmpdir:
+      a = self.jar(tmpdir, 'a', [('X.class', b'a')])
+      b = self.jar(tmpdir, 'b', [('X.class', b'b')])
+      with self.assertRaises(Duplicate.Error):
+        self.assemble(tmpdir, [a, b], jar_rules=JarRules(default_dup_action=Duplicate.FAIL))
+
+  def test_skip(self):
+    with temporary_dir() as tmpdir:
+      a = self.jar(tmpdir, 'a', [('X.class', b'a'), ('skipped/Y.class', b'a')])
+      entries = dict(self.assemble(tmpdir, [a], jar_rules=JarRules(rules=[Skip(r'^skipped/')])))
+      self.assertEqual(b'a', entries['X.class'])
+      self.assertNotIn('skipped/Y.class', entries)
+
+  def test_many_jars(self):
+    with temporary_dir() as tmpdir:
+      jars = [self.jar(tmpdir, 'jar{}'.format(i),
+                       [('shared/Shared.class', b'{}'.format(i))] +
+                       [('jar{}/C{}.class'.format(i, j), os.urandom(100)) for j in range(20)])
+              for i in range(50)]
+      entries = self.assemble(tmpdir, jars, threads=4)
+      self.assertEqual(2 + 1 + 50 * 20, len(entries))
+      self.assertEqual(b'0', dict(entries)['shared/Shared.class'])
+      with open_zip(jars[49]) as jar:
+        self.assertEqual(jar.read('jar49/C19.class'), dict(entries)['jar49/C19.class'])
@@ -7,18 +7,21 @@ from __future__ import (absolute_import, division, generators, nested_scopes, pr
 
 import os
 import subprocess
+import unittest
 from collections import defaultdict
 from textwrap import dedent
 
 from pants.backend.core.targets.resources import Resources
 from pants.backend.jvm.targets.java_tests import JavaTests
-from pants.backend.jvm.tasks.junit_run import JUnitRun
+from pants.backend.jvm.tasks.junit_run import JUnitRun, _pack_by_duration, _report_durations
 from pants.base.build_file_aliases import BuildFileAliases
 from pants.base.exceptions import TargetDefinitionException, TaskError
 from pants.goal.products import MultipleRootedProducts
 from pants.ivy.bootstrapper import Bootstrapper
 from pants.java.distribution.distribution import Distribution
 from pants.java.executor import SubprocessExecutor
+from pants.util.contextutil import temporary_dir
+from pants.util.dirutil import safe_open
 from pants_test.jvm.jvm_tool_task_test_base import JvmToolTaskTestBase
 
 
@@ -151,6 +154,37 @@ class JUnitRunnerTest(JvmToolTaskTestBase):
       task.execute()
 
 
+class ConcurrentJvmsTest(unittest.TestCase):
+  """Tests for spreading tests across concurrent test processes."""
+
+  def test_pack_longest_first(self):
+    durations = {'A': 5.0, 'B': 4.0, 'C': 3.0, 'D': 3.0, 'E': 1.0}
+    self.assertEqual([['A'], ['B', 'E'], ['C', 'D']],
+                     _pack_by_duration(['E', 'D', 'C', 'B', 'A'], durations, 3))
+
+  def test_pack_keeps_classes_together(self):
+    tests = ['A#testOne', 'B', 'A#testTwo']
+    self.assertEqual([['A#testOne', 'A#testTwo'], ['B']],
+                     _pack_by_duration(tests, {'A': 2.0, 'B': 1.0}, 2))
+
+  def test_pack_unknown_at_mean_duration(self):
+    # C is assumed to take 3.0s, the mean of A and B, so it goes before B.
+    self.assertEqual([['A'], ['C', 'B']],
+                     _pack_by_duration(['A', 'B', 'C'], {'A': 5.0, 'B': 1.0}, 2))
+
+  def test_pack_no_empty_bins(self):
+    self.assertEqual([['A']], _pack_by_duration(['A'], {}, 4))
+
+  def test_report_durations(self):
+    with temporary_dir() as reportdir:
+      with safe_open(os.path.join(reportdir, 'TEST-a.ATest.xml'), 'w') as fp:
+        fp.write('<testsuite name="a.ATest" failures="0" time="1.5"/>')
+      with safe_open(os.path.join(reportdir, 'TEST-a.BTest.xml'), 'w') as fp:
+        fp.write('<testsuite name="a.BTest"')
+      self.assertEqual({'a.ATest': 1.5},
+                       _report_durations(reportdir, ['a.ATest', 'a.BTest', 'a.CTest']))
+
+
 class EmmaTest(JvmToolTaskTestBase):
   """Tests for junit_run.Emma class"""
   # TODO(Jin Feng) to be implemented
@@ -158,6 +158,11 @@ class PythonTestBuilderTest(PythonTestBuilderTestBase):
   def test_mixed(self):
     self.run_failing_tests(targets=[self.green, self.red], failed_targets=[self.red])
 
+  def test_mixed_concurrently(self):
+    self.run_failing_tests(targets=[self.green, self.red, self.all],
+                           failed_targets=[self.red, self.all],
+                           fast=False, fail_slow=True, jobs=3)
+
   def assert_expected_junit_xml(self, report_basedir, **kwargs):
     # We expect xml of the following form:
     # <testsuite errors=[Ne] failures=[Nf] skips=[Ns] tests=[Nt] ...>
@@ -0,0 +1,101 @@
+# coding=utf-8
+# Copyright 2015 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (absolute_import, division, generators, nested_scopes, print_function,
+                        unicode_literals, with_statement)
+
+import os
+import time
+
+from pants.backend.python.targets.python_library import PythonLibrary
+from pants.backend.python.tasks.python_task import PythonTask
+from pants.base.source_root import SourceRoot
+from pants_test.backend.python.tasks.python_task_test import PythonTaskTest
+
+
+class ChrootTask(PythonTask):
+
+  def execute(self):
+    pass
+
+
+class CachedChrootTest(PythonTaskTest):
+
+  @classmethod
+  def task_type(cls):
+    return ChrootTask
+
+  def setUp(self):
+    super(CachedChrootTest, self).setUp()
+    SourceRoot.register('src', PythonLibrary)
+    self.create_lib('a', {'a.py': 'A = 1'})
+    self.create_lib('b', {'b.py': 'B = 1'})
+
+  def tearDown(self):
+    super(CachedChrootTest, self).tearDown()
+    SourceRoot.reset()
+
+  def create_lib(self, name, source_contents_map):
+    # Fingerprints are memoized on the targets, so changed sources call for new ones.
+    self.reset_build_graph()
+    return self.create_python_library('src/{}'.format(name), name, source_contents_map)
+
+  def dump(self, *names):
+    """Dumps the cached chroot of the named libraries as a new run would.
+
+    :returns: The path of the chroot, and a dict of the inodes of its sources by path.
+    """
+    self.reset_build_graph()
+    targets = [self.target('src/{0}:{0}'.format(name)) for name in names]
+    task = self.create_task(self.context(target_roots=targets))
+    with task.cached_chroot(targets=targets) as chroot:
+      files = {}
+      for path in chroot.builder.chroot().get('source'):
+        if not os.path.basename(path).startswith('__init__.'):
+          files[path] = os.stat(os.path.join(chroot.path(), path)).st_ino
+      return chroot.path(), files
+
+  def test_reused(self):
+    path, files = self.dump('a', 'b')
+    self.assertEqual({'a/a.py', 'a/a.pyc', 'b/b.py', 'b/b.pyc'}, set(files))
+    self.assertEqual((path, files), self.dump('a', 'b'))
+
+  def test_changed_library_updated(self):
+    _, files = self.dump('a', 'b')
+    self.create_lib('b', {'b.py': 'B = 2', 'c.py': 'C = 1'})
+    _, updated = self.dump('a', 'b')
+    self.assertEqual({'a/a.py', 'a/a.pyc', 'b/b.py', 'b/b.pyc', 'b/c.py', 'b/c.pyc'}, set(updated))
+    self.assertEqual(files['a/a.pyc'], updated['a/a.pyc'])
+    self.assertNotEqual(files['b/b.pyc'], updated['b/b.pyc'])
+
+  def test_removed_files_pruned(self):
+    self.create_lib('b', {'b.py': 'B = 1', 'c.py': 'C = 1'})
+    self.dump('a', 'b')
+    self.create_lib('b', {'b.py': 'B = 1'})
+    path, files = self.dump('a', 'b')
+    self.assertEqual({'a/a.py', 'a/a.pyc', 'b/b.py', 'b/b.pyc'}, set(files))
+    self.assertFalse(os.path.exists(os.path.join(path, 'b/c.py')))
+    self.assertFalse(os.path.exists(os.path.join(path, 'b/c.pyc')))
+
+  def test_namespace_init_replaced(self):
+    # Freezing the chroot writes namespace packages' __init__.py files, untracked by the manifest.
+    self.create_lib('b', {'pkg/p.py': 'P = 1'})
+    path, _ = self.dump('a', 'b')
+    with open(os.path.join(path, 'b/pkg/__init__.py')) as fp:
+      self.assertIn('declare_namespace', fp.read())
+    self.create_lib('b', {'pkg/p.py': 'P = 1', 'pkg/__init__.py': 'I = 1'})
+    path, _ = self.dump('a', 'b')
+    with open(os.path.join(path, 'b/pkg/__init__.py')) as fp:
+      self.assertEqual('I = 1', fp.read())
+
+  def test_unused_chroots_evicted(self):
+    old_path, _ = self.dump('a')
+    recent_path, _ = self.dump('b')
+    old = time.time() - ChrootTask._CACHED_CHROOT_MAX_AGE_SECS - 60
+    os.utime(old_path, (old, old))
+    self.dump('a', 'b')
+    self.assertFalse(os.path.exists(old_path))
+    self.assertFalse(os.path.exists('{}.manifest'.format(old_path)))
+    self.assertTrue(os.path.isdir(recent_path))
+
@@ -0,0 +1,66 @@
+# coding=utf-8
+# Copyright 2015 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (absolute_import, division, generators, nested_scopes, print_function,
+                        unicode_literals, with_statement)
+
+import multiprocessing
+import time
+import unittest
+from textwrap import dedent
+
+from pants.base.build_file import FilesystemBuildFile
+from pants.base.build_file_address_mapper import BuildFileAddressMapper
+from pants_test.base_test import BaseTest
+
+
+class BuildFileAddressMapperBenchmark(BaseTest):
+  """Times scanning the addresses of a generated tree of BUILD files serially and in parallel.
+
+  Not collected by default; run by hand, eg:
+
+    PYTHONPATH=src/python:tests/python \
+      python tests/python/pants_test/base/bench_build_file_address_mapper.py
+  """
+
+  NUM_BUILD_FILES = 10000
+
+  def setUp(self):
+    super(BuildFileAddressMapperBenchmark, self).setUp()
+    for i in range(self.NUM_BUILD_FILES):
+      self.add_to_build_file('src/dir{}/sub{}/BUILD'.format(i // 100, i), dedent("""
+        target(name='lib',
+          dependencies=[
+            ':util',
+            'src/dir{next_dir}/sub{next_sub}:lib',
+          ],
+        )
+
+        target(name='util')
+
+        target(name='tests',
+          dependencies=[':lib'],
+        )
+        """.format(next_dir=(i + 1) // 100, next_sub=i + 1)))
+
+  def _time_scan(self, workers):
+    address_mapper = BuildFileAddressMapper(self.build_file_parser, FilesystemBuildFile,
+                                            parse_workers=workers)
+    start = time.time()
+    addresses = address_mapper.scan_addresses(root=self.build_root)
+    elapsed = time.time() - start
+    self.assertEqual(3 * self.NUM_BUILD_FILES, len(addresses))
+    return elapsed
+
+  def test_parse_workers(self):
+    # Warm the page cache and the BuildFile cache so that the first run timed doesn't pay for them.
+    self._time_scan(1)
+    for workers in sorted({1, 2, 4, multiprocessing.cpu_count()}):
+      elapsed = self._time_scan(workers)
+      print('{} BUILD files  {:>3} workers  {:8.3f}s'.format(self.NUM_BUILD_FILES, workers,
+                                                             elapsed))
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,82 @@
+# coding=utf-8
+# Copyright 2015 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (absolute_import, division, generators, nested_scopes, print_function,
+                        unicode_literals, with_statement)
+
+import os
+import sys
+import time
+
+from pants.base.build_file import FilesystemBuildFile
+from pants.base.build_file_index import BuildFileIndex
+from pants.util.contextutil import temporary_dir
+from pants.util.dirutil import touch
+from pants.util.fileutil import RACY_WINDOW_SECS
+
+
+DIRS_PER_PACKAGE = 1000
+BUILD_FILE_EVERY = 10
+NUM_EXCLUDES = 20
+
+
+def _generate_tree(root_dir, num_dirs):
+  """Creates num_dirs leaf directories under root_dir, with a BUILD file in every tenth."""
+  for i in range(num_dirs):
+    path = os.path.join(root_dir, 'src', 'pkg{}'.format(i // DIRS_PER_PACKAGE), 'dir{}'.format(i))
+    os.makedirs(path)
+    touch(os.path.join(path, 'Source.java'))
+    if i % BUILD_FILE_EVERY == 0:
+      touch(os.path.join(path, 'BUILD'))
+
+
+def _time_scan(root_dir, spec_excludes):
+  FilesystemBuildFile.clear_cache()
+  start = time.time()
+  build_files = FilesystemBuildFile.scan_buildfiles(root_dir, spec_excludes=spec_excludes)
+  return len(build_files), time.time() - start
+
+
+def main(num_dirs):
+  """Times scanning a synthetic tree for BUILD files with and without a BuildFileIndex.
+
+  Run by hand, eg:
+
+    PYTHONPATH=src/python python tests/python/pants_test/base/bench_build_file_index.py 200000
+  """
+  with temporary_dir() as tmpdir:
+    root_dir = os.path.realpath(os.path.join(tmpdir, 'buildroot'))
+    _generate_tree(root_dir, num_dirs)
+    spec_excludes = [os.path.join('src', 'pkg0', 'dir{}'.format(i)) for i in range(NUM_EXCLUDES)]
+    # Directories modified within the racy window are not indexed.
+    time.sleep(RACY_WINDOW_SECS + 1)
+
+    def report(name, scan_result):
+      count, elapsed = scan_result
+      print('{:>7} dirs  {:<12} {:>6} BUILD files  {:8.3f}s'.format(num_dirs, name, count,
+                                                                      elapsed))
+
+    index_path = os.path.join(tmpdir, 'index.pickle')
+    try:
+      FilesystemBuildFile.set_index(None)
+      _time_scan(root_dir, spec_excludes)  # Warm the dentry cache.
+      report('no index', _time_scan(root_dir, spec_excludes))
+
+      index = BuildFileIndex(index_path, root_dir, FilesystemBuildFile.is_buildfile_name)
+      FilesystemBuildFile.set_index(index)
+      report('cold index', _time_scan(root_dir, spec_excludes))
+      start = time.time()
+      index.save()
+      print('{:>7} dirs  {:<12} {:8.3f}s'.format(num_dirs, 'index save', time.time() - start))
+
+      # As a new run would see it, including loading the index.
+      FilesystemBuildFile.set_index(BuildFileIndex(index_path, root_dir,
+                                                   FilesystemBuildFile.is_buildfile_name))
+      report('warm index', _time_scan(root_dir, spec_excludes))
+    finally:
+      FilesystemBuildFile.set_index(None)
+
+
+if __name__ == '__main__':
+  main(int(sys.argv[1]) if len(sys.argv) > 1 else 200000)
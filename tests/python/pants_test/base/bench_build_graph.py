@@ -0,0 +1,143 @@
+# coding=utf-8
+# Copyright 2015 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (absolute_import, division, generators, nested_scopes, print_function,
+                        unicode_literals, with_statement)
+
+import random
+import sys
+import time
+from collections import defaultdict
+
+from twitter.common.collections import OrderedSet
+
+from pants.base.address import SyntheticAddress
+from pants.base.build_graph import BuildGraph, CycleException, sort_targets
+from pants.base.target import Target
+
+
+def _recursive_sort_targets(targets):
+  """sort_targets as it was before it was made iterative."""
+  roots = OrderedSet()
+  inverted_deps = defaultdict(OrderedSet)  # target -> dependent targets
+  visited = set()
+  path = OrderedSet()
+
+  def invert(target):
+    if target in path:
+      path_list = list(path)
+      cycle_head = path_list.index(target)
+      cycle = path_list[cycle_head:] + [target]
+      raise CycleException(cycle)
+    path.add(target)
+    if target not in visited:
+      visited.add(target)
+      for dependency in target.dependencies:
+        inverted_deps[dependency].add(target)
+        invert(dependency)
+      else:
+        roots.add(target)
+    path.remove(target)
+
+  for target in targets:
+    invert(target)
+
+  ordered = []
+  visited.clear()
+
+  def topological_sort(target):
+    if target not in visited:
+      visited.add(target)
+      if target in inverted_deps:
+        for dep in inverted_deps[target]:
+          topological_sort(dep)
+      ordered.append(target)
+
+  for root in roots:
+    topological_sort(root)
+
+  return ordered
+
+
+def _recursive_walk(build_graph, addresses, work):
+  """BuildGraph.walk_transitive_dependency_graph as it was before it was made iterative."""
+  walked = set()
+  def _walk_rec(address):
+    if address not in walked:
+      walked.add(address)
+      target = build_graph.get_target(address)
+      work(target)
+      for dep_address in build_graph.dependencies_of(address):
+        _walk_rec(dep_address)
+  for address in addresses:
+    _walk_rec(address)
+
+
+def _build_graph(dependencies):
+  """Returns a BuildGraph of targets t0..tN, each depending on the targets listed for it, and
+  those targets in order."""
+  build_graph = BuildGraph(address_mapper=None)
+  targets = []
+  for i in range(len(dependencies)):
+    address = SyntheticAddress.parse('src:t{}'.format(i))
+    targets.append(Target(name=address.target_name, address=address, build_graph=build_graph))
+    build_graph.inject_target(targets[-1])
+  for target, dependency_indexes in zip(targets, dependencies):
+    for i in dependency_indexes:
+      build_graph.inject_dependency(dependent=target.address, dependency=targets[i].address)
+  return build_graph, targets
+
+
+def _deep(depth):
+  """A chain of depth targets, each depending on the next."""
+  return [[i + 1] for i in range(depth - 1)] + [[]]
+
+
+def _wide(count, max_dependencies=10):
+  """count targets, each depending on up to max_dependencies random later targets."""
+  rand = random.Random(0)
+  return [rand.sample(range(i + 1, count), min(count - i - 1, rand.randint(0, max_dependencies)))
+          for i in range(count)]
+
+
+def _time(func):
+  start = time.time()
+  try:
+    func()
+  except RuntimeError as e:
+    # The recursive implementations exceed the recursion limit on deep graphs.
+    return str(e)
+  return '{:.3f}s'.format(time.time() - start)
+
+
+def main():
+  """Times sorting and walking synthetic deep and wide graphs with the recursive and iterative
+  implementations.
+
+  Run by hand, eg:
+
+    PYTHONPATH=src/python python tests/python/pants_test/base/bench_build_graph.py
+  """
+  graphs = [
+    ('deep 900', _deep(900)),
+    ('deep 50000', _deep(50000)),
+    ('wide 50000', _wide(50000)),
+  ]
+  for name, dependencies in graphs:
+    build_graph, targets = _build_graph(dependencies)
+    roots = [targets[0].address] if name.startswith('deep') else [t.address for t in targets]
+    edges = sum(len(d) for d in dependencies)
+    print('{} ({} edges):'.format(name, edges))
+    for label, func in (
+        ('recursive sort_targets', lambda: _recursive_sort_targets(targets)),
+        ('iterative sort_targets', lambda: sort_targets(targets)),
+        ('recursive walk', lambda: _recursive_walk(build_graph, roots, lambda t: None)),
+        ('iterative walk',
+         lambda: build_graph.walk_transitive_dependency_graph(roots, lambda t: None))):
+      print('  {:<24} {}'.format(label, _time(func)))
+
+
+if __name__ == '__main__':
+  print('Recursion limit: {}'.format(sys.getrecursionlimit()))
+  main()
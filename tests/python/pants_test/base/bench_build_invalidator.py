@@ -0,0 +1,54 @@
+# coding=utf-8
+# Copyright 2015 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (absolute_import, division, generators, nested_scopes, print_function,
+                        unicode_literals, with_statement)
+
+import hashlib
+import sys
+import time
+
+from pants.base.build_invalidator import BUILD_INVALIDATORS, CacheKey, create_build_invalidator
+from pants.util.contextutil import temporary_dir
+
+
+def _cache_keys(count):
+  return [CacheKey('src.java.com.pants.target{}'.format(i),
+                   hashlib.sha1(str(i)).hexdigest(),
+                   1)
+          for i in range(count)]
+
+
+def _time_noop_check(backend, cache_keys):
+  with temporary_dir() as root:
+    invalidator = create_build_invalidator(root, backend)
+    for cache_key in cache_keys:
+      invalidator.update(cache_key)
+    invalidator.flush()
+
+    # A fresh invalidator, as a new pants run would see it.
+    invalidator = create_build_invalidator(root, backend)
+    start = time.time()
+    invalid = sum(1 for cache_key in cache_keys if invalidator.needs_update(cache_key))
+    elapsed = time.time() - start
+    assert invalid == 0, 'Expected no invalid keys, found {}'.format(invalid)
+    return elapsed
+
+
+def main(counts):
+  """Times a no-op check of each count of targets against each build invalidator backend.
+
+  Run by hand, eg:
+
+    PYTHONPATH=src/python python tests/python/pants_test/base/bench_build_invalidator.py 1000
+  """
+  for count in counts:
+    cache_keys = _cache_keys(count)
+    for backend in sorted(BUILD_INVALIDATORS):
+      elapsed = _time_noop_check(backend, cache_keys)
+      print('{:>7} targets  {:<6} {:8.3f}s'.format(count, backend, elapsed))
+
+
+if __name__ == '__main__':
+  main([int(arg) for arg in sys.argv[1:]] or [1000, 10000, 50000])
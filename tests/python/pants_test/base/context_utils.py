@@ -26,6 +26,8 @@ def create_option_values(option_values):
       self.__dict__ = option_values
     def __getitem__(self, key):
       return getattr(self, key)
+    def __iter__(self):
+      return iter(sorted(option_values))
   return TestOptionValues()
 
 
@@ -91,6 +93,12 @@ class TestContext(Context):
 
     artifact_cache_stats = DummyArtifactCacheStats()
 
+    def register_thread(self, parent_workunit): pass
+
+    @contextmanager
+    def new_workunit_under_parent(self, name, parent, labels=None, cmd=''):
+      yield TestContext.DummyWorkUnit()
+
   @contextmanager
   def new_workunit(self, name, labels=None, cmd=''):
     sys.stderr.write('\nStarting workunit {}\n'.format(name))
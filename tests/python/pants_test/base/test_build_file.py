@@ -164,6 +164,21 @@ class BuildFileTest(BuildFileTestBase):
                        ],
                       buildfiles)
 
+  def test_scan_buildfiles_exclude_nested(self):
+    buildfiles = FilesystemBuildFile.scan_buildfiles(
+      self.root_dir, 'grandparent', spec_excludes=[
+        'grandparent/parent/child2/child3',
+        'grandparent/parent/child5/',
+        'grandparent/parent/child9',
+      ])
+
+    self.assertEquals([self.create_buildfile('grandparent/parent/BUILD'),
+                       self.create_buildfile('grandparent/parent/BUILD.twitter'),
+                       self.create_buildfile('grandparent/parent/child1/BUILD'),
+                       self.create_buildfile('grandparent/parent/child1/BUILD.twitter'),
+                       ],
+                      buildfiles)
+
   def test_invalid_root_dir_error(self):
     self.touch('BUILD')
     with self.assertRaises(BuildFile.InvalidRootDirError):
@@ -11,6 +11,7 @@ from textwrap import dedent
 from pants.backend.core.targets.dependencies import Dependencies
 from pants.base.address import BuildFileAddress, SyntheticAddress
 from pants.base.address_lookup_error import AddressLookupError
+from pants.base.build_file import FilesystemBuildFile
 from pants.base.build_file_address_mapper import BuildFileAddressMapper
 from pants_test.base_test import BaseTest
 
@@ -110,3 +111,44 @@ class BuildFileAddressMapperTest(BaseTest):
     self.assertIsInstance(BuildFileAddressMapper.InvalidBuildFileReference(), AddressLookupError)
     self.assertIsInstance(BuildFileAddressMapper.InvalidAddressError(), AddressLookupError)
     self.assertIsInstance(BuildFileAddressMapper.BuildFileScanError(), AddressLookupError)
+
+  def parallel_address_mapper(self, workers=3):
+    return BuildFileAddressMapper(self.build_file_parser, FilesystemBuildFile,
+                                  parse_workers=workers)
+
+  def test_scan_addresses_parallel(self):
+    for i in range(20):
+      self.add_to_build_file('dir{}/BUILD'.format(i),
+                             'target(name="a", dependencies=["dir{}:b"])'.format(i + 1))
+      self.add_to_build_file('dir{}/BUILD.extra'.format(i), 'target(name="b")')
+
+    serial = self.address_mapper.scan_addresses(root=self.build_root)
+    parallel_mapper = self.parallel_address_mapper()
+    self.assertEquals(serial, parallel_mapper.scan_addresses(root=self.build_root))
+    for address in serial:
+      _, addressable = parallel_mapper.resolve(address)
+      self.assertEqual(Dependencies, addressable.target_type)
+      self.assertEqual(self.address_mapper.resolve_spec(address.spec).dependency_specs,
+                       addressable.dependency_specs)
+
+  def test_scan_addresses_parallel_errors(self):
+    def assert_same_error(message_regex):
+      with self.assertRaisesRegexp(AddressLookupError, message_regex) as serial:
+        self.reset_build_graph()
+        self.address_mapper.scan_addresses(root=self.build_root)
+      with self.assertRaises(AddressLookupError) as parallel:
+        self.parallel_address_mapper().scan_addresses(root=self.build_root)
+      self.assertEqual(type(serial.exception), type(parallel.exception))
+      self.assertEqual(str(serial.exception), str(parallel.exception))
+
+    for i in range(10):
+      self.add_to_build_file('dir{}/BUILD'.format(i), 'target(name="a")')
+
+    self.add_to_build_file('dir7/BUILD.extra', '\ntarget(name="a")')
+    assert_same_error("dir7.*define the same address: 'a'")
+
+    self.add_to_build_file('dir5/BUILD', '\ntarget(name="b", undefined=undefined)')
+    assert_same_error("name 'undefined' is not defined")
+
+    self.add_to_build_file('dir2/BUILD', '\ntarget(')
+    assert_same_error('SyntaxError')
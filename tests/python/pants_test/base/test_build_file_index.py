@@ -0,0 +1,73 @@
+# coding=utf-8
+# Copyright 2015 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (absolute_import, division, generators, nested_scopes, print_function,
+                        unicode_literals, with_statement)
+
+import os
+import time
+
+from mock import patch
+
+from pants.base.build_file import FilesystemBuildFile
+from pants.base.build_file_index import BuildFileIndex
+from pants.util.dirutil import safe_rmtree
+from pants_test.base.build_file_test_base import BuildFileTestBase
+
+
+class BuildFileIndexTest(BuildFileTestBase):
+
+  def setUp(self):
+    super(BuildFileIndexTest, self).setUp()
+    self.index_path = os.path.join(self.base_dir, 'index', 'build_files.pickle')
+    self.addCleanup(FilesystemBuildFile.set_index, None)
+
+  def age(self):
+    """Backdates recently modified directories under the root, so that they can be indexed."""
+    now = time.time()
+    for root, dirs, _ in os.walk(self.root_dir):
+      for path in [root] + [os.path.join(root, d) for d in dirs]:
+        if os.stat(path).st_mtime > now - 10:
+          os.utime(path, (now - 60, now - 60))
+
+  def scan(self, **kwargs):
+    """Scans with a fresh index, as a new run would, returning the scan and the dirs listed."""
+    index = BuildFileIndex(self.index_path, self.root_dir, FilesystemBuildFile.is_buildfile_name)
+    FilesystemBuildFile.set_index(index)
+    with patch('os.listdir', side_effect=os.listdir) as listdir:
+      buildfiles = FilesystemBuildFile.scan_buildfiles(self.root_dir, **kwargs)
+    index.save()
+    listed = set(os.path.relpath(call[0][0], self.root_dir) for call in listdir.call_args_list)
+    return buildfiles, listed
+
+  def walk(self, **kwargs):
+    FilesystemBuildFile.set_index(None)
+    return FilesystemBuildFile.scan_buildfiles(self.root_dir, **kwargs)
+
+  def test_same_as_walk(self):
+    self.age()
+    excludes = ['grandparent/parent/child1']
+    self.assertEquals(self.walk(), self.scan()[0])
+    self.assertEquals(self.walk(spec_excludes=excludes), self.scan(spec_excludes=excludes)[0])
+    self.assertEquals(self.walk(base_path='grandparent'), self.scan(base_path='grandparent')[0])
+
+  def test_only_changed_dirs_are_listed(self):
+    self.age()
+    self.assertIn('grandparent/parent/child4', self.scan()[1])
+    self.assertEquals(set(), self.scan()[1])
+
+    self.touch('grandparent/parent/child4/BUILD')
+    safe_rmtree(self.fullpath('grandparent/parent/child2'))
+    self.age()
+    buildfiles, listed = self.scan()
+    self.assertEquals({'grandparent/parent', 'grandparent/parent/child4'}, listed)
+    self.assertEquals(self.walk(), buildfiles)
+    self.assertIn(self.create_buildfile('grandparent/parent/child4/BUILD'), buildfiles)
+
+  def test_recently_modified_dirs_not_indexed(self):
+    self.age()
+    self.scan()
+    self.touch('grandparent/parent/child4/BUILD')
+    self.assertIn('grandparent/parent/child4', self.scan()[1])
+    self.assertIn('grandparent/parent/child4', self.scan()[1])
@@ -0,0 +1,160 @@
+# coding=utf-8
+# Copyright 2015 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (absolute_import, division, generators, nested_scopes, print_function,
+                        unicode_literals, with_statement)
+
+import os
+import time
+from textwrap import dedent
+
+from pants.backend.core.wrapped_globs import Globs, RGlobs
+from pants.base.build_file import FilesystemBuildFile
+from pants.base.build_file_aliases import BuildFileAliases
+from pants.base.build_file_parse_cache import BuildFileParseCache, watched_dirs
+from pants.base.build_file_parser import BuildFileParser
+from pants.base.target import Target
+from pants_test.base_test import BaseTest
+
+
+class SharedObject(object):
+  pass
+
+
+SHARED = SharedObject()
+
+
+class SideEffect(object):
+  def __init__(self, parse_context):
+    pass
+
+  def __call__(self):
+    return 'sources'
+
+
+class BuildFileParseCacheTest(BaseTest):
+
+  @property
+  def alias_groups(self):
+    return BuildFileAliases.create(
+      targets={'target': Target},
+      objects={'shared': SHARED},
+      context_aware_object_factories={
+        'globs': Globs,
+        'rglobs': RGlobs,
+        'side_effect': SideEffect,
+      })
+
+  def setUp(self):
+    super(BuildFileParseCacheTest, self).setUp()
+    self.cache_path = os.path.join(self.pants_workdir, 'parse_cache', 'cache.pickle')
+
+  def age(self):
+    """Backdates everything under the build root, so that it can be cached."""
+    old = time.time() - 60
+    for root, dirs, files in os.walk(self.build_root):
+      for name in dirs + files:
+        os.utime(os.path.join(root, name), (old, old))
+
+  def parse(self, relpath):
+    """Parses relpath with a fresh parser and cache, as a new run would."""
+    cache = BuildFileParseCache(self.cache_path)
+    parser = BuildFileParser(self._build_configuration, self.build_root, parse_cache=cache)
+    address_map = parser.parse_build_file(FilesystemBuildFile(self.build_root, relpath))
+    cache.save()
+    kwargs_by_name = {address.target_name: addressable.kwargs
+                      for address, addressable in address_map.items()}
+    return cache.hits, kwargs_by_name
+
+  def sources(self, kwargs):
+    return sorted(kwargs['sources'])
+
+  def test_round_trip(self):
+    self.create_file('a/A.java')
+    self.add_to_build_file('a/BUILD', dedent("""
+      target(name='a', sources=globs('*.java'), dependencies=[':b'], shared=shared)
+      target(name='b', sources=rglobs('*.java'))
+    """))
+    self.age()
+
+    hits, parsed = self.parse('a/BUILD')
+    self.assertEquals(0, hits)
+    hits, cached = self.parse('a/BUILD')
+    self.assertEquals(1, hits)
+
+    self.assertEquals(['A.java'], self.sources(cached['a']))
+    self.assertEquals(parsed['a']['sources'].filespec, cached['a']['sources'].filespec)
+    self.assertEquals(['A.java'], self.sources(cached['b']))
+    self.assertIs(SHARED, cached['a']['shared'])
+
+  def test_dependencies_round_trip(self):
+    build_file = self.add_to_build_file('a/BUILD', "target(name='a', dependencies=[':b', 'c'])")
+    self.age()
+    self.parse('a/BUILD')
+    cache = BuildFileParseCache(self.cache_path)
+    parser = BuildFileParser(self._build_configuration, self.build_root, parse_cache=cache)
+    _, addressable = parser.parse_build_file(build_file).popitem()
+    self.assertEquals(1, cache.hits)
+    self.assertEquals([':b', 'c'], addressable.dependency_specs)
+
+  def test_globbed_dir_changes_invalidate(self):
+    self.create_file('a/A.java')
+    self.create_file('a/sub/B.java')
+    self.add_to_build_file('a/BUILD', dedent("""
+      target(name='a', sources=globs('*.java'))
+      target(name='b', sources=rglobs('*.java'))
+    """))
+    self.age()
+    self.parse('a/BUILD')
+
+    self.create_file('a/sub/deeper/C.java')
+    self.age()
+    hits, parsed = self.parse('a/BUILD')
+    self.assertEquals(0, hits)
+    self.assertEquals(['A.java', 'sub/B.java', 'sub/deeper/C.java'], self.sources(parsed['b']))
+    self.assertEquals(1, self.parse('a/BUILD')[0])
+
+  def test_content_changes_invalidate(self):
+    self.add_to_build_file('a/BUILD', "target(name='a')")
+    self.age()
+    self.parse('a/BUILD')
+
+    self.create_file('a/BUILD', "target(name='b')")
+    self.age()
+    hits, parsed = self.parse('a/BUILD')
+    self.assertEquals(0, hits)
+    self.assertEquals(['b'], parsed.keys())
+
+    # Rewriting the same content changes the stat, but not the content hash.
+    self.create_file('a/BUILD', "target(name='b')")
+    self.age()
+    self.assertEquals(1, self.parse('a/BUILD')[0])
+
+  def test_recently_modified_not_cached(self):
+    self.add_to_build_file('a/BUILD', "target(name='a')")
+    self.parse('a/BUILD')
+    self.assertEquals(0, self.parse('a/BUILD')[0])
+
+  def test_side_effects_not_cached(self):
+    self.add_to_build_file('a/BUILD', "target(name='a', sources=side_effect())")
+    self.age()
+    self.parse('a/BUILD')
+    hits, parsed = self.parse('a/BUILD')
+    self.assertEquals(0, hits)
+    self.assertEquals('sources', parsed['a']['sources'])
+
+  def test_aliases_change_invalidates(self):
+    self.add_to_build_file('a/BUILD', "target(name='a')")
+    self.age()
+    self.parse('a/BUILD')
+    self._build_configuration.register_exposed_object('other', SharedObject())
+    self.assertEquals(0, self.parse('a/BUILD')[0])
+
+  def test_watched_dirs(self):
+    self.create_file('a/b/c/D.java')
+    dirs = watched_dirs(self.build_root, [{'globs': ['a/*.java', 'a/x/Y.java'],
+                                           'exclude': [{'globs': ['a/b/**/*.java']}]}])
+    self.assertEquals({'a', 'a/x', 'a/b', 'a/b/c'}, set(dirs))
+    self.assertIsNone(dirs['a/x'])
+    self.assertIsNone(watched_dirs(self.build_root, [{'globs': ['a/*/*.java']}]))
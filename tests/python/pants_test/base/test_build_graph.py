@@ -7,7 +7,7 @@ from __future__ import (absolute_import, division, generators, nested_scopes, pr
 
 from pants.base.address import SyntheticAddress, parse_spec
 from pants.base.address_lookup_error import AddressLookupError
-from pants.base.build_graph import BuildGraph
+from pants.base.build_graph import BuildGraph, CycleException, sort_targets
 from pants.base.target import Target
 from pants_test.base_test import BaseTest
 
@@ -140,6 +140,45 @@ class BuildGraphTest(BaseTest):
     assertDependencyWalk(a, [a, b, c, d, e])
     assertDependencyWalk(a, [c, d, b, e, a], postorder=True)
 
+  def test_deep_graph(self):
+    # Deeper than the recursion limit.
+    targets = [self.make_target('deep:t0')]
+    for i in range(1, 3000):
+      targets.append(self.make_target('deep:t{}'.format(i), dependencies=[targets[-1]]))
+
+    walked = []
+    self.build_graph.walk_transitive_dependency_graph([targets[-1].address], walked.append,
+                                                      postorder=True)
+    self.assertEquals(targets, walked)
+    walked = []
+    self.build_graph.walk_transitive_dependee_graph([targets[0].address], walked.append)
+    self.assertEquals(targets, walked)
+    self.assertEquals(list(reversed(targets)), sort_targets([targets[-1]]))
+
+  def test_sort_targets_cycle(self):
+    a = self.make_target('a')
+    b = self.make_target('b', dependencies=[a])
+    c = self.make_target('c', dependencies=[b])
+    a.inject_dependency(c.address)
+    with self.assertRaisesRegexp(CycleException, r'a:a ->\s+c:c ->\s+b:b ->\s+a:a$'):
+      sort_targets([a])
+
+  def test_sorted_targets_cached(self):
+    a = self.make_target('a')
+    b = self.make_target('b', dependencies=[a])
+    self.assertEquals([b, a], self.build_graph.sorted_targets())
+    sorted_targets = self.build_graph._sorted_targets
+    self.build_graph.inject_dependency(b.address, a.address)
+    self.assertIs(sorted_targets, self.build_graph._sorted_targets)
+
+    c = self.make_target('c')
+    self.assertEquals({a, b, c}, set(self.build_graph.sorted_targets()))
+    c.inject_dependency(b.address)
+    self.assertEquals([c, b, a], self.build_graph.sorted_targets())
+    a.inject_dependency(c.address)
+    with self.assertRaises(CycleException):
+      self.build_graph.sorted_targets()
+
   def test_target_closure(self):
     a = self.make_target('a')
     self.assertEquals([a], a.closure())
@@ -8,9 +8,11 @@ from __future__ import (absolute_import, division, generators, nested_scopes, pr
 import hashlib
 import os
 import tempfile
+import unittest
 from contextlib import contextmanager
 
-from pants.base.build_invalidator import BuildInvalidator, CacheKeyGenerator
+from pants.base.build_invalidator import (GLOBAL_CACHE_KEY_GEN_VERSION, BuildInvalidator, CacheKey,
+                                          CacheKeyGenerator, IndexedBuildInvalidator)
 from pants.util.contextutil import temporary_dir
 
 
@@ -58,3 +60,106 @@ def test_env(content=TEST_CONTENT):
 #     assert cache.needs_update(key)
 #     cache.update(key)
 #     assert not cache.needs_update(key)
+
+
+class BuildInvalidatorTest(unittest.TestCase):
+
+  invalidator_type = BuildInvalidator
+
+  def test_needs_update(self):
+    with temporary_dir() as root:
+      invalidator = self.invalidator_type(root)
+      key = CacheKey('a', 'hash1', 1)
+      self.assertTrue(invalidator.needs_update(key))
+      invalidator.update(key)
+      self.assertFalse(invalidator.needs_update(key))
+      self.assertTrue(invalidator.needs_update(CacheKey('a', 'hash2', 1)))
+
+  def test_update_persists_after_flush(self):
+    with temporary_dir() as root:
+      invalidator = self.invalidator_type(root)
+      invalidator.update(CacheKey('a', 'hash1', 1))
+      invalidator.update(CacheKey('b', 'hash2', 1))
+      invalidator.update(CacheKey('a', 'hash3', 1))
+      invalidator.flush()
+
+      invalidator = self.invalidator_type(root)
+      self.assertEqual('hash3', invalidator.existing_hash('a'))
+      self.assertEqual('hash2', invalidator.existing_hash('b'))
+      self.assertIsNone(invalidator.existing_hash('c'))
+
+  def test_force_invalidate(self):
+    with temporary_dir() as root:
+      invalidator = self.invalidator_type(root)
+      key = CacheKey('a', 'hash1', 1)
+      invalidator.update(key)
+      invalidator.force_invalidate(key)
+      self.assertTrue(invalidator.needs_update(key))
+      invalidator.flush()
+      self.assertTrue(self.invalidator_type(root).needs_update(key))
+
+  def test_force_invalidate_all(self):
+    with temporary_dir() as root:
+      invalidator = self.invalidator_type(root)
+      key = CacheKey('a', 'hash1', 1)
+      invalidator.update(key)
+      invalidator.flush()
+      self.invalidator_type(root).force_invalidate_all()
+      self.assertTrue(self.invalidator_type(root).needs_update(key))
+
+
+class IndexedBuildInvalidatorTest(BuildInvalidatorTest):
+
+  invalidator_type = IndexedBuildInvalidator
+
+  def index_file(self, root):
+    return os.path.join(root, GLOBAL_CACHE_KEY_GEN_VERSION, IndexedBuildInvalidator.INDEX_FILENAME)
+
+  def test_updates_are_buffered_until_flush(self):
+    with temporary_dir() as root:
+      invalidator = IndexedBuildInvalidator(root)
+      key = CacheKey('a', 'hash1', 1)
+      invalidator.update(key)
+      self.assertTrue(IndexedBuildInvalidator(root).needs_update(key))
+      invalidator.flush()
+      self.assertFalse(IndexedBuildInvalidator(root).needs_update(key))
+
+  def test_interrupted_write_ignored(self):
+    with temporary_dir() as root:
+      invalidator = IndexedBuildInvalidator(root)
+      invalidator.update(CacheKey('a', 'hash1', 1))
+      invalidator.flush()
+      with open(self.index_file(root), 'ab') as fd:
+        fd.write('b\thas')
+      invalidator = IndexedBuildInvalidator(root)
+      self.assertEqual('hash1', invalidator.existing_hash('a'))
+      self.assertIsNone(invalidator.existing_hash('b'))
+
+  def test_compaction(self):
+    with temporary_dir() as root:
+      invalidator = IndexedBuildInvalidator(root)
+      for i in range(100):
+        invalidator.update(CacheKey('a', 'hash{}'.format(i), 1))
+        invalidator.flush()
+      with open(self.index_file(root), 'rb') as fd:
+        self.assertLess(len(fd.readlines()), 100)
+      self.assertEqual('hash99', IndexedBuildInvalidator(root).existing_hash('a'))
+
+  def test_compaction_keeps_concurrent_updates(self):
+    with temporary_dir() as root:
+      invalidator = IndexedBuildInvalidator(root)
+      invalidator.update(CacheKey('a', 'hash0', 1))
+      invalidator.flush()
+
+      other = IndexedBuildInvalidator(root)
+      other.update(CacheKey('b', 'hash0', 1))
+      other.flush()
+
+      for i in range(1, 100):
+        invalidator.update(CacheKey('a', 'hash{}'.format(i), 1))
+        invalidator.flush()
+      with open(self.index_file(root), 'rb') as fd:
+        self.assertLess(len(fd.readlines()), 100)
+      reloaded = IndexedBuildInvalidator(root)
+      self.assertEqual('hash99', reloaded.existing_hash('a'))
+      self.assertEqual('hash0', reloaded.existing_hash('b'))
@@ -0,0 +1,123 @@
+# coding=utf-8
+# Copyright 2015 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (absolute_import, division, generators, nested_scopes, print_function,
+                        unicode_literals, with_statement)
+
+import os
+from textwrap import dedent
+
+from pants.backend.core.targets.resources import Resources
+from pants.backend.jvm.targets.java_library import JavaLibrary
+from pants.backend.jvm.targets.scala_library import ScalaLibrary
+from pants.base.build_file import FilesystemBuildFile
+from pants.base.build_file_address_mapper import BuildFileAddressMapper
+from pants.base.build_file_aliases import BuildFileAliases
+from pants.base.build_graph import BuildGraph
+from pants.base.dependee_index import DependeeIndex
+from pants.base.target import Target
+from pants.subsystem.subsystem import Subsystem
+from pants_test.base_test import BaseTest
+
+
+class DependeeIndexTest(BaseTest):
+
+  @property
+  def alias_groups(self):
+    return BuildFileAliases.create(
+      targets={
+        'target': Target,
+        'java_library': JavaLibrary,
+        'resources': Resources,
+        'scala_library': ScalaLibrary,
+      })
+
+  def setUp(self):
+    super(DependeeIndexTest, self).setUp()
+    self.set_runtime([])
+    self.index_path = os.path.join(self.pants_workdir, 'dependee_index', 'index.pickle')
+    self.add_to_build_file('a/BUILD', "target(name='a')")
+    self.add_to_build_file('b/BUILD', "target(name='b', dependencies=['a'])")
+    self.add_to_build_file('c/BUILD', dedent("""
+      target(name='c', dependencies=['b:b', ':d'])
+      target(name='d')
+    """))
+
+  def set_runtime(self, runtime):
+    Subsystem.reset()
+    self.context(options={'scala-platform': {'runtime': runtime}})
+
+  def update(self):
+    """Updates a fresh index over the whole build root, as a new run would.
+
+    :returns: The index, the spec paths it covers and the spec paths that were parsed.
+    """
+    parsed = []
+
+    class RecordingAddressMapper(BuildFileAddressMapper):
+      def addresses_in_build_files(self, build_files):
+        build_files = list(build_files)
+        parsed.extend(build_file.spec_path for build_file in build_files)
+        return super(RecordingAddressMapper, self).addresses_in_build_files(build_files)
+
+    address_mapper = RecordingAddressMapper(self.build_file_parser, FilesystemBuildFile)
+    index = DependeeIndex(self.index_path, self.build_file_parser)
+    build_files = address_mapper.scan_buildfiles(self.build_root)
+    spec_paths = index.update(BuildGraph(address_mapper), build_files)
+    index.save()
+    return index, spec_paths, sorted(parsed)
+
+  def test_dependees(self):
+    index, spec_paths, parsed = self.update()
+    self.assertEquals(['a', 'b', 'c'], parsed)
+    self.assertEquals({'b:b'}, index.dependees(['a:a'], spec_paths))
+    self.assertEquals({'b:b', 'c:c'}, index.dependees(['a:a'], spec_paths, transitive=True))
+    self.assertEquals({'c:c'}, index.dependees(['c:d', 'b:b'], spec_paths))
+    self.assertEquals(set(), index.dependees(['c:c'], spec_paths, transitive=True))
+
+  def test_scoped(self):
+    index, _, _ = self.update()
+    self.assertEquals({'b:b'}, index.dependees(['a:a'], {'a', 'b'}, transitive=True))
+    # Dependees outside the scope are not followed either.
+    self.assertEquals(set(), index.dependees(['a:a'], {'a', 'c'}, transitive=True))
+
+  def test_incremental(self):
+    self.update()
+    index, spec_paths, parsed = self.update()
+    self.assertEquals([], parsed)
+    self.assertEquals({'b:b', 'c:c'}, index.dependees(['a:a'], spec_paths, transitive=True))
+
+    self.create_file('b/BUILD', "target(name='b')")
+    self.add_to_build_file('b/BUILD.extra', "target(name='e', dependencies=['a'])")
+    index, spec_paths, parsed = self.update()
+    self.assertEquals(['b', 'b'], parsed)
+    self.assertEquals({'b:e'}, index.dependees(['a:a'], spec_paths, transitive=True))
+    self.assertEquals({'c:c'}, index.dependees(['b:b'], spec_paths))
+
+  def test_deleted_build_files_evicted(self):
+    self.update()
+    os.unlink(os.path.join(self.build_root, 'b', 'BUILD'))
+    index, spec_paths, parsed = self.update()
+    self.assertEquals([], parsed)
+    self.assertEquals({'a', 'c'}, spec_paths)
+    self.assertEquals(set(), index.dependees(['a:a'], spec_paths))
+    self.assertEquals(set(), DependeeIndex(self.index_path, None).dependees(['a:a'], {'b'}))
+
+  def test_traversable_dependency_specs(self):
+    self.add_to_build_file('r/BUILD', "resources(name='r', sources=[])")
+    self.add_to_build_file('j/BUILD', "java_library(name='j', sources=[], resources=['r'])")
+    index, spec_paths, _ = self.update()
+    self.assertEquals({'j:j'}, index.dependees(['r:r'], spec_paths))
+
+  def test_option_dependencies(self):
+    self.add_to_build_file('s/BUILD', "scala_library(name='s', sources=[])")
+    self.set_runtime(['a'])
+    index, spec_paths, _ = self.update()
+    self.assertEquals({'b:b', 's:s'}, index.dependees(['a:a'], spec_paths))
+
+    self.set_runtime(['c:d'])
+    index, spec_paths, parsed = self.update()
+    self.assertEquals(['a', 'b', 'c', 's'], parsed)
+    self.assertEquals({'b:b'}, index.dependees(['a:a'], spec_paths))
+    self.assertEquals({'c:c', 's:s'}, index.dependees(['c:d'], spec_paths))
@@ -5,9 +5,12 @@
 from __future__ import (absolute_import, division, generators, nested_scopes, print_function,
                         unicode_literals, with_statement)
 
+import os
+
 from pants.backend.jvm.targets.java_library import JavaLibrary
 from pants.base.build_file_aliases import BuildFileAliases
 from pants.base.lazy_source_mapper import LazySourceMapper
+from pants.base.source_owner_index import SourceOwnerIndex
 from pants_test.base_test import BaseTest
 
 
@@ -87,3 +90,15 @@ class LazySourceMapperTest(BaseTest):
     self.owner(['a/b:b'], 'a/b/bar.py')
     self.owner([':top'], 'foo.py')
     self.owner([':top', 'a/b:b'], 'a/b/bar.py')
+
+
+class IndexedLazySourceMapperTest(LazySourceMapperTest):
+  """Runs the same tests mapping sources through a SourceOwnerIndex, reused across mappers."""
+
+  def set_mapper(self, fast=False):
+    if not hasattr(self, 'source_owner_index'):
+      self.source_owner_index = SourceOwnerIndex(
+        os.path.join(self.pants_workdir, 'source_owner_index', 'index.pickle'),
+        self.build_file_parser)
+    self.mapper = LazySourceMapper(self.address_mapper, self.build_graph, stop_after_match=fast,
+                                   source_owner_index=self.source_owner_index)
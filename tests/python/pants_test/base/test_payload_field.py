@@ -5,6 +5,8 @@
 from __future__ import (absolute_import, division, generators, nested_scopes, print_function,
                         unicode_literals, with_statement)
 
+import os
+import time
 from hashlib import sha1
 
 from pants.backend.jvm.targets.exclude import Exclude
@@ -13,6 +15,8 @@ from pants.backend.python.python_requirement import PythonRequirement
 from pants.base.payload_field import (ExcludesField, FingerprintedField, FingerprintedMixin,
                                       JarsField, PrimitiveField, PythonRequirementsField,
                                       SourcesField)
+from pants.base.source_digest_cache import SourceDigestCache
+from pants.util.dirutil import touch
 from pants_test.base_test import BaseTest
 
 
@@ -289,3 +293,25 @@ class PayloadTest(BaseTest):
 
     with self.assertRaises(NotImplementedError):
       FingerprintedField(TestUnimplementedValue()).fingerprint()
+
+  def test_sources_field_digest_cache(self):
+    self.create_file('foo/bar/a.txt', 'a_contents')
+    old = time.time() - 60
+    touch(os.path.join(self.build_root, 'foo/bar/a.txt'), (old, old))
+
+    def fingerprint():
+      return SourcesField(sources_rel_path='foo/bar', sources=['a.txt']).fingerprint()
+
+    uncached_fp = fingerprint()
+    digest_cache = SourceDigestCache(os.path.join(self.pants_workdir, 'digests.pickle'))
+    SourcesField.set_digest_cache(digest_cache)
+    try:
+      self.assertEqual(uncached_fp, fingerprint())
+      key = SourceDigestCache.key_for('foo/bar', 'foo/bar/a.txt')
+      self.assertEqual(uncached_fp, digest_cache.get(key))
+      self.assertEqual(uncached_fp, fingerprint())
+
+      self.create_file('foo/bar/a.txt', 'a_contents_different')
+      self.assertNotEqual(uncached_fp, fingerprint())
+    finally:
+      SourcesField.set_digest_cache(None)
@@ -48,3 +48,25 @@ class ScmBuildFileTest(BuildFileTestBase):
 
       buildfile = self.create_buildfile('grandparent/parent/child2/child3/BUILD')
       self.assertEquals(OrderedSet(), OrderedSet(buildfile.siblings()))
+
+  def test_scan_buildfiles_with_rev(self):
+    with pushd(self.root_dir):
+      subprocess.check_call(['git', 'init'])
+      subprocess.check_call(['git', 'config', 'user.email', 'you@example.com'])
+      subprocess.check_call(['git', 'config', 'user.name', 'Your Name'])
+      subprocess.check_call(['git', 'add', '.'])
+      subprocess.check_call(['git', 'commit', '-m' 'initial commit'])
+
+      subprocess.check_call(['rm', '-rf', 'grandparent/parent/child1'])
+      self.touch('grandparent/parent/child4/BUILD')
+
+      buildfiles = ScmBuildFile.scan_buildfiles(self.root_dir, 'grandparent', spec_excludes=[
+        'grandparent/parent/child2',
+      ])
+      self.assertEquals([self.create_buildfile('grandparent/parent/BUILD'),
+                         self.create_buildfile('grandparent/parent/BUILD.twitter'),
+                         self.create_buildfile('grandparent/parent/child1/BUILD'),
+                         self.create_buildfile('grandparent/parent/child1/BUILD.twitter'),
+                         self.create_buildfile('grandparent/parent/child5/BUILD'),
+                         ],
+                        buildfiles)
@@ -0,0 +1,102 @@
+# coding=utf-8
+# Copyright 2015 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (absolute_import, division, generators, nested_scopes, print_function,
+                        unicode_literals, with_statement)
+
+import os
+import time
+import unittest
+
+from pants.base.source_digest_cache import SourceDigestCache
+from pants.util.contextutil import temporary_dir
+from pants.util.dirutil import touch
+
+
+class SourceDigestCacheTest(unittest.TestCase):
+
+  def create_file(self, root, name, contents):
+    path = os.path.join(root, name)
+    with open(path, 'wb') as fp:
+      fp.write(contents)
+    # Age the file past the racy window so that digests over it are cacheable.
+    old = time.time() - 60
+    touch(path, (old, old))
+    return path
+
+  def test_round_trip(self):
+    with temporary_dir() as root:
+      a = self.create_file(root, 'a', 'a')
+      b = self.create_file(root, 'b', 'b')
+      cache_file = os.path.join(root, 'cache', 'digests.pickle')
+      key = SourceDigestCache.key_for('a', 'b')
+
+      cache = SourceDigestCache(cache_file)
+      self.assertIsNone(cache.get(key))
+      cache.put(key, [a, b], 'digest')
+      self.assertEqual('digest', cache.get(key))
+      cache.save()
+
+      self.assertEqual('digest', SourceDigestCache(cache_file).get(key))
+
+  def test_stat_change_invalidates(self):
+    with temporary_dir() as root:
+      a = self.create_file(root, 'a', 'a')
+      key = SourceDigestCache.key_for('a')
+      cache = SourceDigestCache(os.path.join(root, 'digests.pickle'))
+      cache.put(key, [a], 'digest')
+      self.create_file(root, 'a', 'aa')
+      self.assertIsNone(cache.get(key))
+
+  def test_recently_modified_files_not_cached(self):
+    with temporary_dir() as root:
+      a = os.path.join(root, 'a')
+      touch(a)
+      key = SourceDigestCache.key_for('a')
+      cache = SourceDigestCache(os.path.join(root, 'digests.pickle'))
+      cache.put(key, [a], 'digest')
+      self.assertIsNone(cache.get(key))
+
+  def test_deleted_files_evicted(self):
+    with temporary_dir() as root:
+      a = self.create_file(root, 'a', 'a')
+      b = self.create_file(root, 'b', 'b')
+      cache_file = os.path.join(root, 'digests.pickle')
+      cache = SourceDigestCache(cache_file)
+      cache.put('a', [a], 'digest_a')
+      cache.put('b', [b], 'digest_b')
+      cache.save()
+
+      os.unlink(a)
+      cache = SourceDigestCache(cache_file)
+      cache.put('c', [b], 'digest_c')
+      cache.save()
+
+      cache = SourceDigestCache(cache_file)
+      self.assertIsNone(cache.get('a'))
+      self.assertEqual('digest_b', cache.get('b'))
+      self.assertEqual('digest_c', cache.get('c'))
+
+  def test_unused_entries_evicted(self):
+    with temporary_dir() as root:
+      a = self.create_file(root, 'a', 'a')
+      cache_file = os.path.join(root, 'digests.pickle')
+      cache = SourceDigestCache(cache_file)
+      cache.put('old', [a], 'digest_old')
+      cache.put('recent', [a], 'digest_recent')
+      cache.save()
+
+      # Backdate the last use of one entry past the eviction horizon, and of the other only past
+      # the point where using it records the use.
+      cache = SourceDigestCache(cache_file)
+      now = time.time()
+      cache._load()['old'][2] = now - SourceDigestCache._MAX_UNUSED_SECS - 60
+      cache._load()['recent'][2] = now - SourceDigestCache._USE_RESOLUTION_SECS - 60
+      self.assertEqual('digest_recent', cache.get('recent'))
+      cache.save()
+
+      cache = SourceDigestCache(cache_file)
+      self.assertIsNone(cache.get('old'))
+      self.assertEqual('digest_recent', cache.get('recent'))
+      self.assertGreater(cache._load()['recent'][2], now - 60)
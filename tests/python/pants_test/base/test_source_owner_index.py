@@ -0,0 +1,104 @@
+# coding=utf-8
+# Copyright 2015 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (absolute_import, division, generators, nested_scopes, print_function,
+                        unicode_literals, with_statement)
+
+import os
+import time
+
+from pants.backend.core.targets.resources import Resources
+from pants.backend.core.wrapped_globs import Globs
+from pants.backend.jvm.targets.java_library import JavaLibrary
+from pants.base.build_file_aliases import BuildFileAliases
+from pants.base.lazy_source_mapper import LazySourceMapper
+from pants.base.source_owner_index import SourceOwnerIndex
+from pants_test.base_test import BaseTest
+
+
+class SourceOwnerIndexTest(BaseTest):
+
+  @property
+  def alias_groups(self):
+    return BuildFileAliases.create(
+      targets={
+        'java_library': JavaLibrary,
+        'resources': Resources,
+      },
+      context_aware_object_factories={
+        'globs': Globs,
+      })
+
+  def setUp(self):
+    super(SourceOwnerIndexTest, self).setUp()
+    self.index_path = os.path.join(self.pants_workdir, 'source_owner_index', 'index.pickle')
+
+  def age(self):
+    """Backdates everything under the build root, so that it can be indexed."""
+    old = time.time() - 60
+    for root, dirs, files in os.walk(self.build_root):
+      for name in dirs + files:
+        os.utime(os.path.join(root, name), (old, old))
+
+  def owners(self, *sources):
+    """Maps sources with a fresh graph, mapper and index, as a new run would.
+
+    :returns: The number of families indexed and the owner specs of each source.
+    """
+    indexed = []
+
+    class RecordingSourceMapper(LazySourceMapper):
+      def _index_family(self, build_file):
+        indexed.append(build_file.spec_path)
+        return super(RecordingSourceMapper, self)._index_family(build_file)
+
+    self.reset_build_graph()
+    index = SourceOwnerIndex(self.index_path, self.build_file_parser)
+    mapper = RecordingSourceMapper(self.address_mapper, self.build_graph,
+                                   source_owner_index=index)
+    owners = [sorted(address.spec for address in mapper.target_addresses_for_source(source))
+              for source in sources]
+    index.save()
+    return len(indexed), owners
+
+  def test_reused(self):
+    self.create_library('a', 'java_library', 'a', ['A.java'])
+    self.age()
+    self.assertEquals((1, [['a:a'], ['a:a']]), self.owners('a/A.java', 'a/BUILD'))
+    self.assertEquals((0, [['a:a'], ['a:a']]), self.owners('a/A.java', 'a/BUILD'))
+
+  def test_build_file_change_invalidates(self):
+    self.create_library('a', 'java_library', 'a', ['A.java'])
+    self.age()
+    self.owners('a/A.java')
+    self.create_file('a/BUILD', "java_library(name='b', sources=['A.java'])")
+    self.age()
+    self.assertEquals((1, [['a:b']]), self.owners('a/A.java'))
+
+  def test_globbed_dir_change_invalidates(self):
+    self.create_file('a/A.java')
+    self.add_to_build_file('a/BUILD', "java_library(name='a', sources=globs('*.java'))")
+    self.age()
+    self.assertEquals((1, [[]]), self.owners('a/B.java'))
+    self.create_file('a/B.java')
+    self.age()
+    self.assertEquals((1, [['a:a']]), self.owners('a/B.java'))
+    self.assertEquals((0, [['a:a']]), self.owners('a/B.java'))
+
+  def test_resources_change_invalidates(self):
+    self.add_to_build_file('j/res/BUILD', "resources(name='res', sources=['a.txt'])")
+    self.add_to_build_file('j/BUILD', "java_library(name='j', sources=[], resources=['j/res'])")
+    self.age()
+    self.assertEquals((2, [['j/res:res', 'j:j']]), self.owners('j/res/a.txt'))
+
+    # The resources changing changes what the java_library owns, though its BUILD file is as was.
+    self.create_file('j/res/BUILD', "resources(name='res', sources=['b.txt'])")
+    self.age()
+    self.assertEquals((2, [[], ['j/res:res', 'j:j']]), self.owners('j/res/a.txt', 'j/res/b.txt'))
+
+  def test_recently_modified_not_indexed(self):
+    self.create_file('a/A.java')
+    self.add_to_build_file('a/BUILD', "java_library(name='a', sources=globs('*.java'))")
+    self.owners('a/A.java')
+    self.assertEquals((1, [['a:a']]), self.owners('a/A.java'))
@@ -11,6 +11,8 @@ from pants.backend.core.wrapped_globs import Globs
 from pants.backend.jvm.targets.java_library import JavaLibrary
 from pants.base.address import BuildFileAddress, SyntheticAddress
 from pants.base.build_file_aliases import BuildFileAliases
+from pants.base.build_graph import CycleException
+from pants.base.fingerprint_strategy import DefaultFingerprintHashingMixin, FingerprintStrategy
 from pants.base.payload import Payload
 from pants.base.payload_field import DeferredSourcesField
 from pants.base.target import Target
@@ -25,6 +27,16 @@ class TestDeferredSourcesTarget(Target):
     })
     super(TestDeferredSourcesTarget, self).__init__(payload=payload, *args, **kwargs)
 
+class NameFingerprintStrategy(DefaultFingerprintHashingMixin, FingerprintStrategy):
+  """Fingerprints each target by its name, counting the fingerprints computed."""
+
+  computed = 0
+
+  def compute_fingerprint(self, target):
+    NameFingerprintStrategy.computed += 1
+    return target.name
+
+
 class TargetTest(BaseTest):
   @property
   def alias_groups(self):
@@ -84,3 +96,44 @@ class TargetTest(BaseTest):
                                        deferred_sources_address=SyntheticAddress.parse('//:foo'))
     self.assertSequenceEqual([], list(target.traversable_specs))
     self.assertSequenceEqual([':foo'], list(target.traversable_dependency_specs))
+
+  def test_transitive_invalidation_hash_deep_graph(self):
+    strategy = NameFingerprintStrategy()
+    # Deeper than the recursion limit.
+    target = self.make_target('deep:t0')
+    for i in range(1, 3000):
+      target = self.make_target('deep:t{}'.format(i), dependencies=[target])
+    self.assertIsNotNone(target.transitive_invalidation_hash(strategy))
+
+  def test_transitive_invalidation_hash_dirty_propagation(self):
+    strategy = NameFingerprintStrategy()
+    a = self.make_target('dirty:a')
+    b = self.make_target('dirty:b', dependencies=[a])
+    c = self.make_target('dirty:c', dependencies=[b])
+    sibling = self.make_target('dirty:sibling', dependencies=[a])
+    other = self.make_target('dirty:other')
+    hashes = dict((t, t.transitive_invalidation_hash(strategy)) for t in (c, sibling, other))
+
+    # Injecting a dependency invalidates the dependent and its dependees, and nothing else.
+    NameFingerprintStrategy.computed = 0
+    b.inject_dependency(other.address)
+    self.assertNotEquals(hashes[c], c.transitive_invalidation_hash(strategy))
+    self.assertEquals(hashes[sibling], sibling.transitive_invalidation_hash(strategy))
+    self.assertEquals(hashes[other], other.transitive_invalidation_hash(strategy))
+    # Only the transitive hashes were recomputed; each target's own hash is still memoized.
+    self.assertEquals(0, NameFingerprintStrategy.computed)
+
+    # Dirtying a target's own hash also invalidates its dependees' transitive hashes.
+    hashes = dict((t, t.transitive_invalidation_hash(strategy)) for t in (c, sibling, other))
+    other.mark_invalidation_hash_dirty()
+    self.assertEquals({}, c._cached_transitive_fingerprint_map)
+    self.assertTrue(sibling._cached_transitive_fingerprint_map)
+    self.assertEquals(hashes[c], c.transitive_invalidation_hash(strategy))
+    self.assertEquals(1, NameFingerprintStrategy.computed)
+
+  def test_transitive_invalidation_hash_cycle(self):
+    a = self.make_target('cycle:a')
+    b = self.make_target('cycle:b', dependencies=[a])
+    a.inject_dependency(b.address)
+    with self.assertRaises(CycleException):
+      b.transitive_invalidation_hash(NameFingerprintStrategy())
@@ -0,0 +1,118 @@
+# coding=utf-8
+# Copyright 2015 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (absolute_import, division, generators, nested_scopes, print_function,
+                        unicode_literals, with_statement)
+
+import os
+import random
+import sys
+import time
+
+from pants.cache.artifact import TarballArtifact
+from pants.cache.compression import CODECS, codec_available
+from pants.util.contextutil import open_tar, temporary_dir
+from pants.util.dirutil import safe_mkdir, safe_mkdir_for, safe_rmtree
+
+
+# (codec, level, threads) for each configuration timed.
+CONFIGURATIONS = [
+  ('none', 0, 1),
+  ('gzip', 1, 1),
+  ('gzip', 5, 1),
+  ('gzip', 9, 1),
+  ('gzip', 5, 4),
+  ('lz4', 0, 1),
+  ('zstd', 3, 1),
+  ('zstd', 3, 4),
+]
+
+
+def _write_classes(root, num_files=4000, file_size=32 * 1024):
+  """Writes files of about as compressible, partially repetitive data as class files."""
+  rand = random.Random(0)
+  words = [os.urandom(rand.randint(4, 24)) for _ in range(512)]
+  for i in range(num_files):
+    path = os.path.join(root, 'com/pants/pkg{}/Class{}.class'.format(i // 100, i))
+    safe_mkdir_for(path)
+    with open(path, 'wb') as fp:
+      written = 0
+      while written < file_size:
+        word = rand.choice(words)
+        fp.write(word)
+        written += len(word)
+
+
+def _size(root):
+  return sum(os.path.getsize(os.path.join(dirpath, filename))
+             for dirpath, _, filenames in os.walk(root) for filename in filenames)
+
+
+def _time(func):
+  start = time.time()
+  func()
+  return time.time() - start
+
+
+def _report(name, classes_size, tarball, collect_secs, extract_secs):
+  mb = classes_size / 1024 / 1024
+  print('{:<22} ratio {:5.2f}  collect {:7.1f}MB/s  extract {:7.1f}MB/s'.format(
+    name, classes_size / os.path.getsize(tarball), mb / collect_secs, mb / extract_secs))
+
+
+def main(classes):
+  """Times collecting and extracting a classes directory with each codec.
+
+  The classes directory is the given one or else a synthetic one.  Run by hand, eg:
+
+    PYTHONPATH=src/python \
+      python tests/python/pants_test/cache/bench_artifact_codecs.py path/to/classes
+  """
+  with temporary_dir() as tmpdir:
+    if classes is None:
+      classes = os.path.join(tmpdir, 'classes')
+      _write_classes(classes)
+    classes = os.path.realpath(classes)
+    classes_size = _size(classes)
+    artifact_root = os.path.dirname(classes)
+    paths = [os.path.join(classes, name) for name in os.listdir(classes)]
+    print('{}: {:.1f}MB'.format(classes, classes_size / 1024 / 1024))
+    extract_root = os.path.join(tmpdir, 'extracted')
+
+    def extract(extract_into):
+      safe_rmtree(extract_root)
+      safe_mkdir(extract_root)
+      extract_into(extract_root)
+
+    # The artifact as it was written and read before codecs were selectable.
+    tarball = os.path.join(tmpdir, 'old.tgz')
+
+    def collect_old():
+      with open_tar(tarball, 'w:gz', dereference=True, compresslevel=5) as tarout:
+        for path in paths:
+          tarout.add(path, os.path.relpath(path, artifact_root))
+
+    def extract_old(root):
+      with open_tar(tarball, 'r:gz', errorlevel=2) as tarin:
+        tarin.extractall(root)
+
+    collect_secs = _time(collect_old)
+    extract_secs = _time(lambda: extract(extract_old))
+    _report('tarfile w:gz level 5', classes_size, tarball, collect_secs, extract_secs)
+
+    for codec, level, threads in CONFIGURATIONS:
+      name = '{} level {} x{}'.format(codec, level, threads)
+      if not codec_available(codec):
+        print('{:<22} unavailable'.format(name))
+        continue
+      tarball = os.path.join(tmpdir, 'artifact.{}'.format(codec))
+      artifact = TarballArtifact(artifact_root, tarball, level, codec=codec, threads=threads)
+      collect_secs = _time(lambda: artifact.collect(paths))
+      extract_secs = _time(lambda: extract(lambda root: TarballArtifact(root, tarball).extract()))
+      _report(name, classes_size, tarball, collect_secs, extract_secs)
+
+
+if __name__ == '__main__':
+  assert set(codec for codec, _, _ in CONFIGURATIONS) == set(CODECS)
+  main(sys.argv[1] if len(sys.argv) > 1 else None)
@@ -0,0 +1,91 @@
+# coding=utf-8
+# Copyright 2015 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (absolute_import, division, generators, nested_scopes, print_function,
+                        unicode_literals, with_statement)
+
+import os
+import random
+import sys
+import time
+
+from pants.base.build_invalidator import CacheKey
+from pants.cache.artifact import TarballArtifact
+from pants.cache.local_artifact_cache import TempLocalArtifactCache
+from pants.cache.restful_artifact_cache import RESTfulArtifactCache
+from pants.util.contextutil import temporary_dir, temporary_file
+from pants.util.dirutil import safe_mkdir, safe_mkdir_for, safe_rmtree
+
+
+NUM_FILES = 4000
+FILE_SIZE = 32 * 1024
+
+
+def _write_classes(root):
+  """Writes NUM_FILES files of about as compressible, partially repetitive data as class files."""
+  rand = random.Random(0)
+  words = [os.urandom(rand.randint(4, 24)) for _ in range(512)]
+  paths = []
+  for i in range(NUM_FILES):
+    path = os.path.join(root, 'com/pants/pkg{}/Class{}.class'.format(i // 100, i))
+    safe_mkdir_for(path)
+    with open(path, 'wb') as fp:
+      written = 0
+      while written < FILE_SIZE:
+        word = rand.choice(words)
+        fp.write(word)
+        written += len(word)
+    paths.append(path)
+  return paths
+
+
+def _download(tarball, bytes_per_sec):
+  """Yields the chunks of tarball as a download at bytes_per_sec would."""
+  chunk_size = RESTfulArtifactCache.READ_SIZE_BYTES
+  with open(tarball, 'rb') as fp:
+    for chunk in iter(lambda: fp.read(chunk_size), b''):
+      time.sleep(len(chunk) / bytes_per_sec)
+      yield chunk
+
+
+def _download_then_extract(cache, artifact_root, cache_key, chunks):
+  # The fetch as it was before streaming: the whole tarball is written out, then extracted.
+  with temporary_file(root_dir=artifact_root) as tmp:
+    for chunk in chunks:
+      tmp.write(chunk)
+    tmp.close()
+    TarballArtifact(artifact_root, tmp.name).extract()
+
+
+def _stream(cache, artifact_root, cache_key, chunks):
+  cache.store_and_use_artifact(cache_key, chunks)
+
+
+def main(megabytes_per_sec):
+  """Times fetching a synthetic compile artifact from a remote cache at each bandwidth.
+
+  Run by hand, eg:
+
+    PYTHONPATH=src/python python tests/python/pants_test/cache/bench_artifact_fetch.py 50 200
+  """
+  with temporary_dir() as artifact_root:
+    cache = TempLocalArtifactCache(artifact_root, compression=5)
+    cache_key = CacheKey('bench', 'hash', 1)
+    classes = os.path.join(artifact_root, 'classes')
+    with cache.insert_paths(cache_key, _write_classes(classes)) as tarball:
+      print('{} files, {:.1f}MB compressed'.format(NUM_FILES,
+                                                   os.path.getsize(tarball) / 1024 / 1024))
+      for rate in megabytes_per_sec:
+        for name, fetch in (('download then extract', _download_then_extract),
+                            ('streaming', _stream)):
+          safe_rmtree(classes)
+          safe_mkdir(classes)
+          start = time.time()
+          fetch(cache, artifact_root, cache_key, _download(tarball, rate * 1024 * 1024))
+          elapsed = time.time() - start
+          print('{:>6}MB/s  {:<21} {:8.3f}s'.format(rate, name, elapsed))
+
+
+if __name__ == '__main__':
+  main([float(arg) for arg in sys.argv[1:]] or [25, 100, 400])
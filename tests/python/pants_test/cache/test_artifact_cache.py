@@ -13,15 +13,18 @@ from contextlib import contextmanager
 from threading import Thread
 
 from pants.base.build_invalidator import CacheKey
+from pants.cache.artifact import TarballArtifact
 from pants.cache.artifact_cache import call_insert, call_use_cached_files
 from pants.cache.cache_setup import (CacheSpecFormatError, EmptyCacheSpecError,
                                      InvalidCacheSpecError, LocalCacheSpecRequiredError,
                                      RemoteCacheSpecRequiredError, create_artifact_cache,
                                      select_best_url)
-from pants.cache.local_artifact_cache import LocalArtifactCache, TempLocalArtifactCache
+from pants.cache.local_artifact_cache import (ContentAddressedLocalArtifactCache,
+                                              LocalArtifactCache, TempLocalArtifactCache)
+from pants.cache.read_write_artifact_cache import ReadWriteArtifactCache
 from pants.cache.restful_artifact_cache import InvalidRESTfulCacheProtoError, RESTfulArtifactCache
 from pants.util.contextutil import pushd, temporary_dir, temporary_file
-from pants.util.dirutil import safe_mkdir
+from pants.util.dirutil import safe_mkdir, safe_rmtree
 from pants_test.base.context_utils import create_context
 from pants_test.testutils.mock_logger import MockLogger
 
@@ -36,6 +39,12 @@ class MockPinger(object):
 
 # A very trivial server that serves files under the cwd.
 class SimpleRESTHandler(SimpleHTTPServer.SimpleHTTPRequestHandler):
+  # Request methods received, for tests to inspect.
+  methods = []
+
+  def log_request(self, *args, **kwargs):
+    SimpleRESTHandler.methods.append(self.command)
+
   def __init__(self, request, client_address, server):
     # The base class implements GET and HEAD.
     SimpleHTTPServer.SimpleHTTPRequestHandler.__init__(self, request, client_address, server)
@@ -53,6 +62,19 @@ class SimpleRESTHandler(SimpleHTTPServer.SimpleHTTPRequestHandler):
     self.send_response(200)
     self.end_headers()
 
+  def do_POST(self):
+    # A bulk existence check: the body lists paths relative to the request path, and we respond
+    # with those that exist.
+    content_length = int(self.headers.getheader('content-length'))
+    relpaths = self.rfile.read(content_length).splitlines()
+    base = self.translate_path(self.path)
+    present = [relpath for relpath in relpaths if os.path.isfile(os.path.join(base, relpath))]
+    body = '\n'.join(present)
+    self.send_response(200)
+    self.send_header('Content-Length', str(len(body)))
+    self.end_headers()
+    self.wfile.write(body)
+
   def do_DELETE(self):
     path = self.translate_path(self.path)
     if os.path.exists(path):
@@ -69,10 +91,10 @@ TEST_CONTENT2 = 'kermit'
 
 class TestArtifactCache(unittest.TestCase):
   @contextmanager
-  def setup_local_cache(self):
+  def setup_local_cache(self, cache_type=LocalArtifactCache):
     with temporary_dir() as artifact_root:
       with temporary_dir() as cache_root:
-        yield LocalArtifactCache(artifact_root, cache_root, compression=0)
+        yield cache_type(artifact_root, cache_root, compression=0)
 
   @contextmanager
   def setup_server(self):
@@ -160,6 +182,10 @@ class TestArtifactCache(unittest.TestCase):
     with self.setup_local_cache() as artifact_cache:
       self.do_test_artifact_cache(artifact_cache)
 
+  def test_content_addressed_local_cache(self):
+    with self.setup_local_cache(ContentAddressedLocalArtifactCache) as artifact_cache:
+      self.do_test_artifact_cache(artifact_cache)
+
   def test_restful_cache(self):
     with self.assertRaises(InvalidRESTfulCacheProtoError):
       RESTfulArtifactCache('foo', 'ftp://localhost/bar', 'foo')
@@ -194,46 +220,321 @@ class TestArtifactCache(unittest.TestCase):
 
   def test_local_backed_remote_cache(self):
     """make sure that the combined cache finds what it should and that it backfills"""
+    for cache_type in (LocalArtifactCache, ContentAddressedLocalArtifactCache):
+      with self.setup_server() as url:
+        with self.setup_local_cache(cache_type) as local:
+          tmp = TempLocalArtifactCache(local.artifact_root, 0)
+          remote = RESTfulArtifactCache(local.artifact_root, url, tmp)
+          combined = RESTfulArtifactCache(local.artifact_root, url, local)
+
+          key = CacheKey('muppet_key', 'fake_hash', 42)
+
+          with self.setup_test_file(local.artifact_root) as path:
+            # No cache has key.
+            self.assertFalse(local.has(key))
+            self.assertFalse(remote.has(key))
+            self.assertFalse(combined.has(key))
+
+            # No cache returns key.
+            self.assertFalse(bool(local.use_cached_files(key)))
+            self.assertFalse(bool(remote.use_cached_files(key)))
+            self.assertFalse(bool(combined.use_cached_files(key)))
+
+            # Attempting to use key that no cache had should not change anything.
+            self.assertFalse(local.has(key))
+            self.assertFalse(remote.has(key))
+            self.assertFalse(combined.has(key))
+
+            # Add to only remote cache.
+            remote.insert(key, [path])
+
+            # After insertion to remote, remote and only remote should have key
+            self.assertFalse(local.has(key))
+            self.assertTrue(remote.has(key))
+            self.assertTrue(combined.has(key))
+
+            # Successfully using via remote should NOT change local.
+            self.assertTrue(bool(remote.use_cached_files(key)))
+            self.assertFalse(local.has(key))
+
+            # Successfully using via combined SHOULD backfill local.
+            self.assertTrue(bool(combined.use_cached_files(key)))
+            self.assertTrue(local.has(key))
+            self.assertTrue(bool(local.use_cached_files(key)))
+
+  def test_codecs_cached_apart(self):
+    key = CacheKey('muppet_key', 'fake_hash', 42)
     with self.setup_server() as url:
-      with self.setup_local_cache() as local:
-        tmp = TempLocalArtifactCache(local.artifact_root, 0)
-        remote = RESTfulArtifactCache(local.artifact_root, url, tmp)
-        combined = RESTfulArtifactCache(local.artifact_root, url, local)
-
-        key = CacheKey('muppet_key', 'fake_hash', 42)
-
-        with self.setup_test_file(local.artifact_root) as path:
-          # No cache has key.
-          self.assertFalse(local.has(key))
-          self.assertFalse(remote.has(key))
-          self.assertFalse(combined.has(key))
-
-          # No cache returns key.
-          self.assertFalse(bool(local.use_cached_files(key)))
-          self.assertFalse(bool(remote.use_cached_files(key)))
-          self.assertFalse(bool(combined.use_cached_files(key)))
-
-          # Attempting to use key that no cache had should not change anything.
-          self.assertFalse(local.has(key))
-          self.assertFalse(remote.has(key))
-          self.assertFalse(combined.has(key))
-
-          # Add to only remote cache.
-          remote.insert(key, [path])
-
-          # After insertion to remote, remote and only remote should have key
-          self.assertFalse(local.has(key))
-          self.assertTrue(remote.has(key))
-          self.assertTrue(combined.has(key))
-
-          # Successfully using via remote should NOT change local.
-          self.assertTrue(bool(remote.use_cached_files(key)))
-          self.assertFalse(local.has(key))
-
-          # Successfully using via combined SHOULD backfill local.
-          self.assertTrue(bool(combined.use_cached_files(key)))
-          self.assertTrue(local.has(key))
-          self.assertTrue(bool(local.use_cached_files(key)))
+      with temporary_dir() as artifact_root:
+        with temporary_dir() as cache_root:
+          gzip_local = LocalArtifactCache(artifact_root, cache_root, compression=0)
+          plain_local = LocalArtifactCache(artifact_root, cache_root, compression=0, codec='none')
+          gzip_remote = RESTfulArtifactCache(artifact_root, url,
+                                             TempLocalArtifactCache(artifact_root, 0))
+          plain_remote = RESTfulArtifactCache(artifact_root, url,
+                                              TempLocalArtifactCache(artifact_root, 0,
+                                                                     codec='none'))
+          with self.setup_test_file(artifact_root) as path:
+            plain_local.insert(key, [path])
+            plain_remote.insert(key, [path])
+            self.assertTrue(plain_local.has(key))
+            self.assertTrue(plain_remote.has(key))
+            # Clients compressing with another codec, like older ones that only know gzip, miss.
+            self.assertFalse(gzip_local.has(key))
+            self.assertFalse(gzip_remote.has(key))
+            # But the artifact still counts towards the local cache's bounds.
+            self.assertEquals(1, gzip_local.stats()['entries'])
+
+  def test_store_and_use_artifact_streaming(self):
+    key = CacheKey('muppet_key', 'fake_hash', 42)
+    with self.setup_local_cache() as cache:
+      with self.setup_test_file(cache.artifact_root) as path:
+        with temporary_file() as tarball:
+          TarballArtifact(cache.artifact_root, tarball.name, compression=6).collect([path])
+          with open(tarball.name, 'rb') as fp:
+            contents = fp.read()
+        with open(path, 'w') as outfile:
+          outfile.write(TEST_CONTENT2)
+
+        # Feed the tarball through in small chunks, to exercise reads spanning chunks.
+        chunks = (contents[i:i + 7] for i in range(0, len(contents), 7))
+        self.assertTrue(cache.store_and_use_artifact(key, chunks))
+
+        with open(path, 'r') as infile:
+          self.assertEquals(TEST_CONTENT1, infile.read())
+        self.assertTrue(cache.has(key))
+        with open(cache._cache_file_for_key(key), 'rb') as fp:
+          self.assertEquals(contents, fp.read())
+
+  def test_store_and_use_artifact_source_failure(self):
+    key = CacheKey('muppet_key', 'fake_hash', 42)
+
+    def chunks():
+      yield b'\x1f\x8b'
+      raise IOError('Connection reset.')
+
+    with self.setup_local_cache() as cache:
+      with self.assertRaises(IOError):
+        cache.store_and_use_artifact(key, chunks())
+      self.assertFalse(cache.has(key))
+
+  def test_store_and_use_artifact_partial_extraction_removed(self):
+    key = CacheKey('muppet_key', 'fake_hash', 42)
+    with self.setup_local_cache() as cache:
+      small = os.path.join(cache.artifact_root, 'a', 'small')
+      large = os.path.join(cache.artifact_root, 'a', 'large')
+      safe_mkdir(os.path.dirname(small))
+      with open(small, 'wb') as fp:
+        fp.write(b'small')
+      with open(large, 'wb') as fp:
+        fp.write(os.urandom(256 * 1024))
+      with temporary_file() as tarball:
+        TarballArtifact(cache.artifact_root, tarball.name, compression=1).collect([small, large])
+        with open(tarball.name, 'rb') as fp:
+          contents = fp.read()
+      os.unlink(small)
+      os.unlink(large)
+
+      def chunks():
+        # Fail partway through the large file, once the small one has been extracted.
+        yield contents[:len(contents) // 2]
+        raise IOError('Connection reset.')
+
+      with self.assertRaises(IOError):
+        cache.store_and_use_artifact(key, chunks())
+      self.assertFalse(os.path.exists(small))
+      self.assertFalse(os.path.exists(large))
+      self.assertFalse(cache.has(key))
+
+  def test_has_many(self):
+    keys = [CacheKey('muppet_key{0}'.format(i), 'fake_hash', 42) for i in range(4)]
+    for bulk_lookup in (False, True):
+      with temporary_dir() as artifact_root:
+        with self.setup_server() as url:
+          cache = RESTfulArtifactCache(artifact_root, url, TempLocalArtifactCache(artifact_root, 0),
+                                       bulk_lookup=bulk_lookup)
+          with self.setup_test_file(artifact_root) as path:
+            cache.insert(keys[1], [path])
+            cache.insert(keys[3], [path])
+
+          del SimpleRESTHandler.methods[:]
+          self.assertEquals([False, True, False, True], cache.has_many(keys))
+          self.assertEquals(['POST'] if bulk_lookup else ['HEAD'] * 4, SimpleRESTHandler.methods)
+
+  def test_has_many_bulk_lookup_unsupported(self):
+    keys = [CacheKey('muppet_key{0}'.format(i), 'fake_hash', 42) for i in range(2)]
+    with temporary_dir() as artifact_root:
+      with self.setup_server() as url:
+        cache = RESTfulArtifactCache(artifact_root, url, TempLocalArtifactCache(artifact_root, 0),
+                                     bulk_lookup=True)
+        with self.setup_test_file(artifact_root) as path:
+          cache.insert(keys[1], [path])
+
+        # Simulate a server without bulk lookup support.
+        do_POST = SimpleRESTHandler.do_POST
+        del SimpleRESTHandler.do_POST
+        try:
+          self.assertEquals([False, True], cache.has_many(keys))
+          self.assertEquals([False, True], cache.has_many(keys))
+        finally:
+          SimpleRESTHandler.do_POST = do_POST
+
+  def test_has_many_bulk_lookup_transient_failure(self):
+    keys = [CacheKey('muppet_key{0}'.format(i), 'fake_hash', 42) for i in range(2)]
+    with temporary_dir() as artifact_root:
+      with self.setup_server() as url:
+        cache = RESTfulArtifactCache(artifact_root, url, TempLocalArtifactCache(artifact_root, 0),
+                                     bulk_lookup=True)
+        with self.setup_test_file(artifact_root) as path:
+          cache.insert(keys[1], [path])
+
+        def fail_POST(handler):
+          handler.send_response(503)
+          handler.end_headers()
+
+        do_POST = SimpleRESTHandler.do_POST
+        SimpleRESTHandler.do_POST = fail_POST
+        try:
+          del SimpleRESTHandler.methods[:]
+          self.assertEquals([False, True], cache.has_many(keys))
+          self.assertEquals(['HEAD', 'HEAD', 'POST'], sorted(SimpleRESTHandler.methods))
+        finally:
+          SimpleRESTHandler.do_POST = do_POST
+
+        # A single failure doesn't give up on bulk lookups.
+        del SimpleRESTHandler.methods[:]
+        self.assertEquals([False, True], cache.has_many(keys))
+        self.assertEquals(['POST'], SimpleRESTHandler.methods)
+
+  def test_prune_evicts_least_recently_used(self):
+    keys = [CacheKey('muppet_key{0}'.format(i), 'fake_hash', 42) for i in range(3)]
+    with temporary_dir() as artifact_root:
+      with temporary_dir() as cache_root:
+        cache = LocalArtifactCache(artifact_root, cache_root, compression=0, max_entries=2)
+        with self.setup_test_file(artifact_root) as path:
+          for i, key in enumerate(keys):
+            cache.insert(key, [path])
+            os.utime(cache._cache_file_for_key(key), (i, i))
+
+          # Using the oldest artifact makes the second oldest the least recently used.
+          self.assertTrue(cache.use_cached_files(keys[0]))
+          evicted_bytes = os.path.getsize(cache._cache_file_for_key(keys[1]))
+          cache.prune()
+          self.assertEquals([True, False, True], [cache.has(key) for key in keys])
+
+          stats = cache.stats()
+          self.assertEquals(2, stats['entries'])
+          self.assertEquals(1, stats['evicted_entries'])
+          self.assertEquals(evicted_bytes, stats['evicted_bytes'])
+
+  def test_prune_max_bytes(self):
+    keys = [CacheKey('muppet_key{0}'.format(i), 'fake_hash', 42) for i in range(3)]
+    with temporary_dir() as artifact_root:
+      with temporary_dir() as cache_root:
+        cache = LocalArtifactCache(artifact_root, cache_root, compression=0)
+        with self.setup_test_file(artifact_root) as path:
+          for i, key in enumerate(keys):
+            cache.insert(key, [path])
+            os.utime(cache._cache_file_for_key(key), (i, i))
+        size = os.path.getsize(cache._cache_file_for_key(keys[0]))
+
+        # Unbounded caches are never pruned.
+        cache.prune()
+        self.assertEquals(3, cache.stats()['entries'])
+
+        bounded = LocalArtifactCache(artifact_root, cache_root, compression=0, max_bytes=size)
+        bounded.prune()
+        self.assertEquals([False, False, True], [cache.has(key) for key in keys])
+
+  def test_stats(self):
+    key = CacheKey('muppet_key', 'fake_hash', 42)
+    with self.setup_local_cache() as cache:
+      self.assertFalse(cache.use_cached_files(key))
+      with self.setup_test_file(cache.artifact_root) as path:
+        cache.insert(key, [path])
+      self.assertTrue(cache.use_cached_files(key))
+      self.assertTrue(cache.use_cached_files(key))
+      self.assertEquals(dict(entries=1, bytes=os.path.getsize(cache._cache_file_for_key(key)),
+                             hits=2, misses=1, evicted_entries=0, evicted_bytes=0),
+                        cache.stats())
+
+  def test_stats_has_many_misses(self):
+    keys = [CacheKey('muppet_key{0}'.format(i), 'fake_hash', 42) for i in range(2)]
+    with self.setup_local_cache() as cache:
+      with self.setup_test_file(cache.artifact_root) as path:
+        cache.insert(keys[0], [path])
+      self.assertEquals([True, False], cache.has_many(keys))
+      self.assertTrue(cache.use_cached_files(keys[0]))
+      stats = cache.stats()
+      self.assertEquals(1, stats['hits'])
+      self.assertEquals(1, stats['misses'])
+
+  def test_read_write_prunes_both(self):
+    key = CacheKey('muppet_key', 'fake_hash', 42)
+    with temporary_dir() as artifact_root:
+      with temporary_dir() as read_root:
+        with temporary_dir() as write_root:
+          read_cache = LocalArtifactCache(artifact_root, read_root, compression=0, max_entries=1)
+          write_cache = LocalArtifactCache(artifact_root, write_root, compression=0, max_entries=1)
+          with self.setup_test_file(artifact_root) as path:
+            for cache in (read_cache, write_cache):
+              cache.insert(key, [path])
+              cache.insert(CacheKey('other_key', 'fake_hash', 42), [path])
+          ReadWriteArtifactCache(read_cache, write_cache).prune()
+          self.assertEquals(1, read_cache.stats()['entries'])
+          self.assertEquals(1, write_cache.stats()['entries'])
+
+  def test_content_addressed_dedup(self):
+    keys = [CacheKey('muppet_key{0}'.format(i), 'fake_hash', 42) for i in range(2)]
+    with self.setup_local_cache(ContentAddressedLocalArtifactCache) as cache:
+      root = cache.artifact_root
+      safe_mkdir(os.path.join(root, 'dir', 'empty'))
+      with open(os.path.join(root, 'dir', 'same'), 'w') as fp:
+        fp.write(TEST_CONTENT1)
+      with open(os.path.join(root, 'dir', 'different'), 'w') as fp:
+        fp.write(TEST_CONTENT1)
+      cache.insert(keys[0], [os.path.join(root, 'dir')])
+      with open(os.path.join(root, 'dir', 'different'), 'w') as fp:
+        fp.write(TEST_CONTENT2)
+      cache.insert(keys[1], [os.path.join(root, 'dir')])
+
+      blob_dir = os.path.join(cache._cache_root, ContentAddressedLocalArtifactCache.BLOB_DIR)
+      blobs = [f for _, _, files in os.walk(blob_dir) for f in files]
+      self.assertEquals(2, len(blobs))
+
+      safe_rmtree(os.path.join(root, 'dir'))
+      self.assertTrue(cache.use_cached_files(keys[0]))
+      self.assertTrue(os.path.isdir(os.path.join(root, 'dir', 'empty')))
+      with open(os.path.join(root, 'dir', 'different'), 'r') as fp:
+        self.assertEquals(TEST_CONTENT1, fp.read())
+      self.assertTrue(cache.use_cached_files(keys[1]))
+      with open(os.path.join(root, 'dir', 'different'), 'r') as fp:
+        self.assertEquals(TEST_CONTENT2, fp.read())
+
+  def test_content_addressed_prune_collects_blobs(self):
+    keys = [CacheKey('muppet_key{0}'.format(i), 'fake_hash', 42) for i in range(2)]
+    with temporary_dir() as artifact_root:
+      with temporary_dir() as cache_root:
+        cache = ContentAddressedLocalArtifactCache(artifact_root, cache_root, compression=0,
+                                                   max_entries=1)
+        cache._BLOB_GRACE_SECS = 0
+        path = os.path.join(artifact_root, 'muppet')
+        for i, (key, content) in enumerate(zip(keys, (TEST_CONTENT1, TEST_CONTENT2))):
+          with open(path, 'w') as fp:
+            fp.write(content)
+          cache.insert(key, [path])
+          os.utime(cache._cache_file_for_key(key), (i, i))
+        blob_dir = os.path.join(cache._cache_root, ContentAddressedLocalArtifactCache.BLOB_DIR)
+        for root, _, files in os.walk(blob_dir):
+          for f in files:
+            os.utime(os.path.join(root, f), (0, 0))
+
+        cache.prune()
+        self.assertEquals([False, True], [cache.has(key) for key in keys])
+        self.assertEquals(1, len([f for _, _, files in os.walk(blob_dir) for f in files]))
+        self.assertTrue(cache.use_cached_files(keys[1]))
+        with open(path, 'r') as fp:
+          self.assertEquals(TEST_CONTENT2, fp.read())
 
   def test_multiproc(self):
     context = create_context()
@@ -0,0 +1,96 @@
+# coding=utf-8
+# Copyright 2015 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (absolute_import, division, generators, nested_scopes, print_function,
+                        unicode_literals, with_statement)
+
+import gzip
+import os
+import random
+import unittest
+from io import BytesIO
+
+from pants.cache.artifact import TarballArtifact
+from pants.cache.compression import (CODECS, CompressingWriter, DecompressingReader,
+                                     codec_available)
+from pants.util.contextutil import open_tar, temporary_dir
+from pants.util.dirutil import safe_mkdir, safe_rmtree
+
+
+class CompressionTest(unittest.TestCase):
+
+  def setUp(self):
+    rng = random.Random(42)
+    # Compressible, but not trivially so, and spanning several blocks.
+    words = [bytes(rng.randint(0, 10000)) for _ in range(1000)]
+    self.data = b' '.join(rng.choice(words) for _ in range(500000))
+
+  def compress(self, codec, threads=1, block_size=None):
+    out = BytesIO()
+    with CompressingWriter(out, codec=codec, level=6, threads=threads) as writer:
+      if block_size:
+        writer._BLOCK_SIZE = block_size
+      for i in range(0, len(self.data), 100000):
+        writer.write(self.data[i:i + 100000])
+    return out.getvalue()
+
+  def decompress(self, compressed, read_size=-1):
+    reader = DecompressingReader(BytesIO(compressed))
+    parts = []
+    while True:
+      part = reader.read(read_size)
+      if not part:
+        break
+      parts.append(part)
+      if read_size < 0:
+        break
+    return b''.join(parts)
+
+  def test_round_trip(self):
+    for codec in CODECS:
+      if codec_available(codec):
+        compressed = self.compress(codec)
+        if codec != 'none':
+          self.assertLess(len(compressed), len(self.data))
+        self.assertEquals(self.data, self.decompress(compressed))
+        self.assertEquals(self.data, self.decompress(compressed, read_size=4097))
+
+  def test_parallel_gzip(self):
+    compressed = self.compress('gzip', threads=4, block_size=64 * 1024)
+    self.assertEquals(self.data, self.decompress(compressed))
+    self.assertEquals(self.data, self.decompress(compressed, read_size=4097))
+    # The output is a standard, multi-member gzip stream.
+    self.assertEquals(self.data, gzip.GzipFile(fileobj=BytesIO(compressed)).read())
+
+  def test_uncompressed_passthrough(self):
+    self.assertEquals(b'', self.decompress(b''))
+    self.assertEquals(b'ab', self.decompress(b'ab'))
+
+  def test_tarball_artifact_codecs(self):
+    with temporary_dir() as artifact_root:
+      with temporary_dir() as tmpdir:
+        src = os.path.join(artifact_root, 'classes')
+        safe_mkdir(src)
+        with open(os.path.join(src, 'data'), 'wb') as fp:
+          fp.write(self.data)
+
+        def check_extract(tarball):
+          safe_rmtree(src)
+          TarballArtifact(artifact_root, tarball).extract()
+          with open(os.path.join(src, 'data'), 'rb') as fp:
+            self.assertEquals(self.data, fp.read())
+
+        for codec in CODECS:
+          if codec_available(codec):
+            for threads in (1, 3):
+              tarball = os.path.join(tmpdir, '{0}.{1}.tgz'.format(codec, threads))
+              artifact = TarballArtifact(artifact_root, tarball, 6, codec=codec, threads=threads)
+              artifact.collect([src])
+              check_extract(tarball)
+
+        # Tarballs written before codecs were selectable remain readable.
+        tarball = os.path.join(tmpdir, 'legacy.tgz')
+        with open_tar(tarball, 'w:gz', dereference=True, compresslevel=6) as tarout:
+          tarout.add(src, 'classes')
+        check_extract(tarball)
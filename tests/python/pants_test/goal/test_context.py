@@ -111,3 +111,42 @@ class ContextTest(BaseTest):
     b.inject_dependency(syn_with_deps.address)
 
     self.assertEquals([b, syn_with_deps, a], context.targets())
+
+  def test_targets_memoized(self):
+    a = self.make_target('a')
+    b = self.make_target('b', dependencies=[a])
+    c = self.make_target('c')
+    context = self.context(target_roots=[b])
+    self.assertEquals([b, a], context.targets())
+    self.assertEquals([b], context.targets(lambda t: t.dependencies))
+    self.assertEquals([a, b], context.targets(postorder=True))
+    self.assertEquals([b, a], context.targets())
+    self.assertEquals((4, 2), context.targets_stats[:2])
+
+    # Returned lists are the caller's own.
+    context.targets().append(c)
+    self.assertEquals([b, a], context.targets())
+
+    # Injecting a dependency anywhere in the graph invalidates the memoized targets.
+    a.inject_dependency(c.address)
+    self.assertEquals([b, a, c], context.targets())
+    self.assertEquals(3, context.targets_stats.closures)
+
+  def test_targets_of_type(self):
+    class Library(Target):
+      pass
+
+    class Binary(Target):
+      pass
+
+    a = self.make_target('a', Library)
+    b = self.make_target('b', Binary, dependencies=[a])
+    c = self.make_target('c', Library, dependencies=[b])
+    d = self.make_target('d', Target, dependencies=[c])
+    context = self.context(target_roots=[d])
+    self.assertEquals([c, a], context.targets(Library))
+    self.assertEquals([c, b, a], context.targets((Library, Binary)))
+    self.assertEquals([d, c, b, a], context.targets(Target))
+
+    syn = context.add_new_target(SyntheticAddress.parse('syn'), Library, derived_from=b)
+    self.assertEquals([c, a, syn], context.targets(Library))
@@ -0,0 +1,72 @@
+# coding=utf-8
+# Copyright 2015 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (absolute_import, division, generators, nested_scopes, print_function,
+                        unicode_literals, with_statement)
+
+import multiprocessing
+import os
+import random
+import time
+import unittest
+
+from pants.backend.core.targets.resources import Resources
+from pants.base.build_invalidator import CacheKeyGenerator
+from pants.base.cache_manager import InvalidationCacheManager
+from pants.util.contextutil import temporary_dir
+from pants_test.base_test import BaseTest
+
+
+class CacheManagerBenchmark(BaseTest):
+  """Times a cold invalidation check of a synthetic repo with serial and concurrent fingerprinting.
+
+  Not collected by default; run by hand, eg:
+
+    PYTHONPATH=src/python:tests/python python tests/python/pants_test/tasks/bench_cache_manager.py
+  """
+
+  NUM_TARGETS = 4000
+  SOURCES_PER_TARGET = 5
+  SOURCE_SIZE = 16 * 1024
+  MAX_DEPENDENCIES = 4
+
+  def setUp(self):
+    super(CacheManagerBenchmark, self).setUp()
+    rand = random.Random(0)
+    for i in range(self.NUM_TARGETS):
+      for j in range(self.SOURCES_PER_TARGET):
+        self.create_file('src/t{}/{}.txt'.format(i, j), os.urandom(self.SOURCE_SIZE))
+    self._dependencies = [rand.sample(range(i), min(i, rand.randint(0, self.MAX_DEPENDENCIES)))
+                          for i in range(self.NUM_TARGETS)]
+
+  def _make_targets(self, name):
+    # Fingerprints are memoized on targets, so each run fingerprints a fresh set of them.
+    targets = []
+    for i, dependencies in enumerate(self._dependencies):
+      targets.append(self.make_target('src/t{}:{}'.format(i, name), Resources,
+                                      sources=['{}.txt'.format(j)
+                                               for j in range(self.SOURCES_PER_TARGET)],
+                                      dependencies=[targets[d] for d in dependencies]))
+    return targets
+
+  def _time_check(self, name, fingerprint_workers):
+    targets = self._make_targets(name)
+    with temporary_dir() as invalidator_dir:
+      cache_manager = InvalidationCacheManager(CacheKeyGenerator(), invalidator_dir, True,
+                                               fingerprint_workers=fingerprint_workers)
+      start = time.time()
+      cache_manager.check(targets)
+      return time.time() - start
+
+  def test_fingerprint_workers(self):
+    # Warm the page cache so that the first run timed doesn't pay for it alone.
+    self._time_check('warmup', 1)
+    for fingerprint_workers in sorted({1, 2, 4, multiprocessing.cpu_count()}):
+      elapsed = self._time_check('w{}'.format(fingerprint_workers), fingerprint_workers)
+      print('{} targets  {:>3} workers  {:8.3f}s'.format(self.NUM_TARGETS, fingerprint_workers,
+                                                         elapsed))
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -8,6 +8,7 @@ from __future__ import (absolute_import, division, generators, nested_scopes, pr
 import shutil
 import tempfile
 
+from pants.backend.core.targets.resources import Resources
 from pants.base.build_invalidator import CacheKey, CacheKeyGenerator
 from pants.base.cache_manager import InvalidationCacheManager, InvalidationCheck, VersionedTarget
 from pants_test.base_test import BaseTest
@@ -123,3 +124,23 @@ class InvalidationCacheManagerTest(BaseTest):
     self.assertEquals(1, len(partitioned[0].targets))
     self.assertEquals(3, len(partitioned[1].targets))
     self.assertEquals(1, len(partitioned[2].targets))
+
+  def test_parallel_fingerprinting(self):
+    self.create_file('src/a/a.txt', 'a')
+    self.create_file('src/b/b.txt', 'b')
+    self.create_file('src/c/c.txt', 'c')
+    a = self.make_target('src/a', Resources, sources=['a.txt'])
+    b = self.make_target('src/b', Resources, sources=['b.txt'], dependencies=[a])
+    c = self.make_target('src/c', Resources, sources=['c.txt'], dependencies=[a, b])
+    targets = [a, b, c]
+
+    def keys(fingerprint_workers):
+      for target in targets:
+        target.mark_invalidation_hash_dirty()
+      cache_manager = InvalidationCacheManager(CacheKeyGenerator(), self._dir, True,
+                                               fingerprint_workers=fingerprint_workers)
+      return [vt.cache_key for vt in cache_manager.check(targets).all_vts]
+
+    serial_keys = keys(1)
+    self.assertEqual(3, len(serial_keys))
+    self.assertEqual(serial_keys, keys(4))
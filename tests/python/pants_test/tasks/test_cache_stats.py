@@ -0,0 +1,46 @@
+# coding=utf-8
+# Copyright 2015 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (absolute_import, division, generators, nested_scopes, print_function,
+                        unicode_literals, with_statement)
+
+import os
+
+from pants.backend.core.tasks.cache_stats import CacheStats
+from pants.base.build_invalidator import CacheKey
+from pants.cache.local_artifact_cache import LocalArtifactCache
+from pants.util.contextutil import temporary_dir
+from pants.util.dirutil import touch
+from pants_test.tasks.task_test_base import ConsoleTaskTestBase
+
+
+class CacheStatsTest(ConsoleTaskTestBase):
+
+  @classmethod
+  def task_type(cls):
+    return CacheStats
+
+  def test_no_caches(self):
+    self.assert_console_output(options=dict(read_artifact_caches=[], write_artifact_caches=[],
+                                            cache_compression=0))
+
+  def test_local_cache(self):
+    with temporary_dir() as artifact_root:
+      with temporary_dir() as cache_root:
+        cache = LocalArtifactCache(artifact_root, os.path.join(cache_root, 'TestTask'), 0)
+        key = CacheKey('muppet_key', 'fake_hash', 42)
+        path = os.path.join(artifact_root, 'muppet')
+        touch(path)
+        cache.use_cached_files(key)
+        cache.insert(key, [path])
+        cache.use_cached_files(key)
+        size = os.path.getsize(cache._cache_file_for_key(key))
+
+        self.assert_console_output_ordered(
+          '{}:'.format(os.path.realpath(cache_root)),
+          '  TestTask: 1 artifacts, {} bytes, hit rate 50.0% (1/2), evicted 0 artifacts (0 bytes)'
+          .format(size),
+          options=dict(read_artifact_caches=[cache_root],
+                       write_artifact_caches=[[cache_root, 'http://localhost/bar']],
+                       cache_compression=0))
@@ -5,6 +5,7 @@
 from __future__ import (absolute_import, division, generators, nested_scopes, print_function,
                         unicode_literals, with_statement)
 
+import os
 from textwrap import dedent
 
 from pants.backend.codegen.targets.java_thrift_library import JavaThriftLibrary
@@ -17,6 +18,8 @@ from pants.backend.jvm.targets.java_library import JavaLibrary
 from pants.backend.python.targets.python_library import PythonLibrary
 from pants.backend.python.targets.python_tests import PythonTests
 from pants.base.build_file_aliases import BuildFileAliases
+from pants.base.build_graph import BuildGraph
+from pants.base.dependee_index import DependeeIndex
 from pants.base.exceptions import TaskError
 from pants.base.source_root import SourceRoot
 from pants_test.tasks.task_test_base import ConsoleTaskTestBase
@@ -262,3 +265,13 @@ class ReverseDepmapTest(BaseReverseDepmapTest):
       targets=[self.target('common/a')],
       options={'spec_excludes': ['overlaps']}
     )
+
+
+class IndexedReverseDepmapTest(ReverseDepmapTest):
+  """Runs the same tests finding dependees with a DependeeIndex rather than the build graph."""
+
+  def setUp(self):
+    super(IndexedReverseDepmapTest, self).setUp()
+    index_path = os.path.join(self.pants_workdir, 'dependee_index', 'index.pickle')
+    self.build_graph = BuildGraph(self.address_mapper,
+                                  dependee_index=DependeeIndex(index_path, self.build_file_parser))
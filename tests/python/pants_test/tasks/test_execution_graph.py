@@ -17,6 +17,10 @@ class ImmediatelyExecutingPool(object):
     work.func(*work.args_tuples[0])
 
 
+class SingleWorkerPool(ImmediatelyExecutingPool):
+  num_workers = 1
+
+
 class PrintLogger(object):
   def debug(self, msg):
     print(msg)
@@ -37,12 +41,12 @@ class ExecutionGraphTest(unittest.TestCase):
   def execute(self, exec_graph):
     exec_graph.execute(ImmediatelyExecutingPool(), PrintLogger())
 
-  def job(self, name, fn, dependencies, on_success=None, on_failure=None):
+  def job(self, name, fn, dependencies, on_success=None, on_failure=None, size=1):
     def recording_fn():
       self.jobs_run.append(name)
       fn()
 
-    return Job(name, recording_fn, dependencies, on_success, on_failure)
+    return Job(name, recording_fn, dependencies, on_success, on_failure, size=size)
 
   def test_single_job(self):
     exec_graph = ExecutionGraph([self.job("A", passing_fn, [])])
@@ -191,3 +195,73 @@ class ExecutionGraphTest(unittest.TestCase):
                       self.job("Same", passing_fn, [])])
 
     self.assertEqual("Unexecutable graph: Job already scheduled u'Same'", str(cm.exception))
+
+  def test_critical_path_runs_first(self):
+    exec_graph = ExecutionGraph([self.job("Leaf", passing_fn, [], size=4),
+                                 self.job("C", passing_fn, [], size=1),
+                                 self.job("B", passing_fn, ["C"], size=2),
+                                 self.job("A", passing_fn, ["B"], size=3)])
+    self.assertEqual(6, exec_graph.priority("C"))
+    self.assertEqual(4, exec_graph.priority("Leaf"))
+
+    exec_graph.execute(SingleWorkerPool(), PrintLogger())
+
+    self.assertEqual(["C", "B", "Leaf", "A"], self.jobs_run)
+
+  def test_equal_priorities_run_in_order_of_readiness(self):
+    exec_graph = ExecutionGraph([self.job("A", passing_fn, ["C"]),
+                                 self.job("B", passing_fn, []),
+                                 self.job("C", passing_fn, [])])
+
+    exec_graph.execute(SingleWorkerPool(), PrintLogger())
+
+    self.assertEqual(["C", "B", "A"], self.jobs_run)
+
+  def test_simulated_makespan(self):
+    # A chain of expensive jobs, and many cheap leaves that would be run first in FIFO order.
+    jobs = [self.job("leaf{}".format(i), passing_fn, [], size=1) for i in range(4)]
+    jobs.append(self.job("chain0", passing_fn, [], size=3))
+    jobs.extend(self.job("chain{}".format(i), passing_fn, ["chain{}".format(i - 1)], size=3)
+                for i in range(1, 3))
+    exec_graph = ExecutionGraph(jobs)
+
+    self.assertEqual(11, exec_graph.simulate(2, fifo=True))
+    self.assertEqual(9, exec_graph.simulate(2))
+    self.assertEqual(13, exec_graph.simulate(1))
+    self.assertEqual([], self.jobs_run)
+
+  def test_satisfied_job_does_not_run(self):
+    successes = []
+    exec_graph = ExecutionGraph([self.job("A", passing_fn, ["B"]),
+                                 self.job("B", passing_fn, ["C"],
+                                          on_success=lambda: successes.append("B")),
+                                 self.job("C", passing_fn, [])])
+    exec_graph.satisfy("B")
+
+    self.execute(exec_graph)
+
+    self.assertEqual(["C", "A"], self.jobs_run)
+    self.assertEqual(["B"], successes)
+
+  def test_satisfied_job_is_not_canceled(self):
+    exec_graph = ExecutionGraph([self.job("A", passing_fn, ["B"]),
+                                 self.job("B", passing_fn, ["F"]),
+                                 self.job("F", raising_fn, [])])
+    exec_graph.satisfy("B")
+
+    with self.assertRaises(ExecutionFailure) as cm:
+      self.execute(exec_graph)
+
+    self.assertEqual(["F", "A"], self.jobs_run)
+    self.assertEqual("Failed jobs: F", str(cm.exception))
+
+  def test_satisfying_a_finished_job_is_a_noop(self):
+    successes = []
+    exec_graph = ExecutionGraph([self.job("A", passing_fn, ["B"]),
+                                 self.job("B", lambda: exec_graph.satisfy("B"), [],
+                                          on_success=lambda: successes.append("B"))])
+
+    self.execute(exec_graph)
+
+    self.assertEqual(["B", "A"], self.jobs_run)
+    self.assertEqual(["B"], successes)
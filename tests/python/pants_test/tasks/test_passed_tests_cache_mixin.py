@@ -0,0 +1,104 @@
+# coding=utf-8
+# Copyright 2015 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (absolute_import, division, generators, nested_scopes, print_function,
+                        unicode_literals, with_statement)
+
+import os
+
+from pants.backend.core.tasks.passed_tests_cache_mixin import PassedTestsCacheMixin
+from pants.backend.core.tasks.task import Task
+from pants.backend.jvm.targets.java_library import JavaLibrary
+from pants.backend.jvm.targets.java_tests import JavaTests
+from pants.base.exceptions import TestFailedTaskError
+from pants.util.contextutil import temporary_dir
+from pants.util.dirutil import safe_rmtree
+from pants_test.tasks.task_test_base import TaskTestBase
+
+
+class FakeTestRun(PassedTestsCacheMixin, Task):
+
+  def execute(self):
+    pass
+
+
+class PassedTestsCacheMixinTest(TaskTestBase):
+
+  @classmethod
+  def task_type(cls):
+    return FakeTestRun
+
+  def setUp(self):
+    super(PassedTestsCacheMixinTest, self).setUp()
+    self.create_file('lib/Lib.java', 'class Lib {}')
+    self.create_file('a/ATest.java', 'class ATest {}')
+    self.create_file('b/BTest.java', 'class BTest {}')
+    self.make_targets()
+
+  def make_targets(self):
+    # Fingerprints are memoized on the targets, so changed sources call for new ones.
+    self.reset_build_graph()
+    self.lib = self.make_target('lib', JavaLibrary, sources=['Lib.java'])
+    self.a = self.make_target('a', JavaTests, sources=['ATest.java'], dependencies=[self.lib])
+    self.b = self.make_target('b', JavaTests, sources=['BTest.java'])
+
+  def run_tests(self, failing=(), run_inputs=('-Xmx1g',), cacheable=True, **options):
+    """Runs the tests of a and b as a test task would.
+
+    :returns: The specs of the targets whose tests ran.
+    """
+    self.set_options(**dict(dict(cache_results=True, cache_results_env_vars=[]), **options))
+    task = self.create_task(self.context(target_roots=[self.a, self.b]))
+    ran = []
+    try:
+      with task.invalidated_tests([self.a, self.b], list(run_inputs),
+                                  cacheable=cacheable) as untested_targets:
+        ran.extend(untested_targets)
+        if failing:
+          task.record_passed_tests([t for t in untested_targets if t not in failing])
+          raise TestFailedTaskError()
+    except TestFailedTaskError:
+      pass
+    return sorted(target.address.spec for target in ran)
+
+  def test_passed_skipped(self):
+    self.assertEqual(['a:a', 'b:b'], self.run_tests())
+    self.assertEqual([], self.run_tests())
+
+  def test_failed_rerun(self):
+    self.assertEqual(['a:a', 'b:b'], self.run_tests(failing=[self.b]))
+    self.assertEqual(['b:b'], self.run_tests())
+    self.assertEqual([], self.run_tests())
+
+  def test_dependency_change_reruns(self):
+    self.run_tests()
+    self.create_file('lib/Lib.java', 'class Lib { int i; }')
+    self.make_targets()
+    self.assertEqual(['a:a'], self.run_tests())
+
+  def test_run_inputs_change_reruns(self):
+    self.run_tests()
+    self.assertEqual(['a:a', 'b:b'], self.run_tests(run_inputs=['-Xmx2g']))
+
+  def test_env_var_change_reruns(self):
+    os.environ['PASSED_TESTS_CACHE_MIXIN_TEST'] = '1'
+    try:
+      self.run_tests(cache_results_env_vars=['PASSED_TESTS_CACHE_MIXIN_TEST'])
+      os.environ['PASSED_TESTS_CACHE_MIXIN_TEST'] = '2'
+      self.assertEqual(['a:a', 'b:b'],
+                       self.run_tests(cache_results_env_vars=['PASSED_TESTS_CACHE_MIXIN_TEST']))
+    finally:
+      del os.environ['PASSED_TESTS_CACHE_MIXIN_TEST']
+
+  def test_shared_through_artifact_cache(self):
+    with temporary_dir() as artifact_cache:
+      self.run_tests(failing=[self.b], write_artifact_caches=[artifact_cache])
+      # As if on another machine.
+      safe_rmtree(os.path.join(self.pants_workdir, 'build_invalidator'))
+      self.assertEqual(['b:b'], self.run_tests(read_artifact_caches=[artifact_cache]))
+
+  def test_disabled(self):
+    self.run_tests()
+    self.assertEqual(['a:a', 'b:b'], self.run_tests(cache_results=False))
+    self.assertEqual(['a:a', 'b:b'], self.run_tests(cacheable=False))
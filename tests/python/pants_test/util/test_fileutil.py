@@ -5,10 +5,11 @@
 from __future__ import (absolute_import, division, generators, nested_scopes, print_function,
                         unicode_literals, with_statement)
 
+import os
 import unittest
 
-from pants.util.contextutil import temporary_file
-from pants.util.fileutil import atomic_copy
+from pants.util.contextutil import temporary_dir, temporary_file
+from pants.util.fileutil import atomic_copy, atomic_replace
 
 
 class FileutilTest(unittest.TestCase):
@@ -21,3 +22,27 @@ class FileutilTest(unittest.TestCase):
         dst.close()
         with open(dst.name) as new_dst:
           self.assertEquals(src.name, new_dst.read())
+
+  def test_atomic_replace(self):
+    with temporary_dir() as tmpdir:
+      path = os.path.join(tmpdir, 'file')
+      with open(path, 'w') as fp:
+        fp.write('old')
+      with atomic_replace(path) as tmp_path:
+        with open(tmp_path, 'w') as fp:
+          fp.write('new')
+        with open(path) as fp:
+          self.assertEqual('old', fp.read())
+      with open(path) as fp:
+        self.assertEqual('new', fp.read())
+      self.assertEqual(['file'], os.listdir(tmpdir))
+
+  def test_atomic_replace_failed(self):
+    with temporary_dir() as tmpdir:
+      path = os.path.join(tmpdir, 'file')
+      with self.assertRaises(ValueError):
+        with atomic_replace(path) as tmp_path:
+          with open(tmp_path, 'w') as fp:
+            fp.write('new')
+          raise ValueError()
+      self.assertEqual([], os.listdir(tmpdir))
@@ -0,0 +1,39 @@
+# coding=utf-8
+# Copyright 2015 Pants project contributors (see CONTRIBUTORS.md).
+# Licensed under the Apache License, Version 2.0 (see LICENSE).
+
+from __future__ import (absolute_import, division, generators, nested_scopes, print_function,
+                        unicode_literals, with_statement)
+
+import os
+import unittest
+
+from pants.util.contextutil import temporary_dir
+from pants.util.persistent_pickle import PersistentPickle
+
+
+class PersistentPickleTest(unittest.TestCase):
+
+  def test_round_trip(self):
+    with temporary_dir() as tmpdir:
+      path = os.path.join(tmpdir, 'sub', 'state.pickle')
+      PersistentPickle(path, 1).save({'a': (1, 2)})
+      self.assertEqual({'a': (1, 2)}, PersistentPickle(path, 1).load())
+      self.assertEqual([], [name for name in os.listdir(os.path.dirname(path)) if '.tmp.' in name])
+
+  def test_missing(self):
+    with temporary_dir() as tmpdir:
+      self.assertIsNone(PersistentPickle(os.path.join(tmpdir, 'state.pickle'), 1).load())
+
+  def test_other_version(self):
+    with temporary_dir() as tmpdir:
+      path = os.path.join(tmpdir, 'state.pickle')
+      PersistentPickle(path, 1).save({'a': 1})
+      self.assertIsNone(PersistentPickle(path, 2).load())
+
+  def test_corrupt(self):
+    with temporary_dir() as tmpdir:
+      path = os.path.join(tmpdir, 'state.pickle')
+      with open(path, 'wb') as fp:
+        fp.write(b'garbage')
+      self.assertIsNone(PersistentPickle(path, 1).load())